@@ -0,0 +1,61 @@
+"""add pipeline_runs (estado de corridas interactivas en la DB)
+
+Una fila por corrida interactiva de un pipeline: paso actual, estado,
+input pendiente y el manifiesto del checkpoint (artifacts en disco). Con
+esto el estado deja de vivir en memoria del proceso (`ACTIVE_RUNNERS`) y
+la API puede correr con más de un worker.
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = 'a8b9c0d1e2f3'
+down_revision: Union[str, None] = 'f7a8b9c0d1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pipeline_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('pipeline_id', sa.Integer(), nullable=False),
+        sa.Column('config_json', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='IDLE'),
+        sa.Column('current_step_index', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_steps', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_input_json', sa.Text(), nullable=True),
+        sa.Column('checkpoint_json', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('closed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['pipeline_id'], ['pipelines.pipeline_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_pipeline_runs_id', 'pipeline_runs', ['id'])
+    op.create_index('ix_pipeline_runs_org_id', 'pipeline_runs', ['org_id'])
+    op.create_index('ix_pipeline_runs_user_id', 'pipeline_runs', ['user_id'])
+    op.create_index('ix_pipeline_runs_pipeline_id', 'pipeline_runs', ['pipeline_id'])
+    op.create_index('ix_pipeline_runs_updated_at', 'pipeline_runs', ['updated_at'])
+    op.create_index('ix_pipeline_runs_sesion', 'pipeline_runs', ['user_id', 'pipeline_id', 'closed_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pipeline_runs_sesion', table_name='pipeline_runs')
+    op.drop_index('ix_pipeline_runs_updated_at', table_name='pipeline_runs')
+    op.drop_index('ix_pipeline_runs_pipeline_id', table_name='pipeline_runs')
+    op.drop_index('ix_pipeline_runs_user_id', table_name='pipeline_runs')
+    op.drop_index('ix_pipeline_runs_org_id', table_name='pipeline_runs')
+    op.drop_index('ix_pipeline_runs_id', table_name='pipeline_runs')
+    op.drop_table('pipeline_runs')
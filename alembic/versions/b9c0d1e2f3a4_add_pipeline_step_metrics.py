@@ -0,0 +1,62 @@
+"""add pipeline_step_metrics (telemetría por paso de pipeline)
+
+Una fila por paso ejecutado: tiempo real y de CPU, pico de memoria, filas
+y bytes de entrada/salida. Permite ver qué pasos pesan y detectar
+regresiones agregando por clase de paso.
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = 'b9c0d1e2f3a4'
+down_revision: Union[str, None] = 'a8b9c0d1e2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'pipeline_step_metrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('pipeline_id', sa.Integer(), nullable=False),
+        sa.Column('run_id', sa.Integer(), nullable=True),
+        sa.Column('step_index', sa.Integer(), nullable=False),
+        sa.Column('step_class', sa.String(length=100), nullable=False),
+        sa.Column('step_name', sa.String(length=200), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('wall_ms', sa.Float(), nullable=False),
+        sa.Column('cpu_ms', sa.Float(), nullable=False),
+        sa.Column('rss_peak_delta_kb', sa.Integer(), nullable=True),
+        sa.Column('rows_in', sa.Integer(), nullable=True),
+        sa.Column('rows_out', sa.Integer(), nullable=True),
+        sa.Column('bytes_in', sa.Integer(), nullable=True),
+        sa.Column('bytes_out', sa.Integer(), nullable=True),
+        sa.Column('detail_json', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['pipeline_id'], ['pipelines.pipeline_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['run_id'], ['pipeline_runs.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_pipeline_step_metrics_id', 'pipeline_step_metrics', ['id'])
+    op.create_index('ix_pipeline_step_metrics_org_id', 'pipeline_step_metrics', ['org_id'])
+    op.create_index('ix_pipeline_step_metrics_pipeline_id', 'pipeline_step_metrics', ['pipeline_id'])
+    op.create_index('ix_pipeline_step_metrics_run_id', 'pipeline_step_metrics', ['run_id'])
+    op.create_index('ix_pipeline_step_metrics_step_class', 'pipeline_step_metrics', ['step_class'])
+    op.create_index('ix_pipeline_step_metrics_created_at', 'pipeline_step_metrics', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pipeline_step_metrics_created_at', table_name='pipeline_step_metrics')
+    op.drop_index('ix_pipeline_step_metrics_step_class', table_name='pipeline_step_metrics')
+    op.drop_index('ix_pipeline_step_metrics_run_id', table_name='pipeline_step_metrics')
+    op.drop_index('ix_pipeline_step_metrics_pipeline_id', table_name='pipeline_step_metrics')
+    op.drop_index('ix_pipeline_step_metrics_org_id', table_name='pipeline_step_metrics')
+    op.drop_index('ix_pipeline_step_metrics_id', table_name='pipeline_step_metrics')
+    op.drop_table('pipeline_step_metrics')
@@ -0,0 +1,55 @@
+"""add indexed free-text search on metric_data
+
+Búsqueda libre `q` de GET /api/metrics/{id}/data
+(`backend/metric_store.busqueda_texto_sql`):
+
+  - PostgreSQL: extensión pg_trgm + dos índices GIN trigram sobre
+    `lower(coalesce(value, ''))` y `lower(coalesce(dimensions_json, ''))`,
+    las mismas expresiones que filtra el LIKE.
+  - SQLite: tabla FTS5 `metric_data_fts` (tokenizer trigram) + triggers que
+    la mantienen en cada escritura, poblada con las filas existentes. Si el
+    SQLite no trae trigram (< 3.34) no se crea y la búsqueda sigue por LIKE.
+
+El SQL está en `backend/metric_data_ddl.py`, el mismo que aplica
+`backend/models.py` con `create_all`.
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from backend import metric_data_ddl
+
+revision: str = 'c0d1e2f3a4b5'
+down_revision: Union[str, None] = 'b9c0d1e2f3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for nombre, expresion in metric_data_ddl.TRGM_INDICES_PG.items():
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS {nombre} "
+                f"ON metric_data USING gin (({expresion}) gin_trgm_ops)"
+            )
+    elif bind.dialect.name == 'sqlite' and metric_data_ddl.sqlite_con_fts_trigram(bind):
+        for sentencia in metric_data_ddl.FTS_SQLITE_DDL:
+            op.execute(sentencia)
+        op.execute(metric_data_ddl.FTS_SQLITE_POBLAR)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for nombre in metric_data_ddl.TRGM_INDICES_PG:
+            op.execute(f"DROP INDEX IF EXISTS {nombre}")
+    elif bind.dialect.name == 'sqlite':
+        for trigger in metric_data_ddl.FTS_SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS metric_data_fts")
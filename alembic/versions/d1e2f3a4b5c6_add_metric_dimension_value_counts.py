@@ -0,0 +1,63 @@
+"""add metric_dimension_value_counts (índice de facetas)
+
+Cantidad de filas de `metric_data` por (métrica, dimensión, valor). Los
+dropdowns de filtros y los `distinct` por dimensión (metrics, data_ops,
+results) leen de acá en vez de recorrer `metric_data`.
+
+La tabla la mantienen triggers sobre `metric_data`, así que queda al día
+con cualquier vía de escritura:
+
+  - PostgreSQL: función plpgsql + triggers por sentencia con tablas de
+    transición (un INSERT masivo hace un solo upsert agregado).
+  - SQLite: triggers por fila con UPSERT sobre `json_each`.
+
+Se puebla con las filas existentes. El SQL está en
+`backend/metric_data_ddl.py`, el mismo que aplica `backend/models.py` al
+crear la tabla con `create_all`.
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from backend import metric_data_ddl
+
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, None] = 'c0d1e2f3a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'metric_dimension_value_counts',
+        sa.Column('id_metric', sa.Integer(), nullable=False),
+        sa.Column('dim_key', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('n_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['id_metric'], ['metrics.id_metric'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id_metric', 'dim_key', 'value'),
+    )
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for sentencia in metric_data_ddl.DIM_COUNTS_PG_DDL:
+            op.execute(sentencia)
+    elif bind.dialect.name == 'sqlite':
+        for sentencia in metric_data_ddl.DIM_COUNTS_SQLITE_DDL:
+            op.execute(sentencia)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for trigger in metric_data_ddl.DIM_COUNTS_PG_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON metric_data")
+        op.execute(f"DROP FUNCTION IF EXISTS {metric_data_ddl.DIM_COUNTS_PG_FUNCION}()")
+    elif bind.dialect.name == 'sqlite':
+        for trigger in metric_data_ddl.DIM_COUNTS_SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_table('metric_dimension_value_counts')
@@ -0,0 +1,45 @@
+"""add metric_data_columns (copia columnar materializada de metric_data)
+
+Una fila por métrica con sus datos en forma columnar: un JSON comprimido
+(zlib) con una lista por dimensión y una por field de `value`. Los loaders
+(tablas/gráficos, motor de informes, LoadMetricToDF) leen esta copia con un
+único SELECT en lugar de parsear el JSON de cada fila de `metric_data`.
+
+`n_rows` + `max_id_data` son la huella con la que el lector detecta que la
+copia quedó vieja y la reconstruye (ver `backend/metric_store.py`). La tabla
+arranca vacía: cada copia se arma en la primera lectura de su métrica.
+
+Revision ID: d5e6f7a8b9c0
+Revises: c3d4e5f6a7b8
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = 'd5e6f7a8b9c0'
+down_revision: Union[str, None] = 'c3d4e5f6a7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'metric_data_columns',
+        sa.Column('id_metric', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('n_rows', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_id_data', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('built_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['id_metric'], ['metrics.id_metric'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('id_metric'),
+    )
+    op.create_index('ix_metric_data_columns_org_id', 'metric_data_columns', ['org_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_metric_data_columns_org_id', table_name='metric_data_columns')
+    op.drop_table('metric_data_columns')
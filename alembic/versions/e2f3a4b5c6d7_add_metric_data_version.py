@@ -0,0 +1,57 @@
+"""add metrics.data_version (huella de la copia columnar)
+
+`metric_data_columns` detectaba una copia vieja comparando
+`(n_rows, max_id_data)` con `metric_data`: un UPDATE que no cambia la
+cantidad ni el último id (replace/recalculate de data_ops, edición de una
+fila) commiteado mientras otro request reconstruía la copia dejaba
+persistida una copia vieja con huella "válida".
+
+  - `metrics.data_version`: contador que suben triggers sobre
+    `metric_data` en cada INSERT/UPDATE/DELETE, cualquiera sea la vía.
+  - `metric_data_columns.data_version`: la versión con la que se armó la
+    copia. Las copias existentes quedan en NULL y se reconstruyen en la
+    próxima lectura.
+
+El SQL de los triggers está en `backend/metric_data_ddl.py`, el mismo que
+aplica `backend/models.py` con `create_all`.
+
+Revision ID: e2f3a4b5c6d7
+Revises: d1e2f3a4b5c6
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from backend import metric_data_ddl
+
+revision: str = 'e2f3a4b5c6d7'
+down_revision: Union[str, None] = 'd1e2f3a4b5c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('metrics', sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('metric_data_columns', sa.Column('data_version', sa.Integer(), nullable=True))
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for sentencia in metric_data_ddl.DATA_VERSION_PG_DDL:
+            op.execute(sentencia)
+    elif bind.dialect.name == 'sqlite':
+        for sentencia in metric_data_ddl.DATA_VERSION_SQLITE_DDL:
+            op.execute(sentencia)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for trigger in metric_data_ddl.DATA_VERSION_PG_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON metric_data")
+        op.execute(f"DROP FUNCTION IF EXISTS {metric_data_ddl.DATA_VERSION_PG_FUNCION}()")
+    elif bind.dialect.name == 'sqlite':
+        for trigger in metric_data_ddl.DATA_VERSION_SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_column('metric_data_columns', 'data_version')
+    op.drop_column('metrics', 'data_version')
@@ -0,0 +1,37 @@
+"""add GIN index on metric_data.dimensions_json
+
+Índice GIN (jsonb_path_ops) sobre la expresión `dimensions_json::jsonb`.
+Los loaders compilan los filtros por dimensión a `@> '{"<id>": "valor"}'`
+(`backend/metric_store.filtro_dimensiones_sql`), que este índice resuelve
+sin recorrer todas las filas de la métrica: un export por curso lee solo
+ese curso.
+
+Solo PostgreSQL; en SQLite (tests) no hace nada.
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_metric_data_dims_gin "
+        "ON metric_data USING gin ((dimensions_json::jsonb) jsonb_path_ops)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_metric_data_dims_gin")
@@ -0,0 +1,60 @@
+"""add report_jobs (cola de informes en segundo plano)
+
+Una fila por informe pedido en modo asíncrono: estado
+(queued/running/done/failed), progreso por secciones y el binario
+resultante hasta que vence. La ejecuta el pool de workers del propio
+proceso (`backend/report_jobs.py`); no hay broker externo.
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = 'f7a8b9c0d1e2'
+down_revision: Union[str, None] = 'e6f7a8b9c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=40), nullable=False),
+        sa.Column('params_json', sa.Text(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('progress_done', sa.Integer(), nullable=True),
+        sa.Column('progress_total', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('error_status', sa.Integer(), nullable=True),
+        sa.Column('result', sa.LargeBinary(), nullable=True),
+        sa.Column('result_filename', sa.String(length=255), nullable=True),
+        sa.Column('result_mime', sa.String(length=120), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_report_jobs_id', 'report_jobs', ['id'])
+    op.create_index('ix_report_jobs_org_id', 'report_jobs', ['org_id'])
+    op.create_index('ix_report_jobs_user_id', 'report_jobs', ['user_id'])
+    op.create_index('ix_report_jobs_status', 'report_jobs', ['status'])
+    op.create_index('ix_report_jobs_created_at', 'report_jobs', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_jobs_created_at', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_status', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_user_id', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_org_id', table_name='report_jobs')
+    op.drop_index('ix_report_jobs_id', table_name='report_jobs')
+    op.drop_table('report_jobs')
@@ -15,6 +15,7 @@ from backend.routers import data_ops
 from backend.routers import api_keys
 from backend.routers import ingest
 from backend.routers import assistant
+from backend.routers import report_jobs
 from backend.database import init_db
 from backend.logging_config import get_logger, setup_logging
 
@@ -65,6 +66,7 @@ app.include_router(data_ops.router)
 app.include_router(api_keys.router)
 app.include_router(ingest.router)
 app.include_router(assistant.router)
+app.include_router(report_jobs.router)
 
 @app.get("/", response_class=HTMLResponse, include_in_schema=False)
 def root():
@@ -107,6 +109,21 @@ def root():
 def on_startup():
     logger.info("Iniciando Report Generator API — inicializando base de datos")
     init_db()
+    _recuperar_jobs_de_informes()
+
+
+def _recuperar_jobs_de_informes():
+    """Retoma la cola de informes que dejó el proceso anterior."""
+    from backend import report_jobs as cola
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        cola.recuperar_pendientes(db)
+    except Exception:
+        logger.error("No se pudo recuperar la cola de informes", exc_info=True)
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -6,6 +6,8 @@ Responsabilidades:
     entregado UNA sola vez al crear).
   - Hashear/verificar el secreto con bcrypt.
   - Serializar/deserializar `scopes` (JSON array almacenado en Text).
+  - Cachear verificaciones exitosas (`verificaciones`) para que las requests
+    repetidas de una misma key no paguen bcrypt cada vez.
 
 Regla de oro: el secreto en claro NUNCA se persiste ni se loguea. La DB solo
 guarda el hash bcrypt (`key_hash`) y el `prefix` visible.
@@ -17,9 +19,16 @@ mismo lugar; este módulo es solo crypto/serialización sin FastAPI.
 from __future__ import annotations
 
 import hashlib
+import hmac
 import json
+import os
 import secrets
-from typing import List, Tuple
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 import bcrypt as _bcrypt
 
@@ -34,6 +43,9 @@ _PREFIX_RANDOM_CHARS = 4
 # Bytes de entropía del secreto aleatorio. token_urlsafe(32) ≈ 43 chars.
 _SECRET_ENTROPY_BYTES = 32
 
+API_KEY_CACHE_TTL_SECONDS = float(os.getenv("API_KEY_CACHE_TTL_SECONDS", "300"))
+API_KEY_CACHE_MAX_ENTRIES = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+
 
 def _sha256_hex(secreto_claro: str) -> bytes:
     """Pre-hash sha256 (hex, 64 bytes ASCII) del secreto.
@@ -115,3 +127,83 @@ def deserializar_scopes(scopes_json: str) -> List[str]:
     if not isinstance(data, list):
         return []
     return [str(s) for s in data]
+
+
+# ─── Cache de verificaciones ─────────────────────────────────
+
+@dataclass(frozen=True)
+class KeyVerificada:
+    """Resultado de una verificación bcrypt exitosa, sin el secreto."""
+    api_key_id: int
+    user_id: Optional[int]
+    org_id: int
+    expires_at: Optional[datetime]
+
+
+class CacheVerificaciones:
+    """Mapa acotado `HMAC-SHA256(secreto) → KeyVerificada`.
+
+    La clave HMAC usa un secreto aleatorio del proceso: el cache vive solo
+    en memoria, así que no hace falta compartirlo, y un volcado del mapa no
+    sirve para probar secretos offline (a diferencia de un sha256 pelado).
+    Solo se cachean verificaciones exitosas — una key inválida no ocupa
+    lugar — con TTL de `API_KEY_CACHE_TTL_SECONDS` y desalojo LRU pasadas
+    `API_KEY_CACHE_MAX_ENTRIES` entradas.
+
+    El cache NO reemplaza el chequeo de revocación: `get_org_from_api_key`
+    relee la fila por PK en cada request. `invalidar` (al revocar) saca la
+    entrada para que este proceso vuelva a bcrypt si la fila reaparece.
+    """
+
+    def __init__(self, ttl_seconds: float = API_KEY_CACHE_TTL_SECONDS,
+                 max_entries: int = API_KEY_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clave_hmac = secrets.token_bytes(32)
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[bytes, Tuple[KeyVerificada, float]]" = OrderedDict()
+
+    def _digest(self, secreto_claro: str) -> bytes:
+        return hmac.new(self._clave_hmac, secreto_claro.encode("utf-8"), hashlib.sha256).digest()
+
+    def obtener(self, secreto_claro: str) -> Optional[KeyVerificada]:
+        """Verificación cacheada del secreto, o None si no hay / venció."""
+        digest = self._digest(secreto_claro)
+        with self._lock:
+            par = self._entradas.get(digest)
+            if par is None:
+                return None
+            verificada, vence = par
+            if vence <= time.monotonic():
+                del self._entradas[digest]
+                return None
+            self._entradas.move_to_end(digest)
+            return verificada
+
+    def guardar(self, secreto_claro: str, verificada: KeyVerificada) -> None:
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        digest = self._digest(secreto_claro)
+        with self._lock:
+            self._entradas[digest] = (verificada, time.monotonic() + self.ttl_seconds)
+            self._entradas.move_to_end(digest)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, api_key_id: int) -> int:
+        """Saca las entradas de `api_key_id`. Devuelve cuántas sacó."""
+        with self._lock:
+            digests = [d for d, (v, _) in self._entradas.items() if v.api_key_id == api_key_id]
+            for d in digests:
+                del self._entradas[d]
+        return len(digests)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+verificaciones = CacheVerificaciones()
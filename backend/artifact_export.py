@@ -0,0 +1,196 @@
+"""
+artifact_export.py — Descarga y preview de artifacts DataFrame de pipelines.
+
+`GET /api/pipelines/{id}/artifact/{key}` armaba el XLSX completo en un
+`BytesIO` con `pd.ExcelWriter` (y ante un error volvía a serializar todo
+a CSV), y `/preview` devolvía el frame entero como TSV. Con artifacts
+intermedios de 300k filas eso eran cientos de MB en memoria por request.
+Acá cada formato se genera por bloques de `FILAS_POR_BLOQUE` filas:
+
+  - CSV/TSV: generador que emite un bloque de texto por vez.
+  - XLSX: openpyxl en modo write-only (las filas van a un temporal en
+    disco, no a celdas en memoria); el .xlsx se arma en un archivo
+    temporal y se sirve por trozos.
+  - Parquet: un row group por bloque con `pyarrow.parquet.ParquetWriter`,
+    también a un temporal. pyarrow es opcional: sin él el formato da
+    `ExportacionNoDisponible`.
+
+`pagina` es el preview paginado: una ventana de filas más los dtypes y el
+total.
+
+Los generadores son síncronos: `StreamingResponse` los itera en el
+threadpool, fuera del event loop, igual que los handlers (`def`).
+"""
+from __future__ import annotations
+
+import tempfile
+from typing import Any, Dict, IO, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from backend.results_query import a_filas
+
+FILAS_POR_BLOQUE = 10_000
+
+# Lectura del temporal al servirlo.
+_BYTES_POR_TROZO = 64 * 1024
+
+FORMATOS = ("xlsx", "csv", "tsv", "parquet")
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "tsv": "text/tab-separated-values",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportacionNoDisponible(RuntimeError):
+    """El formato pedido necesita una dependencia que no está instalada."""
+
+
+def _bloques(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+        yield df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+
+
+def _servir(archivo: IO[bytes]) -> Iterator[bytes]:
+    """Lee `archivo` desde el inicio por trozos y lo cierra (el temporal se
+    borra) al terminar o si el cliente corta la descarga."""
+    try:
+        archivo.seek(0)
+        while True:
+            trozo = archivo.read(_BYTES_POR_TROZO)
+            if not trozo:
+                break
+            yield trozo
+    finally:
+        archivo.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# CSV / TSV
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def texto_por_bloques(df: pd.DataFrame, formato: str = "csv") -> Iterator[bytes]:
+    """CSV con separador ';' y BOM (Excel en español lo abre directo como
+    columnas, con tildes), o TSV sin BOM; un bloque de filas por vez."""
+    sep = "\t" if formato == "tsv" else ";"
+    if formato != "tsv":
+        yield "\ufeff".encode("utf-8")
+    if df.empty:
+        yield df.to_csv(index=False, sep=sep).encode("utf-8")
+        return
+    for i, bloque in enumerate(_bloques(df)):
+        yield bloque.to_csv(index=False, header=(i == 0), sep=sep).encode("utf-8")
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# XLSX (openpyxl write-only)
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def _a_celda(v: Any) -> Any:
+    if isinstance(v, np.generic):
+        return v.item()
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    return v
+
+
+def xlsx_temporal(df: pd.DataFrame) -> IO[bytes]:
+    """El .xlsx de `df` (una hoja, encabezado + filas) en un archivo
+    temporal, posicionado al final. Propaga el error de openpyxl si alguna
+    celda no se puede escribir (ej. fechas con zona horaria)."""
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet("Sheet1")
+    hoja.append([_a_celda(c) if not isinstance(c, tuple) else str(c) for c in df.columns])
+    for bloque in _bloques(df):
+        for fila in bloque.astype(object).where(bloque.notna(), None).itertuples(index=False, name=None):
+            hoja.append([_a_celda(v) for v in fila])
+    archivo = tempfile.TemporaryFile()
+    try:
+        libro.save(archivo)
+    except Exception:
+        archivo.close()
+        raise
+    return archivo
+
+
+def xlsx_por_trozos(df: pd.DataFrame) -> Iterator[bytes]:
+    return _servir(xlsx_temporal(df))
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Parquet
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def _columnas_a_texto(df: pd.DataFrame) -> List[Any]:
+    """Columnas `object` que no son solo texto: Arrow no admite la mezcla
+    (ej. [2026, "2025"]) y se exportan como texto."""
+    return [
+        c for c in df.columns
+        if df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) not in ("string", "empty")
+    ]
+
+
+def parquet_temporal(df: pd.DataFrame) -> IO[bytes]:
+    """El Parquet de `df` (un row group por bloque) en un archivo temporal."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportacionNoDisponible("Exportar a Parquet requiere el paquete 'pyarrow'.")
+
+    a_texto = _columnas_a_texto(df)
+    nombres = [str(c) for c in df.columns]
+
+    def _normalizar(bloque: pd.DataFrame) -> pd.DataFrame:
+        bloque = bloque.copy(deep=False)
+        for c in a_texto:
+            bloque[c] = bloque[c].map(lambda v: v if v is None or v is pd.NA or v != v else str(v))
+        bloque.columns = nombres
+        return bloque.reset_index(drop=True)
+
+    base = pa.Schema.from_pandas(_normalizar(df.iloc[:0]), preserve_index=False)
+    esquema = pa.schema([
+        pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in base
+    ])
+    archivo = tempfile.TemporaryFile()
+    try:
+        with pq.ParquetWriter(archivo, esquema) as escritor:
+            for bloque in _bloques(df):
+                escritor.write_table(
+                    pa.Table.from_pandas(_normalizar(bloque), schema=esquema, preserve_index=False)
+                )
+    except Exception:
+        archivo.close()
+        raise
+    return archivo
+
+
+def parquet_por_trozos(df: pd.DataFrame) -> Iterator[bytes]:
+    return _servir(parquet_temporal(df))
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Preview paginado
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def pagina(df: pd.DataFrame, offset: int, limit: int) -> Dict[str, Any]:
+    """Filas `[offset, offset + limit)` de `df` (JSON-serializables), con
+    el dtype de cada columna y el total de filas."""
+    ventana = df.iloc[offset:offset + limit]
+    return {
+        "columns": [{"name": str(c), "dtype": str(t)} for c, t in df.dtypes.items()],
+        "rows": a_filas(ventana),
+        "offset": offset,
+        "limit": limit,
+        "total_rows": len(df),
+    }
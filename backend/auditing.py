@@ -1,7 +1,9 @@
 """auditing.py — helpers para registrar metadatos de carga en metric_data.
 
 Cualquier código que inserte filas en `metric_data` debe pasar por
-`make_metric_data` para que el registro quede auditado uniformemente.
+`make_metric_data` (alta fila a fila, ORM) o por el escritor masivo
+`backend/metric_bulk.py` (cargas de archivos/DataFrames) para que el
+registro quede auditado uniformemente.
 
 Campos:
   - created_by_user_id: id del User que disparó la inserción (None si pipeline cron / legacy).
@@ -30,6 +32,12 @@ ALLOWED_VIA = frozenset({
 })
 
 
+def validar_via(via: str) -> None:
+    """Levanta ValueError si `via` no es un `created_via` válido."""
+    if via not in ALLOWED_VIA:
+        raise ValueError(f"created_via inválido: {via!r}. Esperado uno de {sorted(ALLOWED_VIA)}")
+
+
 def make_metric_data(
     *,
     metric_id: int,
@@ -45,8 +53,7 @@ def make_metric_data(
     `value` debe ser ya un string (json-serializado si era dict).
     `dimensions` puede ser dict (se serializa) o string (se asume json válido).
     """
-    if via not in ALLOWED_VIA:
-        raise ValueError(f"created_via inválido: {via!r}. Esperado uno de {sorted(ALLOWED_VIA)}")
+    validar_via(via)
 
     if isinstance(dimensions, dict):
         dimensions_json = json.dumps(dimensions, ensure_ascii=False)
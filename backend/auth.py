@@ -18,7 +18,13 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 
-from backend.api_keys import deserializar_scopes, extraer_prefix, verificar_api_key
+from backend.api_keys import (
+    KeyVerificada,
+    deserializar_scopes,
+    extraer_prefix,
+    verificaciones,
+    verificar_api_key,
+)
 from backend.database import get_db
 from backend.logging_config import get_logger
 from backend.models import ApiKey, User
@@ -200,6 +206,10 @@ def get_org_from_api_key(
     expirada. Devuelve un `ApiKeyContext` con `org_id`, `api_key_id` y
     `scopes`.
 
+    Una verificación bcrypt exitosa queda en `api_keys.verificaciones`: las
+    requests siguientes con el mismo secreto leen la fila por PK y se
+    saltean bcrypt. Revocación y expiración se validan igual contra la fila.
+
     Falla con 401 si la key está ausente, es inválida, está revocada o
     expirada. NUNCA loguea el secreto en claro.
     """
@@ -207,21 +217,38 @@ def get_org_from_api_key(
     if not secreto:
         raise _unauthorized("Falta el header X-API-Key")
 
-    prefix = extraer_prefix(secreto)
-    # Puede haber más de una key con el mismo prefix (colisión improbable pero
-    # posible); verificamos el hash de cada candidata.
-    candidatas = db.query(ApiKey).filter(ApiKey.prefix == prefix).all()
-
     api_key = None
-    for candidata in candidatas:
-        if verificar_api_key(secreto, candidata.key_hash):
-            api_key = candidata
-            break
+    cacheada = verificaciones.obtener(secreto)
+    if cacheada is not None:
+        api_key = db.get(ApiKey, cacheada.api_key_id)
+        if api_key is None or api_key.org_id != cacheada.org_id:
+            # La fila desapareció o no es la que verificamos: a bcrypt.
+            verificaciones.invalidar(cacheada.api_key_id)
+            api_key = None
 
     if api_key is None:
-        raise _unauthorized("API key inválida")
+        prefix = extraer_prefix(secreto)
+        # Puede haber más de una key con el mismo prefix (colisión improbable
+        # pero posible); verificamos el hash de cada candidata.
+        candidatas = db.query(ApiKey).filter(ApiKey.prefix == prefix).all()
+        for candidata in candidatas:
+            if verificar_api_key(secreto, candidata.key_hash):
+                api_key = candidata
+                break
+
+        if api_key is None:
+            raise _unauthorized("API key inválida")
+
+        if not api_key.revoked:
+            verificaciones.guardar(secreto, KeyVerificada(
+                api_key_id=api_key.id,
+                user_id=api_key.created_by_user_id,
+                org_id=api_key.org_id,
+                expires_at=api_key.expires_at,
+            ))
 
     if api_key.revoked:
+        verificaciones.invalidar(api_key.id)
         raise _unauthorized("API key revocada")
 
     if api_key.expires_at is not None and api_key.expires_at < datetime.utcnow():
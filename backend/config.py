@@ -8,6 +8,7 @@ DB_DIR = BASE_DIR / "data" / "database"
 REPORTS_TEMPLATES_DIR = DB_DIR / "reports_templates"
 PIPELINE_RUNS_DIR = BASE_DIR / "data" / "pipeline_runs"
 UPLOADS_DIR = PIPELINE_RUNS_DIR / "uploads"
+CHART_CACHE_DIR = BASE_DIR / "data" / "chart_cache"
 
 # ──────────────────────────────────────────────────────────────
 # LEGACY: paths Excel usados SOLO por resultspy.py (pendiente de eliminar).
@@ -0,0 +1,323 @@
+"""
+data_ops_sql.py — Ejecución por conjuntos de /api/data-ops (replace y
+recalculate).
+
+El camino histórico carga cada fila de la métrica como objeto ORM, lee y
+reescribe la celda en Python (`_read_cell`/`_write_cell`) y hace flush de
+cada objeto modificado: renombrar "1°A" → "1A" en 100k filas eran minutos
+con la transacción abierta. Acá la operación se resuelve en tres pasos:
+
+  1. `agrupar`: un GROUP BY sobre el valor JSON de las celdas involucradas
+     devuelve cada combinación distinta de valores con su cantidad de
+     filas. La decisión (¿matchea? ¿a qué se reemplaza? ¿qué label da el
+     mapeo?) la sigue tomando el router en Python, una vez por valor
+     distinto, con la misma semántica de siempre (regex de Python, `str`,
+     `apply_mapping_many`).
+  2. `muestra`: las primeras filas que cambian, para el preview.
+  3. `actualizar`: un único UPDATE que escribe el valor nuevo con
+     `json_set` (SQLite) / `jsonb_set` (PostgreSQL). Un solo valor a
+     cambiar va con la condición como bind params; varios, como UPDATE
+     con join contra una tabla temporal de lookup (valor viejo → nuevo).
+
+Cada celda se identifica por su valor JSON tal como lo devuelve la DB
+(`json_type` + `json_extract` en SQLite, el texto del `jsonb` en
+PostgreSQL): las claves de `agrupar` vuelven sin tocar a `muestra` y a
+`actualizar`, así un 1 entero, un 1.0 y un "1" nunca se confunden.
+
+`agrupar` devuelve None cuando la métrica no admite este camino (otro
+dialecto, SQLite < 3.33 sin UPDATE ... FROM, una clave que no se puede
+embeber en un path JSON, o alguna fila cuyo JSON no es un objeto) y el
+router sigue por el camino en Python.
+
+En PostgreSQL el `jsonb` reescribe el JSON completo de la celda con sus
+claves en el orden propio de jsonb; los lectores acceden por clave.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from backend.logging_config import get_logger
+from backend.models import MetricDataColumns
+
+logger = get_logger(__name__)
+
+_COLUMNAS = ("value", "dimensions_json")
+
+_TABLA_LOOKUP = "data_ops_lookup"
+
+
+@dataclass(frozen=True)
+class Celda:
+    """Una columna de data_ops dentro de una fila de `metric_data`:
+    `clave` del objeto JSON guardado en `columna` ("value" para un field,
+    "dimensions_json" para una dimensión)."""
+    columna: str
+    clave: str
+
+
+@dataclass
+class Grupo:
+    """Filas que comparten el valor de cada celda pedida.
+
+    `clave` tiene, por celda, la representación SQL (opaca) de su valor y
+    `valores` lo que leería `_read_cell`: el valor JSON decodificado, None
+    si la clave falta o es null.
+    """
+    clave: Tuple[Tuple[Any, ...], ...]
+    valores: Tuple[Any, ...]
+    filas: int
+
+
+def _dialecto(db: Session) -> str:
+    bind = db.get_bind()
+    return bind.dialect.name if bind is not None else "sqlite"
+
+
+def _sqlite_con_update_from(db: Session) -> bool:
+    version = db.execute(text("SELECT sqlite_version()")).scalar()
+    return tuple(int(p) for p in version.split(".")[:2]) >= (3, 33)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Expresiones por dialecto
+# ─────────────────────────────────────────────────────────────────────────
+#
+# `_extraer` da las columnas SELECT que identifican el valor de una celda
+# (dos en SQLite, una en PostgreSQL); `_igual` compara esas mismas
+# expresiones contra otras tantas (bind params o columnas del lookup),
+# tratando NULL = NULL como igual (clave ausente).
+
+
+def _extraer(dialecto: str, celda: Celda, i: int) -> List[str]:
+    if dialecto == "postgresql":
+        return [f"(CAST({celda.columna} AS jsonb) -> CAST(:k{i} AS text))::text"]
+    return [f"json_type({celda.columna}, :p{i})", f"json_extract({celda.columna}, :p{i})"]
+
+
+def _igual(dialecto: str, celda: Celda, i: int, lados: Sequence[str]) -> str:
+    operador = "IS NOT DISTINCT FROM" if dialecto == "postgresql" else "IS"
+    return " AND ".join(
+        f"{expr} {operador} {lado}" for expr, lado in zip(_extraer(dialecto, celda, i), lados)
+    )
+
+
+def _params_claves(dialecto: str, celdas: Sequence[Celda]) -> Dict[str, str]:
+    if dialecto == "postgresql":
+        return {f"k{i}": c.clave for i, c in enumerate(celdas)}
+    return {f"p{i}": f'$."{c.clave}"' for i, c in enumerate(celdas)}
+
+
+def _ancho(dialecto: str) -> int:
+    """Columnas SQL por celda en la clave de un grupo."""
+    return 1 if dialecto == "postgresql" else 2
+
+
+def _decodificar(dialecto: str, partes: Sequence[Any]) -> Any:
+    """Clave SQL de una celda → el valor que vería `_read_cell`."""
+    if dialecto == "postgresql":
+        crudo = partes[0]
+        return None if crudo is None else json.loads(crudo)
+    tipo, crudo = partes
+    if tipo is None or tipo == "null":
+        return None
+    if tipo == "true":
+        return True
+    if tipo == "false":
+        return False
+    if tipo in ("object", "array"):
+        return json.loads(crudo)
+    return crudo
+
+
+def _partir(fila: Sequence[Any], ancho: int) -> Tuple[Tuple[Any, ...], ...]:
+    return tuple(tuple(fila[j:j + ancho]) for j in range(0, len(fila), ancho))
+
+
+def _aplanar(clave: Tuple[Tuple[Any, ...], ...]) -> List[Any]:
+    return [v for partes in clave for v in partes]
+
+
+def _no_objeto(dialecto: str, columna: str) -> str:
+    """Predicado: `columna` no guarda un objeto JSON."""
+    if dialecto == "postgresql":
+        # Sin validar el JSON completo (el cast fallaría): se filtra por la
+        # forma y el resto lo cubre el savepoint de `agrupar`.
+        return f"coalesce(left(ltrim({columna}), 1), '') <> '{{'"
+    return (
+        f"coalesce(CASE WHEN json_valid({columna}) THEN json_type({columna}) END, '') "
+        "<> 'object'"
+    )
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# API
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def agrupar(db: Session, metric_id: int, celdas: Sequence[Celda]) -> Optional[List[Grupo]]:
+    """Combinaciones distintas de valores de `celdas` en la métrica, con su
+    cantidad de filas; None si la métrica no admite el camino por
+    conjuntos (ver docstring del módulo)."""
+    dialecto = _dialecto(db)
+    if dialecto == "sqlite":
+        if not _sqlite_con_update_from(db):
+            return None
+    elif dialecto != "postgresql":
+        return None
+    if any(c.columna not in _COLUMNAS or '"' in c.clave or "\\" in c.clave for c in celdas):
+        return None
+
+    columnas = sorted({c.columna for c in celdas})
+    hay_no_objetos = db.execute(
+        text(
+            "SELECT 1 FROM metric_data WHERE id_metric = :m AND ("
+            + " OR ".join(_no_objeto(dialecto, col) for col in columnas)
+            + ") LIMIT 1"
+        ),
+        {"m": metric_id},
+    ).first()
+    if hay_no_objetos is not None:
+        return None
+
+    exprs = [e for i, c in enumerate(celdas) for e in _extraer(dialecto, c, i)]
+    sql = text(
+        f"SELECT {', '.join(exprs)}, count(*) FROM metric_data "
+        f"WHERE id_metric = :m GROUP BY {', '.join(str(j + 1) for j in range(len(exprs)))}"
+    )
+    params = {"m": metric_id, **_params_claves(dialecto, celdas)}
+    if dialecto == "postgresql":
+        try:
+            with db.begin_nested():
+                filas = db.execute(sql, params).all()
+        except DBAPIError as e:
+            logger.info(f"data_ops: métrica {metric_id} con JSON inválido, sigue por Python: {e}")
+            return None
+    else:
+        filas = db.execute(sql, params).all()
+
+    ancho = _ancho(dialecto)
+    grupos = []
+    for fila in filas:
+        clave = _partir(fila[:-1], ancho)
+        valores = tuple(_decodificar(dialecto, partes) for partes in clave)
+        grupos.append(Grupo(clave=clave, valores=valores, filas=int(fila[-1])))
+    return grupos
+
+
+def muestra(
+    db: Session,
+    metric_id: int,
+    celdas: Sequence[Celda],
+    cambios: Mapping[Tuple[Tuple[Any, ...], ...], Any],
+    limite: int,
+) -> List[Tuple[int, Any]]:
+    """(id_data, cambios[clave]) de las primeras `limite` filas (por
+    id_data) cuya clave está en `cambios`."""
+    if not cambios or limite <= 0:
+        return []
+    dialecto = _dialecto(db)
+    ancho = _ancho(dialecto)
+    exprs = [e for i, c in enumerate(celdas) for e in _extraer(dialecto, c, i)]
+    resultado = db.execute(
+        text(
+            f"SELECT id_data, {', '.join(exprs)} FROM metric_data "
+            "WHERE id_metric = :m ORDER BY id_data"
+        ).execution_options(yield_per=1000),
+        {"m": metric_id, **_params_claves(dialecto, celdas)},
+    )
+    out = []
+    try:
+        for fila in resultado:
+            clave = _partir(fila[1:], ancho)
+            if clave in cambios:
+                out.append((fila[0], cambios[clave]))
+                if len(out) >= limite:
+                    break
+    finally:
+        resultado.close()
+    return out
+
+
+def actualizar(
+    db: Session,
+    metric_id: int,
+    celdas: Sequence[Celda],
+    destino: Celda,
+    nuevos: Mapping[Tuple[Tuple[Any, ...], ...], Any],
+) -> None:
+    """Escribe `destino` = nuevos[clave] (valor Python, se guarda como su
+    JSON) en las filas cuya clave de `celdas` está en `nuevos`.
+
+    Un UPDATE para todas las filas. No hace commit; descarta la copia
+    columnar de la métrica (el UPDATE no pasa por el flush del ORM, ver
+    `metric_store`).
+    """
+    if not nuevos:
+        return
+    dialecto = _dialecto(db)
+    ancho = _ancho(dialecto)
+    params: Dict[str, Any] = {"m": metric_id, "kd": destino.clave, **_params_claves(dialecto, celdas)}
+    if dialecto == "postgresql":
+        asignacion = (
+            f"jsonb_set(CAST({destino.columna} AS jsonb), ARRAY[CAST(:kd AS text)], "
+            "CAST({nuevo} AS jsonb))::text"
+        )
+    else:
+        asignacion = f"json_set({destino.columna}, '$.\"' || :kd || '\"', json({{nuevo}}))"
+
+    def _condicion(lados_por_celda: List[List[str]]) -> str:
+        return " AND ".join(
+            _igual(dialecto, c, i, lados) for i, (c, lados) in enumerate(zip(celdas, lados_por_celda))
+        )
+
+    if len(nuevos) == 1:
+        (clave, valor), = nuevos.items()
+        lados = [[f":c{i * ancho + j}" for j in range(ancho)] for i in range(len(celdas))]
+        params.update({f"c{j}": v for j, v in enumerate(_aplanar(clave))})
+        params["nuevo"] = json.dumps(valor, ensure_ascii=False)
+        db.execute(text(
+            f"UPDATE metric_data SET {destino.columna} = {asignacion.format(nuevo=':nuevo')} "
+            f"WHERE id_metric = :m AND {_condicion(lados)}"
+        ), params)
+    else:
+        _crear_lookup(db, dialecto, ancho * len(celdas))
+        try:
+            db.execute(
+                text(
+                    f"INSERT INTO {_TABLA_LOOKUP} VALUES ("
+                    + ", ".join(f":c{j}" for j in range(ancho * len(celdas))) + ", :nuevo)"
+                ),
+                [
+                    {**{f"c{j}": v for j, v in enumerate(_aplanar(clave))},
+                     "nuevo": json.dumps(valor, ensure_ascii=False)}
+                    for clave, valor in nuevos.items()
+                ],
+            )
+            lados = [[f"lk.c{i * ancho + j}" for j in range(ancho)] for i in range(len(celdas))]
+            db.execute(text(
+                f"UPDATE metric_data SET {destino.columna} = {asignacion.format(nuevo='lk.nuevo')} "
+                f"FROM {_TABLA_LOOKUP} lk WHERE metric_data.id_metric = :m AND {_condicion(lados)}"
+            ), params)
+        finally:
+            db.execute(text(f"DROP TABLE IF EXISTS {_TABLA_LOOKUP}"))
+
+    db.execute(delete(MetricDataColumns).where(MetricDataColumns.id_metric == metric_id))
+
+
+def _crear_lookup(db: Session, dialecto: str, n_claves: int) -> None:
+    """Tabla temporal (de la conexión) valor viejo → JSON nuevo.
+
+    En SQLite las columnas van sin tipo: guardan cada clave con el tipo
+    con que la devolvió `json_extract`, y la comparación no convierte.
+    """
+    db.execute(text(f"DROP TABLE IF EXISTS {_TABLA_LOOKUP}"))
+    tipo = " text" if dialecto == "postgresql" else ""
+    columnas = ", ".join(f"c{j}{tipo}" for j in range(n_claves))
+    sufijo = " ON COMMIT DROP" if dialecto == "postgresql" else ""
+    db.execute(text(f"CREATE TEMP TABLE {_TABLA_LOOKUP} ({columnas}, nuevo text){sufijo}"))
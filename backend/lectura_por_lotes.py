@@ -0,0 +1,205 @@
+"""
+lectura_por_lotes.py — Lectura de CSV/XLSX en lotes de filas.
+
+El import de /values hacía `await file.read()` y `pd.read_excel`/
+`pd.read_csv` sobre el archivo completo: con un anual de 50 MB
+(`MAX_UPLOAD_MB`) convivían en memoria los bytes crudos, el DataFrame
+entero y los payloads de `metric_bulk`, y el único worker del backend
+podía terminar muerto por OOM.
+
+`leer_por_lotes` recorre el archivo y entrega DataFrames de a
+`filas_por_lote` filas:
+
+  - CSV: `pd.read_csv(chunksize=...)`.
+  - XLSX/XLSM: openpyxl en modo read-only (`iter_rows`), sin cargar el
+    libro completo.
+  - Otros (XLS legacy): no hay lector incremental; se lee con
+    `pd.read_excel` y se entrega en lotes igual.
+
+Cada lote sale con dtype `object` y celdas con el valor de la celda:
+números enteros como `int` (aunque la columna tenga vacíos), vacíos como
+None. Así `metric_bulk.construir_payloads` serializa lo mismo sin importar
+en qué lote cayó la fila (con `read_csv`/`read_excel` de una sola vez, un
+vacío en la columna volvía `2026` en `"2026.0"` en todas las filas).
+
+El origen puede ser una ruta o un archivo binario con `seek` (p.ej. el
+`SpooledTemporaryFile` de un `UploadFile`).
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import IO, Any, Callable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+# Mismo tamaño que los lotes de escritura de `metric_bulk`.
+FILAS_POR_LOTE = int(os.getenv("INGESTA_FILAS_POR_LOTE", "10000"))
+
+Origen = Union[str, IO[bytes]]
+# progreso(filas_leidas, total_estimado | None)
+Progreso = Callable[[int, Optional[int]], None]
+
+_EXTENSIONES_OPENPYXL = (".xlsx", ".xlsm")
+
+
+def _celda(v: Any) -> Any:
+    """Valor de celda normalizado: NaN → None, float entero → int."""
+    if v is None:
+        return None
+    if isinstance(v, float):
+        if math.isnan(v):
+            return None
+        if v.is_integer():
+            return int(v)
+    return v
+
+
+def _normalizar(df: pd.DataFrame) -> pd.DataFrame:
+    """Lote de pandas → dtype object con las celdas de `_celda`."""
+    return pd.DataFrame(
+        {c: [_celda(v) for v in df[c].tolist()] for c in df.columns},
+        index=range(len(df)),
+        columns=df.columns,
+        dtype=object,
+    )
+
+
+def _nombres_columnas(cabecera: List[Any]) -> List[str]:
+    """Cabecera de la hoja con el criterio de `pd.read_excel`: celdas
+    vacías como `Unnamed: i` y repetidas con sufijo `.1`, `.2`…"""
+    nombres: List[str] = []
+    vistos: dict = {}
+    for i, v in enumerate(cabecera):
+        nombre = f"Unnamed: {i}" if v is None or v == "" else _celda(v)
+        base = nombre
+        while nombre in vistos:
+            vistos[base] += 1
+            nombre = f"{base}.{vistos[base]}"
+        vistos[nombre] = 0
+        nombres.append(nombre)
+    return nombres
+
+
+def _lotes_xlsx(
+    origen: Origen,
+    *,
+    header: int,
+    filas_por_lote: int,
+    progreso: Optional[Progreso],
+) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(origen, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = (ws.max_row - header - 1) if ws.max_row else None
+        ancho = ws.max_column or 0
+        filas = ws.iter_rows(values_only=True)
+        for _ in range(header):
+            if next(filas, None) is None:
+                return
+        cabecera = list(next(filas, None) or ())
+        ancho = max(ancho, len(cabecera))
+        columnas = _nombres_columnas(cabecera + [None] * (ancho - len(cabecera)))
+        if not columnas:
+            return
+
+        def _filas_de_datos():
+            vacias: List[list] = []  # en blanco pendientes: se descartan al final
+            for fila in filas:
+                valores = [_celda(v) for v in fila[:ancho]]
+                valores += [None] * (ancho - len(valores))
+                if all(v is None for v in valores):
+                    vacias.append(valores)
+                    continue
+                yield from vacias
+                vacias = []
+                yield valores
+
+        lote: List[list] = []
+        leidas = 0
+        for valores in _filas_de_datos():
+            lote.append(valores)
+            if len(lote) >= filas_por_lote:
+                leidas += len(lote)
+                yield pd.DataFrame(lote, columns=columnas, dtype=object)
+                lote = []
+                if progreso:
+                    progreso(leidas, total)
+        if lote:
+            leidas += len(lote)
+            yield pd.DataFrame(lote, columns=columnas, dtype=object)
+            if progreso:
+                progreso(leidas, leidas)
+    finally:
+        wb.close()
+
+
+def _lotes_pandas(
+    lector: Iterator[pd.DataFrame],
+    progreso: Optional[Progreso],
+) -> Iterator[pd.DataFrame]:
+    leidas = 0
+    for df in lector:
+        leidas += len(df)
+        yield _normalizar(df)
+        if progreso:
+            progreso(leidas, None)
+
+
+def leer_por_lotes(
+    origen: Origen,
+    nombre: str,
+    *,
+    sep: str = ";",
+    header: int = 0,
+    filas_por_lote: Optional[int] = None,
+    progreso: Optional[Progreso] = None,
+) -> Iterator[pd.DataFrame]:
+    """DataFrames de hasta `filas_por_lote` filas del archivo `nombre`.
+
+    El formato sale de la extensión de `nombre` (`.csv` → `sep`; el resto,
+    Excel). `header` es la fila (0-indexada, contando filas en blanco) de
+    los nombres de columna, como en `pd.read_excel`. Las filas en blanco
+    al final de la hoja se descartan.
+    """
+    n = filas_por_lote or FILAS_POR_LOTE
+    ext = os.path.splitext(nombre.lower())[1]
+    if ext == ".csv":
+        return _lotes_pandas(pd.read_csv(origen, sep=sep, header=header, chunksize=n), progreso)
+    if ext in _EXTENSIONES_OPENPYXL:
+        return _lotes_xlsx(origen, header=header, filas_por_lote=n, progreso=progreso)
+    df = pd.read_excel(origen, header=header)
+    return _lotes_pandas((df.iloc[i:i + n] for i in range(0, len(df), n)), progreso)
+
+
+def buscar_fila(ruta: str, texto: str) -> Optional[int]:
+    """Índice (0-indexado) de la primera fila de la primera hoja con una
+    celda de texto que contenga `texto` (sin distinguir mayúsculas).
+
+    En XLSX recorre la hoja en modo read-only y se detiene en esa fila; en
+    otros formatos lee la hoja completa sin cabecera.
+    """
+    buscado = str(texto).strip().lower()
+
+    def _calza(fila) -> bool:
+        return any(isinstance(v, str) and buscado in v.strip().lower() for v in fila)
+
+    if os.path.splitext(ruta.lower())[1] in _EXTENSIONES_OPENPYXL:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            for i, fila in enumerate(wb.worksheets[0].iter_rows(values_only=True)):
+                if _calza(fila):
+                    return i
+            return None
+        finally:
+            wb.close()
+
+    df_raw = pd.read_excel(ruta, header=None)
+    for i in range(len(df_raw)):
+        if _calza(df_raw.iloc[i]):
+            return i
+    return None
@@ -0,0 +1,408 @@
+"""
+metric_bulk.py — Escritor masivo de `metric_data`.
+
+Las cargas grandes (SaveToMetric en pipelines, import CSV/Excel desde
+/values, ingesta por API key) construían un objeto ORM `MetricData` por
+fila recorriendo el DataFrame con `iterrows()` y lo persistían con
+`db.add_all`. Con una carga SIMCE de 100k filas eso eran minutos y 100k
+objetos vivos en el identity map de la sesión.
+
+Este módulo reemplaza ese camino:
+
+  - `construir_payloads` arma `value`/`dimensions_json` columna a columna
+    con pandas (máscaras `notna()`, casteos por columna) y calcula la
+    cobertura por dimensión con sumas vectorizadas.
+  - `escribir_metric_data` inserta las filas ya serializadas sin pasar por
+    el ORM: `COPY ... FROM STDIN` en PostgreSQL, `executemany` en el resto
+    (SQLite en tests/desarrollo).
+  - `guardar_dataframe` combina ambos por lotes de `FILAS_POR_LOTE`, así la
+    memoria queda acotada al lote en curso y no al DataFrame completo;
+    `guardar_lotes` hace lo mismo con lotes que llegan de un iterador (el
+    import de archivos, vía `lectura_por_lotes`), sin DataFrame completo.
+
+Ninguna función hace commit: la carga queda en la transacción de la sesión
+del llamador, igual que antes con `add_all`. Como el insert no pasa por el
+flush del ORM, acá mismo se descarta la copia columnar de la métrica
+(`metric_store`); el cache de DataFrames de tablas lo sigue invalidando
+cada llamador con `invalidate_metric_df_cache` después del commit.
+
+Auditoría: cada fila lleva `created_by_user_id`/`created_via`/
+`created_from_ip` con las mismas reglas que `auditing.make_metric_data`.
+"""
+from __future__ import annotations
+
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from backend.auditing import validar_via
+from backend.logging_config import get_logger
+from backend.models import Metric, MetricData, MetricDataColumns
+from backend.rgenerator.core.pares_nombre import (
+    completar_pares_nombre_columnas,
+    pares_nombre_normalizado,
+)
+
+logger = get_logger(__name__)
+
+# Filas por lote de construcción + escritura. 10k filas de SIMCE son ~5 MB
+# de payload serializado: suficiente para amortizar el round-trip del COPY
+# sin que la memoria crezca con el tamaño del archivo.
+FILAS_POR_LOTE = 10_000
+
+# Textos que el import de /values trata como celda vacía además de NaN/None
+# (Excel exporta "nan"/"None" literales cuando la columna venía de pandas).
+_TEXTOS_VACIOS = ("", "nan", "nat", "none", "null")
+
+# Columnas que escribe el COPY, en el orden del stream.
+_COLUMNAS_COPY = (
+    "id_metric", "value", "dimensions_json", "created_at", "org_id",
+    "created_by_user_id", "created_via", "created_from_ip",
+)
+
+
+@dataclass
+class CargaMetricData:
+    """Resultado de `guardar_dataframe`.
+
+    - `filas`: filas insertadas.
+    - `cobertura`: {id_dimension: filas insertadas que traen esa dimensión
+      con valor no vacío}; la usa el guard de `SaveToMetric`.
+    """
+    filas: int = 0
+    cobertura: Dict[int, int] = field(default_factory=dict)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Construcción de payloads (columnar)
+# ─────────────────────────────────────────────────────────────────────────
+
+def _mascara_presentes(serie: pd.Series, vacios_como_nulos: bool) -> pd.Series:
+    """True donde la celda tiene valor (ni NaN/None ni, opcionalmente, texto vacío)."""
+    mascara = serie.notna()
+    if vacios_como_nulos and serie.dtype == object:
+        es_texto = serie.map(lambda v: isinstance(v, str))
+        if es_texto.any():
+            texto = serie[es_texto].str.strip().str.lower()
+            mascara &= ~texto.isin(_TEXTOS_VACIOS).reindex(serie.index, fill_value=False)
+    return mascara
+
+
+def _castear_field(valores: pd.Series, tipo: Optional[str]) -> list:
+    """Castea un field del objeto al `type` declarado en `meta_json.fields`.
+
+    Mismo criterio que el armado fila a fila: si el casteo falla, el valor
+    queda tal cual. Las columnas ya numéricas se castean en bloque.
+    """
+    if tipo not in ("int", "float"):
+        return valores.tolist()
+    if pd.api.types.is_numeric_dtype(valores):
+        try:
+            return valores.astype("int64" if tipo == "int" else "float64").tolist()
+        except (TypeError, ValueError, OverflowError):
+            pass
+    fn = int if tipo == "int" else float
+
+    def _castear(v):
+        try:
+            return fn(v)
+        except Exception:
+            return v
+    return [_castear(v) for v in valores.tolist()]
+
+
+def _valores_escalares(valores: pd.Series, data_type: str) -> List[str]:
+    """`value` de una métrica simple (int/float/str/bool) como texto.
+
+    Un valor no convertible a int/float levanta ValueError, igual que antes:
+    la carga completa falla en vez de guardar basura.
+    """
+    lista = valores.tolist()
+    if data_type == "int":
+        return [str(int(v)) for v in lista]
+    if data_type == "float":
+        return [str(float(v)) for v in lista]
+    return [str(v) for v in lista]
+
+
+def construir_payloads(
+    df: pd.DataFrame,
+    *,
+    metric: Metric,
+    fields: Sequence[dict],
+    dim_name_to_id: Dict[str, int],
+    pares_nombre: Sequence[Tuple[int, int]] = (),
+    vacios_como_nulos: bool = False,
+) -> Tuple[List[str], List[str], Dict[int, int]]:
+    """Serializa `df` a las columnas `value`/`dimensions_json` de `metric_data`.
+
+    Devuelve `(values, dimensions_json, cobertura)` solo para las filas que
+    se guardan: en métricas `object` todas (aunque el objeto quede vacío);
+    en las simples, las que traen valor en la columna `metric.name`.
+
+    - Dimensiones: una columna del DataFrame por nombre de dimensión; las
+      celdas vacías no generan clave. Los pares `X`/`X_Norm` se completan con
+      `completar_pares_nombre_columnas`.
+    - `vacios_como_nulos`: trata además "", "nan", "none", "null"… como
+      celda vacía (criterio del import de archivos).
+    """
+    n = len(df)
+    df = df.reset_index(drop=True)
+
+    if metric.data_type == "object":
+        guardar = pd.Series(True, index=df.index)
+        objetos: Dict[str, list] = {}
+        for f in fields:
+            fname = f["name"]
+            if fname not in df.columns:
+                continue
+            serie = df[fname]
+            presentes = _mascara_presentes(serie, vacios_como_nulos)
+            col = [None] * n
+            for i, v in zip(presentes[presentes].index, _castear_field(serie[presentes], f.get("type"))):
+                col[i] = v
+            objetos[fname] = col
+        nombres = list(objetos.keys())
+        values = [
+            json.dumps({k: v for k, v in zip(nombres, fila) if v is not None})
+            for fila in zip(*objetos.values())
+        ] if nombres else ["{}"] * n
+    else:
+        if metric.name in df.columns:
+            serie = df[metric.name]
+            guardar = _mascara_presentes(serie, vacios_como_nulos)
+            values = _valores_escalares(serie[guardar], metric.data_type)
+        else:
+            guardar = pd.Series(False, index=df.index)
+            values = []
+
+    filas = df.index[guardar.to_numpy()]
+    n_guardar = len(filas)
+    dims: Dict[str, list] = {}
+    for dim_name, dim_id in dim_name_to_id.items():
+        if dim_name not in df.columns:
+            continue
+        serie = df[dim_name].loc[filas]
+        presentes = _mascara_presentes(serie, vacios_como_nulos).to_numpy()
+        if not presentes.any():
+            continue
+        col: list = [None] * n_guardar
+        for pos, v in zip(presentes.nonzero()[0], serie[presentes].tolist()):
+            col[pos] = str(v)
+        dims[str(dim_id)] = col
+
+    if pares_nombre:
+        completar_pares_nombre_columnas(dims, pares_nombre, n_guardar)
+
+    cobertura = {dim_id: 0 for dim_id in dim_name_to_id.values()}
+    for dim_id in cobertura:
+        col = dims.get(str(dim_id))
+        if col is not None:
+            cobertura[dim_id] = int(pd.Series(col, dtype=object).fillna("").astype(str).str.strip().ne("").sum())
+
+    claves = list(dims.keys())
+    if claves:
+        dimensions_json = [
+            json.dumps({k: v for k, v in zip(claves, fila) if v is not None}, ensure_ascii=False)
+            for fila in zip(*dims.values())
+        ]
+    else:
+        dimensions_json = ["{}"] * n_guardar
+    return values, dimensions_json, cobertura
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Escritura
+# ─────────────────────────────────────────────────────────────────────────
+
+def _copy_texto(v) -> str:
+    """Celda en el formato `text` de COPY (NULL = \\N, escapes de control)."""
+    if v is None:
+        return "\\N"
+    return (
+        str(v).replace("\\", "\\\\").replace("\t", "\\t")
+        .replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+def _insertar_copy(db: Session, filas: List[dict]) -> bool:
+    """COPY FROM STDIN por la conexión DBAPI de la sesión (psycopg2).
+
+    Devuelve False si el driver no expone `copy_expert`; el llamador cae
+    entonces a `executemany`.
+    """
+    cursor = db.connection().connection.cursor()
+    try:
+        copy_expert = getattr(cursor, "copy_expert", None)
+        if copy_expert is None:
+            return False
+        buf = io.StringIO()
+        for fila in filas:
+            buf.write("\t".join(_copy_texto(fila[c]) for c in _COLUMNAS_COPY))
+            buf.write("\n")
+        buf.seek(0)
+        copy_expert(
+            f"COPY {MetricData.__tablename__} ({', '.join(_COLUMNAS_COPY)}) FROM STDIN",
+            buf,
+        )
+        return True
+    finally:
+        cursor.close()
+
+
+def _insertar_lote(db: Session, filas: List[dict]) -> None:
+    if not filas:
+        return
+    if db.get_bind().dialect.name == "postgresql" and _insertar_copy(db, filas):
+        return
+    db.execute(insert(MetricData.__table__), filas)
+
+
+def escribir_metric_data(
+    db: Session,
+    *,
+    metric_id: int,
+    org_id: int,
+    values: Sequence[Optional[str]],
+    dimensions: Iterable[Union[dict, str]],
+    user_id: Optional[int],
+    via: str,
+    ip: Optional[str] = None,
+) -> int:
+    """Inserta filas ya serializadas en `metric_data`, sin objetos ORM.
+
+    `values[i]` va tal cual a `value`; `dimensions[i]` puede ser dict (se
+    serializa como en `make_metric_data`) o el JSON ya armado. No hace
+    commit. Devuelve la cantidad de filas insertadas.
+    """
+    validar_via(via)
+    ahora = datetime.utcnow()
+    filas = []
+    for value, dims in zip(values, dimensions):
+        if isinstance(dims, dict):
+            dims = json.dumps(dims, ensure_ascii=False)
+        filas.append({
+            "id_metric": metric_id,
+            "value": value,
+            "dimensions_json": dims or "{}",
+            "created_at": ahora,
+            "org_id": org_id,
+            "created_by_user_id": user_id,
+            "created_via": via,
+            "created_from_ip": ip,
+        })
+    for inicio in range(0, len(filas), FILAS_POR_LOTE):
+        _insertar_lote(db, filas[inicio:inicio + FILAS_POR_LOTE])
+    if filas:
+        _descartar_copia_columnar(db, metric_id)
+    return len(filas)
+
+
+def _descartar_copia_columnar(db: Session, metric_id: int) -> None:
+    """El insert no pasa por el flush del ORM (`metric_store`): se descarta acá."""
+    db.execute(delete(MetricDataColumns).where(MetricDataColumns.id_metric == metric_id))
+
+
+class LoteInvalido(ValueError):
+    """Un lote de `guardar_lotes` no se pudo serializar (p.ej. un valor no
+    numérico en una métrica int). `desde`/`hasta` son las filas del lote,
+    1-indexadas y contando solo datos (sin cabecera)."""
+
+    def __init__(self, desde: int, hasta: int, causa: Exception):
+        super().__init__(f"filas {desde}-{hasta}: {causa}")
+        self.desde = desde
+        self.hasta = hasta
+
+
+def guardar_lotes(
+    db: Session,
+    lotes: Iterable[pd.DataFrame],
+    *,
+    metric: Metric,
+    fields: Sequence[dict],
+    dim_name_to_id: Dict[str, int],
+    org_id: int,
+    user_id: Optional[int],
+    via: str,
+    ip: Optional[str] = None,
+    vacios_como_nulos: bool = False,
+    progreso: Optional[Callable[[CargaMetricData], None]] = None,
+) -> CargaMetricData:
+    """Guarda en `metric_data` cada DataFrame de `lotes` a medida que llega.
+
+    Con un iterador (p.ej. `lectura_por_lotes.leer_por_lotes`) la memoria
+    queda acotada al lote en curso, no al archivo. Un lote inválido levanta
+    `LoteInvalido`; lo ya escrito queda en la transacción del llamador, que
+    decide el rollback. `progreso(carga)` se llama después de cada lote.
+    No hace commit.
+    """
+    pares = pares_nombre_normalizado(dim_name_to_id)
+    carga = CargaMetricData(cobertura={dim_id: 0 for dim_id in dim_name_to_id.values()})
+    leidas = 0
+    for lote in lotes:
+        try:
+            values, dims, cobertura = construir_payloads(
+                lote,
+                metric=metric,
+                fields=fields,
+                dim_name_to_id=dim_name_to_id,
+                pares_nombre=pares,
+                vacios_como_nulos=vacios_como_nulos,
+            )
+        except (TypeError, ValueError) as e:
+            raise LoteInvalido(leidas + 1, leidas + len(lote), e) from e
+        leidas += len(lote)
+        carga.filas += escribir_metric_data(
+            db,
+            metric_id=metric.id_metric,
+            org_id=org_id,
+            values=values,
+            dimensions=dims,
+            user_id=user_id,
+            via=via,
+            ip=ip,
+        )
+        for dim_id, n in cobertura.items():
+            carga.cobertura[dim_id] += n
+        if progreso:
+            progreso(carga)
+    return carga
+
+
+def guardar_dataframe(
+    db: Session,
+    df: pd.DataFrame,
+    *,
+    metric: Metric,
+    fields: Sequence[dict],
+    dim_name_to_id: Dict[str, int],
+    org_id: int,
+    user_id: Optional[int],
+    via: str,
+    ip: Optional[str] = None,
+    vacios_como_nulos: bool = False,
+) -> CargaMetricData:
+    """Guarda `df` en `metric_data` de `metric`, por lotes de `FILAS_POR_LOTE`.
+
+    Las columnas del DataFrame se mapean por nombre: dimensiones según
+    `dim_name_to_id`, el valor según `fields` (métricas `object`) o la
+    columna `metric.name`. No hace commit.
+    """
+    return guardar_lotes(
+        db,
+        (df.iloc[inicio:inicio + FILAS_POR_LOTE] for inicio in range(0, len(df), FILAS_POR_LOTE)),
+        metric=metric,
+        fields=fields,
+        dim_name_to_id=dim_name_to_id,
+        org_id=org_id,
+        user_id=user_id,
+        via=via,
+        ip=ip,
+        vacios_como_nulos=vacios_como_nulos,
+    )
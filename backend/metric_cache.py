@@ -0,0 +1,286 @@
+"""
+metric_cache.py — Cache de DataFrames de métricas, compartido por proceso.
+
+Un dashboard llena ~10 charts/tablas, muchos sobre la misma métrica, y un
+export PDF inmediatamente posterior vuelve a cargar esas mismas métricas
+desde el motor de informes. Antes solo los routers de tablas/gráficos
+tenían cache (TTL de 60 s, `df.copy()` en cada hit); el motor de informes,
+`LoadMetricToDF` y los endpoints de export/distinct re-parseaban todo.
+
+Este módulo es el único cache de frames de métricas de la aplicación:
+
+  - Clave `(org_id, metric_id, versión local, data_version, variante)`.
+    `data_version` es `Metric.data_version`, el contador que suben los
+    triggers de `metric_data` en toda escritura, venga de donde venga (otro
+    worker, el COPY del escritor masivo, los UPDATE set-based de data_ops):
+    el llamador lo lee antes de cargar (`metric_store.version_de_datos`, un
+    SELECT por PK) y una escritura commiteada en cualquier proceso cambia
+    la clave. La versión local es un contador por métrica del proceso que
+    se incrementa en cada escritura ORM de `MetricData` (eventos de abajo,
+    `invalidate_metric_df_cache` desde los endpoints/steps): cubre las
+    escrituras de este proceso aún no commiteadas. Una carga que empezó
+    antes de una escritura queda guardada con la versión vieja y nunca se
+    sirve.
+  - `variante` distingue las proyecciones de una misma métrica: la base
+    columnar (`metric_store.cargar_marco`, compartida por todos los
+    loaders) y el frame ya armado de tablas/gráficos por filtros.
+  - Expulsión LRU acotada por bytes totales (`METRIC_CACHE_MAX_MB`) y un
+    TTL (`METRIC_CACHE_TTL_SECONDS`), que queda solo de respaldo para los
+    llamadores que no conocen la `data_version`.
+  - Los hits devuelven una vista de solo lectura (`copy(deep=False)` sobre
+    arrays no escribibles), sin copiar datos. Agregar o reemplazar columnas
+    en la vista es seguro; una escritura in-place (`df.loc[...] = ...`)
+    levanta `ValueError` en vez de corromper el cache — quien necesite
+    mutar debe hacer `.copy()`.
+
+Uso:
+
+    from backend.metric_cache import metric_frames
+    from backend.metric_store import version_de_datos
+    df = metric_frames.obtener(org_id, metric_id, "mi_variante", lambda: cargar(...),
+                               data_version=version_de_datos(db, metric_id))
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.logging_config import get_logger
+from backend.models import MetricData
+
+logger = get_logger(__name__)
+
+METRIC_CACHE_MAX_BYTES = int(os.getenv("METRIC_CACHE_MAX_MB", "512")) * 1024 * 1024
+METRIC_CACHE_TTL_SECONDS = float(os.getenv("METRIC_CACHE_TTL_SECONDS", "60"))
+
+# `tiene(...)` sin `data_version`: cualquier versión de datos sirve.
+_CUALQUIERA = object()
+
+# Muestra por columna `object` para estimar su tamaño: `memory_usage(deep=True)`
+# recorre cada celda y en una métrica de 200k filas cuesta más que el hit.
+_MUESTRA_OBJETOS = 1000
+
+
+def _estimar_bytes(df: pd.DataFrame) -> int:
+    """Tamaño aproximado de `df` en memoria (celdas `object` por muestreo)."""
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    n = len(df)
+    if not n:
+        return total
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype != object:
+            continue
+        muestra = serie.iloc[:: max(1, n // _MUESTRA_OBJETOS)].tolist()
+        if muestra:
+            promedio = sum(sys.getsizeof(v) for v in muestra) / len(muestra)
+            total += int(promedio * n)
+    return total
+
+
+def _congelar(df: pd.DataFrame) -> None:
+    """Marca como no escribibles los arrays numpy detrás de `df`."""
+    for col in df.columns:
+        arr = df[col].values
+        if not isinstance(arr, np.ndarray):
+            continue  # extension arrays (string/Int64): pandas no expone el flag
+        while isinstance(arr.base, np.ndarray):
+            arr = arr.base
+        arr.flags.writeable = False
+
+
+@dataclass
+class _Entrada:
+    df: pd.DataFrame
+    nbytes: int
+    creado: float
+
+
+class MetricFrameCache:
+    """Cache LRU de DataFrames de métricas con versión por métrica.
+
+    Thread-safe: el lock protege el índice y los contadores; la carga de un
+    miss corre fuera del lock (dos requests simultáneos sobre la misma
+    métrica pueden cargarla ambos — el segundo pisa al primero).
+    """
+
+    def __init__(self, max_bytes: int = METRIC_CACHE_MAX_BYTES,
+                 ttl_seconds: float = METRIC_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Tuple, _Entrada]" = OrderedDict()
+        self._versiones: Dict[int, int] = {}
+        # Sube con cada invalidación total: es parte de la versión de TODAS
+        # las métricas, incluidas las que nunca se escribieron.
+        self._epoca = 0
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ── Versiones ─────────────────────────────────────────────────────
+
+    def version(self, metric_id: int) -> Tuple[int, int]:
+        """Versión local vigente de `metric_id` (escrituras de este proceso)."""
+        with self._lock:
+            return self._version(metric_id)
+
+    def invalidar(self, metric_id: Optional[int] = None) -> None:
+        """Sube la versión de `metric_id` (o de todas si es None) y libera
+        sus entradas."""
+        with self._lock:
+            if metric_id is None:
+                self._epoca += 1
+                self._entradas.clear()
+                self._bytes = 0
+                return
+            self._versiones[metric_id] = self._versiones.get(metric_id, 0) + 1
+            for clave in [k for k in self._entradas if k[1] == metric_id]:
+                self._quitar(clave)
+
+    # ── Lectura ───────────────────────────────────────────────────────
+
+    def obtener(
+        self,
+        org_id: int,
+        metric_id: int,
+        variante: Hashable,
+        cargar: Callable[[], pd.DataFrame],
+        data_version: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Frame de solo lectura de `(org_id, metric_id, variante)` con
+        `data_version` (`Metric.data_version` leída ANTES de cargar).
+
+        En un miss ejecuta `cargar()` y guarda el resultado con la versión
+        vigente al EMPEZAR la carga. Las excepciones de `cargar` se propagan
+        sin cachear nada.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            version = self._version(metric_id)
+            clave = (org_id, metric_id, version, data_version, variante)
+            entrada = self._entradas.get(clave)
+            if entrada is not None and (ahora - entrada.creado) < self.ttl_seconds:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return entrada.df.copy(deep=False)
+            if entrada is not None:
+                self._quitar(clave)
+            self.misses += 1
+
+        df = cargar()
+        _congelar(df)
+        nbytes = _estimar_bytes(df)
+
+        with self._lock:
+            vigente = self._version(metric_id) == version
+            if vigente and nbytes <= self.max_bytes:
+                if clave in self._entradas:
+                    self._quitar(clave)
+                self._entradas[clave] = _Entrada(df=df, nbytes=nbytes, creado=ahora)
+                self._bytes += nbytes
+                self._expulsar()
+        return df.copy(deep=False)
+
+    def tiene(self, metric_id: int, org_id: Optional[int] = None,
+              variante: Optional[Hashable] = None, data_version: Any = _CUALQUIERA) -> bool:
+        """True si hay alguna entrada vigente de `metric_id` (de `org_id`,
+        de `variante`, con `data_version`)."""
+        ahora = time.monotonic()
+        with self._lock:
+            return any(
+                k[1] == metric_id and k[2] == self._version(metric_id)
+                and (org_id is None or k[0] == org_id)
+                and (data_version is _CUALQUIERA or k[3] == data_version)
+                and (variante is None or k[4] == variante)
+                and (ahora - e.creado) < self.ttl_seconds
+                for k, e in self._entradas.items()
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def limpiar(self) -> None:
+        """Vacía entradas y contadores (tests)."""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    # ── Internos (con el lock tomado) ─────────────────────────────────
+
+    def _version(self, metric_id: int) -> Tuple[int, int]:
+        return (self._epoca, self._versiones.get(metric_id, 0))
+
+    def _quitar(self, clave: Tuple) -> None:
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada.nbytes
+
+    def _expulsar(self) -> None:
+        while self._bytes > self.max_bytes and self._entradas:
+            _, entrada = self._entradas.popitem(last=False)
+            self._bytes -= entrada.nbytes
+            self.evictions += 1
+
+
+#: Instancia única del proceso.
+metric_frames = MetricFrameCache()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Versionado automático en cada escritura ORM de MetricData
+# ─────────────────────────────────────────────────────────────────────────
+#
+# Los eventos de mapper suben la versión dentro del flush. Como un loader
+# concurrente podría leer los datos pre-commit y guardarlos con la versión
+# ya subida, las métricas escritas se recuerdan en `session.info` y se
+# vuelven a subir al commit. Los caminos que no pasan por el ORM (borrados
+# con `query(...).delete()`, el escritor masivo) llaman a
+# `invalidate_metric_df_cache` después de su commit.
+
+_ESCRITAS_KEY = "metric_cache_escritas"
+
+
+@event.listens_for(MetricData, "after_insert")
+@event.listens_for(MetricData, "after_update")
+@event.listens_for(MetricData, "after_delete")
+def _invalidar_en_escritura(mapper, connection, target):
+    metric_frames.invalidar(target.id_metric)
+
+
+@event.listens_for(Session, "after_flush")
+def _recordar_escritas(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, MetricData) and obj.id_metric is not None:
+            session.info.setdefault(_ESCRITAS_KEY, set()).add(obj.id_metric)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_al_commit(session):
+    for metric_id in session.info.pop(_ESCRITAS_KEY, ()):
+        metric_frames.invalidar(metric_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _olvidar_escritas(session):
+    session.info.pop(_ESCRITAS_KEY, None)
@@ -0,0 +1,213 @@
+"""
+metric_data_ddl.py — SQL de la DB (triggers, FTS, índices por expresión)
+sobre `metric_data`.
+
+Lo usan `backend/models.py` (al crear las tablas con `create_all`) y las
+migraciones que lo aplican sobre una base existente, así las dos vías
+crean exactamente lo mismo:
+
+  - Búsqueda libre (`metric_store.busqueda_texto_sql`), migración
+    c0d1e2f3a4b5: en PostgreSQL, índices GIN trigram sobre las
+    expresiones que filtra el LIKE; en SQLite, tabla FTS5 `metric_data_fts`
+    (tokenizer trigram) mantenida por triggers.
+  - Índice de facetas `metric_dimension_value_counts`, migración
+    d1e2f3a4b5c6: triggers que lo mantienen en cada escritura.
+  - `metrics.data_version`, migración e2f3a4b5c6d7: triggers que lo suben
+    en cada escritura de las filas de la métrica (huella de la copia
+    columnar de `metric_store`).
+
+Las migraciones importan este módulo: un cambio en el SQL de acá va con
+una migración nueva que lo vuelva a aplicar, no editando las viejas.
+"""
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+# ─────────────────────────────────────────────────────────────────────────
+# Búsqueda libre
+# ─────────────────────────────────────────────────────────────────────────
+
+# PostgreSQL: nombre del índice → expresión indexada (gin_trgm_ops).
+TRGM_INDICES_PG: Dict[str, str] = {
+    "ix_metric_data_value_trgm": "lower(coalesce(value, ''))",
+    "ix_metric_data_dims_trgm": "lower(coalesce(dimensions_json, ''))",
+}
+
+# SQLite: rowid = id_data. Los triggers cubren también los INSERT/DELETE
+# masivos que no pasan por el ORM.
+FTS_SQLITE_DDL: Tuple[str, ...] = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS metric_data_fts "
+    "USING fts5(value, dims, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS metric_data_fts_ai AFTER INSERT ON metric_data BEGIN "
+    "INSERT INTO metric_data_fts(rowid, value, dims) VALUES "
+    "(new.id_data, coalesce(new.value, ''), coalesce(new.dimensions_json, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS metric_data_fts_ad AFTER DELETE ON metric_data BEGIN "
+    "DELETE FROM metric_data_fts WHERE rowid = old.id_data; END",
+    "CREATE TRIGGER IF NOT EXISTS metric_data_fts_au AFTER UPDATE OF value, dimensions_json "
+    "ON metric_data BEGIN "
+    "DELETE FROM metric_data_fts WHERE rowid = old.id_data; "
+    "INSERT INTO metric_data_fts(rowid, value, dims) VALUES "
+    "(new.id_data, coalesce(new.value, ''), coalesce(new.dimensions_json, '')); END",
+)
+FTS_SQLITE_POBLAR = (
+    "INSERT INTO metric_data_fts(rowid, value, dims) "
+    "SELECT id_data, coalesce(value, ''), coalesce(dimensions_json, '') FROM metric_data"
+)
+FTS_SQLITE_TRIGGERS = ("metric_data_fts_ai", "metric_data_fts_ad", "metric_data_fts_au")
+
+
+def sqlite_con_fts_trigram(conn) -> bool:
+    """True si el SQLite de `conn` trae FTS5 con tokenizer trigram (>= 3.34)."""
+    version = conn.exec_driver_sql("SELECT sqlite_version()").scalar()
+    if tuple(int(p) for p in version.split(".")[:2]) < (3, 34):
+        return False
+    opciones = {r[0] for r in conn.exec_driver_sql("PRAGMA compile_options")}
+    return "ENABLE_FTS5" in opciones
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# metric_dimension_value_counts
+# ─────────────────────────────────────────────────────────────────────────
+#
+#   - PostgreSQL: triggers por sentencia con tablas de transición, así un
+#     INSERT de 200k filas hace un solo upsert agregado.
+#   - SQLite: triggers por fila (no tiene triggers por sentencia).
+#
+# En los dos dialectos un `dimensions_json` que no es un objeto JSON válido
+# (texto roto, '', NULL, una lista) cuenta como '{}': el trigger nunca hace
+# fallar la escritura de la fila. En PostgreSQL el guard es `IS JSON
+# OBJECT` (>= 16) antes del cast, que con texto inválido levanta error.
+
+_DIMS_OBJETO_PG = (
+    "CASE WHEN {t}.dimensions_json IS JSON OBJECT "
+    "THEN {t}.dimensions_json::jsonb ELSE '{{}}'::jsonb END"
+)
+_DIMS_OBJETO_SQLITE = (
+    "coalesce(CASE WHEN json_valid({t}.dimensions_json) THEN "
+    "CASE WHEN json_type({t}.dimensions_json) = 'object' THEN {t}.dimensions_json END END, '{{}}')"
+)
+
+DIM_COUNTS_PG_FUNCION = "metric_dimension_value_counts_sync"
+DIM_COUNTS_PG_TRIGGERS = ("metric_dim_counts_ins", "metric_dim_counts_del", "metric_dim_counts_upd")
+DIM_COUNTS_PG_DDL: Tuple[str, ...] = (
+    f"CREATE OR REPLACE FUNCTION {DIM_COUNTS_PG_FUNCION}() RETURNS trigger "
+    "LANGUAGE plpgsql AS $fn$ BEGIN "
+    "IF TG_OP IN ('DELETE', 'UPDATE') THEN "
+    "UPDATE metric_dimension_value_counts c SET n_rows = c.n_rows - d.n "
+    "FROM (SELECT o.id_metric, e.key AS dim_key, e.value, count(*) AS n "
+    "FROM viejas o, jsonb_each_text(" + _DIMS_OBJETO_PG.format(t="o") + ") e "
+    "WHERE e.value IS NOT NULL GROUP BY 1, 2, 3) d "
+    "WHERE c.id_metric = d.id_metric AND c.dim_key = d.dim_key AND c.value = d.value; "
+    "END IF; "
+    "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+    "INSERT INTO metric_dimension_value_counts (id_metric, dim_key, value, n_rows) "
+    "SELECT n.id_metric, e.key, e.value, count(*) "
+    "FROM nuevas n, jsonb_each_text(" + _DIMS_OBJETO_PG.format(t="n") + ") e "
+    "WHERE e.value IS NOT NULL GROUP BY 1, 2, 3 "
+    "ON CONFLICT (id_metric, dim_key, value) "
+    "DO UPDATE SET n_rows = metric_dimension_value_counts.n_rows + EXCLUDED.n_rows; "
+    "END IF; "
+    "IF TG_OP IN ('DELETE', 'UPDATE') THEN "
+    "DELETE FROM metric_dimension_value_counts "
+    "WHERE n_rows <= 0 AND id_metric IN (SELECT DISTINCT id_metric FROM viejas); "
+    "END IF; "
+    "RETURN NULL; END $fn$",
+    "DROP TRIGGER IF EXISTS metric_dim_counts_ins ON metric_data",
+    "CREATE TRIGGER metric_dim_counts_ins AFTER INSERT ON metric_data "
+    "REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DIM_COUNTS_PG_FUNCION}()",
+    "DROP TRIGGER IF EXISTS metric_dim_counts_del ON metric_data",
+    "CREATE TRIGGER metric_dim_counts_del AFTER DELETE ON metric_data "
+    "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DIM_COUNTS_PG_FUNCION}()",
+    "DROP TRIGGER IF EXISTS metric_dim_counts_upd ON metric_data",
+    "CREATE TRIGGER metric_dim_counts_upd AFTER UPDATE ON metric_data "
+    "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DIM_COUNTS_PG_FUNCION}()",
+    "INSERT INTO metric_dimension_value_counts (id_metric, dim_key, value, n_rows) "
+    "SELECT d.id_metric, e.key, e.value, count(*) "
+    "FROM metric_data d, jsonb_each_text(" + _DIMS_OBJETO_PG.format(t="d") + ") e "
+    "WHERE e.value IS NOT NULL GROUP BY 1, 2, 3 ON CONFLICT DO NOTHING",
+)
+
+_SUMAR_SQLITE = (
+    "INSERT INTO metric_dimension_value_counts (id_metric, dim_key, value, n_rows) "
+    "SELECT new.id_metric, j.key, CAST(j.value AS TEXT), 1 "
+    "FROM json_each(" + _DIMS_OBJETO_SQLITE.format(t="new") + ") j WHERE j.type != 'null' "
+    "ON CONFLICT (id_metric, dim_key, value) DO UPDATE SET n_rows = n_rows + 1; "
+)
+_RESTAR_SQLITE = (
+    "UPDATE metric_dimension_value_counts SET n_rows = n_rows - 1 "
+    "WHERE id_metric = old.id_metric AND (dim_key, value) IN ("
+    "SELECT j.key, CAST(j.value AS TEXT) "
+    "FROM json_each(" + _DIMS_OBJETO_SQLITE.format(t="old") + ") j WHERE j.type != 'null'); "
+)
+_PODAR_SQLITE = (
+    "DELETE FROM metric_dimension_value_counts "
+    "WHERE id_metric = old.id_metric AND n_rows <= 0 AND (dim_key, value) IN ("
+    "SELECT j.key, CAST(j.value AS TEXT) "
+    "FROM json_each(" + _DIMS_OBJETO_SQLITE.format(t="old") + ") j WHERE j.type != 'null'); "
+)
+DIM_COUNTS_SQLITE_TRIGGERS = ("metric_dim_counts_ai", "metric_dim_counts_ad", "metric_dim_counts_au")
+DIM_COUNTS_SQLITE_DDL: Tuple[str, ...] = (
+    "CREATE TRIGGER IF NOT EXISTS metric_dim_counts_ai AFTER INSERT ON metric_data BEGIN "
+    + _SUMAR_SQLITE + "END",
+    "CREATE TRIGGER IF NOT EXISTS metric_dim_counts_ad AFTER DELETE ON metric_data BEGIN "
+    + _RESTAR_SQLITE + _PODAR_SQLITE + "END",
+    "CREATE TRIGGER IF NOT EXISTS metric_dim_counts_au AFTER UPDATE OF id_metric, dimensions_json "
+    "ON metric_data BEGIN " + _RESTAR_SQLITE + _SUMAR_SQLITE + _PODAR_SQLITE + "END",
+    "INSERT INTO metric_dimension_value_counts (id_metric, dim_key, value, n_rows) "
+    "SELECT d.id_metric, j.key, CAST(j.value AS TEXT), count(*) "
+    "FROM metric_data d, json_each(" + _DIMS_OBJETO_SQLITE.format(t="d") + ") j "
+    "WHERE j.type != 'null' GROUP BY 1, 2, 3",
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# metrics.data_version
+# ─────────────────────────────────────────────────────────────────────────
+#
+# Sube con toda escritura sobre `metric_data` (ORM, INSERT/UPDATE/DELETE
+# masivos, COPY), dentro de la misma transacción: una lectura que ve la
+# versión N ve también las filas de esa versión. Por sentencia en
+# PostgreSQL (una sola subida por métrica para un INSERT de 200k filas),
+# por fila en SQLite.
+
+DATA_VERSION_PG_FUNCION = "metric_data_version_bump"
+DATA_VERSION_PG_TRIGGERS = ("metric_data_version_ins", "metric_data_version_del", "metric_data_version_upd")
+DATA_VERSION_PG_DDL: Tuple[str, ...] = (
+    f"CREATE OR REPLACE FUNCTION {DATA_VERSION_PG_FUNCION}() RETURNS trigger "
+    "LANGUAGE plpgsql AS $fn$ BEGIN "
+    "IF TG_OP IN ('DELETE', 'UPDATE') THEN "
+    "UPDATE metrics SET data_version = data_version + 1 "
+    "WHERE id_metric IN (SELECT DISTINCT id_metric FROM viejas); "
+    "END IF; "
+    "IF TG_OP IN ('INSERT', 'UPDATE') THEN "
+    "UPDATE metrics SET data_version = data_version + 1 "
+    "WHERE id_metric IN (SELECT DISTINCT id_metric FROM nuevas); "
+    "END IF; "
+    "RETURN NULL; END $fn$",
+    "DROP TRIGGER IF EXISTS metric_data_version_ins ON metric_data",
+    "CREATE TRIGGER metric_data_version_ins AFTER INSERT ON metric_data "
+    "REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DATA_VERSION_PG_FUNCION}()",
+    "DROP TRIGGER IF EXISTS metric_data_version_del ON metric_data",
+    "CREATE TRIGGER metric_data_version_del AFTER DELETE ON metric_data "
+    "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DATA_VERSION_PG_FUNCION}()",
+    "DROP TRIGGER IF EXISTS metric_data_version_upd ON metric_data",
+    "CREATE TRIGGER metric_data_version_upd AFTER UPDATE ON metric_data "
+    "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas FOR EACH STATEMENT "
+    f"EXECUTE PROCEDURE {DATA_VERSION_PG_FUNCION}()",
+)
+
+DATA_VERSION_SQLITE_TRIGGERS = ("metric_data_version_ai", "metric_data_version_ad", "metric_data_version_au")
+DATA_VERSION_SQLITE_DDL: Tuple[str, ...] = (
+    "CREATE TRIGGER IF NOT EXISTS metric_data_version_ai AFTER INSERT ON metric_data BEGIN "
+    "UPDATE metrics SET data_version = data_version + 1 WHERE id_metric = new.id_metric; END",
+    "CREATE TRIGGER IF NOT EXISTS metric_data_version_ad AFTER DELETE ON metric_data BEGIN "
+    "UPDATE metrics SET data_version = data_version + 1 WHERE id_metric = old.id_metric; END",
+    "CREATE TRIGGER IF NOT EXISTS metric_data_version_au AFTER UPDATE ON metric_data BEGIN "
+    "UPDATE metrics SET data_version = data_version + 1 "
+    "WHERE id_metric IN (old.id_metric, new.id_metric); END",
+)
@@ -0,0 +1,294 @@
+"""
+metric_export.py — Export de `metric_data` a CSV/TXT/XLSX por streaming.
+
+`GET /api/metrics/{id}/export` armaba la métrica completa como DataFrame,
+escribía el archivo entero en un `BytesIO` y recién entonces respondía:
+con 500k filas el pico de memoria era varias veces el tamaño de los datos
+y el cliente esperaba todo ese tiempo sin recibir un byte.
+
+Acá la métrica se recorre por lotes de `FILAS_POR_LOTE`:
+
+  - Si la copia columnar de la métrica ya está en el cache del proceso
+    (`metric_cache`), los lotes salen de ahí, sin tocar la DB.
+  - Si no, se lee `metric_data` con cursor de servidor (`yield_per`) en
+    dos pasadas: la primera solo junta las columnas presentes (dimensiones
+    y fields, en orden de aparición) para poder escribir la cabecera; la
+    segunda emite las filas.
+  - Las columnas de auditoría se resuelven por lote (un SELECT de usuarios
+    por lote, con los emails ya vistos memorizados).
+
+CSV/TXT se emiten a medida que se producen. XLSX usa el modo write-only de
+openpyxl (las filas van a un archivo temporal) y se emite al cerrarlo.
+
+Las columnas son las mismas que `metric_store.marco_plano(...,
+solo_dims_presentes=True)` más las de auditoría.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+
+from backend.logging_config import get_logger
+from backend.metric_cache import metric_frames
+from backend.metric_store import (
+    ColumnasMetrica,
+    columnas_cacheadas,
+    construir_columnas,
+    filtro_dimensiones_sql,
+    normalizar_filtros,
+    version_de_datos,
+)
+from backend.models import Metric, MetricData, User
+
+logger = get_logger(__name__)
+
+FILAS_POR_LOTE = int(os.getenv("METRIC_EXPORT_CHUNK_ROWS", "5000"))
+
+# Bytes por trozo al emitir el XLSX ya cerrado.
+_TROZO_XLSX = 64 * 1024
+
+COLUMNAS_AUDITORIA = ["Cargado por", "Vía", "Fecha de carga", "IP"]
+
+FORMATOS = {
+    # formato: (media_type, extensión)
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "csv": ("text/csv", "csv"),
+    "txt": ("text/plain", "txt"),
+}
+
+
+@dataclass
+class _Cabecera:
+    """Columnas del export en el orden de `marco_plano`."""
+    dims: List[str] = field(default_factory=list)        # ids, orden de aparición
+    fields: List[str] = field(default_factory=list)      # orden de aparición
+    valor_raw: bool = False                               # alguna fila no-objeto
+    n_rows: int = 0
+
+    def sumar(self, col: ColumnasMetrica) -> None:
+        for k in col.dims:
+            if k not in self.dims:
+                self.dims.append(k)
+        for k in col.fields:
+            if k not in self.fields:
+                self.fields.append(k)
+        self.valor_raw = self.valor_raw or not all(col.objeto)
+        self.n_rows += col.n_rows
+
+
+class Exportacion:
+    """Cabecera + lotes de filas de una métrica, listos para serializar."""
+
+    def __init__(
+        self,
+        db: Session,
+        metric: Metric,
+        dims_map: Dict[int, str],
+        filtros: Optional[Dict[str, Any]] = None,
+        *,
+        include_audit: bool = False,
+        filas_por_lote: Optional[int] = None,
+    ):
+        self.db = db
+        self.metric = metric
+        self.dims_map = dims_map
+        self.filtros = normalizar_filtros(filtros)
+        self.include_audit = include_audit
+        self.filas_por_lote = filas_por_lote or FILAS_POR_LOTE
+        self._emails: Dict[int, Optional[str]] = {}
+
+        self._en_memoria: Optional[ColumnasMetrica] = None
+        if metric_frames.tiene(metric.id_metric, org_id=metric.org_id, variante="columnas",
+                               data_version=version_de_datos(db, metric.id_metric)):
+            self._en_memoria = columnas_cacheadas(db, metric, self.filtros)
+            self._cabecera = _Cabecera()
+            self._cabecera.sumar(self._en_memoria)
+        else:
+            self._cabecera = self._cabecera_desde_db()
+        self.columnas, self._proyeccion = self._armar_columnas()
+
+    # ── Columnas ──────────────────────────────────────────────────────
+
+    def _armar_columnas(self):
+        """(nombres, [(tipo, clave)]) — mismo criterio que `marco_plano`:
+        un nombre repetido conserva su primera posición y el último valor."""
+        cab = self._cabecera
+        if not cab.n_rows:
+            return [], []
+        orden: Dict[str, tuple] = {}
+        for dim_id in cab.dims:
+            nombre = self.dims_map.get(int(dim_id)) if dim_id.isdigit() else None
+            orden[nombre or f"Dim_{dim_id}"] = ("dim", dim_id)
+        if self.metric.data_type == "object":
+            for k in cab.fields:
+                orden[k] = ("field", k)
+            if cab.valor_raw:
+                orden["Valor_Raw"] = ("raw", None)
+        else:
+            orden[self.metric.name] = ("value", None)
+        nombres = list(orden)
+        if self.include_audit:
+            nombres += COLUMNAS_AUDITORIA
+        return nombres, list(orden.values())
+
+    # ── Lectura ───────────────────────────────────────────────────────
+
+    def _consulta(self, *columnas):
+        return (
+            select(*columnas)
+            .where(and_(MetricData.id_metric == self.metric.id_metric,
+                        *filtro_dimensiones_sql(self.db, self.filtros)))
+            .order_by(MetricData.id_data)
+            .execution_options(yield_per=self.filas_por_lote)
+        )
+
+    def _cabecera_desde_db(self) -> _Cabecera:
+        cab = _Cabecera()
+        resultado = self.db.execute(self._consulta(
+            MetricData.id_data, MetricData.value, MetricData.dimensions_json,
+        ))
+        for filas in resultado.partitions():
+            cab.sumar(construir_columnas(filas))
+        return cab
+
+    def _lotes_columnares(self) -> Iterator[tuple]:
+        """(ColumnasMetrica, {id_data: fila de auditoría} | None) por lote."""
+        if self._en_memoria is not None:
+            col = self._en_memoria
+            for ini in range(0, col.n_rows, self.filas_por_lote):
+                lote = col.filas(range(ini, min(ini + self.filas_por_lote, col.n_rows)))
+                yield lote, self._auditoria_de(lote.id_data) if self.include_audit else None
+            return
+
+        columnas = [MetricData.id_data, MetricData.value, MetricData.dimensions_json]
+        if self.include_audit:
+            columnas += [MetricData.created_by_user_id, MetricData.created_via,
+                         MetricData.created_at, MetricData.created_from_ip]
+        for filas in self.db.execute(self._consulta(*columnas)).partitions():
+            lote = construir_columnas(filas)
+            yield lote, ({f.id_data: f for f in filas} if self.include_audit else None)
+
+    def _auditoria_de(self, ids: Sequence[int]) -> dict:
+        return {
+            f.id_data: f for f in self.db.execute(
+                select(MetricData.id_data, MetricData.created_by_user_id,
+                       MetricData.created_via, MetricData.created_at,
+                       MetricData.created_from_ip)
+                .where(MetricData.id_data.in_(list(ids)))
+            )
+        }
+
+    def _resolver_emails(self, auditoria: dict) -> None:
+        faltan = {
+            f.created_by_user_id for f in auditoria.values()
+            if f.created_by_user_id and f.created_by_user_id not in self._emails
+        }
+        if not faltan:
+            return
+        for uid, email in self.db.execute(select(User.id, User.email).where(User.id.in_(faltan))):
+            self._emails[uid] = email
+        for uid in faltan:
+            self._emails.setdefault(uid, None)
+
+    # ── Filas ─────────────────────────────────────────────────────────
+
+    def lotes(self) -> Iterator[List[list]]:
+        """Filas del export (listas alineadas con `columnas`), por lote."""
+        if not self.columnas:
+            return
+        for col, auditoria in self._lotes_columnares():
+            columnas = []
+            for tipo, clave in self._proyeccion:
+                if tipo == "dim":
+                    columnas.append(col.dims.get(clave) or [None] * col.n_rows)
+                elif tipo == "field":
+                    columnas.append(col.fields.get(clave) or [None] * col.n_rows)
+                elif tipo == "raw":
+                    columnas.append([None if es_obj else str(v) for v, es_obj in zip(col.value, col.objeto)])
+                else:
+                    columnas.append(col.value)
+            if auditoria is not None:
+                self._resolver_emails(auditoria)
+                filas_aud = [auditoria.get(i) for i in col.id_data]
+                columnas += [
+                    [self._emails.get(f.created_by_user_id) if f is not None and f.created_by_user_id else None
+                     for f in filas_aud],
+                    [f.created_via if f is not None else None for f in filas_aud],
+                    [f.created_at.strftime("%Y-%m-%d %H:%M:%S") if f is not None and f.created_at else None
+                     for f in filas_aud],
+                    [f.created_from_ip if f is not None else None for f in filas_aud],
+                ]
+            yield [list(fila) for fila in zip(*columnas)]
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Serialización
+# ─────────────────────────────────────────────────────────────────────────
+
+def _celda(v: Any) -> Any:
+    """Valor de celda: escalares tal cual; listas/objetos como texto."""
+    if v is None or isinstance(v, (str, int, float, bool)):
+        return v
+    return str(v)
+
+
+def csv_por_trozos(exp: Exportacion, *, sep: str, bom: bool) -> Iterator[bytes]:
+    """CSV/TXT: la cabecera y luego un trozo de bytes por lote."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=sep, lineterminator="\n")
+    if exp.columnas:
+        writer.writerow(exp.columnas)
+    primero = ("﻿" if bom else "") + buf.getvalue()
+    yield primero.encode("utf-8")
+    for filas in exp.lotes():
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([["" if v is None else _celda(v) for v in fila] for fila in filas])
+        yield buf.getvalue().encode("utf-8")
+
+
+def xlsx_por_trozos(exp: Exportacion, *, hoja: str = "Datos") -> Iterator[bytes]:
+    """XLSX en modo write-only: memoria acotada al lote en curso."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    if exp.columnas:
+        negrita = Font(bold=True)
+        cabecera = []
+        for nombre in exp.columnas:
+            celda = WriteOnlyCell(ws, value=nombre)
+            celda.font = negrita
+            cabecera.append(celda)
+        ws.append(cabecera)
+    for filas in exp.lotes():
+        for fila in filas:
+            ws.append([_celda(v) for v in fila])
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as destino:
+        wb.save(destino)
+        destino.seek(0)
+        while True:
+            trozo = destino.read(_TROZO_XLSX)
+            if not trozo:
+                break
+            yield trozo
+
+
+def serializar(exp: Exportacion, formato: str) -> Iterable[bytes]:
+    if formato == "excel":
+        return xlsx_por_trozos(exp)
+    if formato == "csv":
+        return csv_por_trozos(exp, sep=";", bom=True)
+    if formato == "txt":
+        return csv_por_trozos(exp, sep="\t", bom=False)
+    raise ValueError(f"Formato no soportado: {formato}")
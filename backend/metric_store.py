@@ -0,0 +1,792 @@
+"""
+metric_store.py — Layout columnar materializado de `metric_data`.
+
+`metric_data` guarda cada fila como dos textos JSON (`dimensions_json` y
+`value`). Leer una métrica completa fila a fila —un objeto ORM y dos
+`json.loads` por fila— cuesta segundos con las métricas de 25k–200k filas,
+y cada loader (tablas/gráficos, motor de informes, `LoadMetricToDF`) lo
+repetía por su cuenta.
+
+Este módulo mantiene, por métrica, una copia columnar de esos datos en la
+tabla `metric_data_columns`: un único documento JSON (comprimido con zlib)
+con una lista por dimensión y una por field de `value`. Leer la métrica es
+entonces un SELECT de una fila + un `json.loads` + `pd.DataFrame(dict)`,
+sin parseo por fila.
+
+Uso desde un loader (siempre a través del cache de frames del proceso,
+`backend/metric_cache.py`):
+
+    from backend.metric_store import columnas_cacheadas
+    col = columnas_cacheadas(db, metric)
+    df = pd.DataFrame({"Curso": col.dim(12), "Rend": col.field("Rend")})
+
+`cargar_columnas` es la capa de DB debajo del cache: no la llames desde un
+loader.
+
+Con filtros por dimensión (`columnas_cacheadas(db, metric, filtros)`) la
+lectura va a SQL solo con las filas que calzan (`filtro_dimensiones_sql`),
+salvo que la métrica completa ya esté en el cache del proceso. Las entradas
+del cache llevan en la clave el `Metric.data_version` leído antes de cargar
+(`version_de_datos`).
+
+Mantenimiento de la copia:
+  - La copia guarda el `Metric.data_version` con que se armó. Triggers de
+    la DB lo suben en toda escritura de `metric_data` (ORM, masivas, COPY;
+    ver `backend/metric_data_ddl.py`), así que una copia con otra versión
+    está vieja, aunque la escritura no cambie la cantidad de filas.
+  - Toda escritura ORM sobre MetricData (insert/update/delete, incluido el
+    cascade al borrar una Metric) además borra la copia de la métrica
+    afectada en el mismo flush (`_descartar_copias_en_flush`).
+  - La primera lectura posterior reconstruye la copia con un SELECT de tres
+    columnas (sin ORM) y la persiste para las siguientes.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import (
+    Text, and_, cast, delete, event, func, insert, literal, literal_column, or_, select, table, text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.logging_config import get_logger
+from backend.metric_cache import metric_frames
+from backend.models import Metric, MetricData, MetricDataColumns, MetricDimensionValueCount
+
+logger = get_logger(__name__)
+
+# Nivel de zlib del payload: 1 ya reduce ~10x el JSON repetitivo de las
+# dimensiones y comprime/descomprime en decenas de ms para 200k filas.
+_ZLIB_LEVEL = 1
+
+
+def _parse_objeto(raw) -> Optional[dict]:
+    """JSON de un objeto → dict; None si no es un objeto JSON.
+
+    Tolera el formato legacy con comillas simples (mismo fallback que
+    `_parse_meta_json` en los routers).
+    """
+    if isinstance(raw, dict):
+        return raw
+    if not isinstance(raw, str) or not raw.lstrip().startswith("{"):
+        return None
+    try:
+        parsed = json.loads(raw)
+    except Exception:
+        try:
+            parsed = json.loads(raw.replace("'", '"'))
+        except Exception:
+            return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+class _ColumnasDelMarco(Mapping):
+    """`dims`/`fields` de un `ColumnasMetrica` servido desde el frame
+    cacheado (`ColumnasMetrica.from_frame`): cada columna pasa a lista la
+    primera vez que alguien la pide. Un loader que usa 3 de las 40
+    dimensiones de la métrica no copia las otras 37 en cada hit."""
+
+    def __init__(self, df: pd.DataFrame, prefijo: str):
+        self._df = df
+        self._prefijo = prefijo
+        self._claves = [c[len(prefijo):] for c in df.columns if c.startswith(prefijo)]
+        self._presentes = set(self._claves)
+        self._listas: Dict[str, list] = {}
+
+    def __getitem__(self, clave: str) -> list:
+        lista = self._listas.get(clave)
+        if lista is None:
+            if clave not in self._presentes:
+                raise KeyError(clave)
+            lista = self._listas[clave] = self._df[self._prefijo + clave].tolist()
+        return lista
+
+    def __contains__(self, clave: object) -> bool:
+        return clave in self._presentes
+
+    def __iter__(self):
+        return iter(self._claves)
+
+    def __len__(self) -> int:
+        return len(self._claves)
+
+
+@dataclass
+class ColumnasMetrica:
+    """Datos de una métrica en forma columnar (una lista por columna).
+
+    Todas las listas tienen `n_rows` elementos, alineados por posición con
+    `id_data` (orden ascendente).
+
+    - `value`: el texto crudo de `MetricData.value` de cada fila.
+    - `created_at`: fecha de carga de cada fila (ISO 8601, o None).
+    - `objeto`: 1 si `value` era un objeto JSON (sus claves están en
+      `fields`), 0 si no.
+    - `dims`: {"<id_dimension>": [valor | None, ...]} — una lista por cada
+      clave presente en algún `dimensions_json` de la métrica.
+    - `fields`: {"<field>": [valor | None, ...]} — una lista por cada clave
+      de los `value` objeto, en orden de primera aparición.
+    """
+    id_data: List[int] = field(default_factory=list)
+    value: List[Optional[str]] = field(default_factory=list)
+    created_at: List[Optional[str]] = field(default_factory=list)
+    objeto: List[int] = field(default_factory=list)
+    dims: Dict[str, list] = field(default_factory=dict)
+    fields: Dict[str, list] = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.id_data)
+
+    def dim(self, dim_id) -> list:
+        """Columna de la dimensión `dim_id` (None donde la fila no la trae)."""
+        col = self.dims.get(str(dim_id))
+        return list(col) if col is not None else [None] * self.n_rows
+
+    def field(self, name: str) -> list:
+        """Columna del field `name` de los `value` objeto (None si falta)."""
+        col = self.fields.get(name)
+        return list(col) if col is not None else [None] * self.n_rows
+
+    def filas(self, indices: Iterable[int]) -> "ColumnasMetrica":
+        """Subconjunto de filas (por posición), preservando el orden dado."""
+        idx = list(indices)
+        return ColumnasMetrica(
+            id_data=[self.id_data[i] for i in idx],
+            value=[self.value[i] for i in idx],
+            created_at=[self.created_at[i] for i in idx],
+            objeto=[self.objeto[i] for i in idx],
+            dims={k: [v[i] for i in idx] for k, v in self.dims.items()},
+            fields={k: [v[i] for i in idx] for k, v in self.fields.items()},
+        )
+
+    def to_payload(self) -> bytes:
+        doc = {
+            "id_data": self.id_data,
+            "value": self.value,
+            "created_at": self.created_at,
+            "objeto": self.objeto,
+            "dims": self.dims,
+            "fields": self.fields,
+        }
+        return zlib.compress(json.dumps(doc, ensure_ascii=False).encode("utf-8"), _ZLIB_LEVEL)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame `object` (sin inferencia de tipos: los valores quedan
+        tal cual) con `id_data`, `value`, `objeto`, `d:<id>` y `f:<field>`."""
+        datos = {
+            "id_data": self.id_data, "value": self.value,
+            "created_at": self.created_at, "objeto": self.objeto,
+        }
+        datos.update({f"d:{k}": v for k, v in self.dims.items()})
+        datos.update({f"f:{k}": v for k, v in self.fields.items()})
+        return pd.DataFrame(datos, dtype=object)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ColumnasMetrica":
+        """Inversa de `to_frame`. Las columnas de `dims`/`fields` se leen de
+        `df` recién cuando se piden (`_ColumnasDelMarco`): es el camino de
+        cada hit del cache y no debe copiar la métrica entera."""
+        if df.empty:
+            return cls()
+        return cls(
+            id_data=df["id_data"].tolist(),
+            value=df["value"].tolist(),
+            created_at=df["created_at"].tolist(),
+            objeto=df["objeto"].tolist(),
+            dims=_ColumnasDelMarco(df, "d:"),
+            fields=_ColumnasDelMarco(df, "f:"),
+        )
+
+    @classmethod
+    def from_payload(cls, payload: bytes) -> "ColumnasMetrica":
+        doc = json.loads(zlib.decompress(payload).decode("utf-8"))
+        return cls(
+            id_data=doc["id_data"],
+            value=doc["value"],
+            created_at=doc["created_at"],
+            objeto=doc["objeto"],
+            dims=doc["dims"],
+            fields=doc["fields"],
+        )
+
+
+def construir_columnas(rows) -> ColumnasMetrica:
+    """Arma `ColumnasMetrica` desde tuplas `(id_data, value, dimensions_json[, created_at])`.
+
+    Es el único lugar donde se parsea el JSON de cada fila; el resultado se
+    persiste y las lecturas siguientes ya no lo pagan.
+    """
+    rows = list(rows)
+    n = len(rows)
+    col = ColumnasMetrica(
+        id_data=[0] * n, value=[None] * n, created_at=[None] * n, objeto=[0] * n,
+    )
+    dims = col.dims
+    fields = col.fields
+    for i, row in enumerate(rows):
+        id_data, raw_value, raw_dims = row[0], row[1], row[2]
+        col.id_data[i] = id_data
+        col.value[i] = raw_value
+        creado = row[3] if len(row) > 3 else None
+        if creado is not None:
+            col.created_at[i] = creado.isoformat() if hasattr(creado, "isoformat") else str(creado)
+        for k, v in (_parse_objeto(raw_dims) or {}).items():
+            lista = dims.get(k)
+            if lista is None:
+                lista = dims[k] = [None] * n
+            lista[i] = v
+        obj = _parse_objeto(raw_value)
+        if obj is not None:
+            col.objeto[i] = 1
+            for k, v in obj.items():
+                lista = fields.get(k)
+                if lista is None:
+                    lista = fields[k] = [None] * n
+                lista[i] = v
+    return col
+
+
+def _persistir(db: Session, metric: Metric, col: ColumnasMetrica, version: int) -> None:
+    """Guarda (reemplaza) la copia columnar de `metric`, armada con su
+    `data_version` = `version`.
+
+    Se escribe en una transacción propia cuando la sesión está ligada a un
+    Engine, para que un endpoint de solo lectura (que nunca hace commit)
+    también deje la copia persistida. Si la sesión ya escribió en su
+    transacción (`_ESCRIBIO_KEY`) o está ligada a una Connection (tests con
+    SAVEPOINT), se escribe en un savepoint de la misma: otra conexión
+    esperaría los locks de esa escritura (SQLite: "database is locked") y
+    la copia refleja datos que solo esa transacción ve. Un fallo acá nunca
+    rompe la lectura: la copia se reintenta en la próxima.
+    """
+    values = {
+        "id_metric": metric.id_metric,
+        "org_id": metric.org_id,
+        "n_rows": col.n_rows,
+        "max_id_data": max(col.id_data) if col.id_data else None,
+        "data_version": version,
+        "payload": col.to_payload(),
+        "built_at": datetime.utcnow(),
+    }
+    stmt_del = delete(MetricDataColumns).where(MetricDataColumns.id_metric == metric.id_metric)
+    stmt_ins = insert(MetricDataColumns).values(**values)
+    try:
+        bind = db.get_bind()
+        if isinstance(bind, Engine) and not db.info.get(_ESCRIBIO_KEY):
+            with bind.begin() as conn:
+                conn.execute(stmt_del)
+                conn.execute(stmt_ins)
+        else:
+            with db.begin_nested():
+                db.execute(stmt_del)
+                db.execute(stmt_ins)
+    except SQLAlchemyError:
+        logger.warning(
+            "No se pudo persistir la copia columnar de la métrica %s", metric.id_metric,
+            exc_info=True,
+        )
+
+
+def cargar_columnas(db: Session, metric: Metric) -> ColumnasMetrica:
+    """Datos de `metric` en forma columnar, desde la copia materializada.
+
+    La copia vale si se armó con el `Metric.data_version` actual (lo suben
+    triggers en toda escritura de `metric_data`); si no, se reconstruye. La
+    versión se lee antes que las filas: si una escritura se commitea entre
+    medio, la copia queda con la versión vieja y la próxima lectura la
+    vuelve a armar, nunca al revés.
+    """
+    snap = db.execute(
+        select(
+            Metric.data_version, MetricDataColumns.data_version.label("copia"), MetricDataColumns.payload,
+        )
+        .select_from(Metric)
+        .outerjoin(MetricDataColumns, MetricDataColumns.id_metric == Metric.id_metric)
+        .where(Metric.id_metric == metric.id_metric)
+    ).first()
+    version = snap.data_version if snap is not None else None
+    if snap is not None and snap.payload is not None and snap.copia == version:
+        try:
+            return ColumnasMetrica.from_payload(snap.payload)
+        except Exception:
+            logger.warning(
+                "Copia columnar ilegible para la métrica %s; se reconstruye",
+                metric.id_metric, exc_info=True,
+            )
+
+    rows = db.execute(
+        select(MetricData.id_data, MetricData.value, MetricData.dimensions_json, MetricData.created_at)
+        .where(MetricData.id_metric == metric.id_metric)
+        .order_by(MetricData.id_data)
+    ).all()
+    col = construir_columnas(rows)
+    _persistir(db, metric, col, version)
+    return col
+
+
+def version_de_datos(db: Session, metric_id: int) -> Optional[int]:
+    """`Metric.data_version` de `metric_id` tal como está en la DB, para la
+    clave del cache de frames (`backend/metric_cache.py`).
+
+    None si la transacción de la sesión ya escribió (`_ESCRIBIO_KEY`): la
+    versión que ve puede no commitearse nunca, y una lectura limpia jamás
+    debe dar con lo que se cacheó bajo ella.
+    """
+    if db.info.get(_ESCRIBIO_KEY):
+        return None
+    return db.execute(select(Metric.data_version).where(Metric.id_metric == metric_id)).scalar()
+
+
+def cargar_marco(db: Session, metric: Metric, data_version: Optional[int] = None) -> pd.DataFrame:
+    """`ColumnasMetrica.to_frame()` de `metric`, vía el cache del proceso.
+
+    Es la base compartida por todos los loaders: una métrica leída por un
+    dashboard ya está parseada cuando la pide el export PDF. El frame es de
+    solo lectura (ver `backend/metric_cache.py`). `data_version` es la de
+    `version_de_datos` si el llamador ya la leyó.
+    """
+    if data_version is None:
+        data_version = version_de_datos(db, metric.id_metric)
+    return metric_frames.obtener(
+        metric.org_id, metric.id_metric, "columnas",
+        lambda: cargar_columnas(db, metric).to_frame(),
+        data_version=data_version,
+    )
+
+
+def columnas_cacheadas(
+    db: Session,
+    metric: Metric,
+    filtros: Optional[Mapping[Any, Any]] = None,
+) -> ColumnasMetrica:
+    """`cargar_columnas` servido desde el cache del proceso.
+
+    Con `filtros` ({id_dimension: valor | [valores]}, ver
+    `normalizar_filtros`) devuelve solo las filas que calzan:
+
+    - si la métrica completa ya está cacheada, se filtra en memoria;
+    - si no, se leen de `metric_data` solo esas filas, con los filtros
+      compilados a SQL, y el resultado se cachea como variante propia. Un
+      export de un curso no paga el historial completo de la métrica.
+    """
+    filtros_n = normalizar_filtros(filtros)
+    version = version_de_datos(db, metric.id_metric)
+    if not filtros_n:
+        return ColumnasMetrica.from_frame(cargar_marco(db, metric, version))
+    if metric_frames.tiene(metric.id_metric, org_id=metric.org_id, variante="columnas",
+                           data_version=version):
+        return ColumnasMetrica.from_frame(_filtrar_marco(cargar_marco(db, metric, version), filtros_n))
+    marco = metric_frames.obtener(
+        metric.org_id, metric.id_metric, ("columnas", tuple(sorted(filtros_n.items()))),
+        lambda: cargar_columnas_filtradas(db, metric, filtros_n).to_frame(),
+        data_version=version,
+    )
+    return ColumnasMetrica.from_frame(marco)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Filtros por dimensión: compilación a SQL y equivalente en memoria
+# ─────────────────────────────────────────────────────────────────────────
+#
+# `MetricData.dimensions_json` es una columna Text con un JSON plano
+# {"<id_dimension>": "valor"}. Semántica (la de `reports.filtering.matches`):
+# AND entre dimensiones, IN dentro de cada una, comparación como texto; una
+# clave ausente o null vale "". Una lista vacía no restringe.
+#
+# No existe un dialecto común:
+#   - PostgreSQL (prod/dev): containment `dimensions_json::jsonb @> '{"k": "v"}'`,
+#     que usa el índice GIN `ix_metric_data_dims_gin` (jsonb_path_ops). El
+#     `->>` no es indexable con GIN; los valores que parecen números se
+#     prueban también como número JSON, para las filas cargadas a mano
+#     con dimensiones no-string.
+#   - SQLite (tests): `CAST(json_extract(col, '$."k"') AS TEXT) IN (...)`.
+#
+# Precondición: `dimensions_json` siempre contiene JSON válido — todas las
+# escrituras pasan por `json.dumps`.
+
+_DIM_ID_RE = re.compile(r"^\d+$")
+
+
+def normalizar_filtros(filtros: Optional[Mapping[Any, Any]]) -> Dict[str, Tuple[str, ...]]:
+    """{id_dimension: valor | [valores]} → {"<id>": ("v1", ...)} (ordenados).
+
+    Descarta las listas vacías y los valores None (no restringen). Las
+    claves deben ser ids numéricos: viajan embebidas en un literal de
+    path/JSON y no como bind param.
+    """
+    out: Dict[str, Tuple[str, ...]] = {}
+    for dim_id, vals in (filtros or {}).items():
+        key = str(dim_id)
+        if not _DIM_ID_RE.match(key):
+            raise ValueError(f"id de dimensión inválido: {key}")
+        if vals is None:
+            continue
+        if not isinstance(vals, (list, tuple, set)):
+            vals = [vals]
+        limpios = tuple(sorted({str(v) for v in vals if v is not None}))
+        if limpios:
+            out[key] = limpios
+    return out
+
+
+def _dialecto(db: Session) -> str:
+    bind = db.get_bind()
+    return bind.dialect.name if bind is not None else "sqlite"
+
+
+def _como_numero_json(valor: str):
+    """`valor` como número JSON si su texto es exactamente el de ese número."""
+    for tipo in (int, float):
+        try:
+            num = tipo(valor)
+        except ValueError:
+            continue
+        return num if str(num) == valor and math.isfinite(num) else None
+    return None
+
+
+def filtro_dimensiones_sql(db: Session, filtros: Optional[Mapping[Any, Any]]) -> list:
+    """Predicados SQL (uno por dimensión) sobre `MetricData.dimensions_json`,
+    para el dialecto de `db`."""
+    dialect = _dialecto(db)
+    predicados = []
+    for key, valores in normalizar_filtros(filtros).items():
+        if dialect == "postgresql":
+            doc = cast(MetricData.dimensions_json, JSONB)
+            alternativas = []
+            for v in valores:
+                if v == "":
+                    alternativas.append(~doc.has_key(key))
+                    alternativas.append(doc.contains({key: None}))
+                alternativas.append(doc.contains({key: v}))
+                num = _como_numero_json(v)
+                if num is not None:
+                    alternativas.append(doc.contains({key: num}))
+            predicados.append(or_(*alternativas))
+        else:
+            extraido = func.json_extract(MetricData.dimensions_json, literal(f'$."{key}"'))
+            pred = cast(extraido, Text).in_(valores)
+            if "" in valores:
+                pred = or_(pred, extraido.is_(None))
+            predicados.append(pred)
+    return predicados
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Búsqueda libre (`q`) sobre value + dimensions_json
+# ─────────────────────────────────────────────────────────────────────────
+#
+# La semántica es la histórica: substring case-insensitive sobre el texto
+# crudo de `value` y de `dimensions_json` (también matchea las claves). El
+# predicado final es siempre ese LIKE; lo que cambia por dialecto es qué lo
+# vuelve indexable:
+#   - PostgreSQL: `ix_metric_data_value_trgm` / `ix_metric_data_dims_trgm`
+#     (pg_trgm) indexan exactamente estas expresiones, así que el planner
+#     resuelve el LIKE por índice. El '' del coalesce va como literal y no
+#     como bind param para que la expresión calce con la del índice.
+#   - SQLite: la tabla FTS5 trigram `metric_data_fts` da los candidatos por
+#     MATCH y el LIKE solo confirma. Sin la tabla, o con un patrón que el
+#     trigram no puede resolver (menos de 3 caracteres, o `%`/`_`, que en
+#     LIKE son comodines), queda el LIKE solo.
+
+_TRIGRAM_MIN_CHARS = 3
+
+
+def _tiene_fts(db: Session) -> bool:
+    return db.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metric_data_fts'"
+    )).first() is not None
+
+
+def busqueda_texto_sql(db: Session, q: Optional[str]):
+    """Predicado SQL de la búsqueda libre `q`, o None si `q` está vacía."""
+    texto = (q or "").strip().lower()
+    if not texto:
+        return None
+    patron = f"%{texto}%"
+    vacio = literal_column("''")
+    pred = or_(
+        func.lower(func.coalesce(MetricData.value, vacio)).like(patron),
+        func.lower(func.coalesce(MetricData.dimensions_json, vacio)).like(patron),
+    )
+    if (
+        _dialecto(db) == "sqlite"
+        and len(texto) >= _TRIGRAM_MIN_CHARS
+        and "%" not in texto and "_" not in texto
+        and _tiene_fts(db)
+    ):
+        fts = table("metric_data_fts")
+        frase = '"' + texto.replace('"', '""') + '"'
+        candidatos = (
+            select(literal_column("rowid"))
+            .select_from(fts)
+            .where(literal_column("metric_data_fts").op("MATCH")(frase))
+        )
+        pred = and_(MetricData.id_data.in_(candidatos), pred)
+    return pred
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Conteos por (dimensión, valor)
+# ─────────────────────────────────────────────────────────────────────────
+#
+# `metric_dimension_value_counts` la mantienen triggers de la DB (ver
+# models.py): facetas y distinct leen una fila por valor distinto en vez de
+# recorrer metric_data. El valor es el texto del valor JSON (el `str(v)` de
+# lo que guardan las vías de escritura); las claves null no cuentan.
+
+
+def conteos_dimensiones(
+    db: Session,
+    metric_ids: Iterable[int],
+    dim_keys: Optional[Iterable[str]] = None,
+) -> Dict[str, Dict[str, int]]:
+    """{dim_key: {valor: filas}} sumado sobre `metric_ids`."""
+    ids = list(metric_ids)
+    if not ids:
+        return {}
+    q = select(
+        MetricDimensionValueCount.dim_key,
+        MetricDimensionValueCount.value,
+        func.sum(MetricDimensionValueCount.n_rows),
+    ).where(
+        MetricDimensionValueCount.id_metric.in_(ids),
+        MetricDimensionValueCount.n_rows > 0,
+    ).group_by(MetricDimensionValueCount.dim_key, MetricDimensionValueCount.value)
+    if dim_keys is not None:
+        q = q.where(MetricDimensionValueCount.dim_key.in_([str(k) for k in dim_keys]))
+    out: Dict[str, Dict[str, int]] = {}
+    for dim_key, valor, n in db.execute(q):
+        out.setdefault(dim_key, {})[valor] = int(n)
+    return out
+
+
+def cargar_columnas_filtradas(
+    db: Session,
+    metric: Metric,
+    filtros: Mapping[Any, Any],
+) -> ColumnasMetrica:
+    """Solo las filas de `metric` que calzan con `filtros`, leídas de
+    `metric_data` (no toca ni reconstruye la copia materializada)."""
+    rows = db.execute(
+        select(MetricData.id_data, MetricData.value, MetricData.dimensions_json, MetricData.created_at)
+        .where(and_(MetricData.id_metric == metric.id_metric,
+                    *filtro_dimensiones_sql(db, filtros)))
+        .order_by(MetricData.id_data)
+    ).all()
+    return construir_columnas(rows)
+
+
+def filtrar_columnas(col: ColumnasMetrica, filtros: Mapping[Any, Any]) -> ColumnasMetrica:
+    """Equivalente en memoria de `filtro_dimensiones_sql`."""
+    filtros_n = normalizar_filtros(filtros)
+    if not filtros_n:
+        return col
+    keep = range(col.n_rows)
+    for key, valores in filtros_n.items():
+        permitidos = set(valores)
+        columna = col.dims.get(key) or [None] * col.n_rows
+        keep = [i for i in keep if ("" if columna[i] is None else str(columna[i])) in permitidos]
+    return col.filas(keep)
+
+
+def _filtrar_marco(marco: pd.DataFrame, filtros_n: Dict[str, Tuple[str, ...]]) -> pd.DataFrame:
+    """`filtrar_columnas` sobre el frame cacheado (filtros ya normalizados):
+    recorre solo las columnas de las dimensiones filtradas y copia solo las
+    filas que calzan."""
+    keep = pd.Series(True, index=marco.index)
+    for key, valores in filtros_n.items():
+        permitidos = set(valores)
+        columna = f"d:{key}"
+        if columna not in marco.columns:
+            keep &= "" in permitidos
+            continue
+        keep &= marco[columna].map(lambda v: ("" if v is None else str(v)) in permitidos).astype(bool)
+    return marco[keep]
+
+
+def separar_filtros(
+    filtros: Optional[Mapping[str, Any]],
+    dims_map: Dict[int, str],
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Filtros por NOMBRE de columna → (por id de dimensión, resto).
+
+    Los loaders que filtran por nombre humano (tablas, informes,
+    `LoadMetricToDF`) empujan a SQL los que son dimensiones de la métrica;
+    el resto (fields del value) se sigue filtrando en memoria.
+    """
+    id_por_nombre = {name: did for did, name in dims_map.items()}
+    por_dim: Dict[str, Any] = {}
+    resto: Dict[str, Any] = {}
+    for nombre, valor in (filtros or {}).items():
+        did = id_por_nombre.get(nombre)
+        if did is not None:
+            por_dim[str(did)] = valor
+        else:
+            resto[nombre] = valor
+    return por_dim, resto
+
+
+def marco_plano(
+    col: ColumnasMetrica,
+    metric: Metric,
+    dims_map: Dict[int, str],
+    *,
+    solo_dims_presentes: bool = False,
+) -> pd.DataFrame:
+    """Proyección "legible" de `LoadMetricToDF` y del export/distinct de /values.
+
+    Una columna por dimensión (por nombre) y, según el tipo de métrica, una
+    por field de los `value` objeto (+ `Valor_Raw` con el texto de las filas
+    que no lo son) o una `metric.name` con el value crudo.
+
+    - `solo_dims_presentes=False`: todas las dimensiones de `dims_map`,
+      aunque ninguna fila las traiga.
+    - `solo_dims_presentes=True`: solo las claves presentes en los datos;
+      las que no están en `dims_map` salen como `Dim_<id>` (criterio del
+      export).
+    """
+    if not col.n_rows:
+        return pd.DataFrame()
+    columnas: Dict[str, list] = {}
+    if solo_dims_presentes:
+        for dim_id in col.dims:
+            nombre = dims_map.get(int(dim_id)) if dim_id.isdigit() else None
+            columnas[nombre or f"Dim_{dim_id}"] = col.dim(dim_id)
+    else:
+        for dim_id, name in dims_map.items():
+            columnas[name] = col.dim(dim_id)
+
+    if metric.data_type == "object":
+        for k in col.fields:
+            columnas[k] = col.field(k)
+        if not all(col.objeto):
+            columnas["Valor_Raw"] = [
+                None if es_obj else str(v) for v, es_obj in zip(col.value, col.objeto)
+            ]
+    else:
+        columnas[metric.name] = list(col.value)
+    return pd.DataFrame(columnas)
+
+
+def columnas_por_campo(
+    col: ColumnasMetrica,
+    metric: Metric,
+    meta_fields: List[dict],
+    dims: List[tuple],
+    key_fn: Callable[[str], str],
+) -> Dict[str, list]:
+    """Proyección "por field key" que usan el motor de informes y el v1.
+
+    Reproduce, columna a columna, el record que armaban
+    `reports.data._records_for_metric` y `report_steps._build_records`:
+
+    - con `meta_fields`: una columna `key_fn(field)` por field; las filas
+      cuyo value no es objeto llevan el JSON escalar en el primer field, o
+      el texto crudo en `key_fn(metric.name)` si no es JSON válido.
+    - sin `meta_fields`: `key_fn(metric.name)` con el value como float
+      (o el texto crudo si no es numérico).
+    - después, una columna `key_fn(dim.name)` por cada `(id_dimension, name)`
+      de `dims`.
+    """
+    out: Dict[str, list] = {}
+    n = col.n_rows
+    if meta_fields:
+        for f in meta_fields:
+            out[key_fn(f["name"])] = col.field(f["name"])
+        first_key = key_fn(meta_fields[0]["name"])
+        raw_key = key_fn(metric.name)
+        for i in range(n):
+            if col.objeto[i]:
+                continue
+            raw = col.value[i]
+            try:
+                parsed = json.loads(raw) if isinstance(raw, str) else raw
+            except Exception:
+                out.setdefault(raw_key, [None] * n)[i] = raw
+                continue
+            out[first_key][i] = parsed
+    else:
+        out[key_fn(metric.name)] = [_float_o_crudo(v) for v in col.value]
+
+    for did, name in dims:
+        out[key_fn(name)] = col.dim(did)
+    return out
+
+
+def _float_o_crudo(v: Any):
+    """`float(v)`; el valor tal cual si no es numérico (None queda None)."""
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        return v
+
+
+def registros(columnas: Dict[str, list], n_rows: int, extra: Optional[dict] = None) -> List[dict]:
+    """dict de columnas → lista de records (una pasada con `zip`)."""
+    keys = list(columnas.keys())
+    if not keys:
+        base = [{} for _ in range(n_rows)]
+    else:
+        base = [dict(zip(keys, vals)) for vals in zip(*columnas.values())]
+    if extra:
+        for rec in base:
+            rec.update(extra)
+    return base
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Invalidación en el mismo flush que escribe MetricData
+# ─────────────────────────────────────────────────────────────────────────
+#
+# Además, `session.info[_ESCRIBIO_KEY]` marca que la transacción de la
+# sesión ya escribió (flush o DML con `session.execute`, como el escritor
+# masivo o data_ops): `_persistir` escribe entonces dentro de ella y
+# `version_de_datos` no la usa como clave del cache. Las escrituras de la
+# copia misma (`_persistir` en un savepoint) no cuentan: no cambian datos.
+
+_ESCRIBIO_KEY = "metric_store_escribio"
+
+
+@event.listens_for(Session, "after_flush")
+def _descartar_copias_en_flush(session, flush_context):
+    session.info[_ESCRIBIO_KEY] = True
+    metric_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, MetricData) and obj.id_metric is not None:
+            metric_ids.add(obj.id_metric)
+        elif isinstance(obj, Metric) and obj in session.deleted:
+            metric_ids.add(obj.id_metric)
+    if metric_ids:
+        session.connection().execute(
+            delete(MetricDataColumns).where(MetricDataColumns.id_metric.in_(metric_ids))
+        )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _marcar_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement, "table", None)
+        if getattr(tabla, "name", None) != MetricDataColumns.__tablename__:
+            orm_execute_state.session.info[_ESCRIBIO_KEY] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _olvidar_escritura(session, transaction):
+    # Solo al cerrar la transacción raíz: un savepoint que termina no
+    # libera los locks de la transacción que lo contiene.
+    if transaction.parent is None:
+        session.info.pop(_ESCRIBIO_KEY, None)
@@ -7,10 +7,11 @@ Las tablas de auth (organizations, users) son la base del sistema.
 
 from datetime import datetime
 from sqlalchemy import (
-    Boolean, Column, DateTime, Float, ForeignKey,
-    Integer, String, Text, UniqueConstraint
+    DDL, Boolean, Column, DateTime, Float, ForeignKey, Index,
+    Integer, LargeBinary, String, Text, UniqueConstraint, event, text
 )
 from sqlalchemy.orm import relationship
+from backend import metric_data_ddl
 from backend.database import Base
 
 
@@ -156,6 +157,9 @@ class Metric(Base):
     unit         = Column(String(50), default="")
     updated_at   = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     org_id       = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    # Lo suben triggers de la DB en cada escritura de metric_data (ver
+    # `backend/metric_data_ddl.py`); nadie lo escribe desde Python.
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     organization    = relationship("Organization", back_populates="metrics")
     dimension_links = relationship("MetricDimension", back_populates="metric", cascade="all, delete-orphan")
@@ -201,6 +205,108 @@ class MetricData(Base):
     metric       = relationship("Metric", back_populates="data_points")
     created_by   = relationship("User", foreign_keys=[created_by_user_id])
 
+    # GIN sobre dimensions_json::jsonb para los filtros por dimensión
+    # (`metric_store.filtro_dimensiones_sql` compila a `@>`). Solo PostgreSQL.
+    # Los dos trigram (pg_trgm) indexan las expresiones exactas que filtra
+    # la búsqueda libre (`metric_store.busqueda_texto_sql`): un
+    # `LIKE '%q%'` de 3+ caracteres deja de recorrer la tabla.
+    __table_args__ = (
+        Index(
+            "ix_metric_data_dims_gin",
+            text("(dimensions_json::jsonb) jsonb_path_ops"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+        *(
+            Index(
+                nombre, text(f"({expresion}) gin_trgm_ops"), postgresql_using="gin",
+            ).ddl_if(dialect="postgresql")
+            for nombre, expresion in metric_data_ddl.TRGM_INDICES_PG.items()
+        ),
+    )
+
+
+# Búsqueda libre en SQLite: tabla FTS5 con tokenizer trigram que los
+# triggers mantienen en cada escritura (SQL en `backend/metric_data_ddl.py`,
+# compartido con la migración c0d1e2f3a4b5). Sin trigram no se crea y la
+# búsqueda cae al LIKE.
+def _sqlite_con_fts_trigram(ddl, target, bind, **kw) -> bool:
+    """`execute_if`: el SQLite de la conexión trae FTS5 con tokenizer trigram."""
+    return metric_data_ddl.sqlite_con_fts_trigram(bind)
+
+
+event.listen(
+    MetricData.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+for _sentencia in metric_data_ddl.FTS_SQLITE_DDL:
+    event.listen(
+        MetricData.__table__, "after_create",
+        DDL(_sentencia).execute_if(dialect="sqlite", callable_=_sqlite_con_fts_trigram),
+    )
+event.listen(
+    MetricData.__table__, "after_drop",
+    DDL("DROP TABLE IF EXISTS metric_data_fts").execute_if(dialect="sqlite"),
+)
+# `metrics.data_version` (migración e2f3a4b5c6d7).
+for _sentencia in metric_data_ddl.DATA_VERSION_PG_DDL:
+    event.listen(MetricData.__table__, "after_create", DDL(_sentencia).execute_if(dialect="postgresql"))
+for _sentencia in metric_data_ddl.DATA_VERSION_SQLITE_DDL:
+    event.listen(MetricData.__table__, "after_create", DDL(_sentencia).execute_if(dialect="sqlite"))
+
+
+class MetricDataColumns(Base):
+    """Copia columnar materializada de `metric_data`, una fila por métrica.
+
+    `payload` es un JSON comprimido (zlib) con una lista por dimensión y una
+    por field de `value`; `data_version` es el `Metric.data_version` con el
+    que se armó: si ya no coincide, la copia quedó vieja. La mantiene `backend/metric_store.py` — nadie
+    más debería escribir esta tabla.
+    """
+    __tablename__ = "metric_data_columns"
+
+    id_metric   = Column(Integer, ForeignKey("metrics.id_metric", ondelete="CASCADE"), primary_key=True)
+    org_id      = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    n_rows      = Column(Integer, nullable=False, default=0)
+    max_id_data = Column(Integer, nullable=True)
+    data_version = Column(Integer, nullable=True)
+    payload     = Column(LargeBinary, nullable=False)
+    built_at    = Column(DateTime, default=datetime.utcnow)
+
+
+class MetricDimensionValueCount(Base):
+    """Cantidad de filas de `metric_data` por (métrica, dimensión, valor).
+
+    Índice de facetas: los dropdowns de filtros y los `distinct` por
+    dimensión leen de acá en vez de recorrer `metric_data`. Lo mantienen
+    triggers de la DB sobre `metric_data` (abajo), así que cubre toda vía
+    de escritura — ORM, INSERT/DELETE masivos, cascades — sin que nadie lo
+    toque desde Python. `value` es el texto del valor JSON; las claves con
+    null no se cuentan.
+    """
+    __tablename__ = "metric_dimension_value_counts"
+
+    id_metric = Column(Integer, ForeignKey("metrics.id_metric", ondelete="CASCADE"), primary_key=True)
+    dim_key   = Column(String(50), primary_key=True)   # clave de dimensions_json ("<id_dimension>")
+    value     = Column(Text, primary_key=True)
+    n_rows    = Column(Integer, nullable=False, default=0)
+
+
+# Triggers que mantienen `metric_dimension_value_counts` (SQL en
+# `backend/metric_data_ddl.py`, compartido con la migración d1e2f3a4b5c6).
+# Se crean, y se puebla la tabla con lo que ya haya en metric_data, junto
+# con la tabla; como leen metric_data, esta tiene que existir antes.
+MetricDimensionValueCount.__table__.add_is_dependent_on(MetricData.__table__)
+for _sentencia in metric_data_ddl.DIM_COUNTS_PG_DDL:
+    event.listen(
+        MetricDimensionValueCount.__table__, "after_create",
+        DDL(_sentencia).execute_if(dialect="postgresql"),
+    )
+for _sentencia in metric_data_ddl.DIM_COUNTS_SQLITE_DDL:
+    event.listen(
+        MetricDimensionValueCount.__table__, "after_create",
+        DDL(_sentencia).execute_if(dialect="sqlite"),
+    )
+
 
 # =============================================================================
 # INDICATORS
@@ -300,3 +406,94 @@ class IngestLog(Base):
 
     organization = relationship("Organization")
     api_key      = relationship("ApiKey")
+
+
+class ReportJob(Base):
+    """Generación de un informe en segundo plano (`backend/report_jobs.py`).
+
+    El request que lo pide responde de inmediato con el id; el informe se
+    arma en un worker del proceso y el cliente consulta el estado y
+    descarga el resultado (`backend/routers/report_jobs.py`). El binario
+    queda en `result` hasta que el job vence (`REPORT_JOB_TTL_HOURS`).
+    """
+    __tablename__ = "report_jobs"
+
+    id             = Column(Integer, primary_key=True, index=True)
+    org_id         = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    user_id        = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    kind           = Column(String(40), nullable=False)              # ver report_jobs.TIPOS_DE_JOB
+    params_json    = Column(Text, default="{}")                      # args del cuerpo del job
+    status         = Column(String(20), nullable=False, default="queued", index=True)  # queued|running|done|failed
+    progress_done  = Column(Integer, default=0)                      # secciones renderizadas
+    progress_total = Column(Integer, default=0)
+    error          = Column(Text, nullable=True)                     # mensaje para el usuario
+    error_status   = Column(Integer, nullable=True)                  # HTTP status equivalente (400, 422, 500…)
+    result         = Column(LargeBinary, nullable=True)
+    result_filename = Column(String(255), nullable=True)
+    result_mime    = Column(String(120), nullable=True)
+    created_at     = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at     = Column(DateTime, nullable=True)
+    updated_at     = Column(DateTime, nullable=True)                 # último latido (thread de latido y progreso)
+    finished_at    = Column(DateTime, nullable=True)
+
+    organization = relationship("Organization")
+
+
+class PipelineRun(Base):
+    """Corrida interactiva de un pipeline (`backend/pipeline_runs.py`).
+
+    Reemplaza al dict en memoria `ACTIVE_RUNNERS`: el avance (paso actual,
+    estado, input pendiente) vive acá y los artifacts/contexto en un
+    checkpoint en disco, así cualquier worker de la API puede continuar la
+    corrida en el siguiente `/step` o `/input`. La sesión activa de un
+    usuario en un pipeline es su última fila sin `closed_at`.
+    """
+    __tablename__ = "pipeline_runs"
+
+    id                 = Column(Integer, primary_key=True, index=True)
+    org_id             = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    user_id            = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    pipeline_id        = Column(Integer, ForeignKey("pipelines.pipeline_id", ondelete="CASCADE"), nullable=False, index=True)
+    config_json        = Column(Text, nullable=False)                   # snapshot del pipeline al crear la corrida
+    status             = Column(String(20), nullable=False, default="IDLE")  # IDLE|RUNNING|WAITING_INPUT|COMPLETED|FAILED
+    current_step_index = Column(Integer, nullable=False, default=0)
+    total_steps        = Column(Integer, nullable=False, default=0)
+    pending_input_json = Column(Text, nullable=True)                    # resultado waiting_input (input_details…)
+    checkpoint_json    = Column(Text, nullable=True)                    # manifiesto de artifacts + contexto
+    error              = Column(Text, nullable=True)
+    version            = Column(Integer, nullable=False, default=0)      # sube en cada ejecución reclamada
+    created_at         = Column(DateTime, default=datetime.utcnow)
+    updated_at         = Column(DateTime, default=datetime.utcnow, index=True)
+    closed_at          = Column(DateTime, nullable=True)                # reset, fallo, vencida o reemplazada
+
+    __table_args__ = (
+        Index("ix_pipeline_runs_sesion", "user_id", "pipeline_id", "closed_at"),
+    )
+
+
+class PipelineStepMetric(Base):
+    """Costo de un paso ejecutado (`backend/pipeline_telemetry.py`).
+
+    Una fila por `Step.run`: tiempos, pico de memoria y tamaño de lo que
+    leyó y produjo. `run_id` es None para corridas sin sesión (trigger de
+    ingesta). Se agrega por `step_class` en /api/pipelines/telemetry/steps.
+    """
+    __tablename__ = "pipeline_step_metrics"
+
+    id                = Column(Integer, primary_key=True, index=True)
+    org_id            = Column(Integer, ForeignKey("organizations.id"), nullable=False, index=True)
+    pipeline_id       = Column(Integer, ForeignKey("pipelines.pipeline_id", ondelete="CASCADE"), nullable=False, index=True)
+    run_id            = Column(Integer, ForeignKey("pipeline_runs.id", ondelete="SET NULL"), nullable=True, index=True)
+    step_index        = Column(Integer, nullable=False)
+    step_class        = Column(String(100), nullable=False, index=True)
+    step_name         = Column(String(200), nullable=True)
+    status            = Column(String(20), nullable=False)               # success|waiting_input|failed
+    wall_ms           = Column(Float, nullable=False)
+    cpu_ms            = Column(Float, nullable=False)
+    rss_peak_delta_kb = Column(Integer, nullable=True)                   # None sin módulo `resource`
+    rows_in           = Column(Integer, nullable=True)
+    rows_out          = Column(Integer, nullable=True)
+    bytes_in          = Column(Integer, nullable=True)
+    bytes_out         = Column(Integer, nullable=True)
+    detail_json       = Column(Text, nullable=True)                      # {artifacts_in, artifacts_out}
+    created_at        = Column(DateTime, default=datetime.utcnow, index=True)
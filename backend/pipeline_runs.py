@@ -0,0 +1,503 @@
+"""
+pipeline_runs.py — Estado de las corridas interactivas de pipelines, en la DB.
+
+`routers/pipelines.py` guardaba cada `PipelineRunner` en curso en un dict
+del proceso (`ACTIVE_RUNNERS`), lo que obligaba a correr la API con
+`--workers 1`: un `/input` que caía en otro worker no encontraba la
+corrida. Acá el estado vive en `pipeline_runs` y en un checkpoint en disco:
+
+  - La fila guarda el snapshot de la config, el paso actual, el estado del
+    runner, el input pendiente (`WaitingForInputException.input_details`)
+    y el manifiesto del checkpoint.
+  - El checkpoint (`PIPELINE_CHECKPOINT_DIR/<run_id>/`) tiene un archivo
+    por artifact, con nombre por huella de contenido: los DataFrames
+    "planos" en Parquet, el resto en pickle (y todo en pickle si no hay
+    motor de Parquet instalado: pyarrow/fastparquet son opcionales, como
+    en `artifact_export`). Un artifact que no cambió
+    entre pasos no se reescribe. El resto del `RunContext` (inputs,
+    params, user_inputs…) va en un pickle aparte.
+  - Después de cada paso exitoso se guarda un checkpoint
+    (`PipelineRunner.on_step_completed`): `pasos[k]` en el manifiesto es
+    el estado después del paso k. Una corrida que falló queda abierta
+    (FAILED) y `/run?resume=true` la retoma con `reanudar`: salta los
+    pasos cuya config y entrada no cambiaron (`huellas_de_pasos`).
+  - Cada ejecución (`/run`, `/step`, `/input`) reclama la corrida con un
+    UPDATE condicional sobre `version`: dos workers nunca avanzan la misma
+    corrida a la vez. Una corrida en RUNNING sin actividad por más de
+    `PIPELINE_RUN_STALE_SECONDS` se puede volver a reclamar (worker caído).
+  - Cada worker mantiene además el último runner que ejecutó por corrida:
+    si la versión en la DB no cambió, el siguiente request lo reusa sin
+    leer el checkpoint.
+
+El disco del checkpoint debe ser compartido por los workers (mismo host o
+volumen común). Una corrida sin actividad por más de
+`PIPELINE_RUN_TTL_SECONDS` se cierra y su checkpoint se borra.
+
+Uso (ver `routers/pipelines.py`):
+
+    run = pipeline_runs.sesion_activa(db, org_id=..., user_id=..., pipeline_id=...)
+    runner = pipeline_runs.reclamar(db, run)      # None si otro worker la tiene
+    resultados = runner.run_all()
+    pipeline_runs.guardar(db, run, runner, resultados[-1])
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from backend.config import PIPELINE_RUNS_DIR
+from backend.logging_config import get_logger
+from backend.models import PipelineRun
+from backend.pipeline_telemetry import registrar
+from backend.rgenerator.tooling.pipeline_tools import PipelineRunner
+
+logger = get_logger(__name__)
+
+PIPELINE_RUN_TTL_SECONDS = int(os.getenv("PIPELINE_RUN_TTL_SECONDS", str(30 * 60)))
+PIPELINE_RUN_STALE_SECONDS = int(os.getenv("PIPELINE_RUN_STALE_SECONDS", "900"))
+PIPELINE_CHECKPOINT_DIR = Path(os.getenv("PIPELINE_CHECKPOINT_DIR", str(PIPELINE_RUNS_DIR / "checkpoints")))
+
+TERMINALES = ("COMPLETED", "FAILED")
+
+# Atributos del RunContext que no van al checkpoint: la sesión DB se
+# inyecta en cada request y los artifacts van en archivos propios.
+_FUERA_DEL_CONTEXTO = ("db", "artifacts")
+
+# run_id → (version, runner) del último runner ejecutado en este worker.
+_runners_locales: Dict[int, Tuple[int, PipelineRunner]] = {}
+_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Checkpoint en disco
+# ─────────────────────────────────────────────────────────────────────────
+
+def _dir_checkpoint(run_id: int) -> Path:
+    return PIPELINE_CHECKPOINT_DIR / str(run_id)
+
+
+def _hay_motor_parquet() -> bool:
+    """True si pandas tiene con qué leer/escribir Parquet (pyarrow o
+    fastparquet). Ninguno está en requirements.txt."""
+    for modulo in ("pyarrow", "fastparquet"):
+        try:
+            importlib.import_module(modulo)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def _parquet_fiel(df: pd.DataFrame) -> bool:
+    """True si `df` vuelve idéntico (valores y dtypes) desde Parquet.
+
+    Columnas con nombre de texto únicas, índice por defecto y, en las
+    `object`, solo texto: un `object` con números o mezclas volvería con
+    otro dtype y los steps siguientes verían datos distintos.
+    """
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        return False
+    if not all(isinstance(c, str) for c in df.columns) or df.columns.has_duplicates:
+        return False
+    for col in df.columns:
+        serie = df[col]
+        if serie.dtype == object:
+            if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "empty"):
+                return False
+        elif not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie)):
+            return False
+    return True
+
+
+def huella_artefacto(valor: Any) -> Tuple[str, str]:
+    """(huella de contenido, formato) de un artifact.
+
+    DataFrames: hash por filas de pandas + columnas y dtypes; el resto (o
+    un DataFrame con celdas no hasheables), sha1 del pickle.
+    """
+    if isinstance(valor, pd.DataFrame):
+        formato = "parquet" if _parquet_fiel(valor) and _hay_motor_parquet() else "pickle"
+        try:
+            h = hashlib.sha1(pd.util.hash_pandas_object(valor, index=True).values.tobytes())
+            h.update(repr((list(valor.columns), [str(t) for t in valor.dtypes])).encode("utf-8"))
+            return h.hexdigest(), formato
+        except TypeError:
+            pass
+    else:
+        formato = "pickle"
+    return hashlib.sha1(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest(), formato
+
+
+def _escribir_atomico(destino: Path, escribir) -> None:
+    tmp = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        escribir(tmp)
+        os.replace(tmp, destino)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def escribir_artefacto(directorio: Path, valor: Any, huella: str, formato: str) -> str:
+    """Escribe `valor` en `directorio` (si no existe ya) y devuelve el nombre del archivo."""
+    nombre = f"{huella}.{'parquet' if formato == 'parquet' else 'pkl'}"
+    destino = directorio / nombre
+    if destino.exists():
+        return nombre
+    if formato == "parquet":
+        _escribir_atomico(destino, lambda p: valor.to_parquet(p, index=False))
+    else:
+        def _pickle(p: Path) -> None:
+            with open(p, "wb") as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        _escribir_atomico(destino, _pickle)
+    return nombre
+
+
+def leer_artefacto(directorio: Path, entrada: Dict[str, str]) -> Any:
+    ruta = directorio / entrada["archivo"]
+    if entrada["formato"] == "parquet":
+        return pd.read_parquet(ruta)
+    with open(ruta, "rb") as f:
+        return pickle.load(f)
+
+
+def _guardar_estado(directorio: Path, runner: PipelineRunner) -> Dict[str, Any]:
+    """Artifacts + contexto del runner al disco: {"artefactos", "contexto"}."""
+    artefactos: Dict[str, Dict[str, str]] = {}
+    for clave, valor in runner.ctx.artifacts.items():
+        huella, formato = huella_artefacto(valor)
+        archivo = escribir_artefacto(directorio, valor, huella, formato)
+        artefactos[clave] = {"archivo": archivo, "formato": formato, "huella": huella}
+
+    estado = {k: v for k, v in vars(runner.ctx).items() if k not in _FUERA_DEL_CONTEXTO}
+    contenido = pickle.dumps(estado, protocol=pickle.HIGHEST_PROTOCOL)
+    contexto = f"contexto-{hashlib.sha1(contenido).hexdigest()}.pkl"
+    if not (directorio / contexto).exists():
+        _escribir_atomico(directorio / contexto, lambda p: p.write_bytes(contenido))
+    return {"artefactos": artefactos, "contexto": contexto}
+
+
+def _archivos(estado: Dict[str, Any]) -> set:
+    return {e["archivo"] for e in estado["artefactos"].values()} | {estado["contexto"]}
+
+
+def _guardar_checkpoint(run: PipelineRun, runner: PipelineRunner, *, paso: bool = False) -> Dict[str, Any]:
+    """Estado actual del runner al disco; devuelve el manifiesto.
+
+    `pasos[k]` es el estado después del paso k (lo que permite reanudar).
+    Con `paso=True` el estado actual se registra como el del último paso
+    completado.
+    """
+    directorio = _dir_checkpoint(run.id)
+    directorio.mkdir(parents=True, exist_ok=True)
+    previo = json.loads(run.checkpoint_json) if run.checkpoint_json else {}
+
+    actual = _guardar_estado(directorio, runner)
+    completados = runner.current_step_index
+    pasos = previo.get("pasos", [])[:completados - 1 if paso else completados]
+    if paso:
+        pasos.append(actual)
+
+    vigentes = _archivos(actual).union(*(_archivos(p) for p in pasos))
+    for archivo in directorio.iterdir():
+        if archivo.name not in vigentes and not archivo.name.startswith("."):
+            archivo.unlink(missing_ok=True)
+    return {**actual, "pasos": pasos}
+
+
+def _checkpoint_de_paso(run_id: int, runner: PipelineRunner) -> None:
+    """`PipelineRunner.on_step_completed`: checkpoint después de cada paso.
+
+    Además renueva `updated_at`: una corrida larga que avanza no se ve
+    como colgada.
+    """
+    db = runner.ctx.db
+    run = db.get(PipelineRun, run_id)
+    run.checkpoint_json = json.dumps(_guardar_checkpoint(run, runner, paso=True))
+    run.current_step_index = runner.current_step_index
+    run.updated_at = datetime.utcnow()
+    registrar(db, runner, org_id=run.org_id, pipeline_id=run.pipeline_id, run_id=run.id)
+    db.commit()
+
+
+def huellas_de_pasos(config: dict) -> List[str]:
+    """Huella encadenada de cada paso: la del anterior + clase + params.
+
+    Dos configs comparten la huella del paso k solo si el contexto inicial
+    y los pasos 0..k son iguales, es decir, si el paso k recibe la misma
+    entrada y corre con la misma config.
+    """
+    def _canonico(valor) -> bytes:
+        return json.dumps(valor, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+
+    previa = hashlib.sha1(_canonico(config.get("context", {}))).hexdigest()
+    huellas = []
+    for paso in config.get("pipeline", []) or []:
+        previa = hashlib.sha1(
+            previa.encode("ascii") + _canonico([paso.get("step"), paso.get("params", {})])
+        ).hexdigest()
+        huellas.append(previa)
+    return huellas
+
+
+def _restaurar(run: PipelineRun, db: Session) -> PipelineRunner:
+    """Runner de `run` reconstruido desde la config y el checkpoint."""
+    runner = PipelineRunner(
+        json.loads(run.config_json), pipeline_id=run.pipeline_id,
+        db=db, org_id=run.org_id, user_id=run.user_id,
+    )
+    runner.current_step_index = run.current_step_index
+    runner.status = run.status
+    runner.on_step_completed = partial(_checkpoint_de_paso, run.id)
+    manifiesto = json.loads(run.checkpoint_json) if run.checkpoint_json else None
+    if manifiesto:
+        directorio = _dir_checkpoint(run.id)
+        with open(directorio / manifiesto["contexto"], "rb") as f:
+            for clave, valor in pickle.load(f).items():
+                setattr(runner.ctx, clave, valor)
+        runner.ctx.artifacts = {
+            clave: leer_artefacto(directorio, entrada)
+            for clave, entrada in manifiesto["artefactos"].items()
+        }
+    runner.refresh_db(db)
+    return runner
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Sesiones
+# ─────────────────────────────────────────────────────────────────────────
+
+def _olvidar(run_id: int) -> None:
+    with _lock:
+        _runners_locales.pop(run_id, None)
+
+
+def cerrar(db: Session, run: PipelineRun, *, error: Optional[str] = None) -> None:
+    """Cierra la sesión de `run` (la fila queda como historial) y borra su checkpoint.
+
+    Con `error`, la corrida queda registrada como FAILED.
+    """
+    if error is not None:
+        run.status = "FAILED"
+        run.error = error
+    if run.closed_at is None or error is not None:
+        run.closed_at = run.closed_at or datetime.utcnow()
+        db.commit()
+    _olvidar(run.id)
+    shutil.rmtree(_dir_checkpoint(run.id), ignore_errors=True)
+
+
+def cerrar_vencidas(db: Session) -> int:
+    """Cierra las corridas sin actividad por más de `PIPELINE_RUN_TTL_SECONDS`."""
+    limite = datetime.utcnow() - timedelta(seconds=PIPELINE_RUN_TTL_SECONDS)
+    vencidas = db.query(PipelineRun).filter(
+        PipelineRun.closed_at.is_(None),
+        PipelineRun.updated_at < limite,
+    ).all()
+    for run in vencidas:
+        cerrar(db, run)
+    return len(vencidas)
+
+
+def sesion_activa(
+    db: Session,
+    *,
+    org_id: int,
+    user_id: int,
+    pipeline_id: int,
+) -> Optional[PipelineRun]:
+    """Corrida abierta del usuario en el pipeline (la más reciente), o None."""
+    return (
+        db.query(PipelineRun)
+        .filter(
+            PipelineRun.org_id == org_id,
+            PipelineRun.user_id == user_id,
+            PipelineRun.pipeline_id == pipeline_id,
+            PipelineRun.closed_at.is_(None),
+        )
+        .order_by(PipelineRun.id.desc())
+        .first()
+    )
+
+
+def crear(
+    db: Session,
+    *,
+    org_id: int,
+    user_id: int,
+    pipeline_id: int,
+    config: dict,
+) -> PipelineRun:
+    """Nueva corrida (cierra la abierta anterior del mismo usuario y pipeline)."""
+    previa = sesion_activa(db, org_id=org_id, user_id=user_id, pipeline_id=pipeline_id)
+    if previa is not None:
+        cerrar(db, previa)
+    run = PipelineRun(
+        org_id=org_id, user_id=user_id, pipeline_id=pipeline_id,
+        config_json=json.dumps(config, ensure_ascii=False),
+        status="IDLE", current_step_index=0,
+        total_steps=len(config.get("pipeline", []) or []),
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def _legible(estado: Dict[str, Any]) -> bool:
+    """False si el estado tiene artifacts en Parquet y este worker no
+    tiene motor para leerlos (checkpoint escrito en otro entorno)."""
+    return _hay_motor_parquet() or all(
+        e["formato"] != "parquet" for e in estado["artefactos"].values()
+    )
+
+
+def _enlazar(origen: Path, destino: Path) -> None:
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+def reanudar(db: Session, previa: PipelineRun, *, config: dict) -> PipelineRun:
+    """Nueva corrida con `config` que retoma el checkpoint de `previa`.
+
+    Se saltan los primeros pasos cuya huella (`huellas_de_pasos`) no
+    cambió, que no tienen entradas nuevas (`Step.has_new_inputs`) y cuyo
+    checkpoint este worker puede leer (`_legible`): la
+    corrida nueva arranca con el estado guardado después del último de
+    ellos, en `current_step_index`. Típico: falla `SaveToMetric`, se
+    corrige su config y se vuelve a correr sin re-subir ni re-parsear los
+    Excel. `previa` queda cerrada.
+    """
+    manifiesto = json.loads(previa.checkpoint_json) if previa.checkpoint_json else {}
+    pasos = manifiesto.get("pasos", [])
+    viejas = huellas_de_pasos(json.loads(previa.config_json))
+    nuevas = huellas_de_pasos(config)
+    n = 0
+    while n < min(len(pasos), len(viejas), len(nuevas)) and viejas[n] == nuevas[n] and _legible(pasos[n]):
+        n += 1
+    if n:
+        runner = PipelineRunner(config, pipeline_id=previa.pipeline_id, org_id=previa.org_id)
+        n = next((k for k in range(n) if runner.pipeline[k].has_new_inputs(runner.ctx)), n)
+
+    run = PipelineRun(
+        org_id=previa.org_id, user_id=previa.user_id, pipeline_id=previa.pipeline_id,
+        config_json=json.dumps(config, ensure_ascii=False),
+        status="IDLE", current_step_index=n,
+        total_steps=len(nuevas),
+    )
+    db.add(run)
+    db.flush()
+    if n:
+        origen, destino = _dir_checkpoint(previa.id), _dir_checkpoint(run.id)
+        destino.mkdir(parents=True, exist_ok=True)
+        for archivo in set().union(*(_archivos(p) for p in pasos[:n])):
+            _enlazar(origen / archivo, destino / archivo)
+        run.checkpoint_json = json.dumps({**pasos[n - 1], "pasos": pasos[:n]})
+    db.commit()
+    cerrar(db, previa)
+    db.refresh(run)
+    logger.info(
+        "Pipeline %s: corrida %s reanuda la %s desde el paso %s/%s",
+        run.pipeline_id, run.id, previa.id, n + 1, run.total_steps,
+    )
+    return run
+
+
+def runner_de(db: Session, run: PipelineRun, version: Optional[int] = None) -> PipelineRunner:
+    """Runner de `run` para lectura (artifacts), sin reclamarla.
+
+    Reusa el runner local de este worker si su versión es `version` (por
+    defecto, la de la fila).
+    """
+    with _lock:
+        local = _runners_locales.get(run.id)
+    if local is not None and local[0] == (run.version if version is None else version):
+        local[1].refresh_db(db)
+        return local[1]
+    return _restaurar(run, db)
+
+
+def reclamar(db: Session, run: PipelineRun) -> Optional[PipelineRunner]:
+    """Toma `run` para ejecutar pasos; None si otro request la está ejecutando."""
+    version = run.version
+    stale = datetime.utcnow() - timedelta(seconds=PIPELINE_RUN_STALE_SECONDS)
+    tomada = db.execute(
+        update(PipelineRun)
+        .where(
+            PipelineRun.id == run.id,
+            PipelineRun.version == version,
+            (PipelineRun.status != "RUNNING") | (PipelineRun.updated_at < stale),
+        )
+        .values(status="RUNNING", version=version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    if not tomada:
+        return None
+    db.refresh(run)
+    return runner_de(db, run, version)
+
+
+def guardar(
+    db: Session,
+    run: PipelineRun,
+    runner: PipelineRunner,
+    resultado: Optional[Dict[str, Any]] = None,
+    *,
+    error: Optional[str] = None,
+) -> None:
+    """Persiste el avance de `runner` en `run` después de ejecutar pasos.
+
+    `resultado` es el último dict de `step()`: si es `waiting_input` queda
+    como input pendiente. Con `error` la corrida queda FAILED.
+    """
+    manifiesto = _guardar_checkpoint(run, runner)
+    run.status = "FAILED" if error else runner.status
+    run.current_step_index = runner.current_step_index
+    run.pending_input_json = (
+        json.dumps(resultado, default=str, ensure_ascii=False)
+        if resultado and resultado.get("status") == "waiting_input" else None
+    )
+    run.checkpoint_json = json.dumps(manifiesto)
+    run.error = error
+    run.updated_at = datetime.utcnow()
+    registrar(db, runner, org_id=run.org_id, pipeline_id=run.pipeline_id, run_id=run.id)
+    db.commit()
+    with _lock:
+        _runners_locales[run.id] = (run.version, runner)
+
+
+def tocar(db: Session, run: PipelineRun) -> None:
+    """Registra actividad de lectura (descarga/preview) para el TTL."""
+    run.updated_at = datetime.utcnow()
+    db.commit()
+
+
+def estado(run: PipelineRun) -> Dict[str, Any]:
+    return {
+        "run_id": run.id,
+        "pipeline_id": run.pipeline_id,
+        "status": run.status,
+        "current_step_index": run.current_step_index,
+        "total_steps": run.total_steps,
+        "pending_input": json.loads(run.pending_input_json) if run.pending_input_json else None,
+        "artifacts": list(json.loads(run.checkpoint_json)["artefactos"]) if run.checkpoint_json else [],
+        "checkpointed_steps": len(json.loads(run.checkpoint_json).get("pasos", [])) if run.checkpoint_json else 0,
+        "error": run.error,
+        "updated_at": run.updated_at.isoformat() if run.updated_at else None,
+    }
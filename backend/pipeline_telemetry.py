@@ -0,0 +1,130 @@
+"""
+pipeline_telemetry.py — Persistencia y agregación de la telemetría por paso.
+
+`PipelineRunner` mide cada `Step.run` (`rgenerator/tooling/telemetry_tools.py`)
+y acumula las métricas en `runner.telemetry`. `registrar` las pasa a
+`pipeline_step_metrics` (una fila por paso ejecutado) y vacía la lista; lo
+llaman el checkpoint por paso y `guardar` de `backend/pipeline_runs.py`, y
+el trigger de ingesta para las corridas sin sesión.
+
+`resumen_por_clase` agrega esas filas por clase de paso para
+GET /api/pipelines/telemetry/steps: cuántas veces corrió, tiempos
+(promedio, p50, p95, máximo), memoria y volumen de datos.
+"""
+from __future__ import annotations
+
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.models import PipelineStepMetric
+
+_COLUMNAS = (
+    "step_index", "step_class", "step_name", "status", "wall_ms", "cpu_ms",
+    "rss_peak_delta_kb", "rows_in", "rows_out", "bytes_in", "bytes_out",
+)
+
+
+def registrar(
+    db: Session,
+    runner,
+    *,
+    org_id: int,
+    pipeline_id: int,
+    run_id: Optional[int] = None,
+) -> int:
+    """Agrega a la sesión una fila por cada entrada de `runner.telemetry` y
+    vacía la lista. No hace commit: va en la misma transacción que el
+    checkpoint o el log de la corrida. Devuelve cuántas filas agregó."""
+    entradas, runner.telemetry = list(runner.telemetry), []
+    for entrada in entradas:
+        db.add(PipelineStepMetric(
+            org_id=org_id,
+            pipeline_id=pipeline_id,
+            run_id=run_id,
+            detail_json=json.dumps(
+                {"artifacts_in": entrada.get("artifacts_in"), "artifacts_out": entrada.get("artifacts_out")},
+                default=str,
+            ),
+            **{c: entrada.get(c) for c in _COLUMNAS},
+        ))
+    return len(entradas)
+
+
+def _percentil(ordenados: List[float], p: float) -> Optional[float]:
+    """Percentil por interpolación lineal (como `numpy.percentile`)."""
+    if not ordenados:
+        return None
+    pos = (len(ordenados) - 1) * p
+    base = int(pos)
+    sig = min(base + 1, len(ordenados) - 1)
+    return ordenados[base] + (ordenados[sig] - ordenados[base]) * (pos - base)
+
+
+def _promedio(valores: List[float]) -> Optional[float]:
+    return sum(valores) / len(valores) if valores else None
+
+
+def _redondear(valor: Optional[float]) -> Optional[float]:
+    return None if valor is None else round(valor, 2)
+
+
+def resumen_por_clase(
+    db: Session,
+    org_id: int,
+    *,
+    pipeline_id: Optional[int] = None,
+    days: int = 30,
+) -> List[Dict[str, Any]]:
+    """Métricas agregadas por `step_class` de los últimos `days` días,
+    ordenadas por tiempo total (la clase que más pesa primero).
+
+    Los percentiles se calculan acá y no en SQL: SQLite no tiene
+    `percentile_cont` y el volumen (una fila por paso ejecutado) es chico.
+    """
+    q = db.query(
+        PipelineStepMetric.step_class, PipelineStepMetric.status,
+        PipelineStepMetric.wall_ms, PipelineStepMetric.cpu_ms,
+        PipelineStepMetric.rss_peak_delta_kb,
+        PipelineStepMetric.rows_in, PipelineStepMetric.rows_out,
+        PipelineStepMetric.bytes_in, PipelineStepMetric.bytes_out,
+    ).filter(
+        PipelineStepMetric.org_id == org_id,
+        PipelineStepMetric.created_at >= datetime.utcnow() - timedelta(days=days),
+    )
+    if pipeline_id is not None:
+        q = q.filter(PipelineStepMetric.pipeline_id == pipeline_id)
+
+    por_clase: Dict[str, List[Any]] = defaultdict(list)
+    for fila in q.all():
+        por_clase[fila.step_class].append(fila)
+
+    resumen = []
+    for clase, filas in por_clase.items():
+        wall = sorted(f.wall_ms for f in filas)
+
+        def _valores(campo: str) -> List[float]:
+            return [getattr(f, campo) for f in filas if getattr(f, campo) is not None]
+
+        rss = _valores("rss_peak_delta_kb")
+        resumen.append({
+            "step_class": clase,
+            "runs": len(filas),
+            "failed": sum(1 for f in filas if f.status == "failed"),
+            "wall_ms_total": _redondear(sum(wall)),
+            "wall_ms_avg": _redondear(_promedio(wall)),
+            "wall_ms_p50": _redondear(_percentil(wall, 0.5)),
+            "wall_ms_p95": _redondear(_percentil(wall, 0.95)),
+            "wall_ms_max": _redondear(wall[-1]),
+            "cpu_ms_avg": _redondear(_promedio(_valores("cpu_ms"))),
+            "rss_peak_delta_kb_max": max(rss) if rss else None,
+            "rows_in_avg": _redondear(_promedio(_valores("rows_in"))),
+            "rows_out_avg": _redondear(_promedio(_valores("rows_out"))),
+            "bytes_in_avg": _redondear(_promedio(_valores("bytes_in"))),
+            "bytes_out_avg": _redondear(_promedio(_valores("bytes_out"))),
+        })
+    resumen.sort(key=lambda r: r["wall_ms_total"], reverse=True)
+    return resumen
@@ -1,10 +1,10 @@
 """Limitador de intentos in-memory (ventana deslizante).
 
 Pensado para el login: bloquea fuerza bruta de credenciales sin agregar
-dependencias ni infraestructura. Vive en memoria del proceso — válido
-mientras la app corra con --workers 1 (misma restricción documentada de
-ACTIVE_RUNNERS). Si algún día hay múltiples workers, mover a Redis junto
-con los runners.
+dependencias ni infraestructura. Vive en memoria del proceso: con N
+workers (WEB_CONCURRENCY, ver scripts/start.sh) cada uno cuenta por su
+lado y el límite efectivo es hasta N veces `max_attempts`. Si eso deja de
+ser aceptable, mover el conteo a la DB o a Redis.
 
 Uso:
     limiter = SlidingWindowLimiter(max_attempts=5, window_seconds=900)
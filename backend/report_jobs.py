@@ -0,0 +1,336 @@
+"""
+report_jobs.py — Cola de informes en segundo plano, respaldada por la DB.
+
+Un PDF grande (DIA/SIMCE con 18 cursos) tarda decenas de segundos. Dentro
+del request eso retiene un worker de la API todo ese tiempo; con la cola
+el request solo inserta una fila en `report_jobs` y responde con su id.
+
+  - Un pool de threads del propio proceso (`REPORT_JOB_WORKERS`) ejecuta
+    los jobs; no hace falta broker externo. Las secciones de cada informe
+    ya se reparten entre procesos (`reports/runtime._ejecutar_secciones`).
+  - Estados: queued → running → done | failed. El paso a running es un
+    UPDATE condicional, así que un job nunca corre dos veces aunque lo
+    intenten dos workers (o dos procesos uvicorn al arrancar).
+  - Progreso por secciones renderizadas, vía `reports/progreso.py`.
+  - Mientras corre, un thread de latido sube `updated_at` cada
+    `REPORT_JOB_HEARTBEAT_SECONDS` aunque no haya progreso (una sección
+    puede tardar minutos): `recuperar_pendientes` solo da por perdido un
+    job cuyo proceso dejó de latir. Los estados finales se escriben solo
+    sobre un job que sigue en running, así un job ya dado por perdido no
+    vuelve a done.
+  - El binario queda en la fila hasta que vence (`REPORT_JOB_TTL_HOURS`).
+
+Los cuerpos de los jobs son las mismas funciones que usan los endpoints
+síncronos; se registran por nombre con `registrar_tipo` (ver
+`backend/routers/report_jobs.py`). Un cuerpo que levanta `HTTPException`
+deja el job en failed con ese detail y status.
+
+Uso:
+
+    from backend import report_jobs
+    job = report_jobs.encolar(db, org_id=..., user_id=..., kind="reports_v2",
+                              params={"tipo": "dia", ...})
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.logging_config import get_logger
+from backend.models import ReportJob
+from backend.rgenerator.reports.progreso import reportando
+
+logger = get_logger(__name__)
+
+# 0 = sin pool: el job corre en el mismo request (tests, scripts).
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "2"))
+REPORT_JOB_TTL_HOURS = float(os.getenv("REPORT_JOB_TTL_HOURS", "24"))
+# Un job en running sin latido por más de esto se da por perdido (proceso
+# reiniciado a mitad de la generación).
+REPORT_JOB_STALE_SECONDS = int(os.getenv("REPORT_JOB_STALE_SECONDS", "900"))
+# Cada cuánto late un job en running; muy por debajo de STALE.
+REPORT_JOB_HEARTBEAT_SECONDS = float(os.getenv("REPORT_JOB_HEARTBEAT_SECONDS", "30"))
+
+# Intervalo mínimo entre escrituras de progreso de un mismo job.
+_PROGRESO_CADA_SEGUNDOS = 1.0
+
+ESTADOS = ("queued", "running", "done", "failed")
+
+
+@dataclass
+class ResultadoJob:
+    """Lo que devuelve el cuerpo de un job."""
+    contenido: bytes
+    filename: str
+    mime: str
+
+
+# kind → fn(db, org_id, params) -> ResultadoJob
+CuerpoJob = Callable[[Session, int, Dict[str, Any]], ResultadoJob]
+TIPOS_DE_JOB: Dict[str, CuerpoJob] = {}
+
+
+def registrar_tipo(kind: str, cuerpo: CuerpoJob) -> None:
+    TIPOS_DE_JOB[kind] = cuerpo
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Encolado
+# ─────────────────────────────────────────────────────────────────────────
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=REPORT_JOB_WORKERS, thread_name_prefix="report-job",
+            )
+        return _pool
+
+
+def encolar(
+    db: Session,
+    *,
+    org_id: int,
+    user_id: Optional[int],
+    kind: str,
+    params: Dict[str, Any],
+) -> ReportJob:
+    """Crea el job (queued), lo confirma y lo entrega al pool.
+
+    Con `REPORT_JOB_WORKERS=0` lo ejecuta antes de volver, con la misma
+    sesión. Aprovecha para borrar los jobs vencidos.
+    """
+    if kind not in TIPOS_DE_JOB:
+        raise ValueError(f"Tipo de job desconocido: {kind}")
+    purgar_vencidos(db)
+    job = ReportJob(
+        org_id=org_id,
+        user_id=user_id,
+        kind=kind,
+        params_json=json.dumps(params, ensure_ascii=False, default=str),
+        status="queued",
+        progress_done=0,
+        progress_total=0,
+        created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    if REPORT_JOB_WORKERS <= 0:
+        ejecutar(db, job.id)
+        db.refresh(job)
+    else:
+        _obtener_pool().submit(_ejecutar_en_worker, job.id)
+    return job
+
+
+def _ejecutar_en_worker(job_id: int) -> None:
+    from backend.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        ejecutar(db, job_id)
+    except Exception:
+        logger.error("Worker de informes: job %s terminó con error no controlado", job_id, exc_info=True)
+    finally:
+        db.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Ejecución
+# ─────────────────────────────────────────────────────────────────────────
+
+def _actualizar(db: Session, job_id: int, **valores) -> None:
+    """UPDATE de la fila del job fuera de la transacción del cuerpo.
+
+    Mismo criterio que `metric_store._persistir`: transacción propia si la
+    sesión está ligada a un Engine (el cuerpo puede tener la suya abierta);
+    con una Connection (tests) se escribe en la misma sesión.
+    """
+    stmt = update(ReportJob).where(ReportJob.id == job_id).values(**valores)
+    bind = db.get_bind()
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            conn.execute(stmt)
+    else:
+        db.execute(stmt)
+        db.flush()
+
+
+@contextmanager
+def _latiendo(db: Session, job_id: int):
+    """Sube `updated_at` del job cada `REPORT_JOB_HEARTBEAT_SECONDS`
+    desde un thread propio, mientras dura el bloque.
+
+    El latido va en una conexión aparte del pool (la sesión del cuerpo no
+    se comparte entre threads); con una sesión ligada a una Connection
+    (tests) no hay latido. Un latido fallido se loguea y se reintenta en el
+    siguiente.
+    """
+    bind = db.get_bind()
+    if not isinstance(bind, Engine) or REPORT_JOB_HEARTBEAT_SECONDS <= 0:
+        yield
+        return
+    parar = threading.Event()
+
+    def _latir() -> None:
+        while not parar.wait(REPORT_JOB_HEARTBEAT_SECONDS):
+            try:
+                with bind.begin() as conn:
+                    conn.execute(
+                        update(ReportJob)
+                        .where(ReportJob.id == job_id, ReportJob.status == "running")
+                        .values(updated_at=datetime.utcnow())
+                    )
+            except SQLAlchemyError:
+                logger.warning("No se pudo registrar el latido del job %s", job_id, exc_info=True)
+
+    hilo = threading.Thread(target=_latir, name=f"report-job-latido-{job_id}", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def ejecutar(db: Session, job_id: int) -> None:
+    """Toma el job (si sigue queued) y corre su cuerpo hasta done/failed."""
+    ahora = datetime.utcnow()
+    tomado = db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id, ReportJob.status == "queued")
+        .values(status="running", started_at=ahora, updated_at=ahora)
+    ).rowcount
+    db.commit()
+    if not tomado:
+        return
+
+    job = db.get(ReportJob, job_id)
+    cuerpo = TIPOS_DE_JOB.get(job.kind)
+    org_id = job.org_id
+    try:
+        params = json.loads(job.params_json or "{}")
+    except ValueError:
+        params = None
+
+    ultimo = [0.0]
+
+    def _progreso(hechas: int, total: int) -> None:
+        ahora_m = time.monotonic()
+        if hechas < total and ahora_m - ultimo[0] < _PROGRESO_CADA_SEGUNDOS:
+            return
+        ultimo[0] = ahora_m
+        _actualizar(db, job_id, progress_done=hechas, progress_total=total,
+                    updated_at=datetime.utcnow())
+
+    try:
+        if cuerpo is None or params is None:
+            raise HTTPException(status_code=500, detail=f"Job '{job.kind}' no ejecutable")
+        with _latiendo(db, job_id), reportando(_progreso):
+            resultado = cuerpo(db, org_id, params)
+    except HTTPException as e:
+        db.rollback()
+        _terminar(db, job_id, status="failed", error=str(e.detail), error_status=e.status_code)
+        return
+    except Exception:
+        db.rollback()
+        logger.error("Job de informe %s (%s) falló", job_id, job.kind, exc_info=True)
+        _terminar(db, job_id, status="failed", error="Error generando el informe", error_status=500)
+        return
+
+    _terminar(
+        db, job_id, status="done",
+        result=resultado.contenido,
+        result_filename=resultado.filename,
+        result_mime=resultado.mime,
+    )
+
+
+def _terminar(db: Session, job_id: int, **valores) -> None:
+    """Estado final del job, solo si sigue en running: si
+    `recuperar_pendientes` ya lo dio por perdido, queda en failed."""
+    ahora = datetime.utcnow()
+    terminado = db.execute(
+        update(ReportJob).where(ReportJob.id == job_id, ReportJob.status == "running")
+        .values(finished_at=ahora, updated_at=ahora, **valores)
+    ).rowcount
+    db.commit()
+    if not terminado:
+        logger.warning("Job de informe %s ya no estaba en running; se descarta su resultado", job_id)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Mantenimiento
+# ─────────────────────────────────────────────────────────────────────────
+
+def purgar_vencidos(db: Session) -> int:
+    """Borra los jobs terminados hace más de `REPORT_JOB_TTL_HOURS`."""
+    limite = datetime.utcnow() - timedelta(hours=REPORT_JOB_TTL_HOURS)
+    return db.execute(
+        delete(ReportJob).where(
+            ReportJob.status.in_(("done", "failed")),
+            ReportJob.finished_at < limite,
+        )
+    ).rowcount
+
+
+def recuperar_pendientes(db: Session) -> None:
+    """Al arrancar el proceso: marca como fallidos los jobs running sin
+    latido (`_latiendo`) en `REPORT_JOB_STALE_SECONDS` —su proceso murió—
+    y re-entrega los queued al pool."""
+    limite = datetime.utcnow() - timedelta(seconds=REPORT_JOB_STALE_SECONDS)
+    perdidos = db.execute(
+        update(ReportJob)
+        .where(ReportJob.status == "running", ReportJob.updated_at < limite)
+        .values(
+            status="failed", error="La generación se interrumpió; vuelve a pedir el informe.",
+            error_status=500, finished_at=datetime.utcnow(),
+        )
+    ).rowcount
+    db.commit()
+    if perdidos:
+        logger.warning("%s job(s) de informe interrumpidos marcados como fallidos", perdidos)
+    if REPORT_JOB_WORKERS <= 0:
+        return
+    pendientes = [
+        job_id for (job_id,) in db.query(ReportJob.id).filter(ReportJob.status == "queued").all()
+    ]
+    for job_id in pendientes:
+        _obtener_pool().submit(_ejecutar_en_worker, job_id)
+
+
+def estado(job: ReportJob) -> Dict[str, Any]:
+    """Representación JSON del job para los endpoints de polling."""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": {"done": job.progress_done or 0, "total": job.progress_total or 0},
+        "error": job.error,
+        "error_status": job.error_status,
+        "filename": job.result_filename,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": f"/api/report-jobs/{job.id}/download" if job.status == "done" else None,
+    }
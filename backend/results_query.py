@@ -0,0 +1,184 @@
+"""
+results_query.py — Modo agregado de /api/results (grilla + facetas).
+
+`GET /api/results/indicator/{id}/data` devuelve cada fila de cada métrica
+del indicador y el navegador agrega para Plotly: payloads de decenas de MB
+y el cascading de facetas en loops anidados de Python. Con
+`POST /api/results/indicator/{id}/query` el cliente pide solo lo que va a
+pintar — dimensiones de agrupación, medidas con su agregación y una
+ventana de grupos — y el servidor agrega sobre el DataFrame de la métrica
+(el del cache de frames, con las derived_columns ya aplicadas).
+
+Semántica de filtros: la de `reports.filtering.matches`, igual que /data.
+Una clave ausente vale "" — una dimensión que la métrica no tiene deja
+pasar la fila solo si el filtro admite "".
+
+Las facetas replican el paso 7.5 de /data: para cada dimensión, los
+valores (con su cantidad de filas) que sobreviven a todos los filtros
+menos el de esa dimensión, sumados sobre las métricas del indicador.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+AGREGACIONES = ("sum", "mean", "median", "min", "max", "count", "nunique")
+
+# Agregaciones que operan sobre el valor numérico del field.
+_NUMERICAS = {"sum", "mean", "median", "min", "max"}
+
+
+@dataclass
+class Medida:
+    """Una columna de la grilla: `agg` de `field` (None = filas del grupo)."""
+    field: Optional[str]
+    agg: str
+    label: str
+
+
+class ConsultaInvalida(ValueError):
+    """Error del cliente al armar la consulta (columna o agregación)."""
+
+
+def _texto(serie: pd.Series) -> pd.Series:
+    """Valores como los ve `matches`: str, con nulo → ""."""
+    return serie.astype(object).where(serie.notna(), "").astype(str)
+
+
+def mascara_filtro(df: pd.DataFrame, columna: Optional[str], esperado: Any) -> np.ndarray:
+    """`matches(fila[columna], esperado)` para todas las filas a la vez.
+
+    `columna` None (la métrica no tiene esa dimensión) compara contra "".
+    """
+    if isinstance(esperado, (list, tuple, set)):
+        permitidos = {str(v) for v in esperado}
+        if not permitidos:
+            return np.ones(len(df), dtype=bool)
+    else:
+        permitidos = {str(esperado)}
+    if columna is None or columna not in df.columns:
+        return np.full(len(df), "" in permitidos, dtype=bool)
+    return _texto(df[columna]).isin(permitidos).to_numpy()
+
+
+def filtrar(df: pd.DataFrame, filtros: Sequence[Tuple[Optional[str], Any]]) -> pd.DataFrame:
+    """Filas de `df` que cumplen todos los `filtros` (pares columna,
+    esperado; columna None = dimensión que la métrica no tiene)."""
+    if not filtros or df.empty:
+        return df
+    keep = np.ones(len(df), dtype=bool)
+    for columna, esperado in filtros:
+        keep &= mascara_filtro(df, columna, esperado)
+    return df[keep]
+
+
+def _orden(valores: Sequence[Any], ordenar: Callable[[List[Any]], List[Any]]) -> Dict[Any, int]:
+    """Posición de cada valor distinto según `ordenar`; nulos al final."""
+    presentes = [v for v in valores if v is not None and not (isinstance(v, float) and np.isnan(v))]
+    try:
+        ordenados = ordenar(presentes)
+    except TypeError:
+        ordenados = sorted(presentes, key=str)
+    return {v: i for i, v in enumerate(ordenados)}
+
+
+def agregar(
+    df: pd.DataFrame,
+    group_by: Sequence[str],
+    medidas: Sequence[Medida],
+    *,
+    ordenar_claves: Optional[Callable[[str, List[Any]], List[Any]]] = None,
+    order_by: Optional[str] = None,
+    descending: bool = False,
+) -> pd.DataFrame:
+    """Grilla agregada: una fila por combinación de `group_by` (columnas de
+    `df`) y una columna por medida (`label`).
+
+    Los grupos salen ordenados por sus claves con `ordenar_claves(columna,
+    valores)` (ej. orden cronológico de Mes) o, con `order_by`, por esa
+    columna de la grilla. Sin `group_by` la grilla tiene una sola fila.
+    """
+    for col in group_by:
+        if col not in df.columns:
+            raise ConsultaInvalida(f"Columna de agrupación desconocida: {col}")
+    datos: Dict[str, pd.Series] = {}
+    specs: Dict[str, tuple] = {}
+    for j, m in enumerate(medidas):
+        if m.agg not in AGREGACIONES:
+            raise ConsultaInvalida(f"Agregación no soportada: {m.agg}")
+        if m.field is None:
+            if m.agg != "count":
+                raise ConsultaInvalida(f"La medida '{m.label}' necesita un field")
+            datos[f"__m{j}"] = pd.Series(np.ones(len(df)), index=df.index)
+            specs[m.label] = (f"__m{j}", "size")
+            continue
+        if m.field not in df.columns:
+            raise ConsultaInvalida(f"Field desconocido: {m.field}")
+        serie = df[m.field]
+        if m.agg in _NUMERICAS:
+            serie = pd.to_numeric(serie, errors="coerce")
+        datos[f"__m{j}"] = serie
+        specs[m.label] = (f"__m{j}", m.agg)
+
+    if not group_by:
+        base = pd.DataFrame(datos, index=df.index)
+        fila = {label: base[col].agg(agg) if agg != "size" else len(base) for label, (col, agg) in specs.items()}
+        return pd.DataFrame([fila], columns=list(specs))
+
+    claves = [f"__k{i}" for i in range(len(group_by))]
+    base = pd.DataFrame({**{k: df[c] for k, c in zip(claves, group_by)}, **datos}, index=df.index)
+    grilla = base.groupby(claves, dropna=False, sort=False).agg(**specs).reset_index()
+    grilla.columns = list(group_by) + list(specs)
+
+    if len(grilla):
+        posiciones = []
+        for col in group_by:
+            ordenar = (lambda vals, c=col: ordenar_claves(c, vals)) if ordenar_claves else sorted
+            rango = _orden(list(pd.unique(grilla[col])), ordenar)
+            posiciones.append(grilla[col].map(rango).fillna(len(rango)).to_numpy())
+        grilla = grilla.iloc[np.lexsort(posiciones[::-1])].reset_index(drop=True)
+    if order_by:
+        if order_by not in grilla.columns:
+            raise ConsultaInvalida(f"order_by desconocido: {order_by}")
+        grilla = grilla.sort_values(order_by, ascending=not descending, kind="stable",
+                                    na_position="last").reset_index(drop=True)
+    return grilla
+
+
+def a_filas(grilla: pd.DataFrame) -> List[List[Any]]:
+    """Filas JSON-serializables (NaN → None, escalares numpy → Python)."""
+    objetos = grilla.astype(object).where(grilla.notna(), None)
+    return [[v.item() if isinstance(v, np.generic) else v for v in fila]
+            for fila in objetos.itertuples(index=False, name=None)]
+
+
+def facetas(
+    frames: Iterable[Tuple[pd.DataFrame, Mapping[str, str]]],
+    dimensiones: Iterable[str],
+    filtros: Mapping[str, Any],
+) -> Dict[str, Dict[str, int]]:
+    """{dim_key: {valor: filas}} con los filtros de las OTRAS dimensiones.
+
+    `frames` son pares (df de la métrica, {dim_key: columna de df}); los
+    `filtros` van por dim_key. Los valores vacíos no cuentan.
+    """
+    conteos: Dict[str, Dict[str, int]] = {k: {} for k in dimensiones}
+    for df, columnas in frames:
+        if df is None or df.empty:
+            continue
+        mascaras = {fk: mascara_filtro(df, columnas.get(fk), fv) for fk, fv in filtros.items()}
+        for clave, acumulado in conteos.items():
+            columna = columnas.get(clave)
+            if columna is None or columna not in df.columns:
+                continue
+            keep = np.ones(len(df), dtype=bool)
+            for fk, m in mascaras.items():
+                if fk != clave:
+                    keep &= m
+            valores = _texto(df[columna][keep])
+            for valor, n in valores[valores != ""].value_counts(sort=False).items():
+                acumulado[valor] = acumulado.get(valor, 0) + int(n)
+    return conteos
@@ -41,6 +41,13 @@ Kinds soportados:
   - 0.5. Útil cuando hay rectas distintas para distintos rangos del
   valor de entrada.
 
+`compilar_plan` valida una lista de configs una sola vez y la deja lista
+para aplicarse sobre muchos DataFrames (`PlanDerivados`): cada kind recibe
+solo las columnas que lee y sus columnas nuevas se escriben en un único
+frame de trabajo, sin copiar el frame completo en cada paso. La `huella`
+del plan (hash del contenido de las configs) sirve de clave para cachear
+resultados (ver `routers/tables._metric_df_con_derivadas`).
+
 Soporta `value_type: ordinal`: si los valores son cualitativos
 (ej: Insuficiente, Elemental, Adecuado), se mapean a 1..N usando
 `ordinal_levels` antes de calcular, y la columna resultante queda en
@@ -48,14 +55,21 @@ formato numérico (no se revierte porque la salida típicamente es numérica).
 """
 from __future__ import annotations
 
+import copy
+import hashlib
 import logging
 import re
+import threading
 import unicodedata
-from typing import Any, Callable
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
 
 import numpy as np
 import pandas as pd
 
+from .lookups import TramosCompilados, buscar_en_diccionario, como_map
+
 logger = logging.getLogger(__name__)
 
 
@@ -240,8 +254,8 @@ def apply_slope(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     Para cada fila:
         - Toma todas las filas previas + la actual del mismo `entity_field`,
           ordenadas por `time_field`.
-        - Calcula la pendiente lineal (np.polyfit grado 1) sobre los puntos
-          (time_field, value_field).
+        - Calcula la pendiente lineal de mínimos cuadrados (la de np.polyfit
+          grado 1) sobre los puntos (time_field, value_field).
         - Si hay menos de `min_points` (default 2), valor = NaN.
 
     Config esperado:
@@ -285,53 +299,38 @@ def apply_slope(df: pd.DataFrame, config: dict) -> pd.DataFrame:
         .mean()
     )
 
-    # Para cada entidad, ordenar y calcular pendiente expansiva sobre el
-    # df agregado. Mapping (entity_value, time_num) → slope value;
-    # después se broadcast a todas las filas originales del par.
-    group_by_arg = entity_keys[0] if len(entity_keys) == 1 else entity_keys
-    slope_map: dict = {}
-    for entity_value, group in agg_per_time.groupby(group_by_arg, sort=False):
-        ordered = group.sort_values("_time_num", kind="mergesort").reset_index(drop=True)
-        x_values = ordered["_time_num"].to_numpy()
-        y_values = ordered["_value_num"].to_numpy()
-
-        # Para cada punto temporal del estudiante, calcular slope expansivo
-        # con los puntos previos + actual, y asignarlo a TODAS las filas
-        # originales que tienen ese (entity, time).
-        for i in range(len(ordered)):
-            time_at_i = float(x_values[i])
-            x_slice = x_values[: i + 1]
-            y_slice = y_values[: i + 1]
-            mask = ~(np.isnan(x_slice) | np.isnan(y_slice))
-            x_clean = x_slice[mask]
-            y_clean = y_slice[mask]
-            if len(x_clean) < min_points or len(np.unique(x_clean)) < 2:
-                slope_val = np.nan
-            else:
-                try:
-                    slope_val = float(np.polyfit(x_clean, y_clean, 1)[0])
-                except (np.linalg.LinAlgError, ValueError):
-                    slope_val = np.nan
-            slope_map[(entity_value, time_at_i)] = slope_val
-
-    # Broadcast: para cada fila original, lookup por (entity_value, time_num)
-    def _lookup(row):
-        if len(entity_keys) == 1:
-            ev = row[entity_keys[0]]
-        else:
-            ev = tuple(row[k] for k in entity_keys)
-        tn = row["_time_num"]
-        if pd.isna(tn):
-            return np.nan
-        return slope_map.get((ev, float(tn)), np.nan)
-
-    # Si df está vacío (p.ej. filtro previo dejó 0 filas), df.apply puede
-    # devolver un DataFrame en lugar de Series y romper la asignación.
-    # Asignamos NaN explícito y salimos.
-    if df.empty:
-        df[name] = np.nan
-    else:
-        df[name] = df.apply(_lookup, axis=1)
+    # Pendiente expansiva por entidad sobre el df agregado, en forma
+    # cerrada con sumas acumuladas por grupo (O(n) en vez de un polyfit por
+    # punto): con n puntos hasta el actual,
+    #     slope = (n·Σxy − Σx·Σy) / (n·Σx² − (Σx)²)
+    # que es la pendiente de mínimos cuadrados de np.polyfit grado 1. x e y
+    # se desplazan al primer punto de la entidad (la pendiente no cambia)
+    # para no perder precisión con tiempos grandes (años, fechas).
+    pendientes = agg_per_time.sort_values("_time_num", kind="mergesort")
+    grupos = pendientes.groupby(entity_keys, sort=False)
+    x = pendientes["_time_num"] - grupos["_time_num"].transform("first")
+    y = pendientes["_value_num"] - grupos["_value_num"].transform("first")
+    sumas = (
+        pd.DataFrame({"x": x, "y": y, "xy": x * y, "xx": x * x})
+        .groupby([pendientes[k] for k in entity_keys], sort=False)
+        .cumsum()
+    )
+    n = grupos.cumcount().to_numpy() + 1.0
+    denominador = n * sumas["xx"].to_numpy() - sumas["x"].to_numpy() ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sumas["xy"].to_numpy() - sumas["x"].to_numpy() * sumas["y"].to_numpy()) / denominador
+    # Los tiempos son únicos por entidad (ya agregados): n ≥ 2 implica al
+    # menos dos x distintos.
+    slope[(n < max(min_points, 2)) | ~(denominador > 0)] = np.nan
+    pendientes = pendientes[entity_keys + ["_time_num"]].assign(**{name: slope})
+
+    # Broadcast a todas las filas originales del par (entity, time_num).
+    # Filas sin tiempo, con alguna llave nula o cuyo punto no tenía valores
+    # no aparecen en `pendientes` y quedan NaN.
+    cruce = df[entity_keys + ["_time_num"]].merge(
+        pendientes, on=entity_keys + ["_time_num"], how="left", sort=False,
+    )
+    df[name] = cruce[name].to_numpy(dtype=float)
     df.drop(columns=["_value_num", "_time_num"], inplace=True)
     return df
 
@@ -733,40 +732,11 @@ def apply_lookup_range(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     df = df.copy()
     series_num = pd.to_numeric(df[value_field], errors="coerce")
 
-    def _in_range(v, mn, mx) -> bool:
-        if mn is not None:
-            try:
-                mn_f = float(mn)
-            except (TypeError, ValueError):
-                return False
-            if match == "right_inclusive":
-                if not (v > mn_f):
-                    return False
-            else:
-                if not (v >= mn_f):
-                    return False
-        if mx is not None:
-            try:
-                mx_f = float(mx)
-            except (TypeError, ValueError):
-                return False
-            if match == "left_inclusive":
-                if not (v < mx_f):
-                    return False
-            else:
-                if not (v <= mx_f):
-                    return False
-        return True
-
-    def _classify(v):
-        if pd.isna(v):
-            return default
-        for r in ranges:
-            if _in_range(v, r.get("min"), r.get("max")):
-                return r.get("label")
-        return default
-
-    df[name] = series_num.map(_classify)
+    # Tramos compilados (ver `lookups.py`): mismo resultado que recorrer
+    # `ranges` por valor, con NaN → default.
+    tramos = TramosCompilados([(r.get("min"), r.get("max")) for r in ranges], match)
+    labels = np.array([r.get("label") for r in ranges] + [default], dtype=object)
+    df[name] = como_map(labels[tramos.indices(series_num)], series_num)
     return df
 
 
@@ -850,7 +820,7 @@ def apply_lookup_dict(df: pd.DataFrame, config: dict) -> pd.DataFrame:
         return mapping_norm.get(key, default)
 
     df = df.copy()
-    df[name] = df[value_field].map(_lookup)
+    df[name] = buscar_en_diccionario(df[value_field], _lookup)
     return df
 
 
@@ -897,51 +867,30 @@ def apply_piecewise_linear(df: pd.DataFrame, config: dict) -> pd.DataFrame:
 
     df = df.copy()
     series_num = pd.to_numeric(df[value_field], errors="coerce")
-
-    def _in_segment(v: float, seg: dict) -> bool:
-        mn, mx = seg.get("min"), seg.get("max")
-        if mn is not None:
-            try:
-                mn_f = float(mn)
-            except (TypeError, ValueError):
-                return False
-            if match == "right_inclusive":
-                if not (v > mn_f):
-                    return False
-            else:
-                if not (v >= mn_f):
-                    return False
-        if mx is not None:
-            try:
-                mx_f = float(mx)
-            except (TypeError, ValueError):
-                return False
-            if match == "left_inclusive":
-                if not (v < mx_f):
-                    return False
-            else:
-                if not (v <= mx_f):
-                    return False
-        return True
-
-    def _calc(v):
-        if pd.isna(v):
-            return None
-        for seg in segments:
-            if _in_segment(v, seg):
-                slope = float(seg.get("slope", 0))
-                intercept = float(seg.get("intercept", 0))
-                y = slope * v + intercept
-                if clamp_min is not None:
-                    y = max(y, float(clamp_min))
-                if clamp_max is not None:
-                    y = min(y, float(clamp_max))
-                if round_to is not None:
-                    y = round(y, int(round_to))
-                return y
-        return None
-
-    df[name] = series_num.map(_calc)
+    v = series_num.to_numpy(dtype=float)
+
+    # Primer tramo que contiene cada valor (ver `lookups.py`); -1 = ninguno
+    # o NaN → None.
+    idx = TramosCompilados([(seg.get("min"), seg.get("max")) for seg in segments], match).indices(v)
+    slopes = np.zeros(len(segments))
+    intercepts = np.zeros(len(segments))
+    for i in np.unique(idx[idx >= 0]):
+        slopes[i] = float(segments[i].get("slope", 0))
+        intercepts[i] = float(segments[i].get("intercept", 0))
+    y = slopes[idx] * v + intercepts[idx]
+    if clamp_min is not None:
+        y = np.maximum(y, float(clamp_min))
+    if clamp_max is not None:
+        y = np.minimum(y, float(clamp_max))
+    if round_to is not None:
+        # `round` de Python (redondeo decimal exacto), no np.round; una vez
+        # por valor distinto.
+        distintos, inversa = np.unique(y, return_inverse=True)
+        y = np.array([round(x, int(round_to)) for x in distintos], dtype=float)[inversa]
+
+    resultado = y.astype(object)
+    resultado[idx < 0] = None
+    df[name] = como_map(resultado, series_num)
     return df
 
 
@@ -1095,6 +1044,194 @@ KIND_REGISTRY: dict[str, dict[str, Any]] = {
 }
 
 
+# ─────────────────────────────────────────────────────────────────────────
+# Plan compilado
+# ─────────────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class PasoDerivado:
+    """Un config validado, con las columnas que lee y escribe.
+
+    `lee` es None cuando el kind depende de TODAS las columnas del frame
+    (`row_mean_dynamic` sin `include_columns`).
+    """
+    indice: int
+    kind: str
+    config: dict
+    fn: Callable[[pd.DataFrame, dict], pd.DataFrame]
+    lee: Optional[tuple]
+    escribe: tuple
+
+
+def _como_lista(valor) -> list:
+    if valor is None:
+        return []
+    return list(valor) if isinstance(valor, (list, tuple)) else [valor]
+
+
+def _columnas_leidas(kind: str, config: dict) -> Optional[tuple]:
+    if kind == "row_mean_dynamic" and not config.get("include_columns"):
+        return None
+    cols = []
+    for arg in ("value_field", "entity_field", "time_field", "include_columns"):
+        cols.extend(_como_lista(config.get(arg)))
+    return tuple(c for c in cols if isinstance(c, str))
+
+
+def _columnas_escritas(kind: str, config: dict) -> tuple:
+    cols = [config["name"]]
+    if kind == "normalize_name":
+        if "original_name" in config:
+            cols.append(config["original_name"])
+        elif isinstance(config["name"], str):
+            cols.append(_columna_original_por_convencion(config["name"]))
+    return tuple(c for c in cols if isinstance(c, str))
+
+
+def _validar_config(i: int, config) -> dict:
+    if not isinstance(config, dict):
+        raise ValueError(f"derived_fields[{i}] debe ser un dict, recibido: {type(config).__name__}")
+    kind = config.get("kind")
+    if kind not in KIND_REGISTRY:
+        raise ValueError(
+            f"derived_fields[{i}].kind = '{kind}' no soportado. "
+            f"Disponibles: {list(KIND_REGISTRY.keys())}"
+        )
+    missing = [a for a in KIND_REGISTRY[kind]["required_args"] if a not in config]
+    if missing:
+        raise ValueError(
+            f"derived_fields[{i}] (kind={kind}): args requeridos faltantes: {missing}"
+        )
+    return KIND_REGISTRY[kind]
+
+
+def _movidas(entrada: pd.DataFrame, salida: pd.DataFrame, existentes: list) -> set:
+    """Columnas de `existentes` que el kind sacó y volvió a agregar al
+    final (los kinds con merge hacen drop + merge si `name` ya existía)."""
+    pos = {c: i for i, c in enumerate(salida.columns)}
+    previas = list(entrada.columns)
+    movidas = set()
+    for c in existentes:
+        despues = previas[previas.index(c) + 1:]
+        if any(pos[d] < pos[c] for d in salida.columns if d not in entrada.columns) or any(
+            d in pos and pos[d] < pos[c] for d in despues
+        ):
+            movidas.add(c)
+    return movidas
+
+
+class PlanDerivados:
+    """Lista de derived_fields validada, lista para aplicarse.
+
+    Se arma con `compilar_plan`. `aplicar` produce el mismo resultado que
+    correr los `apply_*` en cadena sobre el frame completo: columnas (y su
+    orden), dtypes, índice y errores.
+    """
+
+    def __init__(self, pasos: list[PasoDerivado], huella: str):
+        self.pasos = pasos
+        self.huella = huella
+
+    def aplicar(self, df: pd.DataFrame, *, copiar: bool = True) -> pd.DataFrame:
+        """Aplica el plan sobre `df` sin mutarlo.
+
+        Con `copiar=False` el frame de trabajo es una copia superficial:
+        comparte los arrays de las columnas que no se tocan (sirve para
+        frames de solo lectura del cache de métricas).
+        """
+        trabajo = df.copy() if copiar else df.copy(deep=False)
+        for paso in self.pasos:
+            trabajo = self._ejecutar(paso, trabajo)
+        return trabajo
+
+    @staticmethod
+    def _ejecutar(paso: PasoDerivado, trabajo: pd.DataFrame) -> pd.DataFrame:
+        if paso.lee is None:
+            return paso.fn(trabajo, paso.config)
+
+        # El kind recibe solo lo que lee + las columnas que escribe y ya
+        # existen (algunos kinds cambian de comportamiento si existen).
+        # Éstas van primero: si el kind las saca y las vuelve a agregar al
+        # final, `_movidas` lo detecta.
+        cols = list(dict.fromkeys(c for c in paso.escribe + paso.lee if c in trabajo.columns))
+        entrada = trabajo[cols]
+        salida = paso.fn(entrada, paso.config)
+
+        existentes = [c for c in paso.escribe if c in entrada.columns and c in salida.columns]
+        movidas = _movidas(entrada, salida, existentes)
+        for c in existentes:
+            if c in movidas:
+                del trabajo[c]
+            else:
+                trabajo[c] = salida[c].set_axis(trabajo.index)
+        for c in salida.columns:
+            if c not in entrada.columns or c in movidas:
+                trabajo[c] = salida[c].set_axis(trabajo.index)
+        # Los kinds con merge devuelven un RangeIndex.
+        if not salida.index.equals(trabajo.index):
+            trabajo.index = salida.index
+        return trabajo
+
+
+def _canonico(valor):
+    """Forma hasheable y orden-invariante de un config (los dicts se ordenan
+    por clave; `repr` distingue 1 de "1")."""
+    if isinstance(valor, dict):
+        return ("dict", tuple(sorted((repr(k), _canonico(v)) for k, v in valor.items())))
+    if isinstance(valor, (list, tuple)):
+        return ("list", tuple(_canonico(v) for v in valor))
+    return repr(valor)
+
+
+def huella_configs(configs: list) -> str:
+    """Hash del contenido de `configs` (no de su identidad)."""
+    return hashlib.sha1(repr(_canonico(list(configs or []))).encode("utf-8")).hexdigest()
+
+
+# Planes ya compilados, por huella (LRU chico: hay pocas listas distintas
+# por proceso — las de los indicadores/charts/esquemas cargados).
+_PLANES_MAX = 256
+_planes: "OrderedDict[str, PlanDerivados]" = OrderedDict()
+_planes_lock = threading.Lock()
+
+
+def compilar_plan(configs: list[dict]) -> PlanDerivados:
+    """Valida `configs` y devuelve su `PlanDerivados`.
+
+    Los planes se memorizan por contenido, así que compilar la misma lista
+    en cada request no vuelve a validar. El plan guarda una copia de las
+    configs: mutar la lista original después no lo afecta.
+
+    Raises:
+        ValueError: si algún kind no existe en el registry o falta un arg
+            requerido.
+    """
+    configs = list(configs or [])
+    huella = huella_configs(configs)
+    with _planes_lock:
+        plan = _planes.get(huella)
+        if plan is not None:
+            _planes.move_to_end(huella)
+            return plan
+
+    pasos = []
+    for i, config in enumerate(configs):
+        spec = _validar_config(i, config)
+        config = copy.deepcopy(config)
+        kind = config["kind"]
+        pasos.append(PasoDerivado(
+            indice=i, kind=kind, config=config, fn=spec["fn"],
+            lee=_columnas_leidas(kind, config),
+            escribe=_columnas_escritas(kind, config),
+        ))
+    plan = PlanDerivados(pasos, huella)
+    with _planes_lock:
+        _planes[huella] = plan
+        while len(_planes) > _PLANES_MAX:
+            _planes.popitem(last=False)
+    return plan
+
+
 def apply_derived_fields(df: pd.DataFrame, configs: list[dict]) -> pd.DataFrame:
     """Orquestador: aplica una lista de derived_fields en orden.
 
@@ -1119,25 +1256,4 @@ def apply_derived_fields(df: pd.DataFrame, configs: list[dict]) -> pd.DataFrame:
     """
     if not configs:
         return df.copy()
-
-    out = df.copy()
-    for i, config in enumerate(configs):
-        if not isinstance(config, dict):
-            raise ValueError(f"derived_fields[{i}] debe ser un dict, recibido: {type(config).__name__}")
-        kind = config.get("kind")
-        if kind not in KIND_REGISTRY:
-            raise ValueError(
-                f"derived_fields[{i}].kind = '{kind}' no soportado. "
-                f"Disponibles: {list(KIND_REGISTRY.keys())}"
-            )
-        spec = KIND_REGISTRY[kind]
-        # Validar args requeridos
-        missing = [a for a in spec["required_args"] if a not in config]
-        if missing:
-            raise ValueError(
-                f"derived_fields[{i}] (kind={kind}): args requeridos faltantes: {missing}"
-            )
-        # Ejecutar
-        fn: Callable[[pd.DataFrame, dict], pd.DataFrame] = spec["fn"]
-        out = fn(out, config)
-    return out
+    return compilar_plan(configs).aplicar(df)
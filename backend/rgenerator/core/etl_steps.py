@@ -9,6 +9,7 @@ from typing import Callable, Optional, Dict, List
 # Importaciones internas de RGenerator
 from .step import Step, WaitingForInputException
 from .derived_fields_engine import apply_derived_fields
+from backend.lectura_por_lotes import buscar_fila
 
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -83,6 +84,8 @@ class RunExcelETL(Step):
     Ejemplo:
         RunExcelETL(input_key="estudiantes", output_key="df_estudiantes_raw")
     """
+    parallel_safe = True
+
     def __init__(
         self,
         input_key: Optional[str] = None,
@@ -215,16 +218,9 @@ class RunExcelETL(Step):
                 # Si hay start_marker, buscamos la fila del marker y usamos un offset.
                 # Si no, usamos header_row absoluto del config.
                 if start_marker:
-                    df_raw = pd.read_excel(ruta_archivo, header=None)
-                    marker_lower = str(start_marker).strip().lower()
-                    marker_row = None
-                    for i in range(len(df_raw)):
-                        for v in df_raw.iloc[i]:
-                            if isinstance(v, str) and marker_lower in v.strip().lower():
-                                marker_row = i
-                                break
-                        if marker_row is not None:
-                            break
+                    # En XLSX se recorre la hoja en modo read-only hasta el
+                    # marker, sin una lectura completa extra del archivo.
+                    marker_row = buscar_fila(ruta_archivo, start_marker)
                     if marker_row is None:
                         self._log(
                             f"[{self.name}] start_marker '{start_marker}' no encontrado "
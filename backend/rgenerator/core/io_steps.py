@@ -33,6 +33,18 @@ class RequestUserFiles(Step):
         super().__init__(name="RequestUserFiles")
         self.file_specs = file_specs
 
+    def has_new_inputs(self, ctx):
+        """Hay archivos subidos sin consumir para alguno de los specs."""
+        if not ctx.pipeline_id:
+            return False
+        uploads_root = UPLOADS_DIR / str(ctx.pipeline_id)
+        return any(
+            (uploads_root / spec.get("id")).is_dir()
+            and any(f.is_file() for f in (uploads_root / spec.get("id")).iterdir())
+            for spec in self.file_specs
+            if spec.get("id")
+        )
+
     def run(self, ctx):
         """
         En una ejecución automatizada, verifica que los archivos existan en ctx.inputs.
@@ -0,0 +1,138 @@
+"""Búsquedas compiladas para tramos (min/max) y diccionarios.
+
+`lookup_range`, `piecewise_linear` (derived_fields_engine) y los mapeos
+guardados (`routers/mappings.apply_mapping`) clasifican un valor
+recorriendo la lista de tramos con una closure por elemento. Acá la
+lista se compila una vez y se evalúa la columna entera:
+
+- `TramosCompilados`: los límites de todos los tramos, ordenados, parten
+  la recta en celdas elementales (cada límite y cada intervalo abierto
+  entre dos límites). Un tramo cubre una celda entera o no la toca, así
+  que el primer tramo que matchea se resuelve una vez por celda y cada
+  valor se ubica en su celda con `np.searchsorted`. Mantiene la semántica
+  de la versión por elemento: `match` (qué borde es inclusivo), el primer
+  tramo de la lista gana si se solapan, límite None = abierto y un límite
+  no numérico hace que el tramo no matchee nunca.
+- `buscar_en_diccionario`: aplica la función de clave (extract + lookup)
+  una vez por valor distinto y la columna se resuelve con `Series.map`.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _limite(valor) -> Tuple[bool, Optional[float]]:
+    """(válido, float o None si abierto). NaN cuenta como no válido: en
+    la versión por elemento ninguna comparación contra NaN es verdadera."""
+    if valor is None:
+        return True, None
+    try:
+        f = float(valor)
+    except (TypeError, ValueError):
+        return False, None
+    return (not np.isnan(f)), f
+
+
+class TramosCompilados:
+    """Índice del primer tramo `{min, max}` que contiene cada valor.
+
+    `tramos` es una secuencia de pares (min, max) en el orden del config.
+    `match` no se valida (lo hace cada caller): como en la versión por
+    elemento, el min es exclusivo solo con 'right_inclusive' y el max solo
+    con 'left_inclusive'.
+    """
+
+    def __init__(self, tramos: Sequence[Tuple[Any, Any]], match: str = "left_inclusive"):
+        self.match = match
+        self._tramos = []
+        for mn, mx in tramos:
+            ok_min, mn_f = _limite(mn)
+            ok_max, mx_f = _limite(mx)
+            self._tramos.append((ok_min and ok_max, mn_f, mx_f))
+
+        self.limites = np.array(
+            sorted({f for ok, mn, mx in self._tramos if ok for f in (mn, mx) if f is not None}),
+            dtype=float,
+        )
+        # Celda 2i+1 = el límite i; celda 2i = intervalo abierto entre el
+        # límite i-1 y el i (la 0 y la última no tienen borde exterior).
+        bordes = [-np.inf, *self.limites, np.inf]
+        celdas = []
+        for i in range(len(self.limites) + 1):
+            celdas.append(self._primero_en_intervalo(bordes[i], bordes[i + 1]))
+            if i < len(self.limites):
+                celdas.append(self._primero_en_punto(self.limites[i]))
+        self._por_celda = np.array(celdas, dtype=np.int64)
+
+    def _contiene_punto(self, v: float, mn: Optional[float], mx: Optional[float]) -> bool:
+        if mn is not None:
+            if self.match == "right_inclusive":
+                if not (v > mn):
+                    return False
+            elif not (v >= mn):
+                return False
+        if mx is not None:
+            if self.match == "left_inclusive":
+                if not (v < mx):
+                    return False
+            elif not (v <= mx):
+                return False
+        return True
+
+    def _primero_en_punto(self, v: float) -> int:
+        for i, (ok, mn, mx) in enumerate(self._tramos):
+            if ok and self._contiene_punto(v, mn, mx):
+                return i
+        return -1
+
+    def _primero_en_intervalo(self, a: float, b: float) -> int:
+        # Intervalo abierto (a, b) sin límites adentro: el tramo lo cubre
+        # si empieza en a o antes y termina en b o después.
+        for i, (ok, mn, mx) in enumerate(self._tramos):
+            if ok and (mn is None or mn <= a) and (mx is None or mx >= b):
+                return i
+        return -1
+
+    def indices(self, valores) -> np.ndarray:
+        """Índice del tramo de cada valor; -1 si ninguno o si es NaN."""
+        v = np.asarray(valores, dtype=float)
+        pos = np.searchsorted(self.limites, v, side="left")
+        en_limite = np.zeros(len(v), dtype=bool)
+        dentro = pos < len(self.limites)
+        en_limite[dentro] = self.limites[pos[dentro]] == v[dentro]
+        resultado = self._por_celda[2 * pos + en_limite]
+        resultado[np.isnan(v)] = -1
+        return resultado
+
+
+def como_map(valores: np.ndarray, origen: pd.Series) -> pd.Series:
+    """Serie con `valores` (arreglo object) y el dtype que habría inferido
+    `origen.map(fn)` con los mismos resultados (ej. etiquetas numéricas +
+    None → float64)."""
+    if len(valores) == 0:
+        return pd.Series([], index=origen.index, dtype=origen.dtype)
+    return pd.Series(valores.tolist(), index=origen.index)
+
+
+def buscar_en_diccionario(serie: pd.Series, resolver: Callable[[Any], Any]) -> pd.Series:
+    """`serie.map(resolver)` llamando a `resolver` una vez por valor distinto.
+
+    `resolver` debe depender solo de `str(v)` salvo para None/NaN: los
+    valores se agrupan por su texto (1 y 1.0 quedan separados, como en
+    `str`). Los nulos y las columnas de fechas (cuyo `astype(str)` no es
+    `str(v)`) se resuelven elemento por elemento.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie) or pd.api.types.is_timedelta64_dtype(serie):
+        return serie.map(resolver)
+    nulos = serie.isna().to_numpy()
+    resultado = np.empty(len(serie), dtype=object)
+    if nulos.any():
+        resultado[nulos] = [resolver(v) for v in serie[nulos]]
+    textos = serie[~nulos].astype(str)
+    if len(textos):
+        cache = {t: resolver(t) for t in pd.unique(textos)}
+        resultado[~nulos] = textos.map(cache).to_numpy(dtype=object)
+    return como_map(resultado, serie)
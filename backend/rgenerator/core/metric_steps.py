@@ -3,9 +3,9 @@ import pandas as pd
 import json
 from typing import Optional, Dict, Any
 from .step import Step
-from .pares_nombre import completar_pares_nombre, pares_nombre_normalizado
-from backend.auditing import make_metric_data
 from backend.logging_config import get_logger
+from backend.metric_bulk import guardar_dataframe
+from backend.metric_store import columnas_cacheadas, marco_plano, separar_filtros
 from backend.models import Metric, MetricDimension, MetricData, Dimension
 
 logger = get_logger(__name__)
@@ -154,7 +154,6 @@ class SaveToMetric(Step):
 
         # 3. Construir mapa de dimensiones: nombre → id_dimension
         dim_name_to_id = _build_dim_name_to_id(ctx.db, self.metric_id)
-        pares_nombre = pares_nombre_normalizado(dim_name_to_id)
         logger.info(f"[{self.name}] Dimensiones inferidas: {list(dim_name_to_id.keys())}")
         logger.info(f"[{self.name}] Tipo de dato: {metric.data_type}, Nombre métrica: {metric.name}")
 
@@ -165,93 +164,43 @@ class SaveToMetric(Step):
             ).delete(synchronize_session=False)
             logger.info(f"[{self.name}] Se eliminaron {deleted} registros previos de la métrica {self.metric_id}")
 
-        # 5. Iterar filas del DataFrame y construir registros
-        new_data_points = []
-        # Cobertura por dimensión: cuántas de las filas guardadas traen valor.
-        # Sirve para detectar en el acto una dimensión que se perdió en silencio
-        # (columna renombrada en el XLS, mapeo ausente, llave dropeada en un
-        # merge, etc.) — ver `_advertir_dimensiones_sin_cobertura`.
-        cobertura = {dim_id: 0 for dim_id in dim_name_to_id.values()}
-
-        for _, row in df_input.iterrows():
-            # Extraer dimensiones
-            dims_json = {}
-            for dim_name, dim_id in dim_name_to_id.items():
-                if dim_name in df_input.columns:
-                    val = row[dim_name]
-                    if pd.notna(val):
-                        dims_json[str(dim_id)] = str(val)
-
-            # Toda carga debe dejar el nombre en AMBAS columnas.
-            if pares_nombre:
-                completar_pares_nombre(dims_json, pares_nombre)
-
-            # Extraer valor según tipo de métrica
-            final_value = None
-
-            if metric.data_type == 'object':
-                val_obj = {}
-                fields = meta.get('fields', [])
-                for f in fields:
-                    fname = f['name']
-                    if fname in df_input.columns:
-                        val = row[fname]
-                        if pd.notna(val):
-                            if f.get('type') == 'int':
-                                try: val = int(val)
-                                except: pass
-                            elif f.get('type') == 'float':
-                                try: val = float(val)
-                                except: pass
-                            val_obj[fname] = val
-                final_value = json.dumps(val_obj)
-            else:
-                value_col = metric.name
-                if value_col in df_input.columns:
-                    v = row[value_col]
-                    if pd.notna(v):
-                        if metric.data_type == 'int':
-                            final_value = str(int(v))
-                        elif metric.data_type == 'float':
-                            final_value = str(float(v))
-                        else:
-                            final_value = str(v)
-
-            if final_value is not None:
-                for dim_id in cobertura:
-                    if str(dims_json.get(str(dim_id), "")).strip():
-                        cobertura[dim_id] += 1
-                new_data_points.append(make_metric_data(
-                    metric_id=self.metric_id,
-                    value=final_value,
-                    dimensions=dims_json,
-                    org_id=ctx.org_id,
-                    user_id=ctx.user_id,
-                    via=("pipeline" if ctx.user_id else "pipeline_cron"),
-                ))
+        # 5. Construir y escribir las filas por lotes (columnar, sin ORM).
+        # La cobertura por dimensión (cuántas de las filas guardadas traen
+        # valor) sirve para detectar en el acto una dimensión que se perdió en
+        # silencio (columna renombrada en el XLS, mapeo ausente, llave dropeada
+        # en un merge, etc.) — ver `_advertir_dimensiones_sin_cobertura`.
+        carga = guardar_dataframe(
+            ctx.db,
+            df_input,
+            metric=metric,
+            fields=meta.get('fields', []) if metric.data_type == 'object' else [],
+            dim_name_to_id=dim_name_to_id,
+            org_id=ctx.org_id,
+            user_id=ctx.user_id,
+            via=("pipeline" if ctx.user_id else "pipeline_cron"),
+        )
 
         # 5.b Guard anti-columnas-perdidas-en-silencio
         self._advertir_dimensiones_sin_cobertura(
             ctx=ctx,
             metric_name=metric.name,
             dim_name_to_id=dim_name_to_id,
-            cobertura=cobertura,
+            cobertura=carga.cobertura,
             columnas_df=df_input.columns.tolist(),
-            filas=len(new_data_points),
+            filas=carga.filas,
         )
 
         # 6. Guardar en PostgreSQL
-        if new_data_points:
-            ctx.db.add_all(new_data_points)
+        if carga.filas:
             ctx.db.commit()
-            logger.info(f"[{self.name}] Se guardaron {len(new_data_points)} registros en PostgreSQL")
+            logger.info(f"[{self.name}] Se guardaron {carga.filas} registros en PostgreSQL")
         else:
             logger.info(f"[{self.name}] No se generaron registros nuevos.")
 
         # Invalidar el cache de DataFrames del router de tablas: sin esto los
         # dashboards siguen sirviendo datos pre-ETL hasta que expire el TTL.
         # Import lazy para no acoplar rgenerator → backend.routers en import time.
-        if self.clear_existing or new_data_points:
+        if self.clear_existing or carga.filas:
             try:
                 from backend.routers.tables import invalidate_metric_df_cache
                 invalidate_metric_df_cache(self.metric_id)
@@ -269,13 +218,16 @@ class LoadMetricToDF(Step):
         output_key (str): Clave del artifact donde se guardará el DataFrame.
         filters (dict, opcional): Filtros por nombre de dimensión.
     """
+    parallel_safe = True
+    exclusive = "db"
+
     def __init__(
         self,
         metric_id: int,
         output_key: str,
         filters: Optional[Dict[str, Any]] = None,
     ):
-        super().__init__(name="LoadMetricToDF")
+        super().__init__(name="LoadMetricToDF", produces=[output_key])
         self.metric_id = metric_id
         self.output_key = output_key
         self.filters = filters or {}
@@ -300,53 +252,22 @@ class LoadMetricToDF(Step):
         dims_map = _build_dim_id_to_name(ctx.db, self.metric_id)
         logger.info(f"[{self.name}] Dimensiones: {list(dims_map.values())}")
 
-        # 3. Cargar datos de la métrica desde PostgreSQL
-        data_rows = ctx.db.query(MetricData).filter(
-            MetricData.id_metric == self.metric_id
-        ).all()
-        logger.info(f"[{self.name}] Registros encontrados: {len(data_rows)}")
-
-        # 4. Aplanar a DataFrame legible
-        flat_data = []
-        for row in data_rows:
-            item: Dict[str, Any] = {}
-
-            # Dimensiones
-            dims_json: Dict[str, Any] = {}
-            try:
-                if isinstance(row.dimensions_json, str):
-                    dims_json = json.loads(row.dimensions_json.replace("'", '"'))
-                elif isinstance(row.dimensions_json, dict):
-                    dims_json = row.dimensions_json
-            except Exception:
-                pass
-
-            for dim_id, name in dims_map.items():
-                item[name] = dims_json.get(str(dim_id))
-
-            # Valor(es)
-            value = row.value
-            if metric.data_type == 'object':
-                try:
-                    val_obj = json.loads(value) if isinstance(value, str) else value
-                    for k, v in val_obj.items():
-                        item[k] = v
-                except Exception:
-                    item['Valor_Raw'] = str(value)
-            else:
-                item[metric.name] = value
-
-            flat_data.append(item)
+        # 3. Cargar datos de la métrica desde la copia columnar materializada;
+        #    los filtros sobre dimensiones se resuelven en SQL.
+        filtros_dim, filtros_resto = separar_filtros(self.filters, dims_map)
+        col = columnas_cacheadas(ctx.db, metric, filtros_dim)
+        logger.info(f"[{self.name}] Registros encontrados: {col.n_rows}")
 
-        df_result = pd.DataFrame(flat_data)
+        # 4. Proyectar a DataFrame legible, columna a columna
+        df_result = marco_plano(col, metric, dims_map)
 
-        # 5. Aplicar filtros
-        if self.filters and not df_result.empty:
-            for col, val in self.filters.items():
-                if col in df_result.columns:
-                    df_result = df_result[df_result[col].astype(str) == str(val)]
+        # 5. Aplicar filtros restantes (fields del value)
+        if filtros_resto and not df_result.empty:
+            for campo, val in filtros_resto.items():
+                if campo in df_result.columns:
+                    df_result = df_result[df_result[campo].astype(str) == str(val)]
                 else:
-                    logger.warning(f"[{self.name}] Advertencia: columna de filtro '{col}' no existe en el DataFrame.")
+                    logger.warning(f"[{self.name}] Advertencia: columna de filtro '{campo}' no existe en el DataFrame.")
             logger.info(f"[{self.name}] Registros tras filtros: {len(df_result)}")
 
         ctx.artifacts[self.output_key] = df_result
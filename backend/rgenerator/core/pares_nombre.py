@@ -88,8 +88,42 @@ def completar_pares_nombre(
             dims_json[k_orig] = val_norm
 
 
+def completar_pares_nombre_columnas(
+    dims: Dict[str, list],
+    pares: Sequence[Tuple[int, int]],
+    n_rows: int,
+) -> None:
+    """Versión columnar de `completar_pares_nombre` (misma regla, in-place).
+
+    `dims` es {"<id_dimension>": [valor | None, ...]} con `n_rows` elementos
+    por lista, como lo arma el escritor masivo (`backend/metric_bulk.py`).
+    Una columna ausente se crea recién cuando hace falta completar alguna
+    fila, así que una métrica sin datos del par no gana claves vacías.
+    """
+    for id_original, id_norm in pares:
+        k_orig, k_norm = str(id_original), str(id_norm)
+        col_orig = dims.get(k_orig)
+        col_norm = dims.get(k_norm)
+        if col_orig is None and col_norm is None:
+            continue
+        for i in range(n_rows):
+            val_orig = str((col_orig[i] if col_orig is not None else None) or "").strip()
+            val_norm = str((col_norm[i] if col_norm is not None else None) or "").strip()
+            if val_orig and not val_norm:
+                normalizado = normalizar_nombre(val_orig)
+                if normalizado:
+                    if col_norm is None:
+                        col_norm = dims[k_norm] = [None] * n_rows
+                    col_norm[i] = normalizado
+            elif val_norm and not val_orig:
+                if col_orig is None:
+                    col_orig = dims[k_orig] = [None] * n_rows
+                col_orig[i] = val_norm
+
+
 __all__ = [
     "SUFIJOS_NORM",
     "pares_nombre_normalizado",
     "completar_pares_nombre",
+    "completar_pares_nombre_columnas",
 ]
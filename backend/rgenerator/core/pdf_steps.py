@@ -8,18 +8,30 @@ funcionan.
 
 Ver `docs/desarrollo/script_dia_artesanal_referencia.md` para el plan
 y mapeo línea-a-línea.
+
+Lotes de varios PDFs (un informe por curso) se procesan en un pool de
+procesos (`DIA_PDF_WORKERS`). Dentro de cada PDF el documento se abre una
+sola vez y cada página de la tabla se renderiza una sola vez
+(`_RastersDePagina`) para medir la oscuridad de todos sus tokens.
 """
 from __future__ import annotations
 
+import multiprocessing
 import os
 import re
-from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
 from .step import Step
 
+# Procesos para extraer un lote de PDFs. 1 = en serie, en el proceso actual.
+DIA_PDF_WORKERS = int(os.getenv("DIA_PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
 
 # ─────────────────────────────────────────────────────────────────────────
 # Helpers PDF (copiados literal del script_consolidar_DIA.py)
@@ -42,8 +54,64 @@ def _region_darkness(page, bbox, zoom: float = 5.0) -> float:
     return 1.0 - arr.mean() / 255.0
 
 
+class _RastersDePagina:
+    """`_region_darkness` sin un render por token.
+
+    Renderiza la página completa una vez (mismo zoom, misma conversión a
+    gris) y mide cada bbox sobre un recorte del arreglo. MuPDF rasteriza
+    un clip con la misma grilla de píxeles que la página completa, así que
+    el recorte es idéntico al pixmap que devolvía `get_pixmap(clip=bbox)`.
+    Guarda solo la última página: los tokens se recorren página por página.
+    """
+
+    def __init__(self, doc, zoom: float = 5.0):
+        self.doc = doc
+        self.zoom = zoom
+        self._pagina: Optional[int] = None
+        self._gris: Optional[np.ndarray] = None
+        self._origen = (0, 0)
+
+    def _renderizar(self, pi: int) -> None:
+        import fitz
+        from PIL import Image
+
+        mat = fitz.Matrix(self.zoom, self.zoom)
+        pix = self.doc[pi].get_pixmap(matrix=mat, alpha=False)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        self._gris = np.array(img.convert("L"))
+        self._origen = (pix.x, pix.y)
+        self._pagina = pi
+
+    def oscuridad(self, pi: int, bbox) -> float:
+        import fitz
+
+        if pi != self._pagina:
+            self._renderizar(pi)
+        r = (fitz.Rect(bbox) * fitz.Matrix(self.zoom, self.zoom)).irect
+        ox, oy = self._origen
+        y0, x0 = max(r.y0 - oy, 0), max(r.x0 - ox, 0)
+        recorte = np.ascontiguousarray(self._gris[y0:r.y1 - oy, x0:r.x1 - ox], dtype=np.float32)
+        return 1.0 - recorte.mean() / 255.0
+
+
+@contextmanager
+def _documento(pdf):
+    """Abre `pdf` (ruta) y lo cierra al salir; si ya es un documento
+    abierto, lo usa tal cual (lo cierra quien lo abrió)."""
+    import fitz
+
+    if not isinstance(pdf, (str, os.PathLike)):
+        yield pdf
+        return
+    doc = fitz.open(pdf)
+    try:
+        yield doc
+    finally:
+        doc.close()
+
+
 def _extract_bold_alternatives(
-    pdf_path: str,
+    pdf_path,
     df_intermedio: pd.DataFrame,
     start_page: int = 0,
     end_page: Optional[int] = None,
@@ -61,12 +129,18 @@ def _extract_bold_alternatives(
         - RC (sólo N:): 1 token (se descarta, la respuesta sale directo
           de la celda).
 
-    Devuelve una lista alineada con las filas NO-RC del df.
+    Devuelve una lista alineada con las filas NO-RC del df. `pdf_path`
+    puede ser la ruta o el documento fitz ya abierto.
     """
-    import fitz
+    with _documento(pdf_path) as doc:
+        return _alternativas_en_negrita(
+            doc, df_intermedio, start_page, end_page, letter_tokens, x_min, zoom,
+        )
 
+
+def _alternativas_en_negrita(doc, df_intermedio, start_page, end_page, letter_tokens, x_min, zoom):
     letter_set = set(letter_tokens)
-    doc = fitz.open(pdf_path)
+    rasters = _RastersDePagina(doc, zoom=zoom)
     if end_page is None:
         end_page = len(doc)
 
@@ -95,7 +169,7 @@ def _extract_bold_alternatives(
         n_tokens = count_tokens(cell)
         if idx + n_tokens > len(stream):
             raise RuntimeError(
-                f"{pdf_path}: tokens insuficientes en el stream "
+                f"{doc.name}: tokens insuficientes en el stream "
                 f"(idx={idx}, need={n_tokens}, total={len(stream)}, fila df={ri})"
             )
         bundle = stream[idx:idx + n_tokens]
@@ -112,12 +186,11 @@ def _extract_bold_alternatives(
             letter = tok[:-1]
             if letter == "N":
                 continue
-            d = _region_darkness(doc[pi], (x0, y0, x1, y1), zoom=zoom)
+            d = rasters.oscuridad(pi, (x0, y0, x1, y1))
             scores[letter] = d
         winner = max(scores.items(), key=lambda kv: kv[1])[0]
         results.append({"winner": winner, "scores": scores})
 
-    doc.close()
     return results
 
 
@@ -129,7 +202,7 @@ def _get_correct_percent(cell: str, correct: str) -> float:
     return 0.0
 
 
-def _detectar_paginas_tabla_preguntas(pdf_path: str) -> str:
+def _detectar_paginas_tabla_preguntas(pdf_path) -> str:
     """Detecta el rango de páginas (1-indexado) de la sección
     'N. Resultados por pregunta' del informe DIA.
 
@@ -140,11 +213,13 @@ def _detectar_paginas_tabla_preguntas(pdf_path: str) -> str:
 
     Saltamos la página 1 porque contiene el índice ("En este informe
     encontrará: 1. ... N. Resultados por pregunta ...") que daría falso
-    match.
+    match. `pdf_path` puede ser la ruta o el documento fitz ya abierto.
     """
-    import fitz
+    with _documento(pdf_path) as doc:
+        return _paginas_tabla_preguntas(doc)
 
-    doc = fitz.open(pdf_path)
+
+def _paginas_tabla_preguntas(doc) -> str:
     n = len(doc)
     start = None
     end = None
@@ -157,9 +232,8 @@ def _detectar_paginas_tabla_preguntas(pdf_path: str) -> str:
         elif start is not None and pat_end.search(text):
             end = i  # página anterior a 'Resultados por estudiante'
             break
-    doc.close()
     if start is None:
-        raise ValueError(f"No se halló 'Resultados por pregunta' en {pdf_path}")
+        raise ValueError(f"No se halló 'Resultados por pregunta' en {doc.name}")
     if end is None:
         end = n  # si no hay sección de cierre, hasta el final
     return f"{start}-{end}"
@@ -186,19 +260,17 @@ def _es_tabla_preguntas(df: pd.DataFrame) -> bool:
     return "respuestas" in header.lower()
 
 
-def _extraer_establecimiento_y_curso(pdf_path: str) -> tuple[str, str, dict]:
+def _extraer_establecimiento_y_curso(pdf_path) -> tuple[str, str, dict]:
     """Extrae establecimiento, curso y mapa completo de etiquetas de la
     primera página del informe DIA.
 
     Usa la fecha (dd/mm/yyyy) como ancla para tomar las 7 líneas finales
-    en el orden esperado.
+    en el orden esperado. `pdf_path` puede ser la ruta o el documento
+    fitz ya abierto.
     """
-    import fitz
-
-    doc = fitz.open(pdf_path)
-    page = doc[0]
-
-    blocks = page.get_text("dict")["blocks"]
+    with _documento(pdf_path) as doc:
+        page = doc[0]
+        blocks = page.get_text("dict")["blocks"]
     lineas = []
     for b in blocks:
         if "lines" in b:
@@ -232,70 +304,22 @@ def _extraer_establecimiento_y_curso(pdf_path: str) -> tuple[str, str, dict]:
     establecimiento = mapa.get("Establecimiento:")
     curso = mapa.get("Curso:")
 
-    doc.close()
     return establecimiento, curso, mapa
 
 
-# ─────────────────────────────────────────────────────────────────────────
-# Step principal
-# ─────────────────────────────────────────────────────────────────────────
-
+def _procesar_pdf_dia(pdf_path: str) -> Tuple[pd.DataFrame, List[str]]:
+    """Procesa un PDF DIA y devuelve (df normalizado, líneas de log).
 
-class RunDIAPDFExtraction(Step):
-    """Extrae el cuadro 'Resultados por pregunta' de los PDFs Agencia DIA.
-
-    Para cada PDF en `ctx.inputs[input_key]`:
-        1. Detecta automáticamente el rango de páginas de la sección.
-        2. Extrae establecimiento y curso de la portada.
-        3. Lee las tablas con camelot lattice y se queda con las que
-           traen el encabezado 'N° pregunta' + '% respuestas'.
-        4. Normaliza columnas (Matemáticas trae 8, Lectura trae 6).
-        5. Para preguntas de alternativas, detecta la respuesta correcta
-           por análisis de píxeles (texto en negrita) y extrae el % de
-           esa alternativa.
-        6. Para preguntas de respuesta corta (RC), extrae el % directo.
-        7. Limpia saltos de línea y normaliza capitalización del Eje
-           Temático.
-
-    Output (`ctx.artifacts[output_key]`): DataFrame con columnas
-        ["N° Pregunta", "Eje Temático", "Habilidad",
-         "Indicador de evaluación", "% respuestas", "Logro",
-         "Establecimiento", "Curso"].
-
-    Parámetros:
-        input_key: clave en ctx.inputs con los PDFs a procesar.
-        output_key: clave del artifact resultante (default
-            "df_preguntas_pdf").
-
-    Raises:
-        ValueError: si un PDF no contiene la sección 'Resultados por
-            pregunta'.
-        RuntimeError: si el conteo de tokens A:/B:/C:/D:/E:/N: no
-            coincide con las filas de la tabla.
+    Función de módulo para poder correr en un worker del pool; el step
+    re-emite el log en el proceso principal. El documento fitz se abre una
+    sola vez para páginas, portada y negritas.
     """
+    import camelot.io as camelot
 
-    def __init__(
-        self,
-        input_key: Optional[str] = None,
-        output_key: Optional[str] = None,
-    ):
-        resolved_output_key = output_key or (
-            f"df_preguntas_pdf" if not input_key else f"df_preguntas_{input_key}"
-        )
-        super().__init__(
-            name="RunDIAPDFExtraction",
-            requires=[input_key] if input_key else [],
-            produces=[resolved_output_key] if resolved_output_key else [],
-        )
-        self.input_key = input_key
-        self.output_key = resolved_output_key
-
-    def _process_pdf(self, pdf_path: str) -> pd.DataFrame:
-        """Procesa un PDF DIA y devuelve un df normalizado."""
-        import camelot.io as camelot
-
-        pages = _detectar_paginas_tabla_preguntas(pdf_path)
-        self._log(f"  {pdf_path}: páginas {pages}")
+    log: List[str] = []
+    with _documento(pdf_path) as doc:
+        pages = _detectar_paginas_tabla_preguntas(doc)
+        log.append(f"  {pdf_path}: páginas {pages}")
 
         tablas = camelot.read_pdf(pdf_path, pages=pages, flavor="lattice")
 
@@ -314,7 +338,7 @@ class RunDIAPDFExtraction(Step):
                 f"({len(tablas)} tablas detectadas)."
             )
 
-        establecimiento, curso, _ = _extraer_establecimiento_y_curso(pdf_path)
+        establecimiento, curso, _ = _extraer_establecimiento_y_curso(doc)
 
         df_intermedio = pd.concat(
             [t.df.iloc[1:] for t in tablas_datos], ignore_index=True
@@ -327,7 +351,7 @@ class RunDIAPDFExtraction(Step):
             subset=[0], keep="first"
         ).reset_index(drop=True)
         if len(df_intermedio) != n_antes:
-            self._log(
+            log.append(
                 f"  {pdf_path}: {n_antes - len(df_intermedio)} filas duplicadas "
                 f"descartadas (tablas repetidas por camelot)."
             )
@@ -345,7 +369,7 @@ class RunDIAPDFExtraction(Step):
         page_start -= 1  # 1-indexed inclusive → 0-indexed
 
         respuestas_correctas = _extract_bold_alternatives(
-            pdf_path, df_intermedio,
+            doc, df_intermedio,
             start_page=page_start, end_page=page_end, x_min=450,
         )
 
@@ -366,7 +390,113 @@ class RunDIAPDFExtraction(Step):
         df_intermedio.at[:, 6] = establecimiento
         df_intermedio.at[:, 7] = curso
 
-        return df_intermedio
+        return df_intermedio, log
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Step principal
+# ─────────────────────────────────────────────────────────────────────────
+
+
+class RunDIAPDFExtraction(Step):
+    """Extrae el cuadro 'Resultados por pregunta' de los PDFs Agencia DIA.
+
+    Para cada PDF en `ctx.inputs[input_key]`:
+        1. Detecta automáticamente el rango de páginas de la sección.
+        2. Extrae establecimiento y curso de la portada.
+        3. Lee las tablas con camelot lattice y se queda con las que
+           traen el encabezado 'N° pregunta' + '% respuestas'.
+        4. Normaliza columnas (Matemáticas trae 8, Lectura trae 6).
+        5. Para preguntas de alternativas, detecta la respuesta correcta
+           por análisis de píxeles (texto en negrita) y extrae el % de
+           esa alternativa.
+        6. Para preguntas de respuesta corta (RC), extrae el % directo.
+        7. Limpia saltos de línea y normaliza capitalización del Eje
+           Temático.
+
+    Output (`ctx.artifacts[output_key]`): DataFrame con columnas
+        ["N° Pregunta", "Eje Temático", "Habilidad",
+         "Indicador de evaluación", "% respuestas", "Logro",
+         "Establecimiento", "Curso"].
+
+    Parámetros:
+        input_key: clave en ctx.inputs con los PDFs a procesar.
+        output_key: clave del artifact resultante (default
+            "df_preguntas_pdf").
+
+    Raises:
+        ValueError: si un PDF no contiene la sección 'Resultados por
+            pregunta'.
+        RuntimeError: si el conteo de tokens A:/B:/C:/D:/E:/N: no
+            coincide con las filas de la tabla.
+    """
+    parallel_safe = True
+    exclusive = "pdf"  # pdfium/camelot no son thread-safe
+
+
+    def __init__(
+        self,
+        input_key: Optional[str] = None,
+        output_key: Optional[str] = None,
+    ):
+        resolved_output_key = output_key or (
+            f"df_preguntas_pdf" if not input_key else f"df_preguntas_{input_key}"
+        )
+        super().__init__(
+            name="RunDIAPDFExtraction",
+            requires=[input_key] if input_key else [],
+            produces=[resolved_output_key] if resolved_output_key else [],
+        )
+        self.input_key = input_key
+        self.output_key = resolved_output_key
+
+    def _process_pdf(self, pdf_path: str) -> pd.DataFrame:
+        """Procesa un PDF DIA y devuelve un df normalizado."""
+        df, log = _procesar_pdf_dia(pdf_path)
+        for linea in log:
+            self._log(linea)
+        return df
+
+    def _extraer(self, pdfs: List[str], workers: Optional[int] = None) -> List[pd.DataFrame]:
+        """`_process_pdf` de cada PDF, EN EL MISMO ORDEN de `pdfs`.
+
+        Con `workers` > 1 y más de un PDF corre en un pool de procesos
+        (`spawn`, como el pool de secciones de `reports/runtime.py`): camelot
+        y el análisis de píxeles son CPU puro y no liberan el GIL. Si el
+        pool no arranca, sigue en serie.
+        """
+        workers = min(DIA_PDF_WORKERS if workers is None else workers, len(pdfs))
+        if workers <= 1:
+            return [self._procesar_o_loguear(pdf) for pdf in pdfs]
+
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            futuros = [pool.submit(_procesar_pdf_dia, pdf) for pdf in pdfs]
+        except (OSError, BrokenProcessPool, RuntimeError) as e:
+            self._log(f"[{self.name}] Pool de PDFs no disponible; se procesa en serie ({e})")
+            return [self._procesar_o_loguear(pdf) for pdf in pdfs]
+
+        dfs = []
+        try:
+            for pdf, futuro in zip(pdfs, futuros):
+                try:
+                    df, log = futuro.result()
+                except Exception as e:
+                    self._log(f"[{self.name}] Error procesando {pdf}: {e}")
+                    raise
+                for linea in log:
+                    self._log(linea)
+                dfs.append(df)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return dfs
+
+    def _procesar_o_loguear(self, pdf: str) -> pd.DataFrame:
+        try:
+            return self._process_pdf(pdf)
+        except Exception as e:
+            self._log(f"[{self.name}] Error procesando {pdf}: {e}")
+            raise
 
     def run(self, ctx):
         before = self._snapshot_artifacts(ctx)
@@ -403,9 +533,8 @@ class RunDIAPDFExtraction(Step):
         ]
 
         rendered_dfs: List[pd.DataFrame] = []
-        for pdf in pdfs:
+        for pdf, df_pdf in zip(pdfs, self._extraer(pdfs)):
             try:
-                df_pdf = self._process_pdf(pdf)
                 # 1. Renombrar columnas posicionales (las 8 estándar)
                 df_pdf.columns = BASE_COLS
                 # 2. Limpiar saltos de línea / capitalizar
@@ -112,13 +112,43 @@ Firma pública
 ──────────────────────────────────────────────────────────────────────────
 
     def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult
+    def pivot_columnar(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotColumnar
     def pivot_to_dataframe(result: PivotResult) -> pd.DataFrame
+
+──────────────────────────────────────────────────────────────────────────
+Formato columnar (`PivotColumnar`)
+──────────────────────────────────────────────────────────────────────────
+
+`pivot_columnar` calcula la misma matriz que `pivot` (mismas filas,
+columnas, valores y totales) como arrays densos de numpy: cada agregación
+es un `groupby` cuyo resultado se ubica en la matriz por posición, sin
+recorrer las celdas en Python. `pivot` se arma sobre él. Serializado
+(`to_json()`) para el dashboard::
+
+    {
+      "format": "columnar",
+      "row_fields": [...], "col_fields": [...],
+      "columns": [<PivotColumn>, ...],
+      "row_keys": [["II A"], ..., ["Total"]],
+      "row_is_total": [false, ..., true],
+      "values": [[0.85, null, ...], ...],   # filas × columnas
+      "counts": [[12, 0, ...], ...],        # registros no nulos del field
+      "null_mask": [[0, 1, ...], ...],      # 1 = celda sin valor
+      "meta": {..., "fill_display": null}
+    }
+
+El `display` no viaja: el cliente lo formatea con `meta.aggs[*].format`
+(misma regla que `_format_display`). `fill_display` es el texto de un
+`fill_value` no numérico, que va en las celdas de cuerpo sin valor de las
+métricas no porcentuales (un `fill_value` numérico ya viene en `values`).
 """
 from __future__ import annotations
 
 import math
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel, Field
 
@@ -273,31 +303,6 @@ def _coerce_series(s: pd.Series, agg: str) -> pd.Series:
     return s
 
 
-def _agg_map(df: pd.DataFrame, group_fields: List[str], field: str, agg: str) -> Dict[tuple, Any]:
-    """`{tupla_de_keys: valor_agregado}` para `agg` de `field` agrupando por
-    `group_fields`."""
-    tmp = pd.DataFrame({f: df[f].to_numpy() for f in group_fields})
-    tmp["__v"] = _coerce_series(df[field], agg).to_numpy()
-    grouped = tmp.groupby(group_fields, dropna=True, observed=True)["__v"].agg(agg)
-    out: Dict[tuple, Any] = {}
-    single = len(group_fields) == 1
-    for k, val in grouped.items():
-        out[(k,) if single else tuple(k)] = val
-    return out
-
-
-def _count_map(df: pd.DataFrame, group_fields: List[str], field: str) -> Dict[tuple, int]:
-    """`{tupla_de_keys: conteo_no_nulos_de_field}` agrupando por `group_fields`."""
-    tmp = pd.DataFrame({f: df[f].to_numpy() for f in group_fields})
-    tmp["__v"] = df[field].to_numpy()
-    grouped = tmp.groupby(group_fields, dropna=True, observed=True)["__v"].count()
-    out: Dict[tuple, int] = {}
-    single = len(group_fields) == 1
-    for k, val in grouped.items():
-        out[(k,) if single else tuple(k)] = int(val)
-    return out
-
-
 def _scalar_agg(s: pd.Series, agg: str) -> Any:
     return getattr(_coerce_series(s, agg), agg)()
 
@@ -329,95 +334,145 @@ def _format_display(value: Any, fmt: Optional[str], agg: str) -> str:
         return str(value)
 
 
-def _make_cell(raw: Any, fmt: Optional[str], agg: str, fill_value: Any) -> PivotCell:
-    """Construye una celda a partir del valor crudo, aplicando `fill_value` si
-    falta (solo aggs no porcentuales)."""
-    value: Optional[float]
-    if raw is None or _is_nan(raw):
-        if fill_value is None:
-            return PivotCell(value=None, display="")
-        try:
-            fv = float(fill_value)
-            return PivotCell(value=fv, display=_format_display(fv, fmt, agg))
-        except (ValueError, TypeError):
-            return PivotCell(value=None, display=str(fill_value))
-    value = float(raw)
-    return PivotCell(value=value, display=_format_display(value, fmt, agg))
+def _posiciones(keys: List[tuple], grupos: pd.DataFrame) -> np.ndarray:
+    """Posición en `keys` de cada fila de `grupos` (mismas columnas, en el
+    mismo orden que los elementos de las tuplas). Sin campos → todo 0."""
+    if grupos.shape[1] == 0:
+        return np.zeros(len(grupos), dtype=np.int64)
+    indice = pd.MultiIndex.from_tuples(keys, names=list(grupos.columns))
+    return indice.get_indexer(pd.MultiIndex.from_frame(grupos))
 
 
-# ─────────────────────────────────────────────────────────────────────────
-# Cálculo por métrica
-# ─────────────────────────────────────────────────────────────────────────
+class _Agrupador:
+    """Agregaciones de un `field` sobre `dfg` ubicadas en la grilla
+    `row_keys` × `col_keys` (una matriz, un vector o un escalar según con
+    qué campos se agrupe)."""
 
+    def __init__(self, dfg: pd.DataFrame, rows: List[str], cols: List[str], field: str,
+                 row_keys: List[tuple], col_keys: List[tuple]):
+        self.dfg = dfg
+        self.rows = rows
+        self.cols = cols
+        self.field = field
+        self.row_keys = row_keys
+        self.col_keys = col_keys
+        self._claves = pd.DataFrame({f: dfg[f].to_numpy() for f in dict.fromkeys(rows + cols)})
+
+    def _serie(self, fields: List[str], agg: str) -> pd.Series:
+        tmp = self._claves[list(dict.fromkeys(fields))].copy()
+        crudo = agg == "count"
+        tmp["__v"] = (self.dfg[self.field] if crudo else _coerce_series(self.dfg[self.field], agg)).to_numpy()
+        return tmp.groupby(fields, dropna=True, observed=True)["__v"].agg(agg)
+
+    def escalar(self, agg: str) -> float:
+        if agg == "count":
+            return float(self.dfg[self.field].count())
+        return float(_scalar_agg(self.dfg[self.field], agg))
+
+    def matriz(self, agg: str) -> np.ndarray:
+        """`len(row_keys)` × `len(col_keys)`; NaN donde no hay grupo."""
+        out = np.full((len(self.row_keys), len(self.col_keys)), np.nan)
+        if not self.rows and not self.cols:
+            out[0, 0] = self.escalar(agg)
+            return out
+        serie = self._serie(self.rows + self.cols, agg)
+        grupos = serie.index.to_frame(index=False)
+        i = _posiciones(self.row_keys, grupos[self.rows])
+        j = _posiciones(self.col_keys, grupos[self.cols])
+        out[i, j] = serie.to_numpy(dtype=float)
+        return out
+
+    def vector(self, fields: List[str], keys: List[tuple], agg: str) -> np.ndarray:
+        """Uno por elemento de `keys`, agrupando por `fields`."""
+        if not fields:
+            return np.full(len(keys), self.escalar(agg))
+        out = np.full(len(keys), np.nan)
+        serie = self._serie(fields, agg)
+        out[_posiciones(keys, serie.index.to_frame(index=False))] = serie.to_numpy(dtype=float)
+        return out
+
+
+def _ratio(num: np.ndarray, den) -> np.ndarray:
+    """num / den con 0.0 donde den es 0 (los `pct_*` nunca dan NaN)."""
+    num = np.asarray(num, dtype=float)
+    den = np.broadcast_to(np.asarray(den, dtype=float), num.shape)
+    out = np.zeros(num.shape)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
 
-class _MetricCalc:
-    """Precomputa y sirve los valores (cuerpo, total-columna, total-fila,
-    esquina) de una métrica, ocultando la diferencia entre agg normal y pct."""
 
-    def __init__(self, df: pd.DataFrame, rows: List[str], cols: List[str], field: str, agg: str,
-                 want_col_total: bool, want_row_total: bool):
-        self.field = field
-        self.agg = agg
-        self.is_pct = agg in PCT_AGGS
-
-        if self.is_pct:
-            self.k_body = _count_map(df, rows + cols, field)
-            self.k_row = _count_map(df, rows, field)  # conteo por fila (todas las cols)
-            self.k_grand = int(df[field].count())
-            if cols:
-                self.k_col = _count_map(df, cols, field)  # conteo por columna (todas las filas)
-            else:
-                self.k_col = {(): self.k_grand}
+def _bloques_metrica(a: _Agrupador, agg: str, do_col_total: bool, do_row_total: bool,
+                     fill: Optional[float]) -> Dict[str, Any]:
+    """Valores y conteos de una métrica: cuerpo (R×C), columna Total (R),
+    fila Total (C) y esquina."""
+    n_body = np.nan_to_num(a.matriz("count"))
+    n_row = np.nan_to_num(a.vector(a.rows, a.row_keys, "count"))
+    n_col = np.nan_to_num(a.vector(a.cols, a.col_keys, "count"))
+    n_grand = a.escalar("count")
+
+    if agg in PCT_AGGS:
+        den_body = {"pct_row": n_row[:, None], "pct_col": n_col[None, :]}.get(agg, n_grand)
+        body = _ratio(n_body, den_body)
+        if agg == "pct_row":
+            col_total = (n_row > 0).astype(float)
         else:
-            self.body = _agg_map(df, rows + cols, field, agg)
-            self.col_total = _agg_map(df, rows, field, agg) if want_col_total else {}
-            if want_row_total:
-                self.row_total = _agg_map(df, cols, field, agg) if cols else {(): _scalar_agg(df[field], agg)}
-            else:
-                self.row_total = {}
-            self.corner = _scalar_agg(df[field], agg) if (want_col_total and want_row_total) else None
-
-    @staticmethod
-    def _ratio(num: float, den: float) -> float:
-        return (num / den) if den else 0.0
-
-    def body_value(self, r: tuple, c: tuple) -> Any:
-        if not self.is_pct:
-            return self.body.get(r + c)
-        num = self.k_body.get(r + c, 0)
-        if self.agg == "pct_row":
-            den = self.k_row.get(r, 0)
-        elif self.agg == "pct_col":
-            den = self.k_col.get(c, 0)
-        else:  # pct_total
-            den = self.k_grand
-        return self._ratio(num, den)
-
-    def col_total_value(self, r: tuple) -> Any:
-        """Columna Total (agrega todas las columnas para la fila r)."""
-        if not self.is_pct:
-            return self.col_total.get(r)
-        row_n = self.k_row.get(r, 0)
-        if self.agg == "pct_row":
-            return 1.0 if row_n else 0.0
-        # pct_col / pct_total: la fila completa sobre el gran total.
-        return self._ratio(row_n, self.k_grand)
-
-    def row_total_value(self, c: tuple) -> Any:
-        """Fila Total (agrega todas las filas para la columna c)."""
-        if not self.is_pct:
-            return self.row_total.get(c)
-        col_n = self.k_col.get(c, 0)
-        if self.agg == "pct_col":
-            return 1.0 if col_n else 0.0
-        # pct_row / pct_total: la columna completa sobre el gran total.
-        return self._ratio(col_n, self.k_grand)
-
-    def corner_value(self) -> Any:
-        """Esquina Total×Total."""
-        if not self.is_pct:
-            return self.corner
-        return 1.0 if self.k_grand else 0.0
+            col_total = _ratio(n_row, n_grand)
+        if agg == "pct_col":
+            row_total = (n_col > 0).astype(float)
+        else:
+            row_total = _ratio(n_col, n_grand)
+        corner = 1.0 if n_grand else 0.0
+    else:
+        body = a.matriz(agg)
+        if fill is not None:
+            body[np.isnan(body)] = fill
+        col_total = a.vector(a.rows, a.row_keys, agg) if do_col_total else None
+        row_total = a.vector(a.cols, a.col_keys, agg) if do_row_total else None
+        corner = a.escalar(agg) if (do_col_total and do_row_total) else np.nan
+    return {
+        "body": body, "col_total": col_total, "row_total": row_total, "corner": corner,
+        "n_body": n_body, "n_row": n_row, "n_col": n_col, "n_grand": n_grand,
+    }
+
+
+@dataclass
+class PivotColumnar:
+    """Resultado del pivote en arrays densos (ver docstring del módulo).
+
+    `values[i, j]` / `counts[i, j]` corresponden a `row_keys[i]` ×
+    `columns[j]`; NaN en `values` = celda sin valor.
+    """
+
+    row_fields: List[str]
+    col_fields: List[str]
+    columns: List[PivotColumn]
+    row_keys: List[List[str]]
+    row_is_total: List[bool]
+    values: np.ndarray
+    counts: np.ndarray
+    meta: PivotMeta
+    fill_display: Optional[str] = None
+
+    @property
+    def null_mask(self) -> np.ndarray:
+        return np.isnan(self.values)
+
+    def to_json(self) -> Dict[str, Any]:
+        mask = self.null_mask
+        valores = self.values.astype(object)
+        valores[mask] = None
+        return {
+            "format": "columnar",
+            "row_fields": list(self.row_fields),
+            "col_fields": list(self.col_fields),
+            "columns": [c.model_dump(mode="json") for c in self.columns],
+            "row_keys": self.row_keys,
+            "row_is_total": self.row_is_total,
+            "values": valores.tolist(),
+            "counts": self.counts.tolist(),
+            "null_mask": mask.astype(np.uint8).tolist(),
+            "meta": {**self.meta.model_dump(mode="json"), "fill_display": self.fill_display},
+        }
 
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -425,19 +480,25 @@ class _MetricCalc:
 # ─────────────────────────────────────────────────────────────────────────
 
 
-def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult:
-    """Calcula un pivote declarativo sobre `df`.
+def _fill_numerico(fill_value: Any) -> Tuple[Optional[float], Optional[str]]:
+    """(fill numérico, texto de fill no numérico)."""
+    if fill_value is None:
+        return None, None
+    try:
+        return float(fill_value), None
+    except (ValueError, TypeError):
+        return None, str(fill_value)
 
-    Args:
-        df: DataFrame de origen (ya cargado; el motor no toca DB/IO).
-        spec: `PivotSpec` o dict con la misma forma.
 
-    Returns:
-        `PivotResult` serializable a JSON.
+def pivot_columnar(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotColumnar:
+    """Calcula el pivote de `spec` sobre `df` en formato columnar.
+
+    Misma semántica que `pivot` (totales, porcentajes, NaN, orden); ver la
+    sección "Formato columnar" del docstring del módulo.
 
     Raises:
         ValueError: si algún campo de `rows`/`cols`/`values` no existe en
-            `df` (mensaje con los campos faltantes y las columnas disponibles).
+            `df`.
     """
     spec = _coerce_spec(spec)
     rows = list(spec.rows)
@@ -457,6 +518,7 @@ def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult:
     n_source_rows = int(len(df))
     do_col_total = spec.totals.cols and len(cols) > 0
     do_row_total = spec.totals.rows
+    fill_num, fill_texto = _fill_numerico(spec.fill_value)
 
     meta = PivotMeta(
         n_source_rows=n_source_rows,
@@ -467,7 +529,11 @@ def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult:
 
     # DataFrame vacío → resultado vacío pero válido.
     if n_source_rows == 0:
-        return PivotResult(row_fields=rows, col_fields=cols, columns=[], rows=[], meta=meta)
+        return PivotColumnar(
+            row_fields=rows, col_fields=cols, columns=[], row_keys=[], row_is_total=[],
+            values=np.empty((0, 0)), counts=np.empty((0, 0), dtype=np.int64), meta=meta,
+            fill_display=fill_texto,
+        )
 
     # Descartar filas con NaN en dimensiones de agrupación (coherencia de keys
     # y totales). n_source_rows ya quedó con el largo original.
@@ -476,59 +542,90 @@ def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult:
 
     row_keys = _ordered_keys(dfg, rows, spec.order)
     col_keys = _ordered_keys(dfg, cols, spec.order)  # [()] si no hay cols
-
-    calcs = [
-        _MetricCalc(dfg, rows, cols, v.field, v.agg, do_col_total, do_row_total)
-        for v in values
-    ]
+    n_r, n_c, n_m = len(row_keys), len(col_keys), len(values)
 
     # ── Columnas: (combinación de columna) × (métrica), + columnas Total ──
     columns: List[PivotColumn] = []
-    # col_plan: lista de (tipo, metric_idx, col_key) alineada con `columns`.
-    col_plan: List[Tuple[str, int, Optional[tuple]]] = []
     for c in col_keys:
-        for i, v in enumerate(values):
+        for v in values:
             columns.append(PivotColumn(
                 keys=[_keystr(x) for x in c],
                 field=v.field, agg=v.agg, label=v.display_label(), is_total=False,
             ))
-            col_plan.append(("body", i, c))
     if do_col_total:
-        for i, v in enumerate(values):
+        for v in values:
             columns.append(PivotColumn(
                 keys=[total_label],
                 field=v.field, agg=v.agg, label=v.display_label(), is_total=True,
             ))
-            col_plan.append(("coltotal", i, None))
 
-    # ── Filas de datos ──
-    out_rows: List[PivotRow] = []
-    for r in row_keys:
-        cells: List[PivotCell] = []
-        for kind, i, c in col_plan:
-            v = values[i]
-            if kind == "body":
-                raw = calcs[i].body_value(r, c)
-                fill = None if v.is_pct() else spec.fill_value
-                cells.append(_make_cell(raw, v.format, v.agg, fill))
-            else:  # coltotal
-                raw = calcs[i].col_total_value(r)
-                cells.append(_make_cell(raw, v.format, v.agg, None))
-        out_rows.append(PivotRow(keys=[_keystr(x) for x in r], cells=cells, is_total=False))
-
-    # ── Fila Total ──
+    # ── Matrices: cuerpo en [:n_r, :n_c*n_m] (métrica i en las columnas
+    # i, i+n_m, …), columnas Total al final, fila Total abajo ──
+    forma = (n_r + (1 if do_row_total else 0), len(columns))
+    valores = np.full(forma, np.nan)
+    conteos = np.zeros(forma, dtype=np.int64)
+    cuerpo = slice(None, n_c * n_m)
+    for i, v in enumerate(values):
+        a = _Agrupador(dfg, rows, cols, v.field, row_keys, col_keys)
+        b = _bloques_metrica(a, v.agg, do_col_total, do_row_total, None if v.is_pct() else fill_num)
+        valores[:n_r, cuerpo][:, i::n_m] = b["body"]
+        conteos[:n_r, cuerpo][:, i::n_m] = b["n_body"]
+        if do_col_total:
+            valores[:n_r, n_c * n_m + i] = b["col_total"]
+            conteos[:n_r, n_c * n_m + i] = b["n_row"]
+        if do_row_total:
+            valores[n_r, cuerpo][i::n_m] = b["row_total"]
+            conteos[n_r, cuerpo][i::n_m] = b["n_col"]
+            if do_col_total:
+                valores[n_r, n_c * n_m + i] = b["corner"]
+                conteos[n_r, n_c * n_m + i] = b["n_grand"]
+
+    row_keys_str = [[_keystr(x) for x in r] for r in row_keys]
+    row_is_total = [False] * n_r
     if do_row_total:
-        cells = []
-        for kind, i, c in col_plan:
-            v = values[i]
-            if kind == "body":
-                raw = calcs[i].row_total_value(c)
-            else:  # esquina Total×Total
-                raw = calcs[i].corner_value()
-            cells.append(_make_cell(raw, v.format, v.agg, None))
-        out_rows.append(PivotRow(keys=[total_label], cells=cells, is_total=True))
+        row_keys_str.append([total_label])
+        row_is_total.append(True)
+
+    return PivotColumnar(
+        row_fields=rows, col_fields=cols, columns=columns, row_keys=row_keys_str,
+        row_is_total=row_is_total, values=valores, counts=conteos, meta=meta,
+        fill_display=fill_texto,
+    )
+
 
-    return PivotResult(row_fields=rows, col_fields=cols, columns=columns, rows=out_rows, meta=meta)
+def pivot(df: pd.DataFrame, spec: PivotSpec | dict) -> PivotResult:
+    """Calcula un pivote declarativo sobre `df`.
+
+    Args:
+        df: DataFrame de origen (ya cargado; el motor no toca DB/IO).
+        spec: `PivotSpec` o dict con la misma forma.
+
+    Returns:
+        `PivotResult` serializable a JSON (celdas con `display` ya
+        formateado; para Excel/PDF). El dashboard usa `pivot_columnar`.
+
+    Raises:
+        ValueError: si algún campo de `rows`/`cols`/`values` no existe en
+            `df` (mensaje con los campos faltantes y las columnas disponibles).
+    """
+    columnar = pivot_columnar(df, spec)
+    body_col = [not c.is_total for c in columnar.columns]
+    # Las columnas alternan métricas (métrica = j % n_métricas).
+    formatos = [a["format"] for a in columnar.meta.aggs]
+    out_rows: List[PivotRow] = []
+    for keys, is_total, fila in zip(columnar.row_keys, columnar.row_is_total, columnar.values):
+        cells: List[PivotCell] = []
+        for j, (col, raw) in enumerate(zip(columnar.columns, fila.tolist())):
+            if math.isnan(raw):
+                texto = columnar.fill_display if (body_col[j] and not is_total and col.agg not in PCT_AGGS) else None
+                cells.append(PivotCell(value=None, display=texto or ""))
+            else:
+                cells.append(PivotCell(value=raw, display=_format_display(raw, formatos[j % len(formatos)], col.agg)))
+        out_rows.append(PivotRow(keys=keys, cells=cells, is_total=is_total))
+    return PivotResult(
+        row_fields=columnar.row_fields, col_fields=columnar.col_fields,
+        columns=columnar.columns, rows=out_rows, meta=columnar.meta,
+    )
 
 
 def pivot_to_dataframe(result: PivotResult) -> pd.DataFrame:
@@ -595,7 +692,9 @@ def pivot_to_dataframe(result: PivotResult) -> pd.DataFrame:
 
 __all__ = [
     "pivot",
+    "pivot_columnar",
     "pivot_to_dataframe",
+    "PivotColumnar",
     "PivotResult",
     "PivotColumn",
     "PivotRow",
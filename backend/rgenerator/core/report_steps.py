@@ -24,7 +24,6 @@ from typing import Optional, Dict, List
 
 # Importaciones internas de RGenerator
 from .step import Step
-from ..reports.filtering import matches
 from backend.config import REPORTS_TEMPLATES_DIR
 
 
@@ -584,11 +583,12 @@ def _build_records(
     los componentes de conteo puedan distinguir filas de métricas distintas
     que comparten nombre de columna. Ver `filtrar_records_por_metrica`.
 
-    filters: dict opcional {id_dimension_str: valor} — se aplica sobre
-        dimensions_json de cada MetricData antes de proyectar el record.
+    filters: dict opcional {id_dimension_str: valor} — se compila a SQL
+        sobre dimensions_json (`metric_store.filtro_dimensiones_sql`).
         Mismo contrato que GET /api/results/indicator/{id}/data?filters=...
     """
-    from backend.models import IndicatorMetric, Metric, MetricDimension, MetricData, Dimension
+    from backend.metric_store import columnas_cacheadas, columnas_por_campo, registros
+    from backend.models import IndicatorMetric, Metric, MetricDimension, Dimension
 
     metric_links = db.query(IndicatorMetric).filter(
         IndicatorMetric.id_indicator == indicator.id_indicator
@@ -628,55 +628,19 @@ def _build_records(
             pass
 
         dim_links = db.query(MetricDimension).filter(MetricDimension.id_metric == mid).all()
-        dim_ids = [lnk.id_dimension for lnk in dim_links]
-
-        data_rows = db.query(MetricData).filter(MetricData.id_metric == mid).all()
-        for row in data_rows:
-            try:
-                dims_json = json.loads(row.dimensions_json) if isinstance(row.dimensions_json, str) else (row.dimensions_json or {})
-            except Exception:
-                dims_json = {}
-
-            if filters and not all(
-                matches(dims_json.get(fk, ""), fv)
-                for fk, fv in filters.items()
-            ):
-                continue
-
-            rec = {}
-            # Value fields
-            raw_val = row.value
-            if meta_fields:
-                try:
-                    parsed = json.loads(raw_val) if isinstance(raw_val, str) else raw_val
-                    if isinstance(parsed, dict):
-                        for f in meta_fields:
-                            fname = _to_field_name(f['name'])
-                            rec[fname] = parsed.get(f['name'])
-                    else:
-                        key = _to_field_name(meta_fields[0]['name']) if meta_fields else _to_field_name(m.name)
-                        rec[key] = parsed
-                except Exception:
-                    key = _to_field_name(m.name)
-                    rec[key] = raw_val
-            else:
-                key = _to_field_name(m.name)
-                try:
-                    rec[key] = float(raw_val) if raw_val is not None else None
-                except (ValueError, TypeError):
-                    rec[key] = raw_val
-
-            # Dimension fields
-            for did in dim_ids:
-                dim = dims_by_id.get(did)
-                if dim:
-                    dkey = _to_field_name(dim.name)
-                    rec[dkey] = dims_json.get(str(did))
+        dims_metrica = [
+            (lnk.id_dimension, dims_by_id[lnk.id_dimension].name)
+            for lnk in dim_links if lnk.id_dimension in dims_by_id
+        ]
 
-            # Métrica de origen (clave técnica, no de negocio).
-            rec[METRIC_ID_KEY] = mid
+        # Copia columnar materializada (cacheada por proceso): sin ORM ni
+        # json.loads por fila. Los filtros van a SQL: solo se leen las
+        # filas que calzan con TODOS (clave ausente → "").
+        col = columnas_cacheadas(db, m, filters)
 
-            records.append(rec)
+        columnas = columnas_por_campo(col, m, meta_fields, dims_metrica, _to_field_name)
+        # Métrica de origen (clave técnica, no de negocio).
+        records.extend(registros(columnas, col.n_rows, extra={METRIC_ID_KEY: mid}))
 
     return records
 
@@ -712,8 +676,37 @@ def _natural_sort_key(s):
             for p in re.split(r'(\d+)', s)]
 
 
-def _chart_to_png_b64(item: dict, records: list[dict], indicator=None) -> str:
-    """Renderiza un componente del dashboard como PNG base64 usando matplotlib."""
+def _chart_to_png_b64(item: dict, records: list[dict], indicator=None,
+                      huella_records: Optional[str] = None) -> str:
+    """Renderiza un componente del dashboard como PNG base64 usando matplotlib.
+
+    Pasa por el cache de imágenes (`reports/chart_cache.py`): el mismo
+    componente sobre los mismos records y la misma config del indicador no
+    se vuelve a dibujar. `huella_records` evita re-hashear los records
+    cuando el llamador dibuja varios componentes sobre la misma lista.
+    """
+    import base64
+    from ..reports.chart_cache import chart_images, clave_grafico, huella_json, version_codigo
+
+    config_indicador = None
+    if indicator is not None:
+        config_indicador = [
+            getattr(indicator, attr, None)
+            for attr in ('column_roles', 'role_formats', 'temporal_config', 'achievement_levels')
+        ]
+    clave = clave_grafico(
+        'v1', item, huella_records or huella_json(records), huella_json(config_indicador),
+        version_codigo(__file__),
+    )
+    png = chart_images.obtener(clave)
+    if png is None:
+        png = base64.b64decode(_render_chart_png_b64(item, records, indicator))
+        chart_images.guardar(clave, png)
+    return base64.b64encode(png).decode()
+
+
+def _render_chart_png_b64(item: dict, records: list[dict], indicator=None) -> str:
+    """Dibuja el componente con matplotlib (sin cache, ver `_chart_to_png_b64`)."""
     import io, base64
     import matplotlib
     matplotlib.use('Agg')
@@ -1593,12 +1586,10 @@ def build_pdf_bytes(
         `indicator.pdf_layout` (ej: `pdf_layout_historico`). Si se pasa,
         este reemplaza completamente al layout persistido para esta
         generación (no se muta el indicator).
-    """
-    import locale
-    from datetime import date
-    from jinja2 import Environment, FileSystemLoader
-    from weasyprint import HTML as WeasyprintHTML
 
+    Dentro de `reports.lote.en_lote()` devuelve un `RenderPendiente` en
+    lugar de los bytes: se prepara acá (DB) y se renderiza en el pool.
+    """
     if pdf_layout_override is not None:
         pdf_layout = pdf_layout_override
     else:
@@ -1699,6 +1690,46 @@ def build_pdf_bytes(
     from ..reports.branding import formatear_filtros
     filters_label = formatear_filtros(_etiquetas_de_filtros(db, filters))
 
+    # Hasta acá todo lo que lee la DB. En un lote el render se difiere y
+    # corre en otro proceso (`reports/lote.py`), sin la sesión.
+    from ..reports.lote import RenderPendiente, lote_activo
+    contexto = {
+        'pdf_layout': pdf_layout, 'records': records, 'org_name': org_name,
+        'branding': branding, 'filters_label': filters_label,
+    }
+    if lote_activo():
+        return RenderPendiente(_render_pdf_layout, {'indicator': _indicador_sin_sesion(indicator), **contexto})
+    return _render_pdf_layout(indicator, **contexto)
+
+
+def _indicador_sin_sesion(indicator):
+    """Las columnas del indicador como objeto plano: el render solo lee
+    columnas (`column_roles`, `role_formats`…) y así viaja a otro proceso."""
+    from types import SimpleNamespace
+    from sqlalchemy import inspect as sa_inspect
+
+    return SimpleNamespace(**{
+        attr.key: getattr(indicator, attr.key)
+        for attr in sa_inspect(indicator).mapper.column_attrs
+    })
+
+
+def _render_pdf_layout(
+    indicator,
+    pdf_layout: Dict[str, object],
+    records: list[dict],
+    org_name: str,
+    branding: Dict[str, object],
+    filters_label: str,
+) -> bytes:
+    """Secciones + Jinja2 + WeasyPrint del informe de `build_pdf_bytes`;
+    no usa la DB."""
+    from datetime import date
+    from jinja2 import Environment, FileSystemLoader
+    from weasyprint import HTML as WeasyprintHTML
+
+    raw_sections = pdf_layout.get('sections', [])
+
     # Si el layout declara `title` (sin sección cover explícita), inyectar
     # un encabezado minimalista al inicio del documento — al estilo LaTeX:
     # h1 grande centrado + subtítulo + filtros, sin portada con gradientes.
@@ -1709,6 +1740,13 @@ def build_pdf_bytes(
     # Renderizar cada sección
     rendered = []
 
+    # Huella de los records para la clave del cache de gráficos: una vez por
+    # informe, no una por componente.
+    huella_records = None
+    if any(s.get('type') == 'chart' for s in raw_sections):
+        from ..reports.chart_cache import huella_json
+        huella_records = huella_json(records)
+
     # Inyectar page_title si corresponde (antes de la primera sección)
     if layout_title and not has_cover_section:
         rendered.append({
@@ -1718,7 +1756,9 @@ def build_pdf_bytes(
             'filters_label': filters_label,
         })
 
-    for sec in raw_sections:
+    from ..reports.progreso import reportar
+
+    for n_sec, sec in enumerate(raw_sections, start=1):
         t = sec.get('type')
         if t == 'cover':
             rendered.append({'type': 'cover', 'title': sec.get('title', indicator.name),
@@ -1732,7 +1772,8 @@ def build_pdf_bytes(
                              'body': sec.get('body', '')})
         elif t == 'chart':
             item = sec.get('item', {})
-            b64 = _chart_to_png_b64(item, records, indicator=indicator)
+            b64 = _chart_to_png_b64(item, records, indicator=indicator,
+                                    huella_records=huella_records)
             rendered.append({'type': 'chart', 'heading': sec.get('heading', ''),
                              'image_b64': b64, 'caption': sec.get('caption', '')})
         elif t == 'table':
@@ -1740,6 +1781,7 @@ def build_pdf_bytes(
             tdata = _table_section(item, records, indicator=indicator)
             rendered.append({'type': 'table', 'heading': sec.get('heading', ''),
                              'columns': tdata['columns'], 'rows': tdata['rows']})
+        reportar(n_sec, len(raw_sections))
 
     # Jinja2
     templates_dir = Path(__file__).parent.parent / 'templates'
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, ClassVar, Dict, List, Optional
 
 from backend.logging_config import get_logger
 
@@ -56,12 +56,30 @@ class Step:
     params: Dict[str, Any] = field(default_factory=dict)
     logs: List[str] = field(default_factory=list)
 
+    # Ejecución concurrente (`tooling/dag_tools.py`): un paso con
+    # `parallel_safe` y `produces` declarados puede correr en un hilo junto
+    # a los pasos vecinos que no dependen de él. Debe leer solo lo que
+    # declara en `requires` y no modificar artifacts ajenos. Los pasos con
+    # el mismo `exclusive` (ej. "db") nunca corren a la vez.
+    parallel_safe: ClassVar[bool] = False
+    exclusive: ClassVar[Optional[str]] = None
+
     def validate(self, ctx: "RunContext") -> None:
         """Chequeos simples antes de correr el paso."""
         missing = [k for k in self.requires if k not in ctx.artifacts]
         if missing:
             raise ValueError(f"Step '{self.name}' requiere artifacts faltantes: {missing}")
 
+    def has_new_inputs(self, ctx: "RunContext") -> bool:
+        """True si el paso tiene entradas externas nuevas desde la última
+        corrida (ej. archivos recién subidos).
+
+        Al reanudar un pipeline fallido, un paso con la misma config y el
+        mismo estado de entrada se salta y se restaura su checkpoint; las
+        entradas que no están en el contexto se declaran acá.
+        """
+        return False
+
     def run(self, ctx: "RunContext") -> None:
         """Ejecuta el paso.
 
@@ -0,0 +1,243 @@
+"""Cache de imágenes de gráficos, direccionado por contenido.
+
+Cada gráfico de un informe es un render matplotlib a 300 DPI. Un mismo
+indicador se exporta muchas veces con los mismos datos (re-exports, lotes
+por curso, el PDF después del Word): sin cache se repite todo el trabajo
+de matplotlib para secciones que no cambiaron.
+
+La clave es un sha256 de (función, params, huella de los datos de entrada,
+versión del código que dibuja). Dos niveles:
+
+  - memoria: LRU por bytes (`CHART_CACHE_MEMORY_MB`), por proceso;
+  - disco: `data/chart_cache/<ab>/<clave>.png`, compartido entre workers y
+    reinicios, acotado por `CHART_CACHE_DISK_MB` (se podan los más viejos).
+
+`CHART_CACHE_ENABLED=0` lo apaga (los tests lo apagan para que los espías
+sobre matplotlib vean cada render).
+
+Uso:
+
+    from backend.rgenerator.reports.chart_cache import chart_images, clave_grafico
+    clave = clave_grafico("v2", fn_name, params, huella_dataframe(df))
+    png = chart_images.obtener(clave)
+    if png is None:
+        png = render(...)
+        chart_images.guardar(clave, png)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+
+from backend.config import CHART_CACHE_DIR
+
+try:  # el logger del backend no está disponible en usos standalone del paquete
+    from backend.logging_config import get_logger
+    logger = get_logger(__name__)
+except Exception:  # pragma: no cover — fallback defensivo
+    import logging
+    logger = logging.getLogger(__name__)
+
+CHART_CACHE_ENABLED = os.getenv("CHART_CACHE_ENABLED", "1") != "0"
+CHART_CACHE_MEMORY_BYTES = int(os.getenv("CHART_CACHE_MEMORY_MB", "64")) * 1024 * 1024
+CHART_CACHE_DISK_BYTES = int(os.getenv("CHART_CACHE_DISK_MB", "512")) * 1024 * 1024
+
+# Cada cuántas escrituras a disco se revisa el tope del directorio.
+_PODAR_CADA = 50
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Claves
+# ─────────────────────────────────────────────────────────────────────────
+
+# id(df) → (weakref(df), huella). Un mismo DataFrame alimenta muchas
+# secciones de un informe (18 cursos × N gráficos): se hashea una vez.
+_huellas: dict[int, tuple] = {}
+_huellas_lock = threading.Lock()
+
+
+def huella_dataframe(df: pd.DataFrame) -> Optional[str]:
+    """sha256 del contenido de `df` (valores, índice, columnas y dtypes).
+
+    None si no se puede hashear (celdas no hasheables): el llamador no
+    cachea ese gráfico. Asume que `df` no se muta después de hashearlo,
+    como los DataFrames que recibe el motor de informes.
+    """
+    with _huellas_lock:
+        previa = _huellas.get(id(df))
+        if previa is not None and previa[0]() is df:
+            return previa[1]
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    except Exception:
+        try:
+            h.update(df.to_json(orient="split", date_format="iso", default_handler=str).encode("utf-8"))
+        except Exception:
+            return None
+    huella = h.hexdigest()
+    try:
+        ref = weakref.ref(df, lambda _r, k=id(df): _huellas.pop(k, None))
+    except TypeError:
+        return huella
+    with _huellas_lock:
+        _huellas[id(df)] = (ref, huella)
+    return huella
+
+
+def huella_json(obj: Any) -> Optional[str]:
+    """sha256 de `obj` serializado a JSON canónico (records, configs)."""
+    try:
+        texto = json.dumps(obj, sort_keys=True, default=str, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+_versiones_codigo: dict[str, str] = {}
+
+
+def version_codigo(*paths: str | Path) -> str:
+    """Hash del fuente de los módulos que dibujan: un deploy que cambia un
+    gráfico invalida sus imágenes en disco."""
+    clave = "|".join(str(p) for p in paths)
+    version = _versiones_codigo.get(clave)
+    if version is None:
+        h = hashlib.sha256()
+        for p in paths:
+            try:
+                h.update(Path(p).read_bytes())
+            except OSError:
+                h.update(str(p).encode("utf-8"))
+        version = _versiones_codigo[clave] = h.hexdigest()[:16]
+    return version
+
+
+def clave_grafico(*partes: Any) -> Optional[str]:
+    """Clave del cache a partir de sus partes; None si alguna es None
+    (p.ej. una huella que no se pudo calcular)."""
+    if any(p is None for p in partes):
+        return None
+    return huella_json(list(partes))
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cache de dos niveles
+# ─────────────────────────────────────────────────────────────────────────
+
+class ChartImageCache:
+    """PNGs por clave: LRU en memoria + directorio en disco."""
+
+    def __init__(
+        self,
+        directorio: Path = CHART_CACHE_DIR,
+        max_bytes_memoria: int = CHART_CACHE_MEMORY_BYTES,
+        max_bytes_disco: int = CHART_CACHE_DISK_BYTES,
+        habilitado: bool = CHART_CACHE_ENABLED,
+    ):
+        self.directorio = Path(directorio)
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.habilitado = habilitado
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._escrituras = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}.png"
+
+    def obtener(self, clave: Optional[str]) -> Optional[bytes]:
+        """PNG de `clave` (memoria, luego disco); None en un miss."""
+        if not self.habilitado or clave is None:
+            return None
+        with self._lock:
+            png = self._memoria.get(clave)
+            if png is not None:
+                self._memoria.move_to_end(clave)
+                self.hits += 1
+                return png
+        png = None
+        if self.max_bytes_disco > 0:
+            try:
+                png = self._ruta(clave).read_bytes()
+            except OSError:
+                png = None
+        with self._lock:
+            if png is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._en_memoria(clave, png)
+        return png
+
+    def guardar(self, clave: Optional[str], png: bytes) -> None:
+        """Guarda `png` en ambos niveles. Un fallo de disco no rompe nada."""
+        if not self.habilitado or clave is None or not png:
+            return
+        with self._lock:
+            self._en_memoria(clave, png)
+            self._escrituras += 1
+            podar = self._escrituras % _PODAR_CADA == 0
+        if self.max_bytes_disco <= 0:
+            return
+        ruta = self._ruta(clave)
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            tmp = ruta.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(png)
+            os.replace(tmp, ruta)
+        except OSError:
+            logger.warning("No se pudo escribir el gráfico cacheado %s", ruta, exc_info=True)
+            return
+        if podar:
+            self.podar_disco()
+
+    def podar_disco(self) -> None:
+        """Borra los PNG más viejos hasta quedar bajo `max_bytes_disco`."""
+        try:
+            archivos = [(p.stat().st_mtime, p.stat().st_size, p) for p in self.directorio.glob("*/*.png")]
+        except OSError:
+            return
+        total = sum(a[1] for a in archivos)
+        for _, size, p in sorted(archivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                continue
+
+    def limpiar_memoria(self) -> None:
+        with self._lock:
+            self._memoria.clear()
+            self._bytes = 0
+
+    # Con el lock tomado
+    def _en_memoria(self, clave: str, png: bytes) -> None:
+        previo = self._memoria.pop(clave, None)
+        if previo is not None:
+            self._bytes -= len(previo)
+        if len(png) > self.max_bytes_memoria:
+            return
+        self._memoria[clave] = png
+        self._bytes += len(png)
+        while self._bytes > self.max_bytes_memoria and self._memoria:
+            _, viejo = self._memoria.popitem(last=False)
+            self._bytes -= len(viejo)
+
+
+#: Instancia única del proceso.
+chart_images = ChartImageCache()
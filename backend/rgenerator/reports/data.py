@@ -6,10 +6,11 @@ los esquemas (simce/dia) declaran ("Curso", "Logro", "Eje Temático", ...).
 
 Estrategia:
     1) Iterar `IndicatorMetric` para conocer las metrics asociadas.
-    2) Para cada metric, cargar su `MetricData` y construir 1 row por record:
-       - value field(s): parseado de `value` JSON (con `meta_json.fields` para
+    2) Para cada metric, leer su copia columnar (`backend/metric_store.py`)
+       y proyectar 1 row por record:
+       - value field(s): los fields de `value` (con `meta_json.fields` para
          multi-valor).
-       - dimension fields: parseados de `dimensions_json` y resueltos vía
+       - dimension fields: las columnas de `dimensions_json` resueltas vía
          `Dimension.name`.
     3) Renombrar columnas `_logro` → "Logro", aplicando overrides para
        tildes y mayúsculas (ej `_eje_tematico` → "Eje Temático").
@@ -28,15 +29,17 @@ from typing import Any
 import pandas as pd
 from sqlalchemy.orm import Session
 
+from backend.metric_store import columnas_cacheadas, columnas_por_campo, registros
 from backend.models import (
     Dimension,
     Indicator,
     IndicatorMetric,
     Metric,
-    MetricData,
     MetricDimension,
 )
 
+from .lote import dataframes_memorizados
+
 
 # ─────────────────────────────────────────────────────────────────────────
 # Conversión de nombres DB → nombres canónicos del LaTeX
@@ -128,8 +131,9 @@ def _records_for_metric(
         db: sesión SQLAlchemy.
         metric: Metric ORM instance.
         org_id: para multi-tenancy.
-        filtros: dict {nombre_columna_humano: valor} aplicado AL FINAL,
-            después de construir cada record (ej {"Asignatura": "LENGUAJE"}).
+        filtros: dict {nombre_columna_humano: valor} (ej {"Asignatura":
+            "LENGUAJE"}). Los que apuntan a dimensiones de la metric se
+            resuelven en SQL; el resto, después de construir cada record.
 
     Returns:
         Lista de dicts con keys `_field_name` (todavía con prefijo `_` —
@@ -151,54 +155,33 @@ def _records_for_metric(
         dims = db.query(Dimension).filter(Dimension.id_dimension.in_(dim_ids)).all()
         dims_by_id = {d.id_dimension: d for d in dims}
 
-    # 3) MetricData filtrado por org
-    data_rows = db.query(MetricData).filter(
-        MetricData.id_metric == metric.id_metric,
-        MetricData.org_id == org_id,
-    ).all()
-
-    records: list[dict] = []
-    for row in data_rows:
-        try:
-            dims_json = json.loads(row.dimensions_json) if isinstance(row.dimensions_json, str) else (row.dimensions_json or {})
-        except Exception:
-            dims_json = {}
-
-        rec: dict[str, Any] = {}
-
-        # Value fields
-        raw_val = row.value
-        if meta_fields:
-            try:
-                parsed = json.loads(raw_val) if isinstance(raw_val, str) else raw_val
-                if isinstance(parsed, dict):
-                    for f in meta_fields:
-                        fname = _to_field_name(f["name"])
-                        rec[fname] = parsed.get(f["name"])
-                else:
-                    key = _to_field_name(meta_fields[0]["name"]) if meta_fields else _to_field_name(metric.name)
-                    rec[key] = parsed
-            except Exception:
-                key = _to_field_name(metric.name)
-                rec[key] = raw_val
+    # 3) Datos de la metric desde la copia columnar materializada, vía el
+    #    cache de frames del proceso (si un dashboard ya la leyó, no toca la
+    #    DB). La metric debe ser de la org.
+    if metric.org_id != org_id:
+        return []
+    dims = [(did, dims_by_id[did].name) for did in dim_ids if did in dims_by_id]
+
+    # Los filtros sobre dimensiones de la metric se empujan a SQL (solo se
+    # leen esas filas); el resto (fields del value) se aplica abajo.
+    dim_por_clave = {_to_field_name(name): did for did, name in dims}
+    filtros_dim: dict[str, Any] = {}
+    resto: dict[str, Any] = {}
+    for fk, fv in (filtros or {}).items():
+        did = dim_por_clave.get(_to_field_name(fk))
+        if did is not None and str(did) not in filtros_dim:
+            filtros_dim[str(did)] = fv
         else:
-            key = _to_field_name(metric.name)
-            try:
-                rec[key] = float(raw_val) if raw_val is not None else None
-            except (ValueError, TypeError):
-                rec[key] = raw_val
-
-        # Dimension fields (key = nombre de la dimensión, no su id)
-        for did in dim_ids:
-            dim = dims_by_id.get(did)
-            if dim:
-                dkey = _to_field_name(dim.name)
-                rec[dkey] = dims_json.get(str(did))
-
-        records.append(rec)
-
-    # 4) Filtros (después de armar records — operan sobre los nombres humanos).
-    # Soporta multi-valor desde B9: cuando fv es list/tuple, hace IN.
+            resto[fk] = fv
+    filtros = resto
+
+    col = columnas_cacheadas(db, metric, filtros_dim)
+    columnas = columnas_por_campo(col, metric, meta_fields, dims, _to_field_name)
+    records = registros(columnas, col.n_rows)
+
+    # 4) Filtros restantes (después de armar records — operan sobre los
+    # nombres humanos). Soporta multi-valor desde B9: cuando fv es
+    # list/tuple, hace IN.
     def _matches(actual, expected):
         if isinstance(expected, (list, tuple, set)):
             allowed = {str(v) for v in expected}
@@ -252,7 +235,22 @@ def cargar_dataframes_indicator(
 
     Raises:
         ValueError: si el Indicator no existe o no tiene metrics asociadas.
+
+    Dentro de `lote.en_lote()` la carga se hace una sola vez por filtros
+    y las llamadas siguientes reciben copias (ver `reports/lote.py`).
     """
+    return dataframes_memorizados(
+        indicator_id, org_id, filtros,
+        lambda: _cargar_dataframes_indicator(db, indicator_id, org_id, filtros),
+    )
+
+
+def _cargar_dataframes_indicator(
+    db: Session,
+    indicator_id: int,
+    org_id: int,
+    filtros: dict[str, Any] | None,
+) -> dict[str, pd.DataFrame]:
     indicator = (
         db.query(Indicator)
         .filter(Indicator.id_indicator == indicator_id, Indicator.org_id == org_id)
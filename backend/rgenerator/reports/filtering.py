@@ -5,6 +5,11 @@ el dashboard (/api/results) manda listas multi-valor; los llamados
 programáticos pueden mandar escalares. Cualquier motor de informes debe
 filtrar con `matches` para que el PDF/Word refleje exactamente lo que el
 usuario ve en pantalla (QA maestro P0-1, hallazgo informes H1).
+
+Los loaders que leen de `metric_data` no filtran con `matches` fila a
+fila: compilan la misma semántica a SQL con
+`backend.metric_store.filtro_dimensiones_sql` (o `filtrar_columnas` en
+memoria).
 """
 from __future__ import annotations
 
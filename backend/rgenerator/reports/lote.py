@@ -0,0 +1,214 @@
+"""Generación en lote: N informes del mismo indicador en una sola pasada.
+
+Un cierre de semestre son 18 PDFs del mismo indicador, uno por curso. Cada
+export independiente vuelve a cargar el histórico completo del indicador
+(`cargar_dataframes_indicator` sin filtros lo piden tanto el resolver de
+períodos como los módulos del motor único) para quedarse después con un
+solo curso, y renderiza sus PDFs uno detrás de otro.
+
+El lote se hace en dos fases:
+
+  1. Preparación, en el thread del request (es la que usa la sesión de
+     DB): por rebanada se resuelven filtros y período, se cargan los
+     DataFrames y se calculan las derived_fields. Dentro de `en_lote()` las
+     cargas se memorizan por `(indicator_id, org_id, filtros)`: la primera
+     rebanada lee la DB y las demás reciben una copia de lo ya armado. Las
+     derived_fields se calculan por rebanada, sobre las filas de esa
+     rebanada (el recorte estructural va antes, como en un export suelto):
+     sumadas, son una pasada sobre los datos y el resultado es idéntico al
+     de los exports sueltos.
+  2. Render: dentro de `en_lote()` los motores (`runtime.construir_pdf`,
+     `report_steps.build_pdf_bytes`) no renderizan; devuelven un
+     `RenderPendiente` con los DataFrames/records ya derivados. `renderizar`
+     los reparte en el pool de procesos de `runtime.py` mientras se prepara
+     la rebanada siguiente, y entrega cada PDF apenas termina.
+
+El memo y el modo diferido viven en un ContextVar: fuera de `en_lote()`
+(o en otro thread) todo se comporta igual que siempre.
+
+Uso:
+
+    with en_lote():
+        preparados = ((nombre, generar(..., filtros=f)) for nombre, f in rebanadas)
+        escribir_zip(destino, renderizar(preparados))
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, TypeVar, Union
+
+import pandas as pd
+
+from .chart_cache import huella_json
+from .progreso import reportando
+
+try:  # el logger del backend no está disponible en usos standalone del paquete
+    from backend.logging_config import get_logger
+    logger = get_logger(__name__)
+except Exception:  # pragma: no cover — fallback defensivo
+    import logging
+    logger = logging.getLogger(__name__)
+
+Dataframes = dict[str, pd.DataFrame]
+K = TypeVar("K")
+
+_memo: ContextVar[Optional[dict]] = ContextVar("lote_informes", default=None)
+
+
+@contextmanager
+def en_lote() -> Iterator[None]:
+    """Activa el memo de cargas y el render diferido mientras dure el bloque."""
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+def lote_activo() -> bool:
+    return _memo.get() is not None
+
+
+def dataframes_memorizados(
+    indicator_id: int,
+    org_id: int,
+    filtros: dict[str, Any] | None,
+    cargar: Callable[[], Dataframes],
+) -> Dataframes:
+    """`cargar()` una sola vez por lote para los mismos argumentos.
+
+    Cada llamada recibe copias: los informes agregan columnas a sus
+    DataFrames y no deben verse entre rebanadas. Sin lote activo, o con
+    filtros no serializables, delega directo en `cargar()`. Las excepciones
+    de `cargar` no se memorizan.
+    """
+    memo = _memo.get()
+    huella = huella_json(filtros or {}) if memo is not None else None
+    if huella is None:
+        return cargar()
+    clave = (indicator_id, org_id, huella)
+    if clave not in memo:
+        memo[clave] = cargar()
+    return {rol: df.copy() for rol, df in memo[clave].items()}
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Render en paralelo
+# ─────────────────────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class RenderPendiente:
+    """Un PDF ya preparado: `fn(**kwargs)` lo renderiza sin tocar la DB.
+
+    Viaja a un worker del pool, así que `fn` es una función de módulo y
+    `kwargs` solo lleva datos serializables (DataFrames, records, dicts).
+    """
+    fn: Callable[..., bytes]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+    def __call__(self) -> bytes:
+        return self.fn(**self.kwargs)
+
+
+def _en_proceso(trabajo: RenderPendiente) -> Union[bytes, Exception]:
+    # El avance del lote es por informe: el de las secciones no se reporta.
+    try:
+        with reportando(lambda hechas, total: None):
+            return trabajo()
+    except Exception as e:
+        return e
+
+
+def _cosechar(futuros: dict[Future, tuple[Any, RenderPendiente]]) -> Iterator[tuple[Any, Any]]:
+    """Espera a que termine al menos un render y entrega los terminados."""
+    hechos, _ = wait(list(futuros), return_when=FIRST_COMPLETED)
+    for futuro in hechos:
+        clave, trabajo = futuros.pop(futuro)
+        try:
+            yield clave, futuro.result()
+        except BrokenProcessPool:
+            # El worker murió: se reintenta acá.
+            yield clave, _en_proceso(trabajo)
+        except Exception as e:
+            yield clave, e
+
+
+def renderizar(
+    trabajos: Iterable[tuple[K, Union[bytes, RenderPendiente]]],
+    en_vuelo: Optional[int] = None,
+) -> Iterator[tuple[K, Union[bytes, Exception]]]:
+    """Renderiza los `RenderPendiente` de `trabajos` en el pool de procesos
+    de `runtime.py` y entrega `(clave, pdf)` en el orden en que terminan.
+
+    `trabajos` se consume de a uno, así que su preparación (que usa la DB)
+    corre en este thread mientras el pool renderiza las anteriores. A lo
+    sumo `en_vuelo` renders a la vez (default `REPORT_SECTION_WORKERS`); el
+    pool lo comparten los demás informes en curso. Un trabajo que ya viene
+    en bytes se entrega tal cual. Si un render falla, su excepción se
+    entrega en lugar de los bytes. Sin pool (un proceso, o el pool roto)
+    se renderiza acá.
+    """
+    from . import runtime
+
+    limite = runtime.REPORT_SECTION_WORKERS if en_vuelo is None else en_vuelo
+    pool = runtime._obtener_pool() if limite > 1 else None
+    futuros: dict[Future, tuple[K, RenderPendiente]] = {}
+    for clave, trabajo in trabajos:
+        if not isinstance(trabajo, RenderPendiente):
+            yield clave, trabajo
+            continue
+        if pool is not None:
+            while len(futuros) >= limite:
+                yield from _cosechar(futuros)
+            try:
+                futuros[pool.submit(trabajo)] = (clave, trabajo)
+                continue
+            except (BrokenProcessPool, RuntimeError) as e:
+                logger.warning("Pool de informes no disponible; el lote sigue en serie (%s)", e)
+                runtime._descartar_pool(pool)
+                pool = None
+        yield clave, _en_proceso(trabajo)
+    while futuros:
+        yield from _cosechar(futuros)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Salida
+# ─────────────────────────────────────────────────────────────────────────
+
+def nombre_archivo(texto: Any) -> str:
+    """Fragmento de nombre de archivo seguro a partir de un valor ('II° A' → 'II_A')."""
+    plano = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    plano = re.sub(r"[^A-Za-z0-9.-]+", "_", plano).strip("_.")
+    return plano or "sin_valor"
+
+
+def escribir_zip(destino: IO[bytes], archivos: Iterable[tuple[str, bytes]]) -> int:
+    """Escribe `(nombre, contenido)` en un ZIP sobre `destino`.
+
+    Los PDF ya vienen comprimidos: se guardan sin volver a comprimir.
+    Nombres repetidos reciben sufijo `_2`, `_3`… Devuelve cuántos
+    archivos escribió.
+    """
+    usados: set[str] = set()
+    n = 0
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nombre, contenido in archivos:
+            base, punto, ext = nombre.rpartition(".")
+            if not punto:
+                base, ext = nombre, ""
+            final, k = nombre, 2
+            while final in usados:
+                final = f"{base}_{k}.{ext}" if ext else f"{base}_{k}"
+                k += 1
+            usados.add(final)
+            zf.writestr(final, contenido)
+            n += 1
+    return n
@@ -0,0 +1,48 @@
+"""Progreso de generación de un informe, por secciones renderizadas.
+
+Los motores (`runtime._ejecutar_secciones`, `report_steps.build_pdf_bytes`)
+llaman a `reportar(hechas, total)` después de cada sección. Por default no
+hay nadie escuchando y no cuesta nada; la cola de informes en segundo
+plano (`backend/report_jobs.py`) instala un callback con `reportando` para
+persistir el avance del job.
+
+El callback vive en un ContextVar: cada thread/job ve solo el suyo.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+try:  # el logger del backend no está disponible en usos standalone del paquete
+    from backend.logging_config import get_logger
+    logger = get_logger(__name__)
+except Exception:  # pragma: no cover — fallback defensivo
+    import logging
+    logger = logging.getLogger(__name__)
+
+Callback = Callable[[int, int], None]
+
+_callback: ContextVar[Optional[Callback]] = ContextVar("progreso_informe", default=None)
+
+
+@contextmanager
+def reportando(callback: Callback) -> Iterator[None]:
+    """Instala `callback(hechas, total)` mientras dure el bloque."""
+    token = _callback.set(callback)
+    try:
+        yield
+    finally:
+        _callback.reset(token)
+
+
+def reportar(hechas: int, total: int) -> None:
+    """Avisa el avance al callback instalado, si hay uno. Un callback que
+    falla nunca interrumpe el informe."""
+    callback = _callback.get()
+    if callback is None:
+        return
+    try:
+        callback(hechas, total)
+    except Exception:
+        logger.warning("Callback de progreso de informe falló", exc_info=True)
@@ -10,19 +10,30 @@ Flujo:
     3) Para cada sección fija:
         - chart → llama charts.fn(df, ..., nombre_grafico=aux_dir/X.png)
                   → embebe como <img src="data:base64,...">
+                  (cacheado por contenido: `chart_cache.py`)
         - table → llama tables.fn(df, ...) → DataFrame
                   → renderiza con helpers.df_a_html_table
     4) Para secciones_dinamicas (iteración por curso/categoría): idem pero
        repitiendo por cada valor único (TODO en próximo iter).
+       Las secciones de 3) y 4) se ejecutan en un pool de procesos (ver
+       `_ejecutar_secciones`), conservando su orden.
     5) Renderiza informe_base.html con Jinja2.
     6) WeasyPrint → bytes PDF.
     7) Limpia aux_dir.
 """
 from __future__ import annotations
 
+import atexit
+import base64
 import copy
 import json
+import multiprocessing
+import os
+import pickle
 import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import date
 from typing import Any
@@ -35,8 +46,11 @@ from jinja2 import Environment, FileSystemLoader
 # para que importar este módulo no falle en setups de testing/dev.
 
 from . import charts, tables
+from .chart_cache import chart_images, clave_grafico, huella_dataframe, version_codigo
 from .errores import DatosInsuficientes, mensaje_sin_datos
 from .helpers import df_a_html_table, embed_png_b64, ordenar_valores_categoricos
+from .lote import RenderPendiente, lote_activo
+from .progreso import reportar
 from ..core.derived_fields_engine import apply_derived_fields
 
 try:  # el logger del backend no está disponible en usos standalone del paquete
@@ -56,6 +70,13 @@ ASSETS_DIR = REPORTS_DIR / "assets"
 # statistics...` (QA 2026-07-30, P0-1 / P0-2).
 AVISO_SECCION_FALLIDA = "No fue posible generar esta sección con los datos disponibles."
 
+# Procesos que renderizan secciones en paralelo. 1 = serial (histórico).
+# Procesos y no threads: la máquina de estados de pyplot no es thread-safe.
+REPORT_SECTION_WORKERS = int(os.getenv("REPORT_SECTION_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# Tipos de sección que valen un viaje al pool (el resto es un dict literal).
+_TIPOS_PESADOS = {"chart", "table", "pivot"}
+
 
 def _resolve_logo_path(name: str | None) -> str | None:
     """Resuelve un nombre de logo a path absoluto en assets/. None si no existe."""
@@ -108,6 +129,11 @@ def _error_seccion(titulo: str, contexto: str, exc: BaseException | None = None)
     return {"tipo": "error", "titulo": titulo, "msg": AVISO_SECCION_FALLIDA}
 
 
+def _data_uri_png(png: bytes) -> str:
+    """Mismo formato que `embed_png_b64`, desde bytes en memoria."""
+    return "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+
+
 def _ejecutar_seccion(
     seccion: dict,
     dataframes: dict[str, pd.DataFrame],
@@ -161,6 +187,14 @@ def _ejecutar_seccion(
         spec = charts.CHART_REGISTRY.get(fn_name)
         if not spec:
             return _error_seccion(titulo, f"chart '{fn_name}' no existe en CHART_REGISTRY")
+        # Mismo gráfico (fn + params + datos + código) ya dibujado → sin matplotlib
+        clave = clave_grafico(
+            "v2", fn_name, params, huella_dataframe(df),
+            version_codigo(charts.__file__, Path(charts.__file__).with_name("helpers.py")),
+        )
+        png = chart_images.obtener(clave)
+        if png is not None:
+            return {"tipo": "chart", "titulo": titulo, "image_b64": _data_uri_png(png)}
         # Path PNG temporal
         png_path = aux_dir / f"{fn_name}_{abs(hash(json.dumps(params, sort_keys=True, default=str)))}.png"
         params["nombre_grafico"] = str(png_path)
@@ -168,7 +202,9 @@ def _ejecutar_seccion(
             spec["fn"](df, **params)
         except Exception as e:  # defensivo: una sección rota no cae el informe
             return _error_seccion(titulo, f"chart '{fn_name}'", e)
-        return {"tipo": "chart", "titulo": titulo, "image_b64": embed_png_b64(png_path)}
+        png = png_path.read_bytes()
+        chart_images.guardar(clave, png)
+        return {"tipo": "chart", "titulo": titulo, "image_b64": _data_uri_png(png)}
 
     if tipo == "table":
         spec = tables.TABLE_REGISTRY.get(fn_name)
@@ -198,6 +234,157 @@ def _ejecutar_seccion(
     return _error_seccion(titulo, f"tipo de sección desconocido: {tipo}")
 
 
+# ─────────────────────────────────────────────────────────────────────────
+# Ejecución de secciones en un pool de procesos
+# ─────────────────────────────────────────────────────────────────────────
+#
+# El pool es uno por proceso, de `REPORT_SECTION_WORKERS` procesos, y se
+# crea perezosamente (arrancar intérpretes con pandas + matplotlib cuesta
+# ~1 s cada uno; no se paga por informe). Lo comparten los informes que se
+# generan a la vez (jobs de `report_jobs`, exports concurrentes): nunca se
+# redimensiona ni se apaga mientras está vivo —eso cancelaría las secciones
+# encoladas de otro informe—; cada informe acota su paralelismo por la
+# cantidad de secciones que tiene en vuelo. Solo se descarta un pool roto
+# (`BrokenProcessPool`) y se cierra al terminar el proceso.
+# Usa `spawn`: hacer fork de un worker uvicorn con threads vivos puede
+# heredar locks tomados. Los DataFrames del informe se serializan UNA vez a
+# `aux_dir` y cada worker los carga la primera vez que recibe una sección
+# de ese informe; por tarea solo viaja el dict de la sección.
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+# Estado del lado del worker: DataFrames del último informe cargado.
+_dataframes_worker: dict[str, Any] = {"path": None, "dataframes": None}
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=REPORT_SECTION_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _descartar_pool(roto: ProcessPoolExecutor) -> None:
+    """Descarta `roto` (un worker murió); el próximo informe crea otro. Si
+    otro informe ya lo reemplazó, no toca el nuevo."""
+    global _pool
+    with _pool_lock:
+        if _pool is roto:
+            _pool = None
+    roto.shutdown(wait=False)
+
+
+def cerrar_pool() -> None:
+    """Cierra el pool de secciones; solo al terminar el proceso."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(cerrar_pool)
+
+
+def _seccion_en_worker(dataframes_path: str, seccion: dict, aux_dir: str) -> dict:
+    """`_ejecutar_seccion` dentro de un worker del pool."""
+    if _dataframes_worker["path"] != dataframes_path:
+        with open(dataframes_path, "rb") as f:
+            _dataframes_worker["dataframes"] = pickle.load(f)
+        _dataframes_worker["path"] = dataframes_path
+    destino = Path(aux_dir)
+    destino.mkdir(parents=True, exist_ok=True)
+    return _ejecutar_seccion(seccion, _dataframes_worker["dataframes"], destino)
+
+
+def _ejecutar_secciones(
+    secciones: list[dict],
+    dataframes: dict[str, pd.DataFrame],
+    aux_dir: Path,
+    workers: int | None = None,
+) -> list[dict]:
+    """Ejecuta `secciones` y devuelve sus resultados EN EL MISMO ORDEN.
+
+    Las secciones chart/table/pivot van al pool de procesos cuando hay
+    `workers` > 1 y al menos dos de ellas, con a lo sumo `workers` en vuelo
+    a la vez; las demás (heading, nota, page_break) se resuelven acá. El
+    aislamiento de errores es el de `_ejecutar_seccion`; si además un worker
+    muere o su resultado no vuelve, esa sección sale como `_error_seccion` y
+    el resto del informe sigue (en serie si el pool quedó roto).
+    El avance se informa a `progreso.reportar` sección por sección.
+    """
+    workers = REPORT_SECTION_WORKERS if workers is None else workers
+    total = len(secciones)
+    pesadas = [i for i, sec in enumerate(secciones) if sec.get("tipo") in _TIPOS_PESADOS]
+    if workers <= 1 or len(pesadas) < 2:
+        return _ejecutar_en_serie(secciones, dataframes, aux_dir)
+
+    dataframes_path = aux_dir / "dataframes.pkl"
+    try:
+        with open(dataframes_path, "wb") as f:
+            pickle.dump(dataframes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pool: ProcessPoolExecutor | None = _obtener_pool()
+    except (OSError, pickle.PicklingError) as e:
+        logger.warning("Pool de secciones no disponible; se ejecuta en serie (%s)", e)
+        return _ejecutar_en_serie(secciones, dataframes, aux_dir)
+
+    pendientes = iter(pesadas)
+    futuros: dict[int, Future] = {}
+
+    def _enviar() -> None:
+        # Una sección pesada más al pool; sin pool, queda para la serie.
+        nonlocal pool
+        i = next(pendientes, None)
+        if i is None or pool is None:
+            return
+        try:
+            futuros[i] = pool.submit(
+                _seccion_en_worker, str(dataframes_path), secciones[i], str(aux_dir / f"s{i}"),
+            )
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.warning("Pool de secciones no disponible; el resto se ejecuta en serie (%s)", e)
+            _descartar_pool(pool)
+            pool = None
+
+    for _ in range(min(workers, len(pesadas))):
+        _enviar()
+
+    resultados = []
+    for i, sec in enumerate(secciones):
+        futuro = futuros.pop(i, None)
+        if futuro is None:
+            resultados.append(_ejecutar_seccion(sec, dataframes, aux_dir))
+        else:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool) and pool is not None:
+                    _descartar_pool(pool)
+                    pool = None
+                resultados.append(_error_seccion(
+                    sec.get("titulo", ""), f"{sec.get('tipo')} '{sec.get('fn')}' en worker", e,
+                ))
+            _enviar()
+        reportar(i + 1, total)
+    return resultados
+
+
+def _ejecutar_en_serie(
+    secciones: list[dict],
+    dataframes: dict[str, pd.DataFrame],
+    aux_dir: Path,
+) -> list[dict]:
+    resultados = []
+    for i, sec in enumerate(secciones):
+        resultados.append(_ejecutar_seccion(sec, dataframes, aux_dir))
+        reportar(i + 1, len(secciones))
+    return resultados
+
+
 def construir_pdf(
     report_type: str,
     dataframes: dict[str, pd.DataFrame],
@@ -205,6 +392,7 @@ def construir_pdf(
     df_principal: str | None = None,
     filtros_desc: str = "",
     esquema: dict | None = None,
+    workers: int | None = None,
 ) -> bytes:
     """Punto de entrada: genera bytes PDF para un tipo de informe.
 
@@ -232,9 +420,13 @@ def construir_pdf(
             sin carpeta de esquema (Cálculo Veloz, Fluidez Lectora) usar
             este runtime. Con `None` el comportamiento es idéntico al
             histórico (contrato motor único, N5 / tensión T1).
+        workers: secciones en vuelo a la vez en el pool compartido. `None`
+            → `REPORT_SECTION_WORKERS`; 1 → en serie.
 
     Returns:
-        Bytes del PDF generado.
+        Bytes del PDF generado. Dentro de `lote.en_lote()`, un
+        `RenderPendiente` con los mismos argumentos (y secciones en serie:
+        en un lote la unidad paralela es el informe); ver `reports/lote.py`.
 
     Raises:
         FileNotFoundError: si no existe el esquema.json del tipo solicitado
@@ -257,12 +449,29 @@ def construir_pdf(
         if df_ppal is None or len(df_ppal) == 0:
             raise DatosInsuficientes(mensaje_sin_datos(filtros_desc))
 
+    if lote_activo():
+        return RenderPendiente(_construir_pdf, {
+            "report_type": report_type, "dataframes": dataframes,
+            "overrides": overrides, "esquema": esquema, "workers": 1,
+        })
+    return _construir_pdf(report_type, dataframes, overrides, esquema, workers)
+
+
+def _construir_pdf(
+    report_type: str,
+    dataframes: dict[str, pd.DataFrame],
+    overrides: dict | None,
+    esquema: dict | None,
+    workers: int | None,
+) -> bytes:
+    """Cuerpo de `construir_pdf`, ya validadas las entradas; no usa la DB."""
+    esquema_en_memoria = esquema is not None
     if esquema_en_memoria:
         # Copia profunda: los overrides mutan el dict y el módulo llamador
         # puede estar reutilizando su esquema entre corridas.
         esquema = copy.deepcopy(esquema)
     else:
-        with open(esquema_path, "r", encoding="utf-8") as f:
+        with open(REPORTS_DIR / report_type / "esquema.json", "r", encoding="utf-8") as f:
             esquema = json.load(f)
 
     # Aplicar overrides (merge superficial, suficiente para esta versión)
@@ -304,15 +513,17 @@ def construir_pdf(
     with tempfile.TemporaryDirectory(prefix=f"report_{report_type}_") as tmp_str:
         aux_dir = Path(tmp_str)
 
-        rendered = []
+        # Plan: la lista ordenada de secciones a ejecutar. Se arma entera
+        # antes de ejecutar nada para poder repartirla entre procesos.
+        plan: list[dict] = []
 
         # 1) Secciones fijas. Cualquier sección con `break_before: true`
         # inserta un page_break antes (útil para tablas anchas que de otro
         # modo se cortan a media página).
         for sec in esquema.get("secciones_fijas", []):
             if sec.get("break_before"):
-                rendered.append({"tipo": "page_break"})
-            rendered.append(_ejecutar_seccion(sec, dataframes, aux_dir))
+                plan.append({"tipo": "page_break"})
+            plan.append(sec)
 
         # 2) Secciones dinámicas — iteran por valor único de `iterar_por`
         # del DataFrame `df_iterar`. Cada valor inserta page_break + las
@@ -339,14 +550,15 @@ def construir_pdf(
 
                     for valor in valores:
                         # Page break antes de cada valor (igual a \newpage LaTeX)
-                        rendered.append({"tipo": "page_break"})
+                        plan.append({"tipo": "page_break"})
                         # Context para interpolar {curso} en titulo y params.
                         # La key se deriva del nombre de la columna en lowercase
                         # (Curso → curso, Habilidad → habilidad, etc.).
                         ctx = {iterar_por.lower(): str(valor), "valor": str(valor)}
                         for sec_template in secciones_template:
-                            sec_concreta = _interpolar(sec_template, ctx)
-                            rendered.append(_ejecutar_seccion(sec_concreta, dataframes, aux_dir))
+                            plan.append(_interpolar(sec_template, ctx))
+
+        rendered = _ejecutar_secciones(plan, dataframes, aux_dir, workers)
 
         # Renderizar HTML
         env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)), autoescape=False)
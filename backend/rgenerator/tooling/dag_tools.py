@@ -0,0 +1,200 @@
+"""
+dag_tools.py — Ejecución concurrente de pasos independientes del pipeline.
+
+`PipelineRunner.run_all` corre `self.pipeline` en orden de lista. Los
+pipelines que leen varias fuentes independientes (dos `RunExcelETL`, un
+`RunDIAPDFExtraction`, un `LoadMetricToDF`) esperan uno al otro aunque
+ninguno use lo que produce el otro.
+
+Acá se arma el grafo de dependencias de una *ventana*: el tramo contiguo
+de pasos, desde el paso actual, que declaran `parallel_safe` y `produces`.
+Un paso depende de otro anterior de la ventana si lee lo que el otro
+produce, si produce lo que el otro lee, o si ambos producen la misma
+clave. Los pasos fuera de esas condiciones (InitRun, RequestUserFiles,
+SaveToMetric, los que resuelven su entrada desde `ctx.last_artifact_key`…)
+cortan la ventana y siguen corriendo solos, en orden.
+
+Cada paso de la ventana corre en un hilo sobre una vista del contexto (una
+copia superficial con su propio dict de artifacts y su propia lista de
+warnings). Al terminar la ventana, los cambios de cada paso se aplican al
+contexto real en orden de lista, como si hubieran corrido uno tras otro:
+`last_artifact_key`, `last_step` y los warnings quedan igual que en la
+ejecución secuencial. Si un paso pausa (`WaitingForInputException`) o
+falla, se aplican solo los pasos anteriores a él en la lista; los
+posteriores que alcanzaron a correr se descartan y se vuelven a correr al
+reanudar.
+
+Los pasos con el mismo `exclusive` no corren a la vez (lock por nombre):
+"db" para los que usan la sesión SQLAlchemy del contexto, que no es
+thread-safe; "pdf" para los que usan pdfium/camelot. Sí corren en paralelo
+con los demás.
+"""
+from __future__ import annotations
+
+import copy
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
+
+from ..core.context import RunContext
+from ..core.step import Step
+
+# Hilos por ventana. 1 = ejecución estrictamente secuencial.
+PIPELINE_STEP_WORKERS = int(os.getenv("PIPELINE_STEP_WORKERS", "4"))
+
+
+def es_paralelizable(step: Step) -> bool:
+    return bool(getattr(step, "parallel_safe", False) and step.produces)
+
+
+def ventana(pipeline: Sequence[Step], desde: int) -> List[int]:
+    """Índices del tramo contiguo de pasos paralelizables desde `desde`.
+
+    Vacía si hay menos de dos (no hay nada que paralelizar).
+    """
+    fin = desde
+    while fin < len(pipeline) and es_paralelizable(pipeline[fin]):
+        fin += 1
+    return list(range(desde, fin)) if fin - desde >= 2 else []
+
+
+def dependencias(pipeline: Sequence[Step], indices: Sequence[int]) -> Dict[int, Set[int]]:
+    """{índice: índices anteriores de la ventana que deben terminar antes}.
+
+    Cerrado transitivamente: la vista de un paso incluye los cambios de
+    todos sus ancestros, no solo los directos.
+    """
+    deps: Dict[int, Set[int]] = {}
+    for pos, i in enumerate(indices):
+        lee, escribe = set(pipeline[i].requires), set(pipeline[i].produces)
+        directos = {
+            j for j in indices[:pos]
+            if lee & set(pipeline[j].produces)
+            or escribe & set(pipeline[j].requires)
+            or escribe & set(pipeline[j].produces)
+        }
+        deps[i] = directos.union(*(deps[j] for j in directos))
+    return deps
+
+
+@dataclass
+class Cambios:
+    """Lo que un paso le hizo a su vista del contexto."""
+    artefactos: Dict[str, Any] = field(default_factory=dict)
+    borrados: Set[str] = field(default_factory=set)
+    atributos: Dict[str, Any] = field(default_factory=dict)
+    warnings: List[str] = field(default_factory=list)
+
+    def aplicar(self, ctx: RunContext) -> None:
+        for clave in self.borrados:
+            ctx.artifacts.pop(clave, None)
+        ctx.artifacts.update(self.artefactos)
+        for nombre, valor in self.atributos.items():
+            setattr(ctx, nombre, valor)
+        for w in self.warnings:
+            ctx.add_warning(w)
+
+
+def _vista(ctx: RunContext, previos: Sequence[Cambios]) -> RunContext:
+    vista = copy.copy(ctx)
+    vista.artifacts = dict(ctx.artifacts)
+    vista.warnings = list(ctx.warnings or [])
+    for cambios in previos:
+        cambios.aplicar(vista)
+    return vista
+
+
+def _cambios(antes: RunContext, despues: RunContext) -> Cambios:
+    previos = vars(antes)
+    return Cambios(
+        artefactos={
+            k: v for k, v in despues.artifacts.items()
+            if k not in antes.artifacts or antes.artifacts[k] is not v
+        },
+        borrados=set(antes.artifacts) - set(despues.artifacts),
+        atributos={
+            k: v for k, v in vars(despues).items()
+            if k not in ("artifacts", "warnings") and (k not in previos or previos[k] is not v)
+        },
+        warnings=[w for w in (despues.warnings or []) if w not in (antes.warnings or [])],
+    )
+
+
+@dataclass
+class Resultado:
+    """Desenlace de un paso de la ventana: `cambios` si terminó bien,
+    `error` (la excepción del paso) si no."""
+    indice: int
+    cambios: Optional[Cambios] = None
+    error: Optional[BaseException] = None
+
+
+def ejecutar_ventana(
+    ctx: RunContext,
+    pipeline: Sequence[Step],
+    indices: Sequence[int],
+    ejecutar: Callable[[Step, RunContext], None],
+    *,
+    max_workers: Optional[int] = None,
+) -> List[Resultado]:
+    """Corre los pasos `indices` respetando `dependencias` y devuelve, en
+    orden de lista, los resultados hasta el primer paso que falló o pausó
+    (incluido). No modifica `ctx`: los cambios se aplican con
+    `Cambios.aplicar`.
+
+    `ejecutar(step, vista)` corre un paso (el runner le agrega logging y
+    telemetría).
+    """
+    deps = dependencias(pipeline, indices)
+    locks = {
+        nombre: threading.Lock()
+        for nombre in {getattr(pipeline[i], "exclusive", None) for i in indices} - {None}
+    }
+    hechos: Dict[int, Resultado] = {}
+    pendientes = list(indices)
+    corriendo = {}
+    corte: Optional[int] = None  # primer índice que falló o pausó
+
+    def _correr(i: int, vista: RunContext) -> Resultado:
+        antes = _vista(vista, [])
+        try:
+            lock = locks.get(getattr(pipeline[i], "exclusive", None))
+            if lock is not None:
+                with lock:
+                    ejecutar(pipeline[i], vista)
+            else:
+                ejecutar(pipeline[i], vista)
+        except BaseException as e:  # noqa: BLE001 — se re-lanza en el runner
+            return Resultado(i, error=e)
+        return Resultado(i, cambios=_cambios(antes, vista))
+
+    with ThreadPoolExecutor(max_workers=max_workers or PIPELINE_STEP_WORKERS) as pool:
+        while pendientes or corriendo:
+            for i in list(pendientes):
+                if corte is not None and i > corte:
+                    pendientes.remove(i)  # posterior a un fallo/pausa: se descarta
+                    continue
+                if all(j in hechos and hechos[j].cambios is not None for j in deps[i]):
+                    previos = [hechos[j].cambios for j in indices if j in deps[i]]
+                    corriendo[pool.submit(_correr, i, _vista(ctx, previos))] = i
+                    pendientes.remove(i)
+            if not corriendo:
+                break
+            listos, _ = wait(list(corriendo), return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                del corriendo[futuro]
+                resultado = futuro.result()
+                hechos[resultado.indice] = resultado
+                if resultado.error is not None and (corte is None or resultado.indice < corte):
+                    corte = resultado.indice
+
+    ordenados = []
+    for i in indices:
+        if i not in hechos:
+            break
+        ordenados.append(hechos[i])
+        if hechos[i].error is not None:
+            break
+    return ordenados
@@ -1,11 +1,12 @@
 import json
 from pathlib import Path
-from typing import Dict, Type, List, Optional
+from typing import Callable, Dict, Type, List, Optional
 import re
 from ..core.context import RunContext
 from ..core.step import Step, StepExecutionError, WaitingForInputException
 from ..core import pipeline_steps as ps
 from ..core import metric_steps as ms
+from . import dag_tools, telemetry_tools
 import os
 
 from backend.logging_config import get_logger
@@ -100,17 +101,87 @@ class PipelineRunner:
         self.current_step_index = 0
         self.total_steps = len(self.pipeline)
         self.status = "IDLE" # IDLE, RUNNING, COMPLETED, FAILED
+        # Se llama después de cada paso exitoso (checkpoint por paso, ver
+        # backend/pipeline_runs.py). None = sin checkpoints.
+        self.on_step_completed: Optional[Callable[["PipelineRunner"], None]] = None
+        # Métricas de cada paso ejecutado (`telemetry_tools.medir_paso`), en
+        # orden. `backend/pipeline_telemetry.registrar` las persiste y vacía.
+        self.telemetry: List[dict] = []
+        self._metricas: Dict[int, dict] = {}
 
     def refresh_db(self, db) -> None:
         """Reemplaza la sesión DB del contexto.
 
-        Los runners viven cacheados entre requests (ACTIVE_RUNNERS), pero la
-        sesión que recibieron al construirse la cierra get_db() al terminar
-        ese primer request. Cada endpoint debe llamar esto con su sesión
+        Los runners viven cacheados entre requests (`backend/pipeline_runs.py`),
+        pero la sesión que recibieron al construirse la cierra get_db() al
+        terminar ese primer request. Cada endpoint debe llamar esto con su sesión
         fresca ANTES de run_all()/step().
         """
         self.ctx.db = db
 
+    def _run_step(self, step: Step, ctx: RunContext) -> None:
+        """Ejecuta `step.run` sobre `ctx` (el contexto del runner o, en una
+        ventana paralela, la vista del hilo) y guarda sus métricas."""
+        try:
+            metricas = telemetry_tools.medir_paso(step, ctx, lambda: step.run(ctx))
+        except BaseException as e:
+            self._metricas[id(step)] = getattr(e, "telemetry", None)
+            raise
+        self._metricas[id(step)] = metricas
+
+    def _telemetria(self, step: Step, status: str) -> Optional[dict]:
+        """Saca las métricas del último `_run_step` de `step` y las suma a
+        `self.telemetry`. Llamar antes de mover `current_step_index`."""
+        metricas = self._metricas.pop(id(step), None)
+        if metricas is not None:
+            self.telemetry.append({
+                "step_index": self.current_step_index,
+                "step_class": step.__class__.__name__,
+                "step_name": getattr(step, "name", None),
+                "status": status,
+                **metricas,
+            })
+        return metricas
+
+    def _completed(self, step: Step) -> dict:
+        """Avanza el índice tras un paso exitoso y arma su resultado."""
+        metricas = self._telemetria(step, "success")
+        self.current_step_index += 1
+        if self.current_step_index >= self.total_steps:
+            self.status = "COMPLETED"
+        if self.on_step_completed is not None:
+            self.on_step_completed(self)
+
+        return {
+            "status": "success",
+            "step_index": self.current_step_index - 1, # Index executed
+            "next_index": self.current_step_index,
+            "step_name": step.__class__.__name__,
+            "artifacts": list(self.ctx.artifacts.keys()),
+            # Advertencias no bloqueantes acumuladas (ej. una dimensión de
+            # la métrica que quedó sin poblar en SaveToMetric).
+            "warnings": list(getattr(self.ctx, "warnings", []) or []),
+            "metrics": metricas,
+            "finished": self.status == "COMPLETED"
+        }
+
+    def _waiting(self, step: Step, e: WaitingForInputException) -> dict:
+        self.status = "WAITING_INPUT"
+        logger.info(f"-- Step {self.current_step_index + 1} WAITING: {e}")
+        return {
+            "status": "waiting_input",
+            "step_index": self.current_step_index,
+            "step_name": step.__class__.__name__,
+            "input_details": e.input_details,
+            "metrics": self._telemetria(step, "waiting_input"),
+            "message": str(e)
+        }
+
+    def _failed(self, step: Step, e: Exception) -> StepExecutionError:
+        self.status = "FAILED"
+        self._telemetria(step, "failed")
+        return StepExecutionError(step.__class__.__name__, self.current_step_index, e)
+
     def step(self):
         """Ejecuta el siguiente paso."""
         if self.current_step_index >= self.total_steps:
@@ -122,45 +193,49 @@ class PipelineRunner:
         
         try:
             logger.info(f"-- Running step {self.current_step_index + 1}/{self.total_steps}: {step.__class__.__name__}")
-            step.run(self.ctx)
-            
-            self.current_step_index += 1
-            if self.current_step_index >= self.total_steps:
-                self.status = "COMPLETED"
-            
-            return {
-                "status": "success", 
-                "step_index": self.current_step_index - 1, # Index executed
-                "next_index": self.current_step_index,
-                "step_name": step.__class__.__name__,
-                "artifacts": list(self.ctx.artifacts.keys()),
-                # Advertencias no bloqueantes acumuladas (ej. una dimensión de
-                # la métrica que quedó sin poblar en SaveToMetric).
-                "warnings": list(getattr(self.ctx, "warnings", []) or []),
-                "finished": self.status == "COMPLETED"
-            }
+            self._run_step(step, self.ctx)
         except WaitingForInputException as e:
-            self.status = "WAITING_INPUT"
-            logger.info(f"-- Step {self.current_step_index + 1} WAITING: {e}")
-            return {
-                "status": "waiting_input", 
-                "step_index": self.current_step_index,
-                "step_name": step.__class__.__name__,
-                "input_details": e.input_details,
-                "message": str(e)
-            }
+            return self._waiting(step, e)
         except Exception as e:
-            self.status = "FAILED"
-            raise StepExecutionError(step.__class__.__name__, self.current_step_index, e) from e
+            raise self._failed(step, e) from e
+        return self._completed(step)
+
+    def _run_window(self, indices: List[int]) -> List[dict]:
+        """Corre en paralelo los pasos `indices` (ver `dag_tools`) y aplica
+        sus cambios en orden de lista: mismos resultados, checkpoints y
+        pausas que corriéndolos de a uno."""
+        self.status = "RUNNING"
+        nombres = ", ".join(self.pipeline[i].__class__.__name__ for i in indices)
+        logger.info(
+            f"-- Running steps {indices[0] + 1}-{indices[-1] + 1}/{self.total_steps} en paralelo: {nombres}"
+        )
+        results = []
+        for r in dag_tools.ejecutar_ventana(self.ctx, self.pipeline, indices, self._run_step):
+            step = self.pipeline[r.indice]
+            if isinstance(r.error, WaitingForInputException):
+                results.append(self._waiting(step, r.error))
+            elif r.error is not None:
+                raise self._failed(step, r.error) from r.error
+            else:
+                r.cambios.aplicar(self.ctx)
+                results.append(self._completed(step))
+        return results
 
     def run_all(self):
-        """Ejecuta todos los pasos restantes. Se detiene si un paso necesita input del usuario."""
+        """Ejecuta todos los pasos restantes. Se detiene si un paso necesita input del usuario.
+
+        Los tramos de pasos independientes (`dag_tools.ventana`) corren en
+        paralelo; el resultado es el mismo que en orden de lista.
+        """
         results = []
         while self.current_step_index < self.total_steps:
-            res = self.step()
-            results.append(res)
+            indices = dag_tools.ventana(self.pipeline, self.current_step_index)
+            if indices and dag_tools.PIPELINE_STEP_WORKERS > 1:
+                results.extend(self._run_window(indices))
+            else:
+                results.append(self.step())
             # Si un paso necesita input del usuario, detenerse aquí
-            if res.get("status") == "waiting_input":
+            if results[-1].get("status") == "waiting_input":
                 break
         return results
 
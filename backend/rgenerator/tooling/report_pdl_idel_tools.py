@@ -19,7 +19,8 @@ import pandas as pd
 from matplotlib.backends.backend_pdf import PdfPages
 from sqlalchemy.orm import Session
 
-from backend.models import MetricData, Organization
+from backend.metric_store import columnas_cacheadas
+from backend.models import Metric, Organization
 
 # Reusamos funciones puras y constantes del script CLI (side-effect-free tras
 # el refactor: scripts/__init__.py existe y el script ya no lee DATABASE_URL
@@ -57,37 +58,39 @@ def _load_dataframe_from_orm(
     renderizado del script (puntaje, nivel, establecimiento, año, curso,
     estudiante, subprueba, version, eval_id).
 
-    Los filtros opcionales son iguales a los del CLI — el filtrado se hace
-    en memoria porque la cantidad de filas es moderada (una sola metric).
+    Los filtros opcionales son iguales a los del CLI; establecimiento y
+    cursos se resuelven en SQL, el resto en memoria.
     """
-    rows = db.query(MetricData).filter(MetricData.id_metric == metric_id).all()
-    if not rows:
+    metric = db.get(Metric, metric_id)
+    if metric is None:
+        return pd.DataFrame()
+    # Copia columnar vía el cache de frames del proceso (backend/metric_store.py).
+    # Establecimiento y cursos se comparan como texto: van a SQL. Año y
+    # versión se comparan como enteros, abajo.
+    filtros_sql: dict[str, Any] = {}
+    if establecimiento:
+        filtros_sql[DIM_ESTABLECIMIENTO] = establecimiento
+    if cursos:
+        filtros_sql[DIM_CURSO] = list(cursos)
+    col = columnas_cacheadas(db, metric, filtros_sql)
+    if not col.n_rows:
         return pd.DataFrame()
 
-    records = []
-    for r in rows:
-        try:
-            value = json.loads(r.value) if isinstance(r.value, str) else (r.value or {})
-        except Exception:
-            value = {}
-        try:
-            dims = json.loads(r.dimensions_json) if isinstance(r.dimensions_json, str) else (r.dimensions_json or {})
-        except Exception:
-            dims = {}
-        records.append({
-            "id_data": r.id_data,
-            "puntaje": value.get("Puntaje"),
-            "nivel": value.get("Nivel de Riesgo"),
-            "establecimiento": dims.get(DIM_ESTABLECIMIENTO),
-            "año": int(dims[DIM_ANIO]) if dims.get(DIM_ANIO) else None,
-            "curso": dims.get(DIM_CURSO),
-            "rut": dims.get(DIM_RUT),
-            "nombre": dims.get(DIM_NOMBRE),
-            "subprueba": (dims.get(DIM_SUBPRUEBA) or "").upper(),
-            "version": int(dims[DIM_VERSION]) if dims.get(DIM_VERSION) else None,
-        })
-
-    df = pd.DataFrame.from_records(records)
+    def _entero(v):
+        return int(v) if v else None
+
+    df = pd.DataFrame({
+        "id_data": col.id_data,
+        "puntaje": col.field("Puntaje"),
+        "nivel": col.field("Nivel de Riesgo"),
+        "establecimiento": col.dim(DIM_ESTABLECIMIENTO),
+        "año": [_entero(v) for v in col.dim(DIM_ANIO)],
+        "curso": col.dim(DIM_CURSO),
+        "rut": col.dim(DIM_RUT),
+        "nombre": col.dim(DIM_NOMBRE),
+        "subprueba": [(v or "").upper() for v in col.dim(DIM_SUBPRUEBA)],
+        "version": [_entero(v) for v in col.dim(DIM_VERSION)],
+    })
     if df.empty:
         return df
 
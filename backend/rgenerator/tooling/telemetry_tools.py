@@ -0,0 +1,112 @@
+"""
+telemetry_tools.py — Costo de cada paso del pipeline.
+
+`PipelineRunner._run_step` envuelve cada `Step.run` con `medir_paso`, que
+devuelve:
+
+  - wall_ms / cpu_ms: tiempo real y de CPU del hilo que corrió el paso
+    (`time.thread_time`, así un paso de una ventana paralela no suma el
+    CPU de sus vecinos).
+  - rss_peak_delta_kb: cuánto subió el pico de memoria del proceso
+    (`ru_maxrss`) durante el paso. Es un pico de todo el proceso: con
+    pasos en paralelo se atribuye a los que estaban corriendo. None si la
+    plataforma no tiene `resource`.
+  - rows_in / bytes_in: artifacts declarados en `requires` (o archivos de
+    `ctx.inputs` con esa clave, solo bytes).
+  - rows_out / bytes_out: artifacts que el paso agregó o reemplazó.
+  - artifacts_in / artifacts_out: el detalle por clave.
+
+Los bytes de un DataFrame son `memory_usage(deep=True)`; los de otros
+artifacts no se estiman (None).
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_pico_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes.
+    return pico // 1024 if sys.platform == "darwin" else pico
+
+
+def tamano(valor: Any) -> Dict[str, Optional[int]]:
+    """{"rows", "bytes"} de un artifact (None si no aplica)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        uso = valor.memory_usage(deep=True, index=True)
+        return {"rows": len(valor), "bytes": int(uso.sum() if hasattr(uso, "sum") else uso)}
+    if isinstance(valor, (list, tuple, dict)):
+        return {"rows": len(valor), "bytes": None}
+    return {"rows": None, "bytes": None}
+
+
+def _tamano_archivos(rutas) -> Dict[str, Optional[int]]:
+    total = 0
+    for ruta in rutas or []:
+        try:
+            total += os.path.getsize(ruta)
+        except OSError:
+            pass
+    return {"rows": None, "bytes": total}
+
+
+def _sumar(detalle: Dict[str, Dict[str, Optional[int]]], campo: str) -> Optional[int]:
+    valores = [d[campo] for d in detalle.values() if d.get(campo) is not None]
+    return sum(valores) if valores else None
+
+
+def medir_paso(step, ctx, ejecutar: Callable[[], None]) -> Dict[str, Any]:
+    """Corre `ejecutar()` (el `run` de `step` sobre `ctx`) y devuelve sus
+    métricas. Si `ejecutar` lanza, la excepción lleva las métricas en
+    `telemetry` y se re-lanza."""
+    artefactos_antes = dict(ctx.artifacts or {})
+    entradas: Dict[str, Dict[str, Optional[int]]] = {}
+    rss_antes = _rss_pico_kb()
+    wall, cpu = time.perf_counter(), time.thread_time()
+    error: Optional[BaseException] = None
+    try:
+        ejecutar()
+    except BaseException as e:
+        error = e
+    wall_ms = (time.perf_counter() - wall) * 1000
+    cpu_ms = (time.thread_time() - cpu) * 1000
+    rss_despues = _rss_pico_kb()
+
+    # `requires` puede resolverse recién en run() (ej. RunExcelETL sin input_key).
+    for clave in step.requires or []:
+        if clave in artefactos_antes:
+            entradas[clave] = tamano(artefactos_antes[clave])
+        elif clave in (getattr(ctx, "inputs", None) or {}):
+            entradas[clave] = _tamano_archivos(ctx.inputs[clave])
+    salidas = {
+        clave: tamano(valor)
+        for clave, valor in (ctx.artifacts or {}).items()
+        if clave not in artefactos_antes or artefactos_antes[clave] is not valor
+    }
+    metricas = {
+        "wall_ms": round(wall_ms, 2),
+        "cpu_ms": round(cpu_ms, 2),
+        "rss_peak_delta_kb": None if rss_antes is None else rss_despues - rss_antes,
+        "rows_in": _sumar(entradas, "rows"),
+        "rows_out": _sumar(salidas, "rows"),
+        "bytes_in": _sumar(entradas, "bytes"),
+        "bytes_out": _sumar(salidas, "bytes"),
+        "artifacts_in": entradas,
+        "artifacts_out": salidas,
+    }
+    if error is not None:
+        error.telemetry = metricas
+        raise error
+    return metricas
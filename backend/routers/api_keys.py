@@ -22,6 +22,7 @@ from backend.api_keys import (
     deserializar_scopes,
     generar_api_key,
     serializar_scopes,
+    verificaciones,
 )
 from backend.auth import require_admin
 from backend.database import get_db
@@ -151,6 +152,7 @@ def revoke_api_key(
 
     key.revoked = True
     db.commit()
+    verificaciones.invalidar(key.id)
     logger.info("API key revocada id=%s prefix=%s org=%s", key.id, key.prefix, key.org_id)
 
     return {"status": "success", "detail": f"API key '{key.name}' revocada"}
@@ -38,7 +38,7 @@ from backend.schemas_chart import (
 )
 # Reutilizamos el helper de carga de tabla — la lógica de cargar
 # metric_data + filters es idéntica.
-from backend.routers.tables import _load_metric_to_df
+from backend.routers.tables import _metric_df_con_derivadas
 
 logger = get_logger(__name__)
 
@@ -534,17 +534,10 @@ def _render_chart_data(
         temporal_dim_names = {d.name for d in dims}
 
     pre_filters = {k: v for k, v in base_filters.items() if k not in temporal_dim_names}
-    df = _load_metric_to_df(db, org_id, cfg.data_source.metric_id, pre_filters)
-
-    if derived_cfg_list and not df.empty:
-        try:
-            from backend.rgenerator.core.derived_fields_engine import apply_derived_fields
-            for entry in derived_cfg_list:
-                configs = entry.get("configs") or []
-                if configs:
-                    df = apply_derived_fields(df, configs)
-        except Exception:
-            logger.error("Error aplicando derived_columns en preview de gráfico", exc_info=True)
+    df = _metric_df_con_derivadas(
+        db, org_id, cfg.data_source.metric_id, pre_filters, derived_cfg_list,
+        "preview de gráfico",
+    )
 
     # Filtros temporales POST cálculo
     post_temporal = {k: v for k, v in base_filters.items() if k in temporal_dim_names}
@@ -15,6 +15,11 @@ Resolución de columna: si el nombre coincide con un field del meta_json
 de la métrica, opera sobre value. Si coincide con una dimensión
 registrada, opera sobre dimensions_json. Si está en ambas, prioriza
 field.
+
+replace y recalculate van por conjuntos (`backend/data_ops_sql.py`): se
+decide una vez por valor distinto y se escribe con un único UPDATE. Si la
+métrica no lo admite siguen fila por fila en Python, con los mismos
+conteos y muestras.
 """
 from __future__ import annotations
 
@@ -24,12 +29,15 @@ from typing import Any, Dict, List, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from backend import data_ops_sql
 from backend.auth import get_current_user, require_admin
 from backend.database import get_db
+from backend.metric_store import conteos_dimensiones
 from backend.models import Dimension, Metric, MetricData, MetricDimension, Spec, User
-from backend.routers.mappings import apply_mapping
+from backend.routers.mappings import apply_mapping_many
 from backend.routers.tables import invalidate_metric_df_cache
 from backend.schemas_mapping import MappingConfig
 
@@ -138,6 +146,23 @@ def _write_cell(record: MetricData, metric: Metric, col_info: Dict[str, Any], co
         record.dimensions_json = json.dumps(dims, ensure_ascii=False)
 
 
+def _celda_sql(metric: Metric, col_info: Dict[str, Any], column_name: str) -> Optional[data_ops_sql.Celda]:
+    """Dónde vive la columna para `data_ops_sql`; None si solo la maneja el
+    camino en Python (un field de una métrica que no guarda objetos)."""
+    if col_info["kind"] == "field":
+        if metric.data_type != "object":
+            return None
+        return data_ops_sql.Celda("value", column_name)
+    return data_ops_sql.Celda("dimensions_json", str(col_info["id_dimension"]))
+
+
+def _a_guardar(col_info: Dict[str, Any], new_value: Any) -> Any:
+    """El valor que `_write_cell` deja en el JSON para `new_value`."""
+    if col_info["kind"] == "field":
+        return new_value
+    return None if new_value is None else str(new_value)
+
+
 def _coerce_to_field_type(value: Any, field_type: str) -> Any:
     """Castea un valor al tipo declarado del field."""
     if value is None or value == "":
@@ -175,16 +200,29 @@ async def distinct_values(
 ):
     metric = _get_metric_or_404(db, payload.metric_id, user.org_id)
     col_info = _resolve_column(db, metric, payload.column_name)
-    rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
     seen: Dict[str, int] = {}
-    for r in rows:
-        v = _read_cell(r, metric, col_info, payload.column_name)
-        key = "" if v is None else str(v)
-        seen[key] = seen.get(key, 0) + 1
+    if col_info["kind"] == "dimension":
+        # Dimensión: del índice de conteos. Las filas sin la clave (o con
+        # null) cuentan como "", igual que al leer la celda.
+        dim_key = str(col_info["id_dimension"])
+        n_total = db.query(func.count(MetricData.id_data)).filter(
+            MetricData.id_metric == metric.id_metric
+        ).scalar() or 0
+        seen = dict(conteos_dimensiones(db, [metric.id_metric], [dim_key]).get(dim_key, {}))
+        faltantes = n_total - sum(seen.values())
+        if faltantes > 0:
+            seen[""] = seen.get("", 0) + faltantes
+    else:
+        rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
+        n_total = len(rows)
+        for r in rows:
+            v = _read_cell(r, metric, col_info, payload.column_name)
+            key = "" if v is None else str(v)
+            seen[key] = seen.get(key, 0) + 1
     items = sorted(seen.items(), key=lambda kv: -kv[1])[: payload.limit]
     return {
         "kind": col_info["kind"],
-        "n_total_rows": len(rows),
+        "n_total_rows": n_total,
         "n_distinct": len(seen),
         "values": [{"value": k, "count": v} for k, v in items],
     }
@@ -214,8 +252,6 @@ async def replace_values(
     metric = _get_metric_or_404(db, payload.metric_id, user.org_id)
     col_info = _resolve_column(db, metric, payload.column_name)
 
-    rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
-
     # Compile regex / preparar match
     flags = 0 if payload.case_sensitive else re.IGNORECASE
     rx = None
@@ -253,37 +289,65 @@ async def replace_values(
             return re.sub(re.escape(payload.find), payload.replace, s, flags=flags)
         return rx.sub(payload.replace, s)
 
+    def _cast(new: Any) -> Any:
+        # Cast al tipo del field si aplica
+        if col_info["kind"] == "field":
+            return _coerce_to_field_type(new, col_info["type"])
+        return new
+
     sample = []
     n_matched = 0
     n_would_change = 0
-    for r in rows:
-        old = _read_cell(r, metric, col_info, payload.column_name)
-        if not _matches(old):
-            continue
-        n_matched += 1
-        new = _new_value(old)
-        if str(new) == str(old):
-            continue
-        n_would_change += 1
-        if len(sample) < SAMPLE_LIMIT:
-            sample.append({
-                "id_data": r.id_data,
-                "before": str(old),
-                "after": str(new),
-            })
+    celda = _celda_sql(metric, col_info, payload.column_name)
+    grupos = data_ops_sql.agrupar(db, metric.id_metric, [celda]) if celda else None
+    if grupos is not None:
+        n_total = 0
+        cambios: Dict[tuple, tuple] = {}
+        for g in grupos:
+            n_total += g.filas
+            old = g.valores[0]
+            if not _matches(old):
+                continue
+            n_matched += g.filas
+            new = _new_value(old)
+            if str(new) == str(old):
+                continue
+            n_would_change += g.filas
+            cambios[g.clave] = (old, new)
+        for id_data, (old, new) in data_ops_sql.muestra(db, metric.id_metric, [celda], cambios, SAMPLE_LIMIT):
+            sample.append({"id_data": id_data, "before": str(old), "after": str(new)})
         if not payload.dry_run:
-            # Cast al tipo del field si aplica
-            cast_val = new
-            if col_info["kind"] == "field":
-                cast_val = _coerce_to_field_type(new, col_info["type"])
-            _write_cell(r, metric, col_info, payload.column_name, cast_val)
+            data_ops_sql.actualizar(
+                db, metric.id_metric, [celda], celda,
+                {clave: _a_guardar(col_info, _cast(new)) for clave, (_, new) in cambios.items()},
+            )
+    else:
+        rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
+        n_total = len(rows)
+        for r in rows:
+            old = _read_cell(r, metric, col_info, payload.column_name)
+            if not _matches(old):
+                continue
+            n_matched += 1
+            new = _new_value(old)
+            if str(new) == str(old):
+                continue
+            n_would_change += 1
+            if len(sample) < SAMPLE_LIMIT:
+                sample.append({
+                    "id_data": r.id_data,
+                    "before": str(old),
+                    "after": str(new),
+                })
+            if not payload.dry_run:
+                _write_cell(r, metric, col_info, payload.column_name, _cast(new))
 
     if not payload.dry_run:
         db.commit()
         invalidate_metric_df_cache(metric.id_metric)
 
     return {
-        "n_total_rows": len(rows),
+        "n_total_rows": n_total,
         "n_matched": n_matched,
         "n_would_change": n_would_change,
         "sample_changes": sample,
@@ -343,40 +407,73 @@ async def recalculate_column(
                    "type": next((f.get("type", "str") for f in fields if f.get("name") == payload.target_column), "str")}
 
     cfg = _load_mapping_config(db, user.org_id, payload.mapping_id)
-    rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
+
+    def _muestra(id_data: int, src_val: Any, old_target: Any, result) -> Dict[str, Any]:
+        new_label = result.label
+        return {
+            "id_data": id_data,
+            "source": str(src_val),
+            "before": str(old_target) if old_target is not None else "",
+            "after": str(new_label) if new_label is not None else "",
+            "matched": result.matched,
+        }
 
     sample = []
     n_processed = 0
     n_changed = 0
     n_default = 0
-    for r in rows:
-        n_processed += 1
-        src_val = _read_cell(r, metric, src_info, payload.source_column)
-        result = apply_mapping(cfg, src_val)
-        new_label = result.label
-        if not result.matched and new_label is not None:
-            n_default += 1
-        old_target = _read_cell(r, metric, target_info, payload.target_column)
-        if str(old_target) == str(new_label):
-            continue
-        n_changed += 1
-        if len(sample) < SAMPLE_LIMIT:
-            sample.append({
-                "id_data": r.id_data,
-                "source": str(src_val),
-                "before": str(old_target) if old_target is not None else "",
-                "after": str(new_label) if new_label is not None else "",
-                "matched": result.matched,
-            })
+    celda_src = _celda_sql(metric, src_info, payload.source_column)
+    celda_dst = _celda_sql(metric, target_info, payload.target_column)
+    celdas = [celda_src, celda_dst]
+    grupos = data_ops_sql.agrupar(db, metric.id_metric, celdas) if celda_src and celda_dst else None
+    if grupos is not None:
+        # El mapeo se aplica una vez por valor distinto de la fuente.
+        fuentes = {g.clave[0]: g.valores[0] for g in grupos}
+        por_fuente = dict(zip(fuentes, apply_mapping_many(cfg, list(fuentes.values()))))
+        n_total = 0
+        cambios: Dict[tuple, tuple] = {}
+        for g in grupos:
+            n_total += g.filas
+            src_val, old_target = g.valores
+            result = por_fuente[g.clave[0]]
+            n_processed += g.filas
+            if not result.matched and result.label is not None:
+                n_default += g.filas
+            if str(old_target) == str(result.label):
+                continue
+            n_changed += g.filas
+            cambios[g.clave] = (src_val, old_target, result)
+        for id_data, cambio in data_ops_sql.muestra(db, metric.id_metric, celdas, cambios, SAMPLE_LIMIT):
+            sample.append(_muestra(id_data, *cambio))
         if not payload.dry_run:
-            _write_cell(r, metric, target_info, payload.target_column, new_label)
+            data_ops_sql.actualizar(
+                db, metric.id_metric, celdas, celda_dst,
+                {clave: result.label for clave, (_, _, result) in cambios.items()},
+            )
+    else:
+        rows = db.query(MetricData).filter(MetricData.id_metric == metric.id_metric).all()
+        n_total = len(rows)
+        fuentes = [_read_cell(r, metric, src_info, payload.source_column) for r in rows]
+        for r, src_val, result in zip(rows, fuentes, apply_mapping_many(cfg, fuentes)):
+            n_processed += 1
+            new_label = result.label
+            if not result.matched and new_label is not None:
+                n_default += 1
+            old_target = _read_cell(r, metric, target_info, payload.target_column)
+            if str(old_target) == str(new_label):
+                continue
+            n_changed += 1
+            if len(sample) < SAMPLE_LIMIT:
+                sample.append(_muestra(r.id_data, src_val, old_target, result))
+            if not payload.dry_run:
+                _write_cell(r, metric, target_info, payload.target_column, new_label)
 
     if not payload.dry_run:
         db.commit()
         invalidate_metric_df_cache(metric.id_metric)
 
     return {
-        "n_total_rows": len(rows),
+        "n_total_rows": n_total,
         "n_processed": n_processed,
         "n_changed": n_changed,
         "n_default_used": n_default,
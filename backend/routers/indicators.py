@@ -1,9 +1,12 @@
 import json
+import os
+import tempfile
 from datetime import date, datetime
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Any, List, Optional, Dict
+from typing import Any, List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session, selectinload
 
 from backend.database import get_db
@@ -16,6 +19,11 @@ logger = get_logger(__name__)
 
 router = APIRouter(prefix="/api/indicators", tags=["indicators"])
 
+# Tope de informes por lote (POST /{id}/export-pdf/batch).
+EXPORT_PDF_LOTE_MAX = int(os.getenv("EXPORT_PDF_LOTE_MAX", "200"))
+# El ZIP del lote se arma en memoria hasta este tamaño y después en disco.
+_ZIP_LOTE_EN_MEMORIA = 32 * 1024 * 1024
+
 
 def _validate_metric_ids(db: Session, metric_ids: List[int], org_id: int) -> None:
     """Verifica que todos los metric_ids existen y pertenecen a la org del usuario.
@@ -79,6 +87,18 @@ class ExportPDFRequest(BaseModel):
     periodo: Optional[Dict[str, Any]] = None
 
 
+class ExportPDFLoteRequest(ExportPDFRequest):
+    """Body de POST /{id}/export-pdf/batch: el mismo export, un PDF por rebanada.
+
+    Las rebanadas salen de `por` (un informe por cada valor de esa
+    dimensión, o solo de `valores`) o de `filtros_lote` (N conjuntos de
+    filtros explícitos). Cada una se suma a `filters`.
+    """
+    por: Optional[str] = None                             # dimensión: nombre ("Curso") o id
+    valores: Optional[List[str]] = None                   # default: todos los presentes
+    filtros_lote: Optional[List[Dict[str, Any]]] = None   # alternativa a `por`
+
+
 # Motores de informe disponibles — expuesto al frontend para poblar el modal
 REPORT_ENGINES = [
     {
@@ -980,6 +1000,223 @@ def _validar_asignatura(
         )
 
 
+def _render_export_pdf(
+    db: Session,
+    indicator_id: int,
+    org_id: int,
+    body: Optional[ExportPDFRequest],
+) -> Tuple[bytes, str]:
+    """Cuerpo de `export_pdf`: devuelve `(pdf_bytes, filename)`.
+
+    Lo comparten el endpoint síncrono y la cola de informes
+    (`backend/routers/report_jobs.py`). Los errores de validación salen
+    como `HTTPException`, igual que desde el endpoint.
+    """
+    record = db.query(Indicator).filter(
+        Indicator.id_indicator == indicator_id,
+        Indicator.org_id == org_id,
+    ).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Indicador no encontrado")
+
+    # Tipo de informe (default "evaluacion" para retrocompat)
+    tipo = (body.tipo if body else "evaluacion") or "evaluacion"
+    filters = dict(body.filters) if (body and body.filters) else {}
+    periodo = body.periodo if body else None
+
+    # Los datos del indicador se necesitan para resolver el período y
+    # para saber si mezcla asignaturas. Se cargan UNA sola vez, y solo
+    # cuando hacen falta: un indicador sin dimensión de asignatura y
+    # sin `periodo` sigue exportando sin tocar `metric_data` acá.
+    datos = None
+    if periodo or _tiene_dimension_asignatura(db, indicator_id, org_id):
+        datos = _cargar_dataframes_best_effort(db, indicator_id, org_id)
+
+    # ── Período declarativo: manda sobre `tipo` y agrega filtros ──
+    descripcion_periodo = ""
+    resultado_periodo = None
+    filtros_usuario = dict(filters)
+    if periodo:
+        (
+            resuelto_tipo,
+            filtros_periodo,
+            descripcion_periodo,
+            resultado_periodo,
+        ) = _resolver_periodo_a_filtros(db, record, org_id, periodo, datos)
+        tipo = resuelto_tipo
+        filters.update(filtros_periodo)
+        filtros_usuario.update((periodo or {}).get("filtros") or {})
+
+    filters = _normalizar_filtros_a_dimensiones(
+        db, indicator_id, org_id, filters
+    ) or {}
+
+    # ── Asignatura: el informe cubre UNA sola ──
+    if datos and not datos[1]:
+        _validar_asignatura(db, indicator_id, org_id, datos[0], filters)
+
+    if tipo not in ("evaluacion", "historico"):
+        raise HTTPException(
+            status_code=422,
+            detail=f"tipo='{tipo}' inválido. Usa 'evaluacion' o 'historico'."
+        )
+
+    # Resolver el layout según el tipo
+    if tipo == "historico":
+        pdf_layout = _parse_json_field(record.pdf_layout_historico, {})
+    else:
+        pdf_layout = _parse_json_field(record.pdf_layout, {})
+
+    filters = filters or None
+    branding_override = body.branding_override if body else None
+    # El branding lo pidió el usuario explícitamente: nadie lo pisa
+    # después (ni el `center_header` derivado del período).
+    branding_es_del_usuario = bool(branding_override)
+    save_as_default = bool(body.save_as_default) if body else False
+    engine_override = body.engine if body else None
+
+    # Precedencia del engine: override del modal > pdf_layout.engine > default weasyprint
+    engine = (engine_override or pdf_layout.get("engine") or "weasyprint").lower()
+
+    # Validar que el engine esté disponible
+    engine_meta = next((e for e in REPORT_ENGINES if e["id"] == engine), None)
+    if not engine_meta or not engine_meta.get("available"):
+        valid = [e["id"] for e in REPORT_ENGINES if e.get("available")]
+        raise HTTPException(
+            status_code=422,
+            detail=f"Motor de informe '{engine}' no disponible. "
+                   f"Valores válidos: {', '.join(valid)}."
+        )
+
+    # Persistir branding como default del indicador (opt‑in vía checkbox del modal).
+    # Se persiste en el campo correspondiente al tipo activo (evaluacion o historico).
+    if save_as_default and branding_override:
+        try:
+            merged = dict(pdf_layout)
+            merged['branding'] = {**(pdf_layout.get('branding') or {}), **branding_override}
+            target_field = "pdf_layout_historico" if tipo == "historico" else "pdf_layout"
+            setattr(record, target_field, json.dumps(merged, ensure_ascii=False))
+            record.updated_at = datetime.utcnow()
+            db.commit()
+            # Refrescar pdf_layout local para que el render vea lo guardado
+            pdf_layout = merged
+            branding_override = None
+        except Exception:
+            db.rollback()
+            raise
+
+    # ── Última línea del encabezado = período resuelto ──
+    # El `center_header` del layout es configuración editable del usuario y
+    # su última línea (la del período) queda stale al cambiar de prueba
+    # (QA 2026-07-30, P0-10: "Octubre 2025" con datos de DIAGNOSTICO 2026).
+    # Solo se pisa esa línea, y solo si el usuario no mandó branding propio.
+    if descripcion_periodo and not branding_es_del_usuario:
+        from backend.rgenerator.reports.branding import reemplazar_ultima_linea
+        header_actual = (pdf_layout.get("branding") or {}).get("center_header")
+        header_nuevo = reemplazar_ultima_linea(header_actual, descripcion_periodo)
+        if header_nuevo:
+            branding_override = {"center_header": header_nuevo}
+
+    # ── Motor único: despacho al módulo del indicador ──
+    # Precedencia (contrato §2.2): `body.engine` explícito > módulo que
+    # declara el modo > `pdf_layout.engine` > weasyprint. El módulo trae
+    # sus propias secciones, así que NO pasa por el 422 de "sin
+    # secciones configuradas".
+    modo_periodo = (periodo or {}).get("tipo") if periodo else None
+    modulo_custom, nombre_modulo = (
+        _modulo_motor_unico(record) if (modo_periodo and not engine_override)
+        else (None, None)
+    )
+    if modulo_custom is not None:
+        from backend.rgenerator.reports import custom as custom_reports
+        from backend.rgenerator.reports.errores import DatosInsuficientes
+
+        if not custom_reports.soporta_modo(modulo_custom, modo_periodo):
+            # No debería ocurrir: report-options ya deshabilitó la card.
+            raise HTTPException(
+                status_code=400,
+                detail=custom_reports.motivo_modo(modulo_custom, modo_periodo),
+            )
+
+        # Los módulos consumen filtros por NOMBRE de columna, nunca por
+        # id de dimensión (contrato §2.3).
+        filtros_modulo = _filtros_por_columna(
+            db, indicator_id, org_id, filtros_usuario
+        )
+        if resultado_periodo is not None:
+            filtros_modulo.update(resultado_periodo.filtros)
+
+        overrides_modulo: Dict[str, Any] = {}
+        if branding_override:
+            overrides_modulo["branding"] = branding_override
+
+        # FUENTE ÚNICA del período (QA piloto SIMCE 2026-07-30, P1-1):
+        # la `descripcion` que resolvió `periodos.py` alimenta a la vez
+        # el encabezado corrido (vía branding) y el bloque de título del
+        # módulo. Antes el módulo la recalculaba por su cuenta y en
+        # `personalizado` el título decía "2025" mientras el encabezado
+        # decía "ENERO 2025 – JULIO 2025".
+        params_modulo: Dict[str, Any] = {}
+        if descripcion_periodo:
+            params_modulo["periodo_desc"] = descripcion_periodo
+
+        try:
+            pdf_bytes = modulo_custom.generar(
+                db,
+                indicator_id=indicator_id,
+                org_id=org_id,
+                modo=modo_periodo,
+                filtros=filtros_modulo,
+                params=params_modulo or None,
+                overrides=overrides_modulo,
+            )
+        except (DatosInsuficientes, ValueError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        safe_name = record.name.replace(" ", "_").replace("/", "-")
+        return pdf_bytes, f"informe_{safe_name}.pdf"
+
+    if engine == "weasyprint":
+        if not pdf_layout.get("sections"):
+            modo_label = "histórico" if tipo == "historico" else "por evaluación"
+            raise HTTPException(
+                status_code=422,
+                detail=f"El indicador no tiene secciones configuradas para el informe "
+                       f"{modo_label}. Agrega secciones en el Editor de Layout → "
+                       f"pestaña Informe PDF → {modo_label}."
+            )
+        from backend.rgenerator.core.report_steps import build_pdf_bytes
+        from backend.rgenerator.reports.errores import DatosInsuficientes
+        try:
+            pdf_bytes = build_pdf_bytes(
+                record, db, org_id,
+                filters=filters,
+                branding_override=branding_override,
+                pdf_layout_override=pdf_layout,
+            )
+        except DatosInsuficientes as e:
+            # Combinación de filtros sin datos: 400 accionable en vez de
+            # un PDF con gráficos en blanco (QA 2026-07-30, P0-1).
+            raise HTTPException(status_code=400, detail=str(e))
+    elif engine == "pdl_idel":
+        from backend.rgenerator.tooling.report_pdl_idel_tools import build_pdl_idel_pdf_bytes
+        try:
+            pdf_bytes = build_pdl_idel_pdf_bytes(
+                record, db, org_id, filters=filters,
+            )
+        except ValueError as e:
+            # Sin datos tras aplicar filtros — feedback accionable al usuario.
+            raise HTTPException(status_code=422, detail=str(e))
+    else:
+        raise HTTPException(
+            status_code=501,
+            detail=f"Motor '{engine}' aún no implementado."
+        )
+
+    safe_name = record.name.replace(" ", "_").replace("/", "-")
+    return pdf_bytes, f"informe_{safe_name}.pdf"
+
+
 @router.post("/{indicator_id}/export-pdf")
 def export_pdf(
     indicator_id: int,
@@ -1014,226 +1251,191 @@ def export_pdf(
     `_validar_asignatura`).
     """
     try:
-        record = db.query(Indicator).filter(
-            Indicator.id_indicator == indicator_id,
-            Indicator.org_id == user.org_id,
-        ).first()
-        if not record:
-            raise HTTPException(status_code=404, detail="Indicador no encontrado")
+        pdf_bytes, filename = _render_export_pdf(db, indicator_id, user.org_id, body)
+        return Response(
+            content=pdf_bytes,
+            media_type="application/pdf",
+            headers={"Content-Disposition": content_disposition(filename)},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error interno no controlado en router de indicators", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
+
 
-        # Tipo de informe (default "evaluacion" para retrocompat)
-        tipo = (body.tipo if body else "evaluacion") or "evaluacion"
-        filters = dict(body.filters) if (body and body.filters) else {}
-        periodo = body.periodo if body else None
-
-        # Los datos del indicador se necesitan para resolver el período y
-        # para saber si mezcla asignaturas. Se cargan UNA sola vez, y solo
-        # cuando hacen falta: un indicador sin dimensión de asignatura y
-        # sin `periodo` sigue exportando sin tocar `metric_data` acá.
-        datos = None
-        if periodo or _tiene_dimension_asignatura(db, indicator_id, user.org_id):
-            datos = _cargar_dataframes_best_effort(db, indicator_id, user.org_id)
-
-        # ── Período declarativo: manda sobre `tipo` y agrega filtros ──
-        descripcion_periodo = ""
-        resultado_periodo = None
-        filtros_usuario = dict(filters)
-        if periodo:
-            (
-                resuelto_tipo,
-                filtros_periodo,
-                descripcion_periodo,
-                resultado_periodo,
-            ) = _resolver_periodo_a_filtros(db, record, user.org_id, periodo, datos)
-            tipo = resuelto_tipo
-            filters.update(filtros_periodo)
-            filtros_usuario.update((periodo or {}).get("filtros") or {})
-
-        filters = _normalizar_filtros_a_dimensiones(
-            db, indicator_id, user.org_id, filters
-        ) or {}
-
-        # ── Asignatura: el informe cubre UNA sola ──
-        if datos and not datos[1]:
-            _validar_asignatura(db, indicator_id, user.org_id, datos[0], filters)
-
-        if tipo not in ("evaluacion", "historico"):
+def _rebanadas_lote(
+    db: Session,
+    indicator_id: int,
+    org_id: int,
+    body: ExportPDFLoteRequest,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """[(etiqueta, filtros)] del lote: un informe por entrada."""
+    if body.filtros_lote:
+        rebanadas = [
+            (" ".join(str(v) for v in f.values()) or f"informe_{i}", dict(f))
+            for i, f in enumerate(body.filtros_lote, start=1)
+        ]
+    elif body.por:
+        mapa = _mapa_columna_a_dimension(db, indicator_id, org_id)
+        columnas: Dict[str, str] = {}
+        for columna, id_dimension in mapa.items():
+            columnas.setdefault(str(id_dimension), columna)
+        por = str(body.por)
+        id_dimension = por if por in columnas else (str(mapa[por]) if por in mapa else None)
+        if id_dimension is None:
             raise HTTPException(
-                status_code=422,
-                detail=f"tipo='{tipo}' inválido. Usa 'evaluacion' o 'historico'."
+                status_code=400,
+                detail=f"'{por}' no es una dimensión de las métricas del indicador.",
             )
-
-        # Resolver el layout según el tipo
-        if tipo == "historico":
-            pdf_layout = _parse_json_field(record.pdf_layout_historico, {})
-        else:
-            pdf_layout = _parse_json_field(record.pdf_layout, {})
-
-        filters = filters or None
-        branding_override = body.branding_override if body else None
-        # El branding lo pidió el usuario explícitamente: nadie lo pisa
-        # después (ni el `center_header` derivado del período).
-        branding_es_del_usuario = bool(branding_override)
-        save_as_default = bool(body.save_as_default) if body else False
-        engine_override = body.engine if body else None
-
-        # Precedencia del engine: override del modal > pdf_layout.engine > default weasyprint
-        engine = (engine_override or pdf_layout.get("engine") or "weasyprint").lower()
-
-        # Validar que el engine esté disponible
-        engine_meta = next((e for e in REPORT_ENGINES if e["id"] == engine), None)
-        if not engine_meta or not engine_meta.get("available"):
-            valid = [e["id"] for e in REPORT_ENGINES if e.get("available")]
+        valores = list(body.valores or [])
+        if not valores:
+            dataframes, _error = _cargar_dataframes_best_effort(db, indicator_id, org_id)
+            columna = columnas[id_dimension]
+            presentes = {
+                str(v) for df in dataframes.values() if columna in df.columns
+                for v in df[columna].dropna().unique().tolist() if str(v) != ""
+            }
+            valores = sorted(presentes, key=_orden_natural)
+        if not valores:
             raise HTTPException(
-                status_code=422,
-                detail=f"Motor de informe '{engine}' no disponible. "
-                       f"Valores válidos: {', '.join(valid)}."
+                status_code=400,
+                detail=f"La dimensión '{por}' no tiene valores con datos en este indicador.",
             )
-
-        # Persistir branding como default del indicador (opt‑in vía checkbox del modal).
-        # Se persiste en el campo correspondiente al tipo activo (evaluacion o historico).
-        if save_as_default and branding_override:
-            try:
-                merged = dict(pdf_layout)
-                merged['branding'] = {**(pdf_layout.get('branding') or {}), **branding_override}
-                target_field = "pdf_layout_historico" if tipo == "historico" else "pdf_layout"
-                setattr(record, target_field, json.dumps(merged, ensure_ascii=False))
-                record.updated_at = datetime.utcnow()
-                db.commit()
-                # Refrescar pdf_layout local para que el render vea lo guardado
-                pdf_layout = merged
-                branding_override = None
-            except Exception:
-                db.rollback()
-                raise
-
-        # ── Última línea del encabezado = período resuelto ──
-        # El `center_header` del layout es configuración editable del usuario y
-        # su última línea (la del período) queda stale al cambiar de prueba
-        # (QA 2026-07-30, P0-10: "Octubre 2025" con datos de DIAGNOSTICO 2026).
-        # Solo se pisa esa línea, y solo si el usuario no mandó branding propio.
-        if descripcion_periodo and not branding_es_del_usuario:
-            from backend.rgenerator.reports.branding import reemplazar_ultima_linea
-            header_actual = (pdf_layout.get("branding") or {}).get("center_header")
-            header_nuevo = reemplazar_ultima_linea(header_actual, descripcion_periodo)
-            if header_nuevo:
-                branding_override = {"center_header": header_nuevo}
-
-        # ── Motor único: despacho al módulo del indicador ──
-        # Precedencia (contrato §2.2): `body.engine` explícito > módulo que
-        # declara el modo > `pdf_layout.engine` > weasyprint. El módulo trae
-        # sus propias secciones, así que NO pasa por el 422 de "sin
-        # secciones configuradas".
-        modo_periodo = (periodo or {}).get("tipo") if periodo else None
-        modulo_custom, nombre_modulo = (
-            _modulo_motor_unico(record) if (modo_periodo and not engine_override)
-            else (None, None)
+        rebanadas = [(v, {id_dimension: v}) for v in valores]
+    else:
+        raise HTTPException(
+            status_code=422,
+            detail="Indica `por` (dimensión a recorrer) o `filtros_lote`.",
         )
-        if modulo_custom is not None:
-            from backend.rgenerator.reports import custom as custom_reports
-            from backend.rgenerator.reports.errores import DatosInsuficientes
-
-            if not custom_reports.soporta_modo(modulo_custom, modo_periodo):
-                # No debería ocurrir: report-options ya deshabilitó la card.
-                raise HTTPException(
-                    status_code=400,
-                    detail=custom_reports.motivo_modo(modulo_custom, modo_periodo),
-                )
+    if len(rebanadas) > EXPORT_PDF_LOTE_MAX:
+        raise HTTPException(
+            status_code=422,
+            detail=f"El lote pide {len(rebanadas)} informes; el máximo es {EXPORT_PDF_LOTE_MAX}.",
+        )
+    return rebanadas
 
-            # Los módulos consumen filtros por NOMBRE de columna, nunca por
-            # id de dimensión (contrato §2.3).
-            filtros_modulo = _filtros_por_columna(
-                db, indicator_id, user.org_id, filtros_usuario
-            )
-            if resultado_periodo is not None:
-                filtros_modulo.update(resultado_periodo.filtros)
-
-            overrides_modulo: Dict[str, Any] = {}
-            if branding_override:
-                overrides_modulo["branding"] = branding_override
-
-            # FUENTE ÚNICA del período (QA piloto SIMCE 2026-07-30, P1-1):
-            # la `descripcion` que resolvió `periodos.py` alimenta a la vez
-            # el encabezado corrido (vía branding) y el bloque de título del
-            # módulo. Antes el módulo la recalculaba por su cuenta y en
-            # `personalizado` el título decía "2025" mientras el encabezado
-            # decía "ENERO 2025 – JULIO 2025".
-            params_modulo: Dict[str, Any] = {}
-            if descripcion_periodo:
-                params_modulo["periodo_desc"] = descripcion_periodo
 
-            try:
-                pdf_bytes = modulo_custom.generar(
-                    db,
-                    indicator_id=indicator_id,
-                    org_id=user.org_id,
-                    modo=modo_periodo,
-                    filtros=filtros_modulo,
-                    params=params_modulo or None,
-                    overrides=overrides_modulo,
-                )
-            except (DatosInsuficientes, ValueError) as e:
-                raise HTTPException(status_code=400, detail=str(e))
-
-            safe_name = record.name.replace(" ", "_").replace("/", "-")
-            return Response(
-                content=pdf_bytes,
-                media_type="application/pdf",
-                headers={
-                    "Content-Disposition":
-                        content_disposition(f"informe_{safe_name}.pdf")
-                },
-            )
+def _render_export_pdf_lote(
+    db: Session,
+    indicator_id: int,
+    org_id: int,
+    body: ExportPDFLoteRequest,
+    destino,
+) -> str:
+    """Escribe en `destino` un ZIP con un PDF por rebanada; devuelve su nombre.
+
+    Cada rebanada se prepara acá, con la sesión, compartiendo la carga del
+    indicador (`reports/lote.py`); su render (secciones + WeasyPrint) va al
+    pool de procesos con los datos ya derivados, y el PDF entra al ZIP
+    apenas termina, mientras se preparan las siguientes.
+    Una rebanada sin datos (400/422) no tumba el lote: queda listada en
+    `omitidos.txt` dentro del ZIP. El avance (`progreso.reportar`) es por
+    informe terminado. `save_as_default` se ignora en lote.
+    """
+    from backend.rgenerator.reports.errores import DatosInsuficientes
+    from backend.rgenerator.reports.lote import en_lote, escribir_zip, nombre_archivo, renderizar
+    from backend.rgenerator.reports.progreso import reportando, reportar
 
-        if engine == "weasyprint":
-            if not pdf_layout.get("sections"):
-                modo_label = "histórico" if tipo == "historico" else "por evaluación"
-                raise HTTPException(
-                    status_code=422,
-                    detail=f"El indicador no tiene secciones configuradas para el informe "
-                           f"{modo_label}. Agrega secciones en el Editor de Layout → "
-                           f"pestaña Informe PDF → {modo_label}."
-                )
-            from backend.rgenerator.core.report_steps import build_pdf_bytes
-            from backend.rgenerator.reports.errores import DatosInsuficientes
-            try:
-                pdf_bytes = build_pdf_bytes(
-                    record, db, user.org_id,
-                    filters=filters,
-                    branding_override=branding_override,
-                    pdf_layout_override=pdf_layout,
-                )
-            except DatosInsuficientes as e:
-                # Combinación de filtros sin datos: 400 accionable en vez de
-                # un PDF con gráficos en blanco (QA 2026-07-30, P0-1).
-                raise HTTPException(status_code=400, detail=str(e))
-        elif engine == "pdl_idel":
-            from backend.rgenerator.tooling.report_pdl_idel_tools import build_pdl_idel_pdf_bytes
-            try:
-                pdf_bytes = build_pdl_idel_pdf_bytes(
-                    record, db, user.org_id, filters=filters,
-                )
-            except ValueError as e:
-                # Sin datos tras aplicar filtros — feedback accionable al usuario.
-                raise HTTPException(status_code=422, detail=str(e))
-        else:
-            raise HTTPException(
-                status_code=501,
-                detail=f"Motor '{engine}' aún no implementado."
-            )
+    record = db.query(Indicator).filter(
+        Indicator.id_indicator == indicator_id,
+        Indicator.org_id == org_id,
+    ).first()
+    if not record:
+        raise HTTPException(status_code=404, detail="Indicador no encontrado")
 
-        safe_name = record.name.replace(" ", "_").replace("/", "-")
-        return Response(
-            content=pdf_bytes,
-            media_type="application/pdf",
-            headers={"Content-Disposition": content_disposition(f"informe_{safe_name}.pdf")},
-        )
+    base = body.model_dump(exclude={"por", "valores", "filtros_lote"})
+    base["save_as_default"] = False
+
+    with en_lote():
+        rebanadas = _rebanadas_lote(db, indicator_id, org_id, body)
+        generados: List[str] = []
+        omitidas: List[HTTPException] = []
+        etiquetas_omitidas: List[str] = []
+        hechos = [0]
+
+        def _terminada() -> None:
+            hechos[0] += 1
+            reportar(hechos[0], len(rebanadas))
+
+        def _omitir(etiqueta: str, e: HTTPException) -> None:
+            omitidas.append(e)
+            etiquetas_omitidas.append(f"{etiqueta}: {e.detail}")
+            _terminada()
+
+        def _preparados():
+            for etiqueta, filtros in rebanadas:
+                cuerpo = ExportPDFRequest(**{**base, "filters": {**(body.filters or {}), **filtros}})
+                try:
+                    # El avance por secciones de cada PDF no se reporta: el
+                    # del lote es por informe.
+                    with reportando(lambda hechas, total: None):
+                        pdf, filename = _render_export_pdf(db, indicator_id, org_id, cuerpo)
+                except HTTPException as e:
+                    if e.status_code not in (400, 422):
+                        raise
+                    _omitir(etiqueta, e)
+                    continue
+                stem = filename[:-4] if filename.lower().endswith(".pdf") else filename
+                yield (etiqueta, f"{stem}_{nombre_archivo(etiqueta)}.pdf"), pdf
+
+        def _pdfs():
+            for (etiqueta, nombre), pdf in renderizar(_preparados()):
+                if isinstance(pdf, DatosInsuficientes):
+                    _omitir(etiqueta, HTTPException(status_code=400, detail=str(pdf)))
+                    continue
+                if isinstance(pdf, Exception):
+                    raise pdf
+                generados.append(etiqueta)
+                _terminada()
+                yield nombre, pdf
+            if etiquetas_omitidas:
+                yield "omitidos.txt", "\n".join(etiquetas_omitidas).encode("utf-8")
+
+        escribir_zip(destino, _pdfs())
+
+    if omitidas and not generados:
+        # Ninguna rebanada produjo PDF: el error de la primera es el del lote.
+        raise omitidas[0]
+    safe_name = record.name.replace(" ", "_").replace("/", "-")
+    return f"informes_{safe_name}.zip"
+
+
+@router.post("/{indicator_id}/export-pdf/batch")
+def export_pdf_lote(
+    indicator_id: int,
+    body: ExportPDFLoteRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Genera el informe PDF del indicador para N rebanadas y devuelve un ZIP.
+
+    Mismo despacho que `export-pdf` por rebanada: `{"por": "Curso"}` produce
+    un PDF por curso con datos; `{"por": "Curso", "valores": ["1 A", "2 A"]}`
+    solo esos; `{"filtros_lote": [{...}, {...}]}` un PDF por conjunto de
+    filtros. Para lotes largos conviene la versión asíncrona
+    (`POST /api/report-jobs/indicator/{id}/batch`).
+    """
+    destino = tempfile.SpooledTemporaryFile(max_size=_ZIP_LOTE_EN_MEMORIA)
+    try:
+        filename = _render_export_pdf_lote(db, indicator_id, user.org_id, body, destino)
+        destino.seek(0)
     except HTTPException:
+        destino.close()
         raise
-    except Exception as e:
+    except Exception:
+        destino.close()
         logger.error("Error interno no controlado en router de indicators", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
+    return StreamingResponse(
+        iter(lambda: destino.read(64 * 1024), b""),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(filename)},
+        background=BackgroundTask(destino.close),
+    )
+
 
 @router.delete("/{indicator_id}")
 def delete_indicator(
@@ -27,11 +27,13 @@ from pydantic import BaseModel, Field
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from backend.auditing import client_ip, make_metric_data
+from backend.auditing import client_ip
 from backend.auth import ApiKeyContext, require_scope
 from backend.config import UPLOADS_DIR
 from backend.database import get_db
 from backend.logging_config import get_logger
+from backend.metric_bulk import escribir_metric_data
+from backend.pipeline_telemetry import registrar
 from backend.models import Dimension, IngestLog, Metric, MetricDimension, Pipeline
 from backend.rgenerator.core.pares_nombre import (
     completar_pares_nombre,
@@ -277,7 +279,8 @@ def ingest_metric_data(
     fields = _expected_fields(metric)
 
     errors: List[dict] = []
-    to_insert = []
+    values: List[str] = []
+    dimensions: List[Dict[str, str]] = []
     rows_ok = 0
 
     for idx, record in enumerate(body.records):
@@ -289,15 +292,8 @@ def ingest_metric_data(
             completar_pares_nombre(dims_json, pares_nombre)
         rows_ok += 1
         if not body.dry_run:
-            to_insert.append(make_metric_data(
-                metric_id=metric_id,
-                value=final_value,
-                dimensions=dims_json,
-                org_id=ctx.org_id,
-                user_id=None,
-                via="api_direct",
-                ip=client_ip(request),
-            ))
+            values.append(final_value)
+            dimensions.append(dims_json)
 
     rows_failed = len(errors)
 
@@ -317,8 +313,17 @@ def ingest_metric_data(
         "dry_run": body.dry_run,
     }
 
-    if not body.dry_run and to_insert:
-        db.add_all(to_insert)
+    if not body.dry_run and values:
+        escribir_metric_data(
+            db,
+            metric_id=metric_id,
+            org_id=ctx.org_id,
+            values=values,
+            dimensions=dimensions,
+            user_id=None,
+            via="api_direct",
+            ip=client_ip(request),
+        )
 
     log_row = IngestLog(
         org_id=ctx.org_id,
@@ -350,7 +355,7 @@ def ingest_metric_data(
         logger.error("IntegrityError inesperado en ingest_metric_data", exc_info=True)
         raise HTTPException(status_code=409, detail="Conflicto de idempotencia")
 
-    if not body.dry_run and to_insert:
+    if not body.dry_run and values:
         invalidate_metric_df_cache(metric_id)
 
     return response_body
@@ -393,7 +398,7 @@ def get_metric_schema(
 #
 # Ejecución SÍNCRONA: no hay cola real (fuera de alcance de W1, ver
 # docs/planes/w1_ingesta_api.md). Cada llamada crea un `PipelineRunner`
-# nuevo (sin estado en `ACTIVE_RUNNERS`, que está keyed por user_id de
+# nuevo (sin sesión en `pipeline_runs`, que está keyed por user_id de
 # sesión JWT y no aplica a auth por API key) y corre `run_all()`:
 #   - Si termina -> status "completed".
 #   - Si un step pide más archivos (`RequestUserFiles` con specs faltantes)
@@ -455,6 +460,7 @@ async def trigger_pipeline(
     rows_ok = 0
     rows_failed = 0
     detail: Optional[str] = None
+    runner: Optional[PipelineRunner] = None
 
     if not config:
         detail = "El pipeline no tiene configuración"
@@ -480,6 +486,10 @@ async def trigger_pipeline(
             detail = "Error interno ejecutando el pipeline"
             logger.error("Error ejecutando pipeline vía ingest trigger (pipeline_id=%s)", pipeline_id, exc_info=True)
 
+    if runner is not None:
+        # Sin sesión interactiva: la telemetría va sin run_id, junto con el log.
+        registrar(db, runner, org_id=ctx.org_id, pipeline_id=pipeline_id)
+
     log_row = IngestLog(
         org_id=ctx.org_id,
         api_key_id=ctx.api_key_id,
@@ -23,12 +23,14 @@ import re
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from backend.auth import get_current_user, require_editor
 from backend.database import get_db
 from backend.models import Spec, User
+from backend.rgenerator.core.lookups import TramosCompilados
 from backend.schemas_mapping import (
     MappingConfig,
     MappingCreate,
@@ -180,6 +182,51 @@ def apply_mapping(cfg: MappingConfig, value: Any) -> MappingPreviewResult:
     )
 
 
+def _a_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+def apply_mapping_many(cfg: MappingConfig, values: List[Any]) -> List[MappingPreviewResult]:
+    """`apply_mapping` para una lista de valores, con el config compilado
+    una vez: los tramos con `TramosCompilados` (searchsorted) y el
+    discrete resolviendo cada texto distinto una sola vez. Mismo resultado
+    que `[apply_mapping(cfg, v) for v in values]`."""
+    if cfg.kind == "range":
+        numeros = [_a_float(v) for v in values]
+        arr = np.array([np.nan if n is None else n for n in numeros], dtype=float)
+        idx = TramosCompilados([(r.min, r.max) for r in cfg.ranges], cfg.match).indices(arr)
+        resultados = []
+        for value, n, i in zip(values, numeros, idx):
+            if n is not None and np.isnan(n):
+                # NaN explícito: solo lo atrapa un tramo abierto en ambos
+                # lados; se resuelve con la versión por valor.
+                resultados.append(apply_mapping(cfg, value))
+                continue
+            matched = i >= 0
+            resultados.append(MappingPreviewResult(
+                value=value,
+                raw_value=value,
+                label=cfg.ranges[i].label if matched else cfg.default,
+                matched=bool(matched),
+            ))
+        return resultados
+
+    por_texto: Dict[str, MappingPreviewResult] = {}
+    resultados = []
+    for value in values:
+        texto = "" if value is None else str(value)
+        if texto not in por_texto:
+            por_texto[texto] = apply_mapping(cfg, texto)
+        base = por_texto[texto]
+        resultados.append(MappingPreviewResult(
+            value=value, raw_value=base.raw_value, label=base.label, matched=base.matched,
+        ))
+    return resultados
+
+
 def resolve_mapping_to_lookup_config(db: Session, org_id: int, mapping_id: int) -> Dict[str, Any]:
     """Resuelve un mapping_id al config inline esperado por
     derived_fields_engine (apply_lookup_range / apply_lookup_dict).
@@ -330,7 +377,7 @@ async def preview_mapping(
 ):
     """Aplica un MappingConfig (en body) a una lista de valores y
     devuelve `[{value, raw_value, label, matched}]`. Sin persistencia."""
-    return [apply_mapping(payload.config, v) for v in payload.values]
+    return apply_mapping_many(payload.config, payload.values)
 
 
 @router.get("/{mapping_id}/resolved")
@@ -8,7 +8,6 @@ import pandas as pd
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Request, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy import func, or_, cast, literal
 from sqlalchemy.orm import Session
 
 from backend.database import get_db
@@ -16,6 +15,16 @@ from backend.auth import get_current_user, require_admin, require_editor
 from backend.auditing import client_ip, make_metric_data
 from backend.http_utils import content_disposition
 from backend.logging_config import get_logger
+from backend.lectura_por_lotes import leer_por_lotes
+from backend.metric_bulk import LoteInvalido, guardar_lotes
+from backend.metric_export import FORMATOS as FORMATOS_EXPORT, Exportacion, serializar as serializar_export
+from backend.metric_store import (
+    busqueda_texto_sql,
+    columnas_cacheadas,
+    conteos_dimensiones,
+    filtro_dimensiones_sql,
+    marco_plano,
+)
 from backend.models import User, Metric, MetricDimension, MetricData, Dimension
 from backend.rgenerator.core.pares_nombre import (
     completar_pares_nombre,
@@ -121,44 +130,16 @@ def _pares_nombre_de_metrica(db: Session, metric_id: int):
 
 # ── Filtrado server-side de metric_data ──────────────────────────────────
 #
-# `MetricData.dimensions_json` es una columna Text con un JSON plano
-# {"<id_dimension>": "valor"}. Para poder filtrar DENTRO de la query
-# paginada (la tabla de /values llega a ~25k filas por métrica, así que
-# filtrar en Python después de paginar daría totales incorrectos) hace
-# falta extraer la clave del JSON en SQL.
-#
-# No existe un dialecto común: PostgreSQL (prod/dev) usa `::jsonb ->> 'k'`
-# y SQLite (tests) usa `json_extract(col, '$."k"')`. `_dim_value_expr`
-# encapsula esa bifurcación; el resto del router no debería volver a
-# escribir SQL sobre dimensions_json.
-#
-# Precondición: `dimensions_json` siempre contiene JSON válido — todas las
-# escrituras pasan por `json.dumps` (ver `backend/auditing.make_metric_data`
-# y los endpoints de este router). Un valor corrupto haría fallar el
-# extractor en ambos dialectos.
+# Para poder filtrar DENTRO de la query paginada (la tabla de /values llega
+# a ~25k filas por métrica, así que filtrar en Python después de paginar
+# daría totales incorrectos) los filtros por dimensión se compilan a SQL
+# con `metric_store.filtro_dimensiones_sql`, el mismo compilador que usan
+# todos los loaders; el router no debería volver a escribir SQL sobre
+# dimensions_json.
 
 _DIM_ID_RE = re.compile(r"^\d+$")
 
 
-def _dim_value_expr(db: Session, dim_id: str):
-    """Expresión SQL portable: valor de la dimensión `dim_id` como texto.
-
-    `dim_id` se valida contra `_DIM_ID_RE` antes de llegar aquí (solo
-    dígitos), porque en ambos dialectos la clave viaja embebida en un
-    literal de path/JSON y no como bind param.
-    """
-    key = str(dim_id)
-    if not _DIM_ID_RE.match(key):
-        raise HTTPException(status_code=400, detail=f"id de dimensión inválido: {key}")
-
-    dialect = db.bind.dialect.name if db.bind is not None else "sqlite"
-    if dialect == "postgresql":
-        from sqlalchemy.dialects.postgresql import JSONB
-        return cast(MetricData.dimensions_json, JSONB).op("->>")(literal(key))
-    # SQLite (tests) y cualquier otro dialecto con json1
-    return func.json_extract(MetricData.dimensions_json, literal(f'$."{key}"'))
-
-
 def _parse_filters_param(raw: Optional[str]) -> Dict[str, List[str]]:
     """Parsea el query param `filters` (JSON) a {dim_id: [valores]}.
 
@@ -194,19 +175,15 @@ def _aplicar_filtros(query, db: Session, filtros: Dict[str, List[str]], q: Optio
 
     `q` es difusa a propósito: hace LIKE sobre el JSON crudo, así que también
     matchea las claves numéricas. Los filtros exactos, en cambio, van por
-    extracción de clave.
+    extracción de clave. Ambos predicados se arman en `metric_store` (la
+    búsqueda usa índices trigram / FTS5 según el dialecto).
     """
-    for dim_id, valores in (filtros or {}).items():
-        query = query.filter(_dim_value_expr(db, dim_id).in_(valores))
-
-    if q and q.strip():
-        patron = f"%{q.strip().lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(func.coalesce(MetricData.value, "")).like(patron),
-                func.lower(func.coalesce(MetricData.dimensions_json, "")).like(patron),
-            )
-        )
+    for predicado in filtro_dimensiones_sql(db, filtros):
+        query = query.filter(predicado)
+
+    busqueda = busqueda_texto_sql(db, q)
+    if busqueda is not None:
+        query = query.filter(busqueda)
     return query
 
 
@@ -437,11 +414,8 @@ def get_metric_data_facets(
 
     Devuelve `{"<id_dimension>": {"name": "Curso", "values": [...]}}`.
 
-    Se computa en Python sobre una única query que trae solo la columna
-    `dimensions_json` (no las filas completas). Con ~25k filas por métrica el
-    costo es despreciable y evita depender de funciones de expansión de JSON
-    que no existen en SQLite (`jsonb_each` vs `json_each` tienen semánticas
-    distintas), manteniendo un solo camino de código para ambos dialectos.
+    Sale de `metric_dimension_value_counts` (una fila por valor distinto,
+    mantenida por triggers), así que no depende del tamaño de la métrica.
     """
     try:
         metric = db.query(Metric).filter(
@@ -462,16 +436,12 @@ def get_metric_data_facets(
                 dims_map[d.id_dimension] = d.name
 
         valores: Dict[str, set] = {}
-        for (raw,) in db.query(MetricData.dimensions_json).filter(
-            MetricData.id_metric == metric_id
-        ).all():
-            for dim_id_str, val in _parse_dims_json(raw).items():
-                if val is None:
-                    continue
-                texto = str(val).strip()
+        for dim_id_str, por_valor in conteos_dimensiones(db, [metric_id]).items():
+            for val in por_valor:
+                texto = val.strip()
                 if not texto or texto.lower() in ("nan", "nat", "none", "null"):
                     continue
-                valores.setdefault(str(dim_id_str), set()).add(texto)
+                valores.setdefault(dim_id_str, set()).add(texto)
 
         # Orden de las dimensiones: primero las declaradas por la métrica (en
         # su orden), después las que solo aparecen en los datos.
@@ -694,15 +664,32 @@ def delete_metric_data_batch(
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 
+def _emitir_export(exportacion: Exportacion, formato: str, metric_id: int):
+    """Trozos del archivo; un error a mitad de camino ya no puede ser un
+    500 (los headers salieron), así que se registra y se corta el stream."""
+    try:
+        yield from serializar_export(exportacion, formato)
+    except Exception:
+        logger.error("Export de la métrica %s interrumpido", metric_id, exc_info=True)
+        raise
+
+
 @router.get("/{metric_id}/export")
 def export_metric_data(
     metric_id: int,
     format: str = "excel",
     include_audit: bool = False,
+    filters: Optional[str] = Query(
+        None,
+        description='JSON {"<id_dimension>": ["valor", ...]} — exporta solo esas filas',
+    ),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
+    if format not in FORMATOS_EXPORT:
+        raise HTTPException(status_code=400, detail="Formato no soportado")
     try:
+        filtros = _parse_filters_param(filters)
         metric = db.query(Metric).filter(
             Metric.id_metric == metric_id,
             Metric.org_id == user.org_id,
@@ -710,73 +697,20 @@ def export_metric_data(
         if not metric:
             raise HTTPException(status_code=404, detail="Métrica no encontrada")
 
-        meta = _parse_meta_json(metric.meta_json)
-
         # Build dims_map: id_dimension -> name
         dim_links = db.query(MetricDimension).filter(MetricDimension.id_metric == metric_id).all()
         dim_ids = [lnk.id_dimension for lnk in dim_links]
         dims = db.query(Dimension).filter(Dimension.id_dimension.in_(dim_ids)).all()
         dims_map = {d.id_dimension: d.name for d in dims}
 
-        data_rows = db.query(MetricData).filter(MetricData.id_metric == metric_id).all()
-
-        # Si se pide auditoría, resolver emails de usuarios en una query.
-        users_map: dict[int, str] = {}
-        if include_audit:
-            uids = {r.created_by_user_id for r in data_rows if r.created_by_user_id}
-            if uids:
-                for u in db.query(User).filter(User.id.in_(uids)).all():
-                    users_map[u.id] = u.email
-
-        flat_data = []
-        for r in data_rows:
-            item = {}
-            dims_json = _parse_dims_json(r.dimensions_json)
-            for dim_id_str, val in dims_json.items():
-                dim_name = dims_map.get(int(dim_id_str), f"Dim_{dim_id_str}")
-                item[dim_name] = val
-
-            value = r.value
-            if metric.data_type == "object":
-                try:
-                    val_obj = json.loads(value) if isinstance(value, str) else (value or {})
-                    for k, v in val_obj.items():
-                        item[k] = v
-                except Exception:
-                    item["Valor_Raw"] = str(value)
-            else:
-                item[metric.name] = value
-
-            if include_audit:
-                item["Cargado por"]   = users_map.get(r.created_by_user_id) if r.created_by_user_id else None
-                item["Vía"]           = r.created_via
-                item["Fecha de carga"] = r.created_at.strftime("%Y-%m-%d %H:%M:%S") if r.created_at else None
-                item["IP"]             = r.created_from_ip
-
-            flat_data.append(item)
-
-        df_export = pd.DataFrame(flat_data)
-        stream = io.BytesIO()
-
-        if format == "excel":
-            with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-                df_export.to_excel(writer, index=False, sheet_name="Datos")
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            filename_ext = "xlsx"
-        elif format == "csv":
-            df_export.to_csv(stream, index=False, sep=";", encoding="utf-8-sig")
-            media_type = "text/csv"
-            filename_ext = "csv"
-        elif format == "txt":
-            df_export.to_csv(stream, index=False, sep="\t", encoding="utf-8")
-            media_type = "text/plain"
-            filename_ext = "txt"
-        else:
-            raise HTTPException(status_code=400, detail="Formato no soportado")
-
-        stream.seek(0)
+        # Por lotes (ver backend/metric_export.py): desde la copia columnar
+        # si ya está en el cache del proceso, si no con cursor de servidor
+        # sobre metric_data. La cabecera se resuelve acá, antes de empezar
+        # a responder; las filas se leen mientras se emiten.
+        exportacion = Exportacion(db, metric, dims_map, filtros, include_audit=include_audit)
+        media_type, filename_ext = FORMATOS_EXPORT[format]
         return StreamingResponse(
-            stream,
+            _emitir_export(exportacion, format, metric_id),
             media_type=media_type,
             headers={"Content-Disposition": f"attachment; filename=export.{filename_ext}"},
         )
@@ -787,6 +721,25 @@ def export_metric_data(
         raise HTTPException(status_code=500, detail="Error interno del servidor")
 
 
+def _columna_a_dim_key(column: str, dims_map: Dict[int, str]) -> Optional[str]:
+    """Clave de dimensions_json de la columna `column` de `marco_plano`."""
+    for dim_id, nombre in dims_map.items():
+        if nombre == column:
+            return str(dim_id)
+    m = re.fullmatch(r"Dim_(\d+)", column)
+    if m and int(m.group(1)) not in dims_map:
+        return m.group(1)
+    return None
+
+
+def _es_columna_de_value(metric: Metric, column: str) -> bool:
+    if metric.data_type != "object":
+        return column == metric.name
+    meta = _parse_meta_json(metric.meta_json)
+    nombres = {f.get("name") for f in (meta.get("fields") or []) if isinstance(f, dict)}
+    return column in nombres or column == "Valor_Raw"
+
+
 @router.get("/{metric_id}/distinct/{column}")
 def get_metric_distinct_values(
     metric_id: int,
@@ -807,28 +760,19 @@ def get_metric_distinct_values(
         dims = db.query(Dimension).filter(Dimension.id_dimension.in_(dim_ids)).all()
         dims_map = {d.id_dimension: d.name for d in dims}
 
-        data_rows = db.query(MetricData).filter(MetricData.id_metric == metric_id).all()
+        # Una dimensión sale del índice de conteos. Los nombres de columna
+        # son los de `marco_plano(..., solo_dims_presentes=True)`: el de la
+        # dimensión o `Dim_<id>`; un field del value con el mismo nombre
+        # tiene precedencia, así que ese caso va por el frame.
+        dim_key = _columna_a_dim_key(column, dims_map)
+        if dim_key is not None and not _es_columna_de_value(metric, column):
+            conteos = conteos_dimensiones(db, [metric_id], [dim_key]).get(dim_key, {})
+            return {"values": sorted(conteos)}
 
+        df = marco_plano(columnas_cacheadas(db, metric), metric, dims_map, solo_dims_presentes=True)
         distinct_vals = set()
-        for r in data_rows:
-            dims_json = _parse_dims_json(r.dimensions_json)
-            for dim_id_str, val in dims_json.items():
-                dim_name = dims_map.get(int(dim_id_str), f"Dim_{dim_id_str}")
-                if dim_name == column:
-                    distinct_vals.add(str(val))
-
-            value = r.value
-            if metric.data_type == "object":
-                try:
-                    val_obj = json.loads(value) if isinstance(value, str) else {}
-                    for k, v in val_obj.items():
-                        if k == column:
-                            distinct_vals.add(str(v))
-                except Exception:
-                    if column == "Valor_Raw":
-                        distinct_vals.add(str(value))
-            elif metric.name == column:
-                distinct_vals.add(str(value))
+        if column in df.columns:
+            distinct_vals = {str(v) for v in df[column].tolist() if v is not None}
 
         return {"values": sorted(list(distinct_vals))}
     except Exception as e:
@@ -884,7 +828,7 @@ def get_metric_template(
 
 
 @router.post("/{metric_id}/import")
-async def import_metric_data(
+def import_metric_data(
     metric_id: int,
     request: Request,
     files: List[UploadFile] = File(...),
@@ -903,90 +847,42 @@ async def import_metric_data(
 
         # Build dim_name -> id map
         dim_name_to_id = _dim_name_to_id(db, metric_id)
-        # Pares X/X_Norm de la métrica: si el archivo trae solo una de las
-        # dos columnas, la otra se completa antes de insertar (misma red de
-        # seguridad que aplica `SaveToMetric` en el camino de pipelines).
-        pares_nombre = pares_nombre_normalizado(dim_name_to_id)
-
-        new_data_points = []
+        # El escritor masivo completa los pares X/X_Norm de la métrica si el
+        # archivo trae solo una de las dos columnas (misma red de seguridad
+        # que aplica `SaveToMetric` en el camino de pipelines).
+        fields = meta.get("fields", []) if metric.data_type == "object" else []
+        imported = 0
 
         for file in files:
-            contents = await file.read()
-            if file.filename.endswith(".csv"):
-                df = pd.read_csv(io.BytesIO(contents), sep=";")
-            else:
-                df = pd.read_excel(io.BytesIO(contents))
-
-            def _is_empty_like(v):
-                if v is None:
-                    return True
-                try:
-                    if pd.isna(v):
-                        return True
-                except Exception:
-                    pass
-                if isinstance(v, str):
-                    s = v.strip().lower()
-                    return s in ("", "nan", "nat", "none", "null")
-                return False
-
-            for _, row in df.iterrows():
-                dims_json = {}
-                for dim_name, dim_id in dim_name_to_id.items():
-                    if dim_name in df.columns:
-                        val = row[dim_name]
-                        if not _is_empty_like(val):
-                            dims_json[str(dim_id)] = str(val)
-
-                if pares_nombre:
-                    completar_pares_nombre(dims_json, pares_nombre)
-
-                final_value = None
-                if metric.data_type == "object":
-                    val_obj = {}
-                    fields = meta.get("fields", [])
-                    for f in fields:
-                        fname = f["name"]
-                        if fname in df.columns:
-                            val = row[fname]
-                            if not _is_empty_like(val):
-                                if f["type"] == "int":
-                                    try: val = int(val)
-                                    except Exception: pass
-                                elif f["type"] == "float":
-                                    try: val = float(val)
-                                    except Exception: pass
-                                val_obj[fname] = val
-                    final_value = json.dumps(val_obj)
-                else:
-                    value_col = metric.name
-                    if value_col in df.columns:
-                        v = row[value_col]
-                        if not _is_empty_like(v):
-                            if metric.data_type == "int":
-                                final_value = str(int(v))
-                            elif metric.data_type == "float":
-                                final_value = str(float(v))
-                            else:
-                                final_value = str(v)
-
-                if final_value is not None:
-                    new_data_points.append(make_metric_data(
-                        metric_id=metric_id,
-                        value=final_value,
-                        dimensions=dims_json,
-                        org_id=user.org_id,
-                        user_id=user.id,
-                        via="import_csv",
-                        ip=client_ip(request),
-                    ))
-
-        if new_data_points:
-            db.add_all(new_data_points)
+            # Por lotes desde el archivo temporal del upload: ni los bytes
+            # ni el DataFrame completo pasan por memoria.
+            def _avance(carga, nombre=file.filename):
+                logger.info("Import métrica %s (%s): %d filas guardadas", metric_id, nombre, carga.filas)
+
+            try:
+                carga = guardar_lotes(
+                    db,
+                    leer_por_lotes(file.file, file.filename or "", sep=";"),
+                    metric=metric,
+                    fields=fields,
+                    dim_name_to_id=dim_name_to_id,
+                    org_id=user.org_id,
+                    user_id=user.id,
+                    via="import_csv",
+                    ip=client_ip(request),
+                    vacios_como_nulos=True,
+                    progreso=_avance,
+                )
+            except LoteInvalido as e:
+                db.rollback()
+                raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+            imported += carga.filas
+
+        if imported:
             db.commit()
             invalidate_metric_df_cache(metric_id)
 
-        return {"status": "success", "imported": len(new_data_points)}
+        return {"status": "success", "imported": imported}
     except HTTPException:
         raise
     except Exception as e:
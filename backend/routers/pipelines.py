@@ -2,24 +2,23 @@ import json
 import os
 import re
 import shutil
-import time
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import List, Literal, Optional
 
 import pandas as pd
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from backend.auth import get_current_user, require_admin, require_editor
 from backend.database import get_db
 from backend.logging_config import get_logger
-from backend.models import Pipeline, User
+from backend import artifact_export, pipeline_runs, pipeline_telemetry
+from backend.models import Pipeline, PipelineRun, User
 from backend.config import UPLOADS_DIR, PIPELINE_RUNS_DIR
 from backend.rgenerator.core.step import StepExecutionError
-from backend.rgenerator.tooling.pipeline_tools import PipelineRunner
 from backend.rgenerator.tooling.data_tools import safe_json_to_text, safe_text_to_json
 
 logger = get_logger(__name__)
@@ -29,26 +28,18 @@ router = APIRouter(prefix="/api/pipelines", tags=["pipelines"])
 # ─────────────────────────────────────────────────────────────────────────
 # Estado de sesión de pipelines
 #
-# `ACTIVE_RUNNERS` mantiene los `PipelineRunner` en curso en memoria. La
-# clave es `(user_id, pipeline_id)` — así distintos usuarios pueden
-# ejecutar el mismo pipeline en paralelo sin pisarse el state.
+# Cada corrida interactiva (run → waiting_input → input → …) vive en la
+# tabla `pipeline_runs` + un checkpoint en disco (ver
+# `backend/pipeline_runs.py`), no en memoria del proceso: cualquier worker
+# de uvicorn puede retomarla en el siguiente `step()`. Hay a lo sumo una
+# sesión abierta por `(user_id, pipeline_id)` — así distintos usuarios
+# pueden ejecutar el mismo pipeline en paralelo sin pisarse el state.
 #
-# IMPORTANTE: este dict vive en memoria del proceso. Para que funcione
-# uvicorn debe correr con `--workers 1` (ver scripts/start.sh). Con
-# múltiples workers, cada request puede caer en un proceso distinto y
-# no encontrar el runner. La opción de escala es mover este state a Redis.
-#
-# `_RUNNER_LAST_ACTIVITY` rastrea cuándo se tocó cada runner por última
-# vez. Runners idle por más de RUNNER_TTL_SECONDS se descartan en cada
-# request para no acumular sesiones colgadas.
+# Sesiones sin actividad por más de PIPELINE_RUN_TTL_SECONDS se cierran en
+# cada request para no acumular checkpoints colgados.
 # ─────────────────────────────────────────────────────────────────────────
 
-RunnerKey = Tuple[int, int]  # (user_id, pipeline_id)
-
-ACTIVE_RUNNERS: Dict[RunnerKey, PipelineRunner] = {}
-_RUNNER_LAST_ACTIVITY: Dict[RunnerKey, float] = {}
-
-RUNNER_TTL_SECONDS = 30 * 60  # 30 minutos
+_EN_CURSO = {"error": "El pipeline ya se está ejecutando en otra solicitud. Espera a que termine."}
 
 # ─── Límites de upload ───────────────────────────────────────────────────
 # input_key viene de un Form y se usa como nombre de directorio: solo
@@ -58,29 +49,6 @@ _INPUT_KEY_RE = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
 MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
 
 
-def _key(user: User, pipeline_id: int) -> RunnerKey:
-    return (user.id, pipeline_id)
-
-
-def _cleanup_stale_runners() -> int:
-    """Descarta runners cuya última actividad es más antigua que el TTL."""
-    now = time.time()
-    stale = [k for k, ts in _RUNNER_LAST_ACTIVITY.items() if now - ts > RUNNER_TTL_SECONDS]
-    for k in stale:
-        ACTIVE_RUNNERS.pop(k, None)
-        _RUNNER_LAST_ACTIVITY.pop(k, None)
-    return len(stale)
-
-
-def _touch_runner(key: RunnerKey) -> None:
-    _RUNNER_LAST_ACTIVITY[key] = time.time()
-
-
-def _drop_runner(key: RunnerKey) -> None:
-    ACTIVE_RUNNERS.pop(key, None)
-    _RUNNER_LAST_ACTIVITY.pop(key, None)
-
-
 def _pipeline_to_dict(p: Pipeline) -> dict:
     return {
         "pipeline_id": p.pipeline_id,
@@ -137,6 +105,22 @@ async def get_pipelines(
         return JSONResponse({"error": "Error interno del servidor"}, status_code=500)
 
 
+@router.get("/telemetry/steps")
+def get_step_telemetry(
+    pipeline_id: Optional[int] = None,
+    days: int = Query(30, ge=1, le=365),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Tiempos, memoria y volumen por clase de paso en los últimos `days`
+    días (todas las corridas de la organización o de un pipeline)."""
+    return {
+        "days": days,
+        "pipeline_id": pipeline_id,
+        "steps": pipeline_telemetry.resumen_por_clase(db, user.org_id, pipeline_id=pipeline_id, days=days),
+    }
+
+
 @router.post("/{pipeline_id}/upload")
 async def upload_pipeline_files(
     pipeline_id: int,
@@ -204,77 +188,128 @@ async def upload_pipeline_files(
         return {"error": "Error interno del servidor"}
 
 
-@router.post("/{pipeline_id}/run")
-async def execute_pipeline(
-    pipeline_id: int,
-    db: Session = Depends(get_db),
-    user: User = Depends(require_editor),
-):
-    try:
-        _cleanup_stale_runners()
-        key = _key(user, pipeline_id)
-
-        # Si hay un runner previo en estado terminal (COMPLETED/FAILED),
-        # lo descartamos para empezar un run nuevo desde cero. Sin esto, el
-        # frontend reusaba el runner agotado y los steps ya ejecutados se
-        # saltaban (bug: pedía archivos en orden incorrecto entre re-ejecuciones).
-        existing = ACTIVE_RUNNERS.get(key)
-        if existing is not None and getattr(existing, "status", None) in ("COMPLETED", "FAILED"):
-            _drop_runner(key)
-
-        if key not in ACTIVE_RUNNERS:
+def _abrir_corrida(db: Session, user: User, pipeline_id: int, reanudar: bool = False) -> Optional[PipelineRun]:
+    """Sesión abierta del usuario en el pipeline, o una nueva.
+
+    Una sesión en estado terminal (COMPLETED/FAILED) se cierra para empezar
+    un run nuevo desde cero. Sin esto, el frontend reusaba el runner agotado
+    y los steps ya ejecutados se saltaban (bug: pedía archivos en orden
+    incorrecto entre re-ejecuciones). Con `reanudar`, una sesión FAILED se
+    retoma desde el checkpoint del último paso que no cambió (con la config
+    actual del pipeline). None si el pipeline no tiene config.
+    """
+    run = pipeline_runs.sesion_activa(db, org_id=user.org_id, user_id=user.id, pipeline_id=pipeline_id)
+    if run is not None and run.status in pipeline_runs.TERMINALES:
+        if reanudar and run.status == "FAILED":
             config = _get_pipeline_config_from_db(pipeline_id, user.org_id, db)
-            if not config:
-                return {"error": f"No se encontró la configuración del pipeline para el ID {pipeline_id}"}
-            ACTIVE_RUNNERS[key] = PipelineRunner(config, pipeline_id=pipeline_id, db=db, org_id=user.org_id, user_id=user.id)
-
-        runner = ACTIVE_RUNNERS[key]
-        # El runner puede venir cacheado de un request anterior cuya sesión
-        # DB ya fue cerrada por get_db(). Siempre inyectar la sesión fresca.
-        runner.refresh_db(db)
-        _touch_runner(key)
-        results = runner.run_all()
-        _touch_runner(key)
-        last_result = results[-1] if results else {}
+            return pipeline_runs.reanudar(db, run, config=config) if config else None
+        pipeline_runs.cerrar(db, run)
+        run = None
+    if run is None:
+        config = _get_pipeline_config_from_db(pipeline_id, user.org_id, db)
+        if not config:
+            return None
+        run = pipeline_runs.crear(db, org_id=user.org_id, user_id=user.id, pipeline_id=pipeline_id, config=config)
+    return run
+
+
+def _sesion_o_404(db: Session, user: User, pipeline_id: int, detail: str) -> PipelineRun:
+    run = pipeline_runs.sesion_activa(db, org_id=user.org_id, user_id=user.id, pipeline_id=pipeline_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=detail)
+    return run
+
+
+def _fallo_de_step(db: Session, run: PipelineRun, runner, pipeline_id: int, e: StepExecutionError) -> dict:
+    """La sesión queda abierta (FAILED): los artifacts parciales siguen
+    descargables y `/run?resume=true` la retoma desde el último checkpoint."""
+    db.rollback()
+    pipeline_runs.guardar(db, run, runner, error=str(e))
+    logger.warning(f"Pipeline {pipeline_id} falló en un paso: {e}")
+    return {"error": str(e), "status": "failed", "step_name": e.step_name, "step_index": e.step_index}
+
+
+def _fallo_interno(db: Session, run: Optional[PipelineRun]) -> dict:
+    logger.error("Error interno no controlado en router de pipelines", exc_info=True)
+    db.rollback()
+    if run is not None:
+        try:
+            pipeline_runs.cerrar(db, run, error="Error interno del servidor")
+        except Exception:
+            db.rollback()
+            logger.error("No se pudo cerrar la corrida %s", run.id, exc_info=True)
+    return {"error": "Error interno del servidor"}
+
 
-        if last_result.get("status") == "waiting_input":
-            return last_result
+def _resultado_final(db: Session, run: PipelineRun, runner, results: list, pipeline_id: int, user: User,
+                     reanudados: int = 0) -> dict:
+    last_result = results[-1] if results else {}
+    pipeline_runs.guardar(db, run, runner, last_result)
 
+    if last_result.get("status") == "waiting_input":
+        result = dict(last_result)
+    else:
+        _update_last_run(pipeline_id, user, db)
         result = {
             "status": "success",
             "message": "Pipeline completado",
             "artifacts": list(runner.ctx.artifacts.keys()),
         }
-        _update_last_run(pipeline_id, user, db)
-        return result
+    if reanudados:
+        # Pasos restaurados del checkpoint de la corrida fallida.
+        result["resumed_steps"] = reanudados
+    return result
+
+
+# Los endpoints que ejecutan steps son `def` (threadpool): un pipeline
+# lento no bloquea el event loop del resto de la API.
+@router.post("/{pipeline_id}/run")
+def execute_pipeline(
+    pipeline_id: int,
+    resume: bool = False,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_editor),
+):
+    run = None
+    try:
+        pipeline_runs.cerrar_vencidas(db)
+        run = _abrir_corrida(db, user, pipeline_id, reanudar=resume)
+        if run is None:
+            return {"error": f"No se encontró la configuración del pipeline para el ID {pipeline_id}"}
+
+        # version 0: corrida recién creada (por `reanudar`, si hubo checkpoint).
+        reanudados = run.current_step_index if resume and run.version == 0 else 0
+        runner = pipeline_runs.reclamar(db, run)
+        if runner is None:
+            run = None  # es de otra solicitud: no cerrarla si algo falla acá
+            return _EN_CURSO
+        results = runner.run_all()
+        return _resultado_final(db, run, runner, results, pipeline_id, user, reanudados)
     except StepExecutionError as e:
-        _drop_runner(_key(user, pipeline_id))
-        logger.warning(f"Pipeline {pipeline_id} falló en un paso: {e}")
-        return {"error": str(e), "status": "failed", "step_name": e.step_name, "step_index": e.step_index}
-    except Exception as e:
-        _drop_runner(_key(user, pipeline_id))
-        logger.error("Error interno no controlado en router de pipelines", exc_info=True)
-        return {"error": "Error interno del servidor"}
+        return _fallo_de_step(db, run, runner, pipeline_id, e)
+    except Exception:
+        return _fallo_interno(db, run)
 
 
 @router.post("/{pipeline_id}/input")
-async def submit_pipeline_input(
+def submit_pipeline_input(
     pipeline_id: int,
     input_data: dict,
     db: Session = Depends(get_db),
     user: User = Depends(require_editor),
 ):
     """Recibe input del usuario para reanudar un pipeline pausado."""
+    run = None
     try:
-        _cleanup_stale_runners()
-        key = _key(user, pipeline_id)
-        if key not in ACTIVE_RUNNERS:
+        pipeline_runs.cerrar_vencidas(db)
+        run = pipeline_runs.sesion_activa(db, org_id=user.org_id, user_id=user.id, pipeline_id=pipeline_id)
+        if run is None:
             return {"error": "La sesión del pipeline no está activa."}
 
-        runner = ACTIVE_RUNNERS[key]
-        # Sesión fresca: la del request que creó el runner ya está cerrada.
-        runner.refresh_db(db)
-        _touch_runner(key)
+        runner = pipeline_runs.reclamar(db, run)
+        if runner is None:
+            run = None
+            return _EN_CURSO
 
         if input_data.get("type") == "enrich_per_file":
             if not hasattr(runner.ctx, "user_inputs"):
@@ -291,118 +326,117 @@ async def submit_pipeline_input(
             runner.ctx.user_inputs["enrich_global"] = global_store
 
         results = runner.run_all()
-        _touch_runner(key)
-        last_result = results[-1] if results else {}
-
-        if last_result.get("status") == "waiting_input":
-            return last_result
-
-        result = {
-            "status": "success",
-            "message": "Pipeline completado",
-            "artifacts": list(runner.ctx.artifacts.keys()),
-        }
-        _update_last_run(pipeline_id, user, db)
-        return result
+        return _resultado_final(db, run, runner, results, pipeline_id, user)
     except StepExecutionError as e:
-        logger.warning(f"Pipeline {pipeline_id} falló en un paso: {e}")
-        return {"error": str(e), "status": "failed", "step_name": e.step_name, "step_index": e.step_index}
-    except Exception as e:
-        logger.error("Error interno no controlado en router de pipelines", exc_info=True)
-        return {"error": "Error interno del servidor"}
+        return _fallo_de_step(db, run, runner, pipeline_id, e)
+    except Exception:
+        return _fallo_interno(db, run)
 
 
 @router.post("/{pipeline_id}/step")
-async def execute_pipeline_step(
+def execute_pipeline_step(
     pipeline_id: int,
+    resume: bool = False,
     db: Session = Depends(get_db),
     user: User = Depends(require_editor),
 ):
+    run = None
     try:
-        _cleanup_stale_runners()
-        key = _key(user, pipeline_id)
-
-        # Idem que en /run: descartar runner terminal antes de crear nuevo.
-        existing = ACTIVE_RUNNERS.get(key)
-        if existing is not None and getattr(existing, "status", None) in ("COMPLETED", "FAILED"):
-            _drop_runner(key)
-
-        if key not in ACTIVE_RUNNERS:
-            config = _get_pipeline_config_from_db(pipeline_id, user.org_id, db)
-            if not config:
-                return {"error": "No se encontró la configuración del pipeline"}
-            ACTIVE_RUNNERS[key] = PipelineRunner(config, pipeline_id=pipeline_id, db=db, org_id=user.org_id, user_id=user.id)
-
-        runner = ACTIVE_RUNNERS[key]
-        # Sesión fresca: la del request que creó el runner ya está cerrada.
-        runner.refresh_db(db)
-        _touch_runner(key)
+        pipeline_runs.cerrar_vencidas(db)
+        run = _abrir_corrida(db, user, pipeline_id, reanudar=resume)
+        if run is None:
+            return {"error": "No se encontró la configuración del pipeline"}
+
+        runner = pipeline_runs.reclamar(db, run)
+        if runner is None:
+            run = None
+            return _EN_CURSO
         result = runner.step()
-        _touch_runner(key)
+        pipeline_runs.guardar(db, run, runner, result)
 
         if result.get("finished"):
             _update_last_run(pipeline_id, user, db)
 
         return result
     except StepExecutionError as e:
-        _drop_runner(_key(user, pipeline_id))
-        logger.warning(f"Pipeline {pipeline_id} falló en un paso: {e}")
-        return {"error": str(e), "status": "failed", "step_name": e.step_name, "step_index": e.step_index}
-    except Exception as e:
-        _drop_runner(_key(user, pipeline_id))
-        logger.error("Error interno no controlado en router de pipelines", exc_info=True)
-        return {"error": "Error interno del servidor"}
+        return _fallo_de_step(db, run, runner, pipeline_id, e)
+    except Exception:
+        return _fallo_interno(db, run)
 
 
 @router.post("/{pipeline_id}/reset")
-async def reset_pipeline_session(
+def reset_pipeline_session(
     pipeline_id: int,
     db: Session = Depends(get_db),
     user: User = Depends(require_editor),
 ):
-    _drop_runner(_key(user, pipeline_id))
+    run = pipeline_runs.sesion_activa(db, org_id=user.org_id, user_id=user.id, pipeline_id=pipeline_id)
+    if run is not None:
+        pipeline_runs.cerrar(db, run)
     return {"status": "success"}
 
 
-@router.get("/{pipeline_id}/artifact/{artifact_key}")
-async def download_artifact(
+@router.get("/{pipeline_id}/run-state")
+def get_pipeline_run_state(
     pipeline_id: int,
-    artifact_key: str,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    key = _key(user, pipeline_id)
-    if key not in ACTIVE_RUNNERS:
-        raise HTTPException(status_code=404, detail="La sesión del pipeline ha expirado o no existe.")
+    """Estado de la sesión abierta (paso actual, input pendiente, artifacts)."""
+    pipeline_runs.cerrar_vencidas(db)
+    run = _sesion_o_404(db, user, pipeline_id, "La sesión del pipeline ha expirado o no existe.")
+    return pipeline_runs.estado(run)
 
-    runner = ACTIVE_RUNNERS[key]
-    _touch_runner(key)
-    artifact = runner.ctx.artifacts.get(artifact_key)
 
+def _artefacto_de_sesion(db: Session, user: User, pipeline_id: int, artifact_key: str, sin_sesion: str, sin_artefacto: str):
+    run = _sesion_o_404(db, user, pipeline_id, sin_sesion)
+    runner = pipeline_runs.runner_de(db, run)
+    pipeline_runs.tocar(db, run)
+    artifact = runner.ctx.artifacts.get(artifact_key)
     if artifact is None:
-        raise HTTPException(status_code=404, detail=f"Artefacto '{artifact_key}' no encontrado.")
+        raise HTTPException(status_code=404, detail=sin_artefacto)
+    return artifact
+
+
+# Tope de `limit` del preview paginado (/artifact/{key}/preview?limit=).
+PREVIEW_MAX_FILAS = 1000
+
+
+@router.get("/{pipeline_id}/artifact/{artifact_key}")
+def download_artifact(
+    pipeline_id: int,
+    artifact_key: str,
+    formato: Literal["xlsx", "csv", "tsv", "parquet"] = Query("xlsx", alias="format"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Descarga un artifact. Los DataFrame salen en `format` (XLSX por
+    defecto) generados por bloques (`backend/artifact_export.py`)."""
+    artifact = _artefacto_de_sesion(
+        db, user, pipeline_id, artifact_key,
+        "La sesión del pipeline ha expirado o no existe.",
+        f"Artefacto '{artifact_key}' no encontrado.",
+    )
 
     if isinstance(artifact, pd.DataFrame):
-        output = BytesIO()
-        try:
-            with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                artifact.to_excel(writer, index=False)
-        except Exception:
-            logger.error("Error generando Excel", exc_info=True)
-            output = BytesIO()
-            # Separador ';' para que Excel en español (Chile) abra
-            # directo como columnas. utf-8-sig agrega BOM para tildes.
-            artifact.to_csv(output, index=False, sep=";", encoding="utf-8-sig")
-            output.seek(0)
-            headers = {"Content-Disposition": f'attachment; filename="{artifact_key}.csv"'}
-            return StreamingResponse(output, headers=headers, media_type="text/csv")
-        output.seek(0)
-        headers = {"Content-Disposition": f'attachment; filename="{artifact_key}.xlsx"'}
-        return StreamingResponse(
-            output,
-            headers=headers,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
+        if formato == "parquet":
+            try:
+                contenido = artifact_export.parquet_por_trozos(artifact)
+            except artifact_export.ExportacionNoDisponible as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                logger.error("Error generando Parquet", exc_info=True)
+                raise HTTPException(status_code=400, detail=f"El artefacto no se puede exportar a Parquet: {e}")
+        elif formato == "xlsx":
+            try:
+                contenido = artifact_export.xlsx_por_trozos(artifact)
+            except Exception:
+                logger.error("Error generando Excel", exc_info=True)
+                formato = "csv"
+        if formato in ("csv", "tsv"):
+            contenido = artifact_export.texto_por_bloques(artifact, formato)
+        headers = {"Content-Disposition": f'attachment; filename="{artifact_key}.{formato}"'}
+        return StreamingResponse(contenido, headers=headers, media_type=artifact_export.MEDIA_TYPES[formato])
 
     elif isinstance(artifact, (str, Path)) and os.path.exists(artifact):
         file_path = Path(artifact)
@@ -421,24 +455,26 @@ async def download_artifact(
 
 
 @router.get("/{pipeline_id}/artifact/{artifact_key}/preview")
-async def preview_artifact(
+def preview_artifact(
     pipeline_id: int,
     artifact_key: str,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=PREVIEW_MAX_FILAS),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    key = _key(user, pipeline_id)
-    if key not in ACTIVE_RUNNERS:
-        raise HTTPException(status_code=404, detail="La sesión del pipeline ha expirado.")
-
-    runner = ACTIVE_RUNNERS[key]
-    _touch_runner(key)
-    artifact = runner.ctx.artifacts.get(artifact_key)
-
-    if artifact is None:
-        raise HTTPException(status_code=404, detail="Artefacto no encontrado.")
+    """Con `limit`, un DataFrame devuelve una página (`artifact_export.pagina`:
+    filas, dtypes y total). Sin `limit`, el texto completo para copiar al
+    portapapeles (TSV para DataFrames, JSON para dict/list)."""
+    artifact = _artefacto_de_sesion(
+        db, user, pipeline_id, artifact_key,
+        "La sesión del pipeline ha expirado.",
+        "Artefacto no encontrado.",
+    )
 
     if isinstance(artifact, pd.DataFrame):
+        if limit is not None:
+            return artifact_export.pagina(artifact, offset, limit)
         return artifact.to_csv(sep="\t", index=False)
     elif isinstance(artifact, (dict, list)):
         return json.dumps(artifact, indent=2, default=str)
@@ -603,6 +639,11 @@ async def delete_pipeline(
         if not row:
             return {"error": "Pipeline no encontrado"}
 
+        for run in db.query(PipelineRun).filter(
+            PipelineRun.pipeline_id == pipeline_id,
+            PipelineRun.closed_at.is_(None),
+        ).all():
+            pipeline_runs.cerrar(db, run)
         db.delete(row)
         db.commit()
 
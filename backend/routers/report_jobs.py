@@ -0,0 +1,214 @@
+"""
+routers/report_jobs.py — Informes en segundo plano (`backend/report_jobs.py`).
+
+Las mismas generaciones que `POST /api/indicators/{id}/export-pdf`,
+`POST /api/reports/{tipo}` y `POST /api/reports/custom/{nombre}`, pero el
+POST responde 202 con el id del job en vez de esperar al PDF:
+
+    POST /api/report-jobs/indicator/{indicator_id}   body = ExportPDFRequest
+    POST /api/report-jobs/indicator/{indicator_id}/batch   body = ExportPDFLoteRequest (ZIP)
+    POST /api/report-jobs/reports/{tipo}             body = ReportRequest
+    POST /api/report-jobs/custom/{nombre}            body = CustomReportRequest
+    GET  /api/report-jobs/{job_id}                   estado + progreso
+    GET  /api/report-jobs/{job_id}/download          binario (409 si no terminó)
+    GET  /api/report-jobs/                           jobs recientes de la org
+
+Los errores de validación del informe (400/404/422) no llegan en el POST:
+quedan en el job (`status=failed`, `error`, `error_status`).
+"""
+from __future__ import annotations
+
+import io
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import Response
+from sqlalchemy.orm import Session, defer
+
+from backend import report_jobs as cola
+from backend.auth import get_current_user
+from backend.database import get_db
+from backend.http_utils import content_disposition
+from backend.models import ReportJob, User
+from backend.routers.indicators import (
+    ExportPDFLoteRequest,
+    ExportPDFRequest,
+    _render_export_pdf,
+    _render_export_pdf_lote,
+)
+from backend.routers.reports import (
+    CustomReportRequest,
+    ReportRequest,
+    _render_informe_custom,
+    _render_reporte_v2,
+)
+
+router = APIRouter(prefix="/api/report-jobs", tags=["report-jobs"])
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cuerpos de los jobs
+# ─────────────────────────────────────────────────────────────────────────
+
+def _job_export_pdf(db: Session, org_id: int, params: Dict[str, Any]) -> cola.ResultadoJob:
+    body = ExportPDFRequest(**params["body"]) if params.get("body") else None
+    pdf_bytes, filename = _render_export_pdf(db, params["indicator_id"], org_id, body)
+    return cola.ResultadoJob(pdf_bytes, filename, "application/pdf")
+
+
+def _job_export_pdf_lote(db: Session, org_id: int, params: Dict[str, Any]) -> cola.ResultadoJob:
+    buf = io.BytesIO()
+    filename = _render_export_pdf_lote(
+        db, params["indicator_id"], org_id, ExportPDFLoteRequest(**params["body"]), buf,
+    )
+    return cola.ResultadoJob(buf.getvalue(), filename, "application/zip")
+
+
+def _job_reporte_v2(db: Session, org_id: int, params: Dict[str, Any]) -> cola.ResultadoJob:
+    tipo = params["tipo"]
+    pdf_bytes = _render_reporte_v2(
+        db, tipo, org_id,
+        indicator_id=params["indicator_id"],
+        filtros=params.get("filtros"),
+        overrides=params.get("overrides"),
+    )
+    return cola.ResultadoJob(pdf_bytes, f"informe_{tipo}.pdf", "application/pdf")
+
+
+def _job_informe_custom(db: Session, org_id: int, params: Dict[str, Any]) -> cola.ResultadoJob:
+    contenido, filename, mime = _render_informe_custom(
+        db, params["nombre"], org_id,
+        indicator_id=params["indicator_id"],
+        filtros=params.get("filtros"),
+        params=params.get("params"),
+        overrides=params.get("overrides"),
+    )
+    return cola.ResultadoJob(contenido, filename, mime)
+
+
+cola.registrar_tipo("export_pdf", _job_export_pdf)
+cola.registrar_tipo("export_pdf_lote", _job_export_pdf_lote)
+cola.registrar_tipo("reports_v2", _job_reporte_v2)
+cola.registrar_tipo("custom", _job_informe_custom)
+
+
+def _encolar(db: Session, user: User, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    job = cola.encolar(db, org_id=user.org_id, user_id=user.id, kind=kind, params=params)
+    return cola.estado(job)
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Encolado
+# ─────────────────────────────────────────────────────────────────────────
+
+@router.post("/indicator/{indicator_id}", status_code=202)
+def encolar_export_pdf(
+    indicator_id: int,
+    body: Optional[ExportPDFRequest] = None,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Encola `POST /api/indicators/{indicator_id}/export-pdf`."""
+    return _encolar(db, user, "export_pdf", {
+        "indicator_id": indicator_id,
+        "body": body.model_dump() if body else None,
+    })
+
+
+@router.post("/indicator/{indicator_id}/batch", status_code=202)
+def encolar_export_pdf_lote(
+    indicator_id: int,
+    body: ExportPDFLoteRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Encola `POST /api/indicators/{indicator_id}/export-pdf/batch`.
+
+    El progreso del job cuenta informes del lote, no secciones.
+    """
+    return _encolar(db, user, "export_pdf_lote", {
+        "indicator_id": indicator_id,
+        "body": body.model_dump(),
+    })
+
+
+@router.post("/reports/{tipo}", status_code=202)
+def encolar_reporte_v2(
+    tipo: str,
+    body: ReportRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Encola `POST /api/reports/{tipo}`."""
+    return _encolar(db, user, "reports_v2", {"tipo": tipo, **body.model_dump()})
+
+
+@router.post("/custom/{nombre}", status_code=202)
+def encolar_informe_custom(
+    nombre: str,
+    body: CustomReportRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Encola `POST /api/reports/custom/{nombre}`."""
+    return _encolar(db, user, "custom", {"nombre": nombre, **body.model_dump()})
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Consulta
+# ─────────────────────────────────────────────────────────────────────────
+
+def _job_de_la_org(db: Session, job_id: int, org_id: int) -> ReportJob:
+    job = db.query(ReportJob).filter(
+        ReportJob.id == job_id,
+        ReportJob.org_id == org_id,
+    ).first()
+    if not job:
+        # 404 también si pertenece a otra org (no revelar existencia).
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
+@router.get("/")
+def listar_jobs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Jobs más recientes de la organización (sin el binario)."""
+    jobs = (
+        db.query(ReportJob)
+        .options(defer(ReportJob.result))
+        .filter(ReportJob.org_id == user.org_id)
+        .order_by(ReportJob.created_at.desc(), ReportJob.id.desc())
+        .limit(max(1, min(limit, 100)))
+        .all()
+    )
+    return [cola.estado(j) for j in jobs]
+
+
+@router.get("/{job_id}")
+def estado_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    return cola.estado(_job_de_la_org(db, job_id, user.org_id))
+
+
+@router.get("/{job_id}/download")
+def descargar_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    job = _job_de_la_org(db, job_id, user.org_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error or "El informe falló")
+    if job.status != "done" or job.result is None:
+        raise HTTPException(status_code=409, detail=f"El informe aún no está listo ({job.status})")
+    return Response(
+        content=job.result,
+        media_type=job.result_mime or "application/octet-stream",
+        headers={"Content-Disposition": content_disposition(job.result_filename or f"informe_{job.id}")},
+    )
@@ -208,6 +208,35 @@ def generar_informe_custom(
             informe reporta datos/filtros insuficientes.
         500 en cualquier otro error de generación.
     """
+    contenido, filename, mime = _render_informe_custom(
+        db, nombre, user.org_id,
+        indicator_id=body.indicator_id,
+        filtros=body.filtros,
+        params=body.params,
+        overrides=body.overrides,
+    )
+    return Response(
+        content=contenido,
+        media_type=mime,
+        headers={"Content-Disposition": content_disposition(filename)},
+    )
+
+
+def _render_informe_custom(
+    db: Session,
+    nombre: str,
+    org_id: int,
+    *,
+    indicator_id: int,
+    filtros: dict[str, Any] | None = None,
+    params: dict[str, Any] | None = None,
+    overrides: dict[str, Any] | None = None,
+) -> tuple[bytes, str, str]:
+    """Cuerpo de `generar_informe_custom`: `(contenido, filename, mime)`.
+
+    Lo comparte con la cola de informes (`backend/routers/report_jobs.py`);
+    los errores salen ya traducidos a `HTTPException`.
+    """
     from backend.models import Indicator
     from backend.rgenerator.reports import custom as custom_reports
     from backend.rgenerator.reports.engine_types import resolver_engine_type
@@ -218,8 +247,8 @@ def generar_informe_custom(
         raise HTTPException(404, str(e))
 
     record = db.query(Indicator).filter(
-        Indicator.id_indicator == body.indicator_id,
-        Indicator.org_id == user.org_id,
+        Indicator.id_indicator == indicator_id,
+        Indicator.org_id == org_id,
     ).first()
     if not record:
         raise HTTPException(404, "Indicador no encontrado")
@@ -239,11 +268,11 @@ def generar_informe_custom(
     try:
         contenido = modulo.generar(
             db,
-            indicator_id=body.indicator_id,
-            org_id=user.org_id,
-            filtros=body.filtros,
-            params=body.params,
-            overrides=body.overrides,
+            indicator_id=indicator_id,
+            org_id=org_id,
+            filtros=filtros,
+            params=params,
+            overrides=overrides,
         )
     except TipoNoSoportado as e:
         raise HTTPException(404, str(e))
@@ -257,11 +286,7 @@ def generar_informe_custom(
         logger.error("Error generando informe custom '%s'", nombre, exc_info=True)
         raise HTTPException(500, "Error generando el informe")
 
-    return Response(
-        content=contenido,
-        media_type=meta["mime"],
-        headers={"Content-Disposition": content_disposition(meta["filename"])},
-    )
+    return contenido, meta["filename"], meta["mime"]
 
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -295,14 +320,37 @@ def generar_reporte(
             no tiene las metrics requeridas.
         500 si la generación falla.
     """
+    pdf_bytes = _render_reporte_v2(
+        db, tipo, user.org_id,
+        indicator_id=body.indicator_id,
+        filtros=body.filtros,
+        overrides=body.overrides,
+    )
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": content_disposition(f"informe_{tipo}.pdf", disposition="inline")},
+    )
+
+
+def _render_reporte_v2(
+    db: Session,
+    tipo: str,
+    org_id: int,
+    *,
+    indicator_id: int,
+    filtros: dict[str, Any] | None = None,
+    overrides: dict[str, Any] | None = None,
+) -> bytes:
+    """Cuerpo de `generar_reporte`, compartido con la cola de informes."""
     try:
         pdf_bytes = generar_pdf_v2(
             db,
             tipo=tipo,
-            indicator_id=body.indicator_id,
-            org_id=user.org_id,
-            filtros=body.filtros,
-            overrides=body.overrides,
+            indicator_id=indicator_id,
+            org_id=org_id,
+            filtros=filtros,
+            overrides=overrides,
         )
     except TipoNoSoportado as e:
         raise HTTPException(404, str(e))
@@ -312,8 +360,4 @@ def generar_reporte(
         logger.error("Error generando PDF de reporte", exc_info=True)
         raise HTTPException(500, "Error interno del servidor")
 
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": content_disposition(f"informe_{tipo}.pdf", disposition="inline")},
-    )
+    return pdf_bytes
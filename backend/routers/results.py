@@ -1,18 +1,29 @@
 import json
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query, Depends
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from backend.database import get_db
 from backend.auth import get_current_user
 from backend.logging_config import get_logger
+from backend.metric_store import columnas_cacheadas, conteos_dimensiones
 from backend.models import (
     User, Indicator, IndicatorMetric,
-    Metric, MetricDimension, MetricData, Dimension,
+    Metric, MetricDimension, Dimension,
+)
+from backend.results_query import (
+    ConsultaInvalida,
+    Medida,
+    a_filas,
+    agregar,
+    facetas,
+    filtrar,
 )
 from backend.rgenerator.reports.filtering import matches
 from backend.rgenerator.tooling.curso_order import curso_sort_key
+from backend.routers.tables import _load_metric_to_df, _metric_df_con_derivadas
 
 logger = get_logger(__name__)
 
@@ -59,6 +70,34 @@ def _parse_json_field(value, default):
     return default
 
 
+def _enrich_configs(raw_configs, temporal_cfg):
+    """Auto-resuelve `time_ordinal_levels` desde el temporal_config del
+    indicador cuando un config slope/delta NO lo trae explícito. Esto evita
+    duplicar la lista entre temporal_config y derived_columns (single source
+    of truth en el indicador). Si el config trae su propio
+    time_ordinal_levels, ese gana (override por config).
+    """
+    levels_by_label = {}
+    for lvl in (temporal_cfg.get("levels") or []):
+        label = lvl.get("label")
+        order = lvl.get("order") or []
+        if label and order:
+            levels_by_label[str(label).lower()] = list(order)
+
+    out = []
+    for c in raw_configs:
+        if not isinstance(c, dict):
+            out.append(c)
+            continue
+        if c.get("kind") in ("slope", "delta") and c.get("time_type") == "ordinal" and not c.get("time_ordinal_levels"):
+            tf = str(c.get("time_field") or "").lower()
+            order = levels_by_label.get(tf)
+            if order:
+                c = {**c, "time_ordinal_levels": order}
+        out.append(c)
+    return out
+
+
 @router.get("/indicator/{indicator_id}/data")
 def get_indicator_data(
     indicator_id: int,
@@ -139,30 +178,39 @@ def get_indicator_data(
         unique_dim_values = {str(did): set() for did in all_dim_ids}
 
         for mid in metric_ids:
-            data_rows = db.query(MetricData).filter(MetricData.id_metric == mid).all()
-            if not data_rows:
+            m = metrics_by_id.get(mid)
+            # Copia columnar vía el cache de frames del proceso: sin ORM ni
+            # json.loads por fila (ver backend/metric_store.py).
+            col = columnas_cacheadas(db, m) if m is not None else None
+            if col is None or not col.n_rows:
                 data_by_metric[int(mid)] = []
                 continue
 
-            rows = []
-            for r in data_rows:
-                dims_json = _parse_json_field(r.dimensions_json, {})
-
-                # Collect unique values before filtering
-                for dk, dv in dims_json.items():
-                    if dk in unique_dim_values:
-                        unique_dim_values[dk].add(str(dv))
-
-                rows.append({
-                    "id_data": r.id_data,
-                    "id_metric": r.id_metric,
-                    "value": r.value,
-                    "dimensions_json": dims_json,
-                    "created_at": r.created_at.isoformat() if r.created_at else "",
-                })
+            claves = list(col.dims.keys())
+            rows = [
+                {
+                    "id_data": id_data,
+                    "id_metric": mid,
+                    "value": value,
+                    "dimensions_json": {k: v for k, v in zip(claves, dims) if v is not None},
+                    "created_at": creado or "",
+                }
+                for id_data, value, creado, dims in zip(
+                    col.id_data, col.value, col.created_at,
+                    zip(*col.dims.values()) if claves else [()] * col.n_rows,
+                )
+            ]
 
             data_by_metric[int(mid)] = rows
 
+        # Valores distintos (antes de filtrar) del índice de conteos: una
+        # fila por valor, no una pasada por todas las filas de cada métrica.
+        conteos = conteos_dimensiones(
+            db, [mid for mid in metric_ids if mid in metrics_by_id], unique_dim_values
+        )
+        for dk, por_valor in conteos.items():
+            unique_dim_values[dk].update(por_valor)
+
         # Add unique values to dims_map
         for dk, vals in unique_dim_values.items():
             if dk in dims_map:
@@ -186,36 +234,11 @@ def get_indicator_data(
                 from backend.rgenerator.core.derived_fields_engine import apply_derived_fields
                 import pandas as pd
 
-                # Auto-resolver `time_ordinal_levels` desde el temporal_config del
-                # indicador cuando un config slope/delta NO lo trae explícito. Esto
-                # evita duplicar la lista entre temporal_config y derived_columns
-                # (single source of truth en el indicador). Si el config trae su
-                # propio time_ordinal_levels, ese gana (override por config).
                 _temporal_cfg = _parse_json_field(indicator.temporal_config, {})
-                _temporal_levels_by_label = {}
-                for _lvl in (_temporal_cfg.get("levels") or []):
-                    _label = _lvl.get("label")
-                    _order = _lvl.get("order") or []
-                    if _label and _order:
-                        _temporal_levels_by_label[str(_label).lower()] = list(_order)
-
-                def _enrich_configs(raw_configs):
-                    out = []
-                    for c in raw_configs:
-                        if not isinstance(c, dict):
-                            out.append(c)
-                            continue
-                        if c.get("kind") in ("slope", "delta") and c.get("time_type") == "ordinal" and not c.get("time_ordinal_levels"):
-                            tf = str(c.get("time_field") or "").lower()
-                            order = _temporal_levels_by_label.get(tf)
-                            if order:
-                                c = {**c, "time_ordinal_levels": order}
-                        out.append(c)
-                    return out
 
                 for entry in derived_columns:
                     target_mid = entry.get("metric_id")
-                    configs = _enrich_configs(entry.get("configs") or [])
+                    configs = _enrich_configs(entry.get("configs") or [], _temporal_cfg)
                     temporal_dim_ids = {str(x) for x in (entry.get("temporal_dim_ids") or [])}
                     if not target_mid or not configs:
                         continue
@@ -383,3 +406,184 @@ def get_indicator_data(
     except Exception:
         logger.error("Error interno en endpoint de results", exc_info=True)
         raise HTTPException(status_code=500, detail="Error interno del servidor")
+
+
+# ── Modo agregado ─────────────────────────────────────────────────────────
+#
+# En vez de todas las filas de todas las métricas, el cliente manda qué
+# agrupar y qué medir sobre UNA métrica del indicador y recibe solo la
+# grilla agregada (paginada por grupos) + las facetas para los filtros.
+# La lógica vectorizada vive en `backend/results_query.py`.
+
+QUERY_MAX_LIMIT = 10000
+
+
+class MedidaRequest(BaseModel):
+    field: Optional[str] = None   # None + agg "count" = filas del grupo
+    agg: str = "mean"
+    label: Optional[str] = None
+
+
+class IndicatorQueryRequest(BaseModel):
+    metric_id: int
+    group_by: List[str] = Field(default_factory=list)   # ids de dimensión o columnas
+    measures: List[MedidaRequest] = Field(min_length=1)
+    filters: Dict[str, Any] = Field(default_factory=dict)  # {id_dimension: valor | [valores]}
+    order_by: Optional[str] = None
+    descending: bool = False
+    offset: int = Field(0, ge=0)
+    limit: int = Field(500, ge=1, le=QUERY_MAX_LIMIT)
+    facets: bool = True
+
+
+@router.post("/indicator/{indicator_id}/query")
+def query_indicator_data(
+    indicator_id: int,
+    body: IndicatorQueryRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Grilla agregada de una métrica del indicador + facetas.
+
+    - `group_by`: ids de dimensión (como en `filters`) o nombres de columna
+      del frame (fields del value, derived_columns).
+    - `measures`: `{field, agg, label}` con agg en sum/mean/median/min/max/
+      count/nunique; `field` null con count cuenta filas.
+    - `filters`: misma semántica que /data. Las derived_columns del
+      indicador se calculan con los filtros no temporales y los temporales
+      se aplican después, igual que /data.
+
+    Respuesta: `columns` (dimensiones y medidas, en orden), `rows` (la
+    ventana `offset`/`limit` de grupos), `total_groups`, `n_rows` (filas
+    que pasaron los filtros) y, con `facets`, `{dim_id: {name, values:
+    [{value, count}]}}` para todas las dimensiones del indicador.
+    """
+    try:
+        indicator = db.query(Indicator).filter(
+            Indicator.id_indicator == indicator_id,
+            Indicator.org_id == user.org_id,
+        ).first()
+        if not indicator:
+            raise HTTPException(status_code=404, detail="Indicador no encontrado")
+
+        metric_ids = [
+            lnk.id_metric for lnk in
+            db.query(IndicatorMetric).filter(IndicatorMetric.id_indicator == indicator_id).all()
+        ]
+        metrics = db.query(Metric).filter(
+            Metric.id_metric.in_(metric_ids),
+            Metric.org_id == user.org_id,
+        ).all() if metric_ids else []
+        metrics_by_id = {m.id_metric: m for m in metrics}
+        if body.metric_id not in metrics_by_id:
+            raise HTTPException(status_code=404, detail="La métrica no pertenece al indicador")
+
+        # {id_metric: {"<id_dimension>": nombre}} — las columnas del frame
+        # llevan el nombre humano de cada dimensión.
+        links = db.query(MetricDimension).filter(
+            MetricDimension.id_metric.in_(list(metrics_by_id))
+        ).all()
+        dim_names = {
+            str(d.id_dimension): d.name
+            for d in db.query(Dimension).filter(
+                Dimension.id_dimension.in_({lnk.id_dimension for lnk in links})
+            ).all()
+        } if links else {}
+        columnas_por_metrica: Dict[int, Dict[str, str]] = {mid: {} for mid in metrics_by_id}
+        for lnk in links:
+            nombre = dim_names.get(str(lnk.id_dimension))
+            if nombre:
+                columnas_por_metrica[lnk.id_metric][str(lnk.id_dimension)] = nombre
+
+        mid = body.metric_id
+        columnas = columnas_por_metrica[mid]
+        filtros = {str(k): v for k, v in (body.filters or {}).items()}
+
+        temporal_cfg = _parse_json_field(indicator.temporal_config, {})
+        entradas = []
+        for entry in _parse_json_field(indicator.derived_columns, []):
+            if not isinstance(entry, dict) or str(entry.get("metric_id")) != str(mid):
+                continue
+            configs = _enrich_configs(entry.get("configs") or [], temporal_cfg)
+            if configs:
+                entradas.append({**entry, "configs": configs})
+        temporales = {str(x) for e in entradas for x in (e.get("temporal_dim_ids") or [])}
+
+        pre = {columnas[k]: v for k, v in filtros.items() if k in columnas and k not in temporales}
+        post = [(columnas.get(k), v) for k, v in filtros.items() if k not in columnas or k in temporales]
+        df = _metric_df_con_derivadas(db, user.org_id, mid, pre, entradas, "results")
+        df = filtrar(df, post)
+
+        medidas = [
+            Medida(
+                field=m.field,
+                agg=m.agg,
+                label=m.label or (f"{m.field}_{m.agg}" if m.field else "n"),
+            )
+            for m in body.measures
+        ]
+        if len({m.label for m in medidas}) != len(medidas):
+            raise HTTPException(status_code=400, detail="Las medidas deben tener labels distintos")
+        group_cols = [columnas.get(g, g) for g in body.group_by]
+        nombre_a_dim = {v: k for k, v in columnas.items()}
+        if df.empty:
+            grilla = None
+        else:
+            grilla = agregar(
+                df, group_cols, medidas,
+                ordenar_claves=lambda col, vals: _smart_sort_dim_values(col if col in nombre_a_dim else "", vals),
+                order_by=body.order_by,
+                descending=body.descending,
+            )
+
+        columns = [
+            {"key": g, "label": c, "role": "dimension"}
+            for g, c in zip(body.group_by, group_cols)
+        ] + [
+            {"key": m.label, "label": m.label, "role": "measure", "field": m.field, "agg": m.agg}
+            for m in medidas
+        ]
+        total = 0 if grilla is None else len(grilla)
+        ventana = [] if grilla is None else a_filas(grilla.iloc[body.offset:body.offset + body.limit])
+        respuesta = {
+            "metric_id": mid,
+            "columns": columns,
+            "rows": ventana,
+            "total_groups": total,
+            "n_rows": int(len(df)),
+            "offset": body.offset,
+            "limit": body.limit,
+        }
+
+        if body.facets:
+            # Una lista vacía no restringe (semántica de `matches`).
+            if any(not (isinstance(v, (list, tuple, set)) and not v) for v in filtros.values()):
+                frames = [
+                    (_load_metric_to_df(db, user.org_id, m_id, None), columnas_por_metrica[m_id])
+                    for m_id in metrics_by_id
+                ]
+                conteos = facetas(frames, dim_names, filtros)
+            else:
+                # Sin filtros las facetas son los conteos del índice.
+                conteos = {dk: {} for dk in dim_names}
+                for dk, por_valor in conteos_dimensiones(db, list(metrics_by_id), dim_names).items():
+                    conteos[dk] = {v: n for v, n in por_valor.items() if v != ""}
+            respuesta["facets"] = {
+                dk: {
+                    "name": dim_names[dk],
+                    "values": [
+                        {"value": v, "count": conteos[dk][v]}
+                        for v in _smart_sort_dim_values(dim_names[dk], conteos[dk])
+                    ],
+                }
+                for dk in dim_names
+            }
+        return respuesta
+
+    except HTTPException:
+        raise
+    except ConsultaInvalida as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.error("Error interno en query de results", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error interno del servidor")
@@ -16,22 +16,22 @@ Endpoints:
 from __future__ import annotations
 
 import json
-import threading
-import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import pandas as pd
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from backend.auth import get_current_user, require_editor
 from backend.database import get_db
 from backend.logging_config import get_logger
-from backend.models import Indicator, Metric, MetricData, MetricDimension, Dimension, Spec, User
-from backend.rgenerator.core.pivot_engine import pivot
+from backend.metric_cache import metric_frames
+from backend.metric_store import columnas_cacheadas, separar_filtros, version_de_datos
+from backend.models import Indicator, Metric, MetricDimension, Dimension, Spec, User
+from backend.rgenerator.core.derived_fields_engine import apply_derived_fields, compilar_plan
+from backend.rgenerator.core.pivot_engine import pivot, pivot_columnar
 from backend.schemas_table import TableConfig, TableCreate, TableSummary, TableUpdate
 
 logger = get_logger(__name__)
@@ -112,76 +112,106 @@ def _get_spec_or_404(db: Session, table_id: int, org_id: int) -> Spec:
 
 
 # ─────────────────────────────────────────────────────────────────────────
-# Cache TTL para _load_metric_to_df
+# Cache de _load_metric_to_df
 # ─────────────────────────────────────────────────────────────────────────
 #
 # Un dashboard llena ~10 charts/tables, muchos de ellos sobre la misma
-# métrica. Sin cache cada uno repite las queries y el parsing de JSON.
-# Con TTL corto el segundo+ load del mismo (metric, filtros) es instantáneo.
-# El TTL de 60s acota la ventana de obsolescencia tras un ETL.
-_METRIC_DF_CACHE: Dict[Tuple, Tuple[float, pd.DataFrame]] = {}
-_METRIC_DF_CACHE_LOCK = threading.Lock()
-_METRIC_DF_CACHE_TTL = 60.0
+# métrica. El frame ya armado por (metric, filtros) vive en el cache de
+# frames del proceso (`backend/metric_cache.py`), que también guarda la base
+# columnar que comparten el motor de informes y `LoadMetricToDF`.
 
 
-def _metric_df_cache_key(org_id: int, metric_id: int,
-                         filters: Optional[Dict[str, Any]]) -> Tuple:
+def _metric_df_cache_key(filters: Optional[Dict[str, Any]]) -> Tuple:
+    """Variante de cache de tablas/gráficos para `filters` (orden-invariante)."""
     if not filters:
-        return (org_id, metric_id, None)
+        return ("tablas", None)
     items = []
     for k in sorted(filters.keys()):
         v = filters[k]
         if isinstance(v, (list, tuple, set)):
             v = tuple(sorted(str(x) for x in v))
         items.append((str(k), v))
-    return (org_id, metric_id, tuple(items))
+    return ("tablas", tuple(items))
 
 
 def invalidate_metric_df_cache(metric_id: Optional[int] = None) -> None:
-    """Invalida entradas del cache. Si metric_id es None, limpia todo.
+    """Sube la versión de datos de `metric_id` (todas si es None).
 
     Llamar desde endpoints que escriben MetricData (carga ETL, edición de
-    valores, etc.) para que el siguiente read vea los nuevos datos sin
-    esperar al TTL.
+    valores, etc.) después del commit, para que el siguiente read vea los
+    nuevos datos: invalida tablas/gráficos y también el motor de informes.
     """
-    with _METRIC_DF_CACHE_LOCK:
-        if metric_id is None:
-            _METRIC_DF_CACHE.clear()
-            return
-        keys = [k for k in _METRIC_DF_CACHE if k[1] == metric_id]
-        for k in keys:
-            _METRIC_DF_CACHE.pop(k, None)
+    metric_frames.invalidar(metric_id)
 
 
 def _load_metric_to_df(db: Session, org_id: int, metric_id: int,
-                       filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
-    """Wrapper cacheado de _load_metric_to_df_uncached. Devuelve una copia
-    del DataFrame para que el caller pueda mutarla sin afectar el cache.
+                       filters: Optional[Dict[str, Any]] = None,
+                       data_version: Optional[int] = None) -> pd.DataFrame:
+    """Wrapper cacheado de _load_metric_to_df_uncached.
+
+    Devuelve una vista de solo lectura del frame cacheado (sin copia):
+    agregar/reemplazar columnas o filtrar es seguro, pero una escritura
+    in-place necesita `.copy()` antes. `data_version` es la de
+    `version_de_datos` si el llamador ya la leyó.
     """
-    key = _metric_df_cache_key(org_id, metric_id, filters)
-    now = time.time()
-    with _METRIC_DF_CACHE_LOCK:
-        cached = _METRIC_DF_CACHE.get(key)
-        if cached and (now - cached[0]) < _METRIC_DF_CACHE_TTL:
-            return cached[1].copy()
+    if data_version is None:
+        data_version = version_de_datos(db, metric_id)
+    return metric_frames.obtener(
+        org_id, metric_id, _metric_df_cache_key(filters),
+        lambda: _load_metric_to_df_uncached(db, org_id, metric_id, filters),
+        data_version=data_version,
+    )
+
 
-    df = _load_metric_to_df_uncached(db, org_id, metric_id, filters)
+def _metric_df_con_derivadas(db: Session, org_id: int, metric_id: int,
+                             filters: Optional[Dict[str, Any]],
+                             derived_cfg_list: List[Dict[str, Any]],
+                             contexto: str) -> pd.DataFrame:
+    """`_load_metric_to_df` + las derived_columns de `derived_cfg_list`.
 
-    with _METRIC_DF_CACHE_LOCK:
-        _METRIC_DF_CACHE[key] = (now, df)
-        # Cleanup de entradas expiradas (>2x TTL) para evitar memory leak
-        cutoff = now - 2 * _METRIC_DF_CACHE_TTL
-        expired = [k for k, (t, _) in _METRIC_DF_CACHE.items() if t < cutoff]
-        for k in expired:
-            _METRIC_DF_CACHE.pop(k, None)
+    Todas las entradas se compilan en un solo plan y el resultado queda en
+    el cache de frames con clave (versiones de datos de la métrica, filtros,
+    huella de las configs): los tiles de un dashboard que comparten métrica
+    y derivadas las calculan una vez. Las versiones se toman ANTES de cargar
+    la base y las mismas van a la base y a las derivadas, así un resultado
+    calculado sobre datos viejos no se sirve después de una escritura.
+
+    Si el plan falla, se loguea y se aplican las entradas una por una
+    conservando las que alcanzaron a calcularse (comportamiento previo).
+    """
+    version = metric_frames.version(metric_id)
+    data_version = version_de_datos(db, metric_id)
+    df = _load_metric_to_df(db, org_id, metric_id, filters, data_version)
+    if not derived_cfg_list or df.empty:
+        return df
+    try:
+        configs = [c for entry in derived_cfg_list for c in (entry.get("configs") or [])]
+        if not configs:
+            return df
+        plan = compilar_plan(configs)
+        return metric_frames.obtener(
+            org_id, metric_id,
+            ("derivados", _metric_df_cache_key(filters), version, plan.huella),
+            lambda: plan.aplicar(df, copiar=False),
+            data_version=data_version,
+        )
+    except Exception:
+        logger.error("Error aplicando derived_columns en %s", contexto, exc_info=True)
 
-    return df.copy()
+    for entry in derived_cfg_list:
+        try:
+            configs = entry.get("configs") or []
+            if configs:
+                df = apply_derived_fields(df, configs)
+        except Exception:
+            break
+    return df
 
 
 def _load_metric_to_df_uncached(db: Session, org_id: int, metric_id: int,
                                 filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
     """Carga metric_data + dimensiones a DataFrame plano, aplicando filtros
-    por igualdad simple sobre nombres de dimensiones.
+    por igualdad simple sobre nombres de dimensiones (empujados a SQL).
 
     Es una versión inline de la lógica que vive en
     `rgenerator/core/metric_steps.py:LoadMetricToDF` — replicada acá
@@ -199,51 +229,34 @@ def _load_metric_to_df_uncached(db: Session, org_id: int, metric_id: int,
     dims = db.query(Dimension).filter(Dimension.id_dimension.in_(dim_ids)).all() if dim_ids else []
     dims_map = {d.id_dimension: d.name for d in dims}
 
-    rows = db.query(MetricData).filter(MetricData.id_metric == metric_id).all()
+    # Los filtros sobre dimensiones van a SQL (o al frame completo si ya
+    # está cacheado); los que apuntan a fields del value, en memoria abajo.
+    filtros_dim, filters = separar_filtros(filters, dims_map)
+    columnas = columnas_cacheadas(db, metric, filtros_dim)
 
-    # Parse de meta_json UNA sola vez fuera del loop: es invariante por métrica
-    # y antes se parseaba O(N) veces (una por row).
+    # Parse de meta_json UNA sola vez: es invariante por métrica.
     try:
         meta = json.loads(metric.meta_json or "{}") if isinstance(metric.meta_json, str) else (metric.meta_json or {})
     except Exception:
         meta = {}
     meta_fields = meta.get("fields", []) if isinstance(meta, dict) else []
 
-    flat: List[Dict[str, Any]] = []
-    for r in rows:
-        item: Dict[str, Any] = {}
-        # Dimensiones
-        try:
-            dims_json = json.loads(r.dimensions_json) if isinstance(r.dimensions_json, str) else (r.dimensions_json or {})
-        except Exception:
-            dims_json = {}
-        for dim_id, name in dims_map.items():
-            item[name] = dims_json.get(str(dim_id))
-        # Valor (object → expandido a fields, simple → 1 columna)
-        val = r.value
-        if metric.data_type == "object":
-            try:
-                val_obj = json.loads(val) if isinstance(val, str) else val
-            except Exception:
-                val_obj = {}
-            for f in meta_fields:
-                fname = f["name"]
-                item[fname] = val_obj.get(fname)
-        else:
-            try:
-                if metric.data_type == "int":
-                    item[metric.name] = int(val)
-                elif metric.data_type == "float":
-                    item[metric.name] = float(val)
-                else:
-                    item[metric.name] = val
-            except Exception:
-                item[metric.name] = val
-        flat.append(item)
-
-    df = pd.DataFrame(flat)
-
-    # Filtros: igualdad simple (str) o IN (list de valores).
+    # Proyección columnar: una lista por columna, sin parsear JSON por fila
+    # (la copia materializada ya trae dimensiones y fields separados).
+    cols: Dict[str, list] = {}
+    for dim_id, name in dims_map.items():
+        cols[name] = columnas.dim(dim_id)
+    # Valor (object → expandido a fields, simple → 1 columna)
+    if metric.data_type == "object":
+        for f in meta_fields:
+            cols[f["name"]] = columnas.field(f["name"])
+    else:
+        cast = {"int": int, "float": float}.get(metric.data_type)
+        cols[metric.name] = [_cast_o_crudo(v, cast) for v in columnas.value] if cast else list(columnas.value)
+
+    df = pd.DataFrame(cols) if columnas.n_rows else pd.DataFrame()
+
+    # Filtros restantes: igualdad simple (str) o IN (list de valores).
     # Soporta multi-valor desde B9: cuando val es list/tuple, hace
     # df[col].isin([...]) para retener cualquier coincidencia.
     if filters:
@@ -261,6 +274,14 @@ def _load_metric_to_df_uncached(db: Session, org_id: int, metric_id: int,
     return df
 
 
+def _cast_o_crudo(value: Any, cast) -> Any:
+    """`cast(value)`; el valor crudo si la conversión falla."""
+    try:
+        return cast(value)
+    except Exception:
+        return value
+
+
 def _apply_format(value: Any, fmt: str, decimals: int = 1) -> str:
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return ""
@@ -510,18 +531,11 @@ def _prepare_table_df(
 
     # Pre-filtros: solo los NO-temporales se aplican antes del cálculo
     pre_filters = {k: v for k, v in base_filters.items() if k not in temporal_dim_names}
-    df = _load_metric_to_df(db, org_id, cfg.data_source.metric_id, pre_filters)
-
     # Aplicar derived_columns sobre el df ANTES de filtrar por temporal
-    if derived_cfg_list and not df.empty:
-        try:
-            from backend.rgenerator.core.derived_fields_engine import apply_derived_fields
-            for entry in derived_cfg_list:
-                configs = entry.get("configs") or []
-                if configs:
-                    df = apply_derived_fields(df, configs)
-        except Exception:
-            logger.error("Error aplicando derived_columns en preview de tabla", exc_info=True)
+    df = _metric_df_con_derivadas(
+        db, org_id, cfg.data_source.metric_id, pre_filters, derived_cfg_list,
+        "preview de tabla",
+    )
 
     # Aplicar filtros temporales POST cálculo
     post_temporal = {k: v for k, v in base_filters.items() if k in temporal_dim_names}
@@ -651,21 +665,31 @@ def _render_table_data(
 def _render_pivot_data(
     db: Session, org_id: int, cfg: TableConfig,
     extra_filters: Optional[Dict[str, Any]] = None,
+    pivot_format: str = "cells",
 ) -> Dict[str, Any]:
     """Corre el motor de pivotes sobre el df de la tabla y devuelve el
-    `PivotResult` serializado a JSON para el dashboard (PARTE B2 frontend).
+    resultado serializado a JSON para el dashboard (PARTE B2 frontend).
 
     Forma de la respuesta::
 
         {"mode": "pivot",
-         "pivot": <PivotResult.model_dump(mode="json")>,
+         "format": "cells" | "columnar",
+         "pivot": <PivotResult.model_dump(mode="json")> | <PivotColumnar.to_json()>,
          "n_rows": <filas del df de origen>}
+
+    `pivot_format="columnar"` devuelve arrays densos de valores/conteos sin
+    una celda por objeto (el frontend formatea los displays): pensado para
+    cruces grandes.
     """
     df = _prepare_table_df(db, org_id, cfg, extra_filters)
-    result = pivot(df, cfg.pivot)
+    if pivot_format == "columnar":
+        payload = pivot_columnar(df, cfg.pivot).to_json()
+    else:
+        payload = pivot(df, cfg.pivot).model_dump(mode="json")
     return {
         "mode": "pivot",
-        "pivot": result.model_dump(mode="json"),
+        "format": pivot_format,
+        "pivot": payload,
         "n_rows": int(len(df)),
     }
 
@@ -765,6 +789,7 @@ def get_table_data(
     offset: int = Query(0, ge=0),
     include_styles: bool = Query(True),
     extra_filters: Optional[str] = Query(None, description="JSON dict con filtros adicionales (encoded)"),
+    pivot_format: str = Query("cells", pattern="^(cells|columnar)$"),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -787,7 +812,7 @@ def get_table_data(
     # Modo pivote (W2): devuelve el PivotResult calculado por el motor.
     if cfg.pivot is not None:
         try:
-            return _render_pivot_data(db, user.org_id, cfg, extra)
+            return _render_pivot_data(db, user.org_id, cfg, extra, pivot_format)
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
     return _render_table_data(db, user.org_id, cfg, limit, offset, include_styles, extra)
@@ -799,6 +824,7 @@ class TablePreviewRequest(BaseModel):
     offset: int = 0
     include_styles: bool = True
     extra_filters: Optional[Dict[str, Any]] = None
+    pivot_format: Literal["cells", "columnar"] = "cells"
 
 
 @router.post("/preview")
@@ -811,7 +837,9 @@ def preview_table_config(
     que la tabla esté persistida). Pensado para el editor live."""
     if payload.config.pivot is not None:
         try:
-            return _render_pivot_data(db, user.org_id, payload.config, payload.extra_filters)
+            return _render_pivot_data(
+                db, user.org_id, payload.config, payload.extra_filters, payload.pivot_format,
+            )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
     return _render_table_data(
@@ -867,17 +895,3 @@ def export_pivot_xlsx(
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
-
-
-# ─────────────────────────────────────────────────────────────────────────
-# Invalidación automática del cache cuando cambia MetricData
-# ─────────────────────────────────────────────────────────────────────────
-#
-# Cubre los endpoints HTTP de metrics, los steps de pipelines (SaveToMetric)
-# y cualquier otra escritura que use la sesión SQLAlchemy. Garantiza que el
-# dashboard refleje los cambios sin esperar el TTL.
-@event.listens_for(MetricData, "after_insert")
-@event.listens_for(MetricData, "after_update")
-@event.listens_for(MetricData, "after_delete")
-def _invalidate_on_metric_data_change(mapper, connection, target):
-    invalidate_metric_df_cache(target.id_metric)
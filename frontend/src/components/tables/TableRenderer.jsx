@@ -31,6 +31,7 @@ import { ChevronUp, ChevronDown, ChevronsUpDown, Download, Loader2, FileSpreadsh
 import toast from 'react-hot-toast';
 import { API_BASE_URL } from '../../constants';
 import { PivotResultTable } from '../../tooling/plotly-charts/pivotTable';
+import { columnarAPivotResult } from '../../tooling/pivotColumnar';
 import { useAuth } from '../../context/AuthContext';
 
 const PAGE_SIZE_DEFAULT = 50;
@@ -88,6 +89,7 @@ export default function TableRenderer({
             offset: page * pageSize,
             include_styles: true,
             extra_filters: extraFilters || null,
+            pivot_format: 'columnar',
           }),
         });
       } else {
@@ -95,6 +97,7 @@ export default function TableRenderer({
           limit: String(pageSize),
           offset: String(page * pageSize),
           include_styles: 'true',
+          pivot_format: 'columnar',
         });
         if (extraFilters && Object.keys(extraFilters).length) {
           params.set('extra_filters', JSON.stringify(extraFilters));
@@ -107,7 +110,8 @@ export default function TableRenderer({
       }
       const data = await res.json();
       if (data.mode === 'pivot') {
-        setPivotResult(data.pivot || null);
+        // Arrays densos del motor (pivot_format=columnar) → filas/celdas.
+        setPivotResult(columnarAPivotResult(data.pivot) || null);
         setPivotNRows(data.n_rows || 0);
         setColumns([]);
         setRows([]);
@@ -0,0 +1,158 @@
+/**
+ * pivotColumnar — convierte la respuesta columnar del motor de pivotes al
+ * `PivotResult` que pinta `PivotResultTable`.
+ *
+ * Con `pivot_format=columnar` (`GET /api/tables/{id}/data`,
+ * `POST /api/tables/preview`) el backend manda la matriz como arrays densos
+ * en vez de un objeto `{value, display}` por celda:
+ *
+ *   { format: "columnar", row_fields, col_fields, columns,
+ *     row_keys: [["I A"], ..., ["Total"]], row_is_total: [false, ..., true],
+ *     values: [[0.7, null, ...], ...], counts: [[2, 0, ...], ...],
+ *     null_mask: [[0, 1, ...], ...],
+ *     meta: { aggs: [{field, agg, label, format}], fill_display, ... } }
+ *
+ * El `display` se arma acá con la misma regla que `_format_display` de
+ * `backend/rgenerator/core/pivot_engine.py` (format-spec de Python por
+ * métrica; sin format: % para pct_*, entero para count/nunique, `:g` para
+ * el resto). Sin React — se testea aparte.
+ */
+
+const PCT_AGGS = ['pct_row', 'pct_col', 'pct_total'];
+
+/** Separador de miles de Python (`,`) sobre la parte entera. */
+function agruparMiles(texto) {
+    const [entero, decimales] = texto.split('.');
+    const signo = entero.startsWith('-') ? '-' : '';
+    const digitos = signo ? entero.slice(1) : entero;
+    const agrupado = digitos.replace(/\B(?=(\d{3})+(?!\d))/g, ',');
+    return signo + agrupado + (decimales !== undefined ? `.${decimales}` : '');
+}
+
+/** Exponente con al menos dos dígitos, como Python (`1e+06`). */
+function exponentePython(texto) {
+    return texto.replace(/e([+-])(\d)$/, 'e$10$2');
+}
+
+/**
+ * `v.toFixed(d)` con el redondeo de Python: un empate exacto (el valor
+ * binario termina justo en 5) va al par; JS lo redondea hacia afuera.
+ */
+export function toFixedPython(v, d) {
+    const texto = v.toFixed(d);
+    if (d > 60) return texto;
+    const exacto = Math.abs(v).toFixed(d + 40);
+    const corte = exacto.length - 40;
+    if (!/^50*$/.test(exacto.slice(corte))) return texto;
+    // Empate: si el último dígito que queda es par se trunca; si es impar,
+    // el redondeo hacia afuera de JS ya coincide.
+    const truncado = exacto.slice(0, corte).replace(/\.$/, '');
+    if (Number(truncado[truncado.length - 1]) % 2 !== 0) return texto;
+    return (v < 0 ? '-' : '') + truncado;
+}
+
+/** `str(v)` de un float de Python (`1.0`, `1.234e-05`, `1e+16`). */
+export function strPython(v) {
+    if (!Number.isFinite(v)) return String(v);
+    const [mantisa, e] = v.toExponential().split('e');
+    const exp = Number(e);
+    if (exp < -4 || exp >= 16) {
+        return exponentePython(`${mantisa}e${exp < 0 ? '-' : '+'}${Math.abs(exp)}`);
+    }
+    const texto = String(v);  // en este rango JS no usa notación exponencial
+    return texto.includes('.') ? texto : `${texto}.0`;
+}
+
+/** `format(v, 'g')` de Python (precisión 6 por defecto). */
+export function formatoG(v, precision = 6) {
+    if (v === 0) return '0';
+    if (!Number.isFinite(v)) return String(v);
+    const p = precision || 1;
+    const exp = Math.floor(Math.log10(Math.abs(Number(v.toPrecision(p)))));
+    if (exp >= -4 && exp < p) {
+        const texto = toFixedPython(v, Math.max(0, p - 1 - exp));
+        return texto.includes('.') ? texto.replace(/\.?0+$/, '') : texto;
+    }
+    const [mantisa, e] = v.toExponential(p - 1).split('e');
+    const limpia = mantisa.includes('.') ? mantisa.replace(/\.?0+$/, '') : mantisa;
+    return exponentePython(`${limpia}e${e}`);
+}
+
+/**
+ * Aplica un format-spec de Python (`[,][.N](f|%|e|g|d)`) a un número. Un
+ * spec que no se reconoce cae a `String(v)`.
+ */
+export function aplicarFormato(v, fmt) {
+    const m = /^(,)?(?:\.(\d+))?([fF%eEgGd])?$/.exec(String(fmt).trim());
+    if (!m) return strPython(v);
+    const [, miles, prec, tipo] = m;
+    const p = prec !== undefined ? Number(prec) : null;
+    let texto;
+    switch (tipo) {
+        case '%':
+            texto = toFixedPython(v * 100, p ?? 6);
+            return (miles ? agruparMiles(texto) : texto) + '%';
+        case 'f':
+        case 'F':
+            texto = toFixedPython(v, p ?? 6);
+            break;
+        case 'e':
+        case 'E':
+            texto = exponentePython(v.toExponential(p ?? 6));
+            if (tipo === 'E') texto = texto.toUpperCase();
+            break;
+        case 'd':
+            // format(float, 'd') falla en Python y el motor cae a str(value).
+            return strPython(v);
+        default:
+            texto = formatoG(v, p ?? 6);
+            if (tipo === 'G') texto = texto.toUpperCase();
+    }
+    return miles ? agruparMiles(texto) : texto;
+}
+
+/** `display` de una celda (igual a `_format_display` del backend). */
+export function formatearCelda(value, fmt, agg) {
+    if (value === null || value === undefined || Number.isNaN(value)) return '';
+    if (!fmt) {
+        if (PCT_AGGS.includes(agg)) return aplicarFormato(value, '.1%');
+        if (agg === 'count' || agg === 'nunique') return String(Number(toFixedPython(value, 0)));
+        return Number.isInteger(value) ? String(value) : formatoG(value);
+    }
+    return aplicarFormato(value, fmt);
+}
+
+/**
+ * Respuesta columnar → `PivotResult` (`rows[i].cells[j] = {value, display}`).
+ * Una respuesta que ya viene en formato de celdas se devuelve tal cual.
+ */
+export function columnarAPivotResult(pivot) {
+    if (!pivot || pivot.format !== 'columnar') return pivot;
+    const columns = pivot.columns || [];
+    const meta = pivot.meta || {};
+    const formatos = (meta.aggs || []).map((a) => a.format);
+    const nMetricas = formatos.length || 1;
+    const fill = meta.fill_display ?? null;
+
+    const rows = (pivot.row_keys || []).map((keys, i) => {
+        const isTotal = Boolean(pivot.row_is_total?.[i]);
+        const valores = pivot.values?.[i] || [];
+        const mascara = pivot.null_mask?.[i] || [];
+        const cells = columns.map((col, j) => {
+            if (mascara[j] || valores[j] === null || valores[j] === undefined) {
+                const conFill = fill !== null && !isTotal && !col.is_total && !PCT_AGGS.includes(col.agg);
+                return { value: null, display: conFill ? fill : '' };
+            }
+            return { value: valores[j], display: formatearCelda(valores[j], formatos[j % nMetricas], col.agg) };
+        });
+        return { keys, cells, is_total: isTotal };
+    });
+
+    return {
+        row_fields: pivot.row_fields || [],
+        col_fields: pivot.col_fields || [],
+        columns,
+        rows,
+        meta,
+    };
+}
@@ -16,6 +16,8 @@
  *       meta: {...},
  *     }
  *     `cells[i]` está alineada posicionalmente con `columns[i]`.
+ *     TableRenderer pide `pivot_format=columnar` (arrays densos) y lo
+ *     convierte a esta forma con `tooling/pivotColumnar.js`.
  *
  *   PivotTable — componente LEGACY que se mantiene sin cambios para el modo
  *     "raw"/categórico (un único campo `pivotConfig.value` + `semaphoreField`,
@@ -17,11 +17,12 @@ echo "→ Iniciando uvicorn en puerto ${PORT:-8000}..."
 # /api/metrics/) se construyen con http:// en lugar de https://, y el browser
 # los bloquea por mixed content -> "Failed to fetch".
 #
-# --workers 1: el dict ACTIVE_RUNNERS en routers/pipelines.py vive en memoria
-# del proceso. Con 2+ workers cada request del mismo pipeline puede caer en
-# un worker distinto y no ver el runner cargado, rompiendo el flow
-# upload/run/input. Mientras no haya backend de estado compartido (Redis u
-# otra DB), nos quedamos en 1 worker. Para escalar, agregar Redis y mover
-# ACTIVE_RUNNERS allí.
-exec uvicorn backend.api:app --host 0.0.0.0 --port "${PORT:-8000}" --workers 1 \
+# --workers: WEB_CONCURRENCY (default 1). Las corridas de pipelines viven en
+# la tabla pipeline_runs + checkpoints en PIPELINE_CHECKPOINT_DIR (ver
+# backend/pipeline_runs.py), así que el flow upload/run/input funciona con
+# 2+ workers siempre que compartan ese directorio y UPLOADS_DIR (mismo
+# contenedor). Lo que sigue siendo por proceso: el limitador de login
+# (backend/rate_limit.py, el límite efectivo se multiplica por la cantidad
+# de workers) y los caches de métricas (TTL corto).
+exec uvicorn backend.api:app --host 0.0.0.0 --port "${PORT:-8000}" --workers "${WEB_CONCURRENCY:-1}" \
     --proxy-headers --forwarded-allow-ips='*'
@@ -15,6 +15,7 @@ from __future__ import annotations
 
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -38,6 +39,14 @@ if str(ROOT) not in sys.path:
 os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
 os.environ.setdefault("JWT_SECRET", "test-secret-do-not-use-in-prod")
 os.environ.setdefault("JWT_EXPIRE_HOURS", "1")
+# Cache de imágenes de gráficos apagado: los tests espían los renders de
+# matplotlib y no deben ver imágenes de otro test (ni dejarlas en data/).
+os.environ.setdefault("CHART_CACHE_ENABLED", "0")
+# Cola de informes sin pool: cada job corre dentro del request que lo pide,
+# con la sesión de test (ver backend/report_jobs.py).
+os.environ.setdefault("REPORT_JOB_WORKERS", "0")
+# Checkpoints de corridas de pipelines fuera del árbol del repo.
+os.environ.setdefault("PIPELINE_CHECKPOINT_DIR", tempfile.mkdtemp(prefix="pipeline-checkpoints-"))
 os.environ.setdefault("ENVIRONMENT", "test")
 
 # ─────────────────────────────────────────────────────────────────────────
@@ -155,7 +164,7 @@ def db_session(engine):
         if not nested.is_active:
             nested = connection.begin_nested()
 
-    # Invalidar cache TTL de _load_metric_to_df para no leak entre tests.
+    # Invalidar el cache de frames de métricas para no leak entre tests.
     try:
         from backend.routers.tables import invalidate_metric_df_cache
         invalidate_metric_df_cache()
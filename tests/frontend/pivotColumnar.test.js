@@ -0,0 +1,77 @@
+/**
+ * Tests de pivotColumnar — respuesta columnar del motor de pivotes →
+ * PivotResult, con los displays formateados como `_format_display`.
+ *
+ * Correr:
+ *   cd frontend && npm run test:frontend -- pivotColumnar
+ */
+
+import { describe, it, expect } from 'vitest';
+import {
+    columnarAPivotResult,
+    formatearCelda,
+    toFixedPython,
+} from '../../frontend/src/tooling/pivotColumnar.js';
+
+describe('formatearCelda', () => {
+    it('usa el format-spec de la métrica', () => {
+        expect(formatearCelda(0.7, '.1%', 'mean')).toBe('70.0%');
+        expect(formatearCelda(1234567.891, ',.2f', 'sum')).toBe('1,234,567.89');
+        expect(formatearCelda(0.00001234, '.2e', 'mean')).toBe('1.23e-05');
+    });
+
+    it('sin format: % para pct_*, entero para count, :g para el resto', () => {
+        expect(formatearCelda(0.25, null, 'pct_row')).toBe('25.0%');
+        expect(formatearCelda(3, null, 'count')).toBe('3');
+        expect(formatearCelda(3, null, 'mean')).toBe('3');
+        expect(formatearCelda(0.123456789, null, 'mean')).toBe('0.123457');
+        expect(formatearCelda(1234567.891, null, 'mean')).toBe('1.23457e+06');
+    });
+
+    it('redondea empates al par como Python', () => {
+        expect(toFixedPython(0.125, 2)).toBe('0.12');
+        expect(toFixedPython(0.375, 2)).toBe('0.38');
+        expect(toFixedPython(2.5, 0)).toBe('2');
+    });
+
+    it('spec no reconocido cae a str(value) de Python', () => {
+        expect(formatearCelda(1, 'xx', 'mean')).toBe('1.0');
+        expect(formatearCelda(3, 'd', 'mean')).toBe('3.0');
+    });
+});
+
+describe('columnarAPivotResult', () => {
+    const columnar = {
+        format: 'columnar',
+        row_fields: ['Curso'],
+        col_fields: ['Mes'],
+        columns: [
+            { keys: ['Abril'], field: 'Logro', agg: 'mean', label: 'Logro', is_total: false },
+            { keys: ['Marzo'], field: 'Logro', agg: 'mean', label: 'Logro', is_total: false },
+            { keys: ['Total'], field: 'Logro', agg: 'mean', label: 'Logro', is_total: true },
+        ],
+        row_keys: [['I A'], ['I B'], ['Total']],
+        row_is_total: [false, false, true],
+        values: [[0.9, 0.7, 0.7666], [null, 0.5, 0.5], [0.9, 0.6333, 0.7]],
+        counts: [[1, 2, 3], [0, 1, 1], [1, 3, 4]],
+        null_mask: [[0, 0, 0], [1, 0, 0], [0, 0, 0]],
+        meta: { aggs: [{ field: 'Logro', agg: 'mean', label: 'Logro', format: '.1%' }], fill_display: 's/d' },
+    };
+
+    it('arma filas con value/display alineados a columns', () => {
+        const res = columnarAPivotResult(columnar);
+        expect(res.rows.map((r) => r.keys)).toEqual([['I A'], ['I B'], ['Total']]);
+        expect(res.rows[0].cells[1]).toEqual({ value: 0.7, display: '70.0%' });
+        expect(res.rows[2].is_total).toBe(true);
+    });
+
+    it('fill_display solo en celdas de cuerpo sin valor', () => {
+        const res = columnarAPivotResult(columnar);
+        expect(res.rows[1].cells[0]).toEqual({ value: null, display: 's/d' });
+    });
+
+    it('una respuesta en formato de celdas pasa tal cual', () => {
+        const celdas = { row_fields: [], columns: [], rows: [] };
+        expect(columnarAPivotResult(celdas)).toBe(celdas);
+    });
+});
@@ -1,46 +1,120 @@
-"""Regresión: cache TTL de _load_metric_to_df + invalidación automática.
+"""Regresión: cache de frames de métricas + invalidación automática.
 
-Feature commit 6e83156: cache LRU+TTL para que dashboards con múltiples
-charts/tablas sobre la misma métrica no re-carguen MetricData.
+Feature commit 6e83156: cache para que dashboards con múltiples
+charts/tablas sobre la misma métrica no re-carguen MetricData. Hoy vive en
+`backend/metric_cache.py` (versionado por métrica, LRU por bytes) y lo
+comparten tablas/gráficos, el motor de informes y `LoadMetricToDF`.
 
 Necesitamos validar:
-1. invalidate_metric_df_cache(metric_id=N) borra solo esa key.
-2. invalidate_metric_df_cache() (sin arg) limpia todo.
+1. invalidate_metric_df_cache(metric_id=N) invalida solo esa métrica.
+2. invalidate_metric_df_cache() (sin arg) invalida todo.
 3. Event listeners SQLAlchemy invalidan automáticamente tras
    INSERT/UPDATE/DELETE en MetricData.
+4. Los hits no copian datos y no se pueden mutar in-place; la expulsión
+   respeta el tope de bytes; una carga pisada por una escritura no se
+   cachea.
+5. Las derived_columns de tablas/gráficos se cachean por versión de datos
+   y huella de las configs.
+6. Una escritura que no pasa por este proceso (otro worker, SQL crudo) sube
+   `Metric.data_version` y cambia la clave: el frame viejo no se sirve.
 """
 from __future__ import annotations
 
+import pandas as pd
 import pytest
 
-from backend.routers.tables import (
-    _METRIC_DF_CACHE,
-    invalidate_metric_df_cache,
-)
+from backend.metric_cache import MetricFrameCache, metric_frames
+from backend.routers.tables import invalidate_metric_df_cache
+
+
+def _sembrar(org_id, metric_id, df=None):
+    metric_frames.obtener(
+        org_id, metric_id, "test",
+        lambda: df if df is not None else pd.DataFrame({"x": [1]}),
+    )
 
 
 @pytest.mark.unit
 class TestInvalidateExplicito:
     def test_invalidate_total_limpia_todo(self):
-        _METRIC_DF_CACHE[(1, 99, None)] = (0.0, "fake_df")
-        _METRIC_DF_CACHE[(1, 100, None)] = (0.0, "fake_df")
+        _sembrar(1, 99)
+        _sembrar(1, 100)
         invalidate_metric_df_cache()
-        assert len(_METRIC_DF_CACHE) == 0
+        assert not metric_frames.tiene(99)
+        assert not metric_frames.tiene(100)
 
     def test_invalidate_por_metric_id_borra_solo_esa(self):
-        _METRIC_DF_CACHE[(1, 99, None)] = (0.0, "df_99")
-        _METRIC_DF_CACHE[(1, 100, None)] = (0.0, "df_100")
-        _METRIC_DF_CACHE[(2, 99, None)] = (0.0, "df_99_org2")
+        _sembrar(1, 99)
+        _sembrar(1, 100)
+        _sembrar(2, 99)
         invalidate_metric_df_cache(metric_id=99)
         # Las 2 entries con metric_id=99 deben haber salido,
         # la de metric_id=100 sigue.
-        remaining = list(_METRIC_DF_CACHE.keys())
-        assert all(k[1] != 99 for k in remaining)
-        assert (1, 100, None) in _METRIC_DF_CACHE
+        assert not metric_frames.tiene(99)
+        assert metric_frames.tiene(100, org_id=1)
         # Cleanup
         invalidate_metric_df_cache()
 
 
+@pytest.mark.unit
+class TestMetricFrameCache:
+    def test_hit_es_vista_de_solo_lectura_sin_copia(self):
+        cache = MetricFrameCache(max_bytes=10 ** 8, ttl_seconds=60)
+        cargas = []
+
+        def cargar():
+            cargas.append(1)
+            return pd.DataFrame({"a": [1.0, 2.0], "b": ["x", "y"]})
+
+        v1 = cache.obtener(1, 5, "v", cargar)
+        v2 = cache.obtener(1, 5, "v", cargar)
+        assert len(cargas) == 1
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+        # Mismo buffer de datos, sin copia
+        assert v1["a"].values.base is v2["a"].values.base or v1["a"].values is v2["a"].values
+        with pytest.raises(ValueError):
+            v2.loc[0, "a"] = 9.0
+        # Agregar columnas a la vista no toca el cacheado
+        v2["c"] = 1
+        assert "c" not in cache.obtener(1, 5, "v", cargar).columns
+
+    def test_lru_respeta_tope_de_bytes(self):
+        df = pd.DataFrame({"a": range(1000)})
+        nbytes = int(df.memory_usage(index=True).sum())
+        cache = MetricFrameCache(max_bytes=int(nbytes * 2.5), ttl_seconds=60)
+        for mid in (1, 2, 3):
+            cache.obtener(1, mid, "v", lambda: pd.DataFrame({"a": range(1000)}))
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        assert stats["bytes"] <= stats["max_bytes"]
+        assert not cache.tiene(1) and cache.tiene(3)
+
+    def test_carga_pisada_por_escritura_no_se_cachea(self):
+        cache = MetricFrameCache(max_bytes=10 ** 8, ttl_seconds=60)
+
+        def cargar_y_escribir():
+            cache.invalidar(7)  # escritura concurrente durante la carga
+            return pd.DataFrame({"a": [1]})
+
+        cache.obtener(1, 7, "v", cargar_y_escribir)
+        assert not cache.tiene(7)
+
+    def test_data_version_es_parte_de_la_clave(self):
+        cache = MetricFrameCache(max_bytes=10 ** 8, ttl_seconds=60)
+        cache.obtener(1, 9, "v", lambda: pd.DataFrame({"a": [1]}), data_version=3)
+        assert cache.tiene(9, data_version=3) and not cache.tiene(9, data_version=4)
+        df = cache.obtener(1, 9, "v", lambda: pd.DataFrame({"a": [2]}), data_version=4)
+        assert df["a"].tolist() == [2]
+        assert cache.stats()["misses"] == 2
+
+    def test_ttl_vencido_recarga(self):
+        cache = MetricFrameCache(max_bytes=10 ** 8, ttl_seconds=0)
+        cache.obtener(1, 8, "v", lambda: pd.DataFrame({"a": [1]}))
+        cache.obtener(1, 8, "v", lambda: pd.DataFrame({"a": [1]}))
+        assert cache.stats()["misses"] == 2
+
+
 @pytest.mark.integration
 class TestEventListenerInvalida:
     def test_insert_metric_data_invalida_cache(self, db_session):
@@ -49,15 +123,14 @@ class TestEventListenerInvalida:
         )
         org = make_org(db_session)
         m = make_metric(db_session, org)
-        # Pre-cargar el cache manualmente
-        _METRIC_DF_CACHE[(org.id, m.id_metric, None)] = (0.0, "stale_df")
+        # Pre-cargar el cache
+        _sembrar(org.id, m.id_metric)
+        assert metric_frames.tiene(m.id_metric)
         # Insertar MetricData → after_insert listener debe invalidar
         make_metric_data(db_session, m, value="1.0", dimensions_json={"3": "X"})
-        # La entry para esa metric debe haber sido removida
-        assert (org.id, m.id_metric, None) not in _METRIC_DF_CACHE
+        assert not metric_frames.tiene(m.id_metric)
 
     def test_delete_metric_data_invalida_cache(self, db_session):
-        from backend.models import MetricData
         from tests.factories import (
             make_metric, make_metric_data, make_org,
         )
@@ -65,9 +138,79 @@ class TestEventListenerInvalida:
         m = make_metric(db_session, org)
         md = make_metric_data(db_session, m, value="1.0")
         # Pre-cargar cache
-        _METRIC_DF_CACHE[(org.id, m.id_metric, None)] = (0.0, "stale_df")
+        _sembrar(org.id, m.id_metric)
         # Borrar la fila
         db_session.delete(md)
         db_session.commit()
         # Cache invalidado para esa metric
-        assert (org.id, m.id_metric, None) not in _METRIC_DF_CACHE
+        assert not metric_frames.tiene(m.id_metric)
+
+    def test_escritura_fuera_del_orm_no_deja_frame_viejo(self, db_session):
+        """UPDATE crudo sin eventos ORM ni invalidación (como lo vería otro
+        worker): el trigger sube `data_version` y el próximo read recarga."""
+        from sqlalchemy import text
+
+        from backend.routers.tables import _load_metric_to_df
+        from tests.factories import make_metric, make_metric_data, make_org
+
+        org = make_org(db_session)
+        m = make_metric(db_session, org)
+        make_metric_data(db_session, m, value="1.5")
+        assert _load_metric_to_df(db_session, org.id, m.id_metric)[m.name].tolist() == [1.5]
+
+        db_session.connection().execute(
+            text("UPDATE metric_data SET value = '2.5' WHERE id_metric = :m"), {"m": m.id_metric},
+        )
+        db_session.commit()
+        assert _load_metric_to_df(db_session, org.id, m.id_metric)[m.name].tolist() == [2.5]
+
+    def test_loaders_comparten_la_base_columnar(self, db_session):
+        """Un frame de tablas y luego el motor de informes: una sola carga."""
+        from backend.rgenerator.reports.data import _records_for_metric
+        from backend.routers.tables import _load_metric_to_df
+        from tests.factories import (
+            make_dimension, make_metric, make_metric_data, make_org,
+        )
+        org = make_org(db_session)
+        dim = make_dimension(db_session, org, name="Curso")
+        m = make_metric(db_session, org, dimensions=[dim])
+        make_metric_data(db_session, m, value="1.5",
+                         dimensions_json={str(dim.id_dimension): "II A"})
+
+        df = _load_metric_to_df(db_session, org.id, m.id_metric)
+        assert df["Curso"].tolist() == ["II A"]
+
+        antes = metric_frames.stats()
+        records = _records_for_metric(db_session, m, org.id, None)
+        despues = metric_frames.stats()
+        assert len(records) == 1
+        assert despues["hits"] == antes["hits"] + 1
+        assert despues["misses"] == antes["misses"]
+
+    def test_derivadas_se_cachean_por_version_y_configs(self, db_session):
+        """Los tiles con la misma métrica y derivadas calculan el plan una vez;
+        una escritura en la métrica lo vuelve a calcular."""
+        from backend.routers.tables import _metric_df_con_derivadas
+        from tests.factories import (
+            make_dimension, make_metric, make_metric_data, make_org,
+        )
+        org = make_org(db_session)
+        dim = make_dimension(db_session, org, name="Curso")
+        m = make_metric(db_session, org, dimensions=[dim])
+        make_metric_data(db_session, m, value="1.5",
+                         dimensions_json={str(dim.id_dimension): "II A"})
+        derivadas = [{"metric_id": m.id_metric, "configs": [
+            {"kind": "agg", "name": "Max_Curso", "value_field": m.name,
+             "entity_field": "Curso", "agg": "max"},
+        ]}]
+
+        df = _metric_df_con_derivadas(db_session, org.id, m.id_metric, None, derivadas, "test")
+        assert df["Max_Curso"].tolist() == [1.5]
+        antes = metric_frames.stats()
+        _metric_df_con_derivadas(db_session, org.id, m.id_metric, None, derivadas, "test")
+        assert metric_frames.stats()["hits"] == antes["hits"] + 2  # base + derivadas
+
+        make_metric_data(db_session, m, value="3.0",
+                         dimensions_json={str(dim.id_dimension): "II A"})
+        df = _metric_df_con_derivadas(db_session, org.id, m.id_metric, None, derivadas, "test")
+        assert df["Max_Curso"].tolist() == [3.0, 3.0]
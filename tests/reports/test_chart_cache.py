@@ -0,0 +1,81 @@
+"""Cache de imágenes de gráficos (`reports/chart_cache.py`).
+
+Cubre:
+1. Niveles memoria (LRU por bytes) y disco (compartido entre instancias).
+2. La huella de un DataFrame cambia con los datos y no con la identidad.
+3. `runtime._ejecutar_seccion` no vuelve a llamar a matplotlib para el
+   mismo gráfico con los mismos datos, y sí cuando los datos cambian.
+"""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from backend.rgenerator.reports import runtime
+from backend.rgenerator.reports.chart_cache import (
+    ChartImageCache,
+    clave_grafico,
+    huella_dataframe,
+)
+
+
+@pytest.mark.unit
+class TestChartImageCache:
+    def test_memoria_y_disco(self, tmp_path):
+        cache = ChartImageCache(tmp_path, max_bytes_memoria=10 ** 6, max_bytes_disco=10 ** 6, habilitado=True)
+        clave = clave_grafico("v2", "fn", {"a": 1}, "huella")
+        assert cache.obtener(clave) is None
+        cache.guardar(clave, b"png")
+        assert cache.obtener(clave) == b"png"
+
+        # Otro proceso/instancia: lo encuentra en disco
+        otra = ChartImageCache(tmp_path, max_bytes_memoria=10 ** 6, max_bytes_disco=10 ** 6, habilitado=True)
+        assert otra.obtener(clave) == b"png"
+
+    def test_lru_de_memoria_por_bytes(self, tmp_path):
+        cache = ChartImageCache(tmp_path, max_bytes_memoria=10, max_bytes_disco=0, habilitado=True)
+        cache.guardar("a" * 64, b"12345")
+        cache.guardar("b" * 64, b"12345")
+        cache.guardar("c" * 64, b"12345")
+        assert cache.obtener("a" * 64) is None
+        assert cache.obtener("c" * 64) == b"12345"
+
+    def test_deshabilitado_no_guarda(self, tmp_path):
+        cache = ChartImageCache(tmp_path, habilitado=False)
+        cache.guardar("x" * 64, b"png")
+        assert cache.obtener("x" * 64) is None
+        assert not any(tmp_path.iterdir())
+
+    def test_clave_none_si_falta_una_parte(self):
+        assert clave_grafico("v2", "fn", None) is None
+
+    def test_huella_depende_del_contenido(self):
+        a = pd.DataFrame({"x": [1, 2], "y": ["a", "b"]})
+        assert huella_dataframe(a) == huella_dataframe(a.copy())
+        assert huella_dataframe(a) != huella_dataframe(a.assign(x=[1, 3]))
+        assert huella_dataframe(a) != huella_dataframe(a.astype({"x": float}))
+
+
+@pytest.mark.unit
+def test_seccion_chart_repetida_no_redibuja(tmp_path, monkeypatch):
+    llamadas = []
+
+    def _chart(df, nombre_grafico, **kwargs):
+        llamadas.append(len(df))
+        with open(nombre_grafico, "wb") as f:
+            f.write(b"\x89PNG" + bytes(len(df)))
+
+    monkeypatch.setitem(runtime.charts.CHART_REGISTRY, "_chart_cache_test", {"fn": _chart})
+    monkeypatch.setattr(runtime, "chart_images", ChartImageCache(
+        tmp_path / "cache", max_bytes_memoria=10 ** 6, max_bytes_disco=10 ** 6, habilitado=True,
+    ))
+    sec = {"tipo": "chart", "titulo": "T", "fn": "_chart_cache_test", "df_input": "df", "params": {"k": 1}}
+
+    primero = runtime._ejecutar_seccion(sec, {"df": pd.DataFrame({"a": [1, 2]})}, tmp_path)
+    segundo = runtime._ejecutar_seccion(sec, {"df": pd.DataFrame({"a": [1, 2]})}, tmp_path)
+    assert llamadas == [2]
+    assert primero == segundo
+    assert primero["image_b64"].startswith("data:image/png;base64,")
+
+    runtime._ejecutar_seccion(sec, {"df": pd.DataFrame({"a": [1, 2, 3]})}, tmp_path)
+    assert llamadas == [2, 3]
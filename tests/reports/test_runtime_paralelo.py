@@ -0,0 +1,119 @@
+"""Ejecución de secciones del motor PDF v2 en un pool de procesos.
+
+`runtime._ejecutar_secciones` debe devolver exactamente lo mismo que la
+ejecución en serie, en el mismo orden, y una sección rota no debe tumbar
+al resto.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from backend.rgenerator.reports import runtime
+from backend.rgenerator.reports.progreso import reportando
+
+
+def _df():
+    return pd.DataFrame({
+        "Curso": ["I A", "I A", "I B", "I B"],
+        "Mes": ["MARZO", "JUNIO", "MARZO", "JUNIO"],
+        "Logro": [0.5, 0.6, 0.7, 0.8],
+    })
+
+
+def _secciones():
+    return [
+        {"tipo": "heading", "titulo": "Inicio"},
+        {"tipo": "pivot", "titulo": "Por curso", "df_input": "estudiantes",
+         "spec": {"rows": ["Curso"], "values": [{"field": "Logro", "agg": "mean"}]}},
+        {"tipo": "page_break"},
+        {"tipo": "chart", "titulo": "Roto", "fn": "no_registrado",
+         "df_input": "estudiantes", "params": {}},
+        {"tipo": "pivot", "titulo": "Por mes", "df_input": "estudiantes",
+         "spec": {"rows": ["Mes"], "values": [{"field": "Logro", "agg": "count"}]}},
+    ]
+
+
+@pytest.mark.unit
+def test_un_worker_es_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(runtime, "_obtener_pool", lambda: pytest.fail("no debe usar pool"))
+    out = runtime._ejecutar_secciones(_secciones(), {"estudiantes": _df()}, tmp_path, workers=1)
+    assert [s["tipo"] for s in out] == ["heading", "table", "page_break", "error", "table"]
+
+
+@pytest.mark.slow
+def test_pool_conserva_orden_y_aislamiento(tmp_path):
+    dfs = {"estudiantes": _df()}
+    serial = runtime._ejecutar_secciones(_secciones(), dfs, tmp_path / "a", workers=1)
+    (tmp_path / "b").mkdir()
+    try:
+        paralelo = runtime._ejecutar_secciones(_secciones(), dfs, tmp_path / "b", workers=2)
+    finally:
+        runtime.cerrar_pool()
+    assert paralelo == serial
+    assert paralelo[3]["msg"] == runtime.AVISO_SECCION_FALLIDA
+
+
+class _PoolContado(ThreadPoolExecutor):
+    """Pool en threads que registra cuántas secciones hubo en vuelo."""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.en_vuelo = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.en_vuelo += 1
+            self.maximo = max(self.maximo, self.en_vuelo)
+        futuro = super().submit(fn, *args)
+        futuro.add_done_callback(self._terminada)
+        return futuro
+
+    def _terminada(self, _futuro):
+        with self._lock:
+            self.en_vuelo -= 1
+
+
+@pytest.mark.unit
+def test_workers_acota_lo_que_hay_en_vuelo_y_reporta_todo(tmp_path, monkeypatch):
+    pool = _PoolContado()
+    monkeypatch.setattr(runtime, "_obtener_pool", lambda: pool)
+    secciones = _secciones() * 3
+    avance = []
+    try:
+        with reportando(lambda hechas, total: avance.append(hechas)):
+            out = runtime._ejecutar_secciones(secciones, {"estudiantes": _df()}, tmp_path, workers=2)
+    finally:
+        pool.shutdown()
+    assert [s["tipo"] for s in out] == ["heading", "table", "page_break", "error", "table"] * 3
+    assert pool.maximo <= 2
+    # Las secciones livianas (resueltas acá) también informan avance.
+    assert avance == list(range(1, len(secciones) + 1))
+
+
+@pytest.mark.slow
+def test_informes_concurrentes_no_se_cancelan(tmp_path):
+    dfs = {"estudiantes": _df()}
+    esperado = runtime._ejecutar_secciones(_secciones(), dfs, tmp_path / "serie", workers=1)
+    salidas = {}
+
+    def _informe(nombre, workers):
+        destino = tmp_path / nombre
+        destino.mkdir()
+        salidas[nombre] = runtime._ejecutar_secciones(_secciones() * 4, dfs, destino, workers=workers)
+
+    hilos = [threading.Thread(target=_informe, args=(n, w)) for n, w in (("a", 4), ("b", 2))]
+    try:
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    finally:
+        runtime.cerrar_pool()
+    assert salidas["a"] == esperado * 4
+    assert salidas["b"] == esperado * 4
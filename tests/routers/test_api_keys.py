@@ -287,3 +287,85 @@ class TestAuthDependency:
         api_key_client.get("/solo-auth", headers={"X-API-Key": secreto})
         db_session.refresh(row)
         assert row.last_used_at is not None
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Cache de verificaciones (bcrypt una vez por key y proceso)
+# ─────────────────────────────────────────────────────────────────────────
+
+class TestCacheVerificaciones:
+    def _contar_bcrypt(self, monkeypatch):
+        import backend.auth as auth_mod
+
+        llamadas = []
+        original = auth_mod.verificar_api_key
+
+        def _espia(secreto, key_hash):
+            llamadas.append(key_hash)
+            return original(secreto, key_hash)
+
+        monkeypatch.setattr(auth_mod, "verificar_api_key", _espia)
+        return llamadas
+
+    def test_bcrypt_una_sola_vez(self, api_key_client, db_session, org, monkeypatch):
+        llamadas = self._contar_bcrypt(monkeypatch)
+        _, secreto = _crear_api_key_row(db_session, org, scopes=["ingest:write"])
+        for _ in range(3):
+            resp = api_key_client.get("/protegido", headers={"X-API-Key": secreto})
+            assert resp.status_code == 200
+        assert len(llamadas) == 1
+
+    def test_revocar_invalida_el_cache(self, client, admin_headers, api_key_client):
+        create = client.post(
+            "/api/api-keys/", json={"name": "K", "scopes": ["ingest:write"]}, headers=admin_headers
+        ).json()
+        headers = {"X-API-Key": create["secret"]}
+        assert api_key_client.get("/protegido", headers=headers).status_code == 200
+
+        from backend.api_keys import verificaciones
+        assert verificaciones.obtener(create["secret"]) is not None
+        assert client.delete(f"/api/api-keys/{create['id']}", headers=admin_headers).status_code == 200
+        assert verificaciones.obtener(create["secret"]) is None
+        assert api_key_client.get("/protegido", headers=headers).status_code == 401
+
+    def test_revocacion_externa_se_ve_en_hit(self, api_key_client, db_session, org):
+        # Otro proceso revoca la key: este no recibió el invalidar, pero la
+        # fila se relee en cada request.
+        row, secreto = _crear_api_key_row(db_session, org, scopes=["ingest:write"])
+        assert api_key_client.get("/solo-auth", headers={"X-API-Key": secreto}).status_code == 200
+        row.revoked = True
+        db_session.commit()
+        assert api_key_client.get("/solo-auth", headers={"X-API-Key": secreto}).status_code == 401
+
+    def test_expiracion_se_valida_en_hit(self, api_key_client, db_session, org):
+        row, secreto = _crear_api_key_row(db_session, org, scopes=["ingest:write"])
+        assert api_key_client.get("/solo-auth", headers={"X-API-Key": secreto}).status_code == 200
+        row.expires_at = datetime.utcnow() - timedelta(minutes=1)
+        db_session.commit()
+        assert api_key_client.get("/solo-auth", headers={"X-API-Key": secreto}).status_code == 401
+
+    def test_ttl_y_limite_de_entradas(self, monkeypatch):
+        from backend import api_keys as mod
+
+        reloj = [1000.0]
+        monkeypatch.setattr(mod.time, "monotonic", lambda: reloj[0])
+        cache = mod.CacheVerificaciones(ttl_seconds=10, max_entries=2)
+        v = lambda i: mod.KeyVerificada(api_key_id=i, user_id=None, org_id=1, expires_at=None)
+
+        cache.guardar("a", v(1))
+        cache.guardar("b", v(2))
+        assert cache.obtener("a").api_key_id == 1
+        cache.guardar("c", v(3))  # desaloja "b", el menos usado
+        assert cache.obtener("b") is None
+        assert len(cache) == 2
+
+        reloj[0] += 11
+        assert cache.obtener("a") is None
+        assert cache.obtener("c") is None
+
+    def test_no_guarda_el_secreto(self):
+        from backend.api_keys import CacheVerificaciones, KeyVerificada
+
+        cache = CacheVerificaciones()
+        cache.guardar("rg_live_abcdsecreto", KeyVerificada(1, None, 1, None))
+        assert all(b"rg_live" not in d for d in cache._entradas)
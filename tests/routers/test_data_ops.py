@@ -0,0 +1,219 @@
+"""Tests de /api/data-ops replace y recalculate.
+
+Cada caso corre por los dos caminos — por conjuntos
+(`backend/data_ops_sql.py`) y fila por fila en Python (forzado anulando
+`data_ops_sql.agrupar`) — con los mismos conteos, muestras y datos finales
+esperados.
+"""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from backend import data_ops_sql
+from backend.metric_store import columnas_cacheadas
+from backend.models import MetricData, Spec
+from tests.factories import make_dimension, make_metric, make_metric_data
+
+
+@pytest.fixture(params=["conjuntos", "python"])
+def camino(request, monkeypatch):
+    """Qué camino ejecuta el endpoint; con "conjuntos" además verifica que
+    `agrupar` efectivamente lo tomó."""
+    usados = []
+    original = data_ops_sql.agrupar
+
+    def _agrupar(*args, **kwargs):
+        grupos = original(*args, **kwargs) if request.param == "conjuntos" else None
+        usados.append(grupos is not None)
+        return grupos
+
+    monkeypatch.setattr(data_ops_sql, "agrupar", _agrupar)
+    yield request.param
+    if request.param == "conjuntos":
+        assert usados and all(usados)
+
+
+@pytest.fixture
+def metrica_cursos(db_session, org):
+    """Métrica objeto (Puntaje, Nivel) con la dimensión Curso.
+
+    id | Curso | Puntaje | Nivel
+    ---+-------+---------+-------
+     1 | 1°A   | 200     | Bajo
+     2 | 1°A   | 280     | Bajo
+     3 | 1°B   | 300     | Alto
+     4 | 1°A   | 250     | —
+     5 | 2     | 320     | Alto     (Curso guardado como número JSON)
+     6 | —     | None    | —        (sin Curso)
+    """
+    dim = make_dimension(db_session, org, name="Curso")
+    metric = make_metric(
+        db_session, org, name="SIMCE", data_type="object",
+        fields=[{"name": "Puntaje", "type": "float"}, {"name": "Nivel", "type": "str"}],
+        dimensions=[dim],
+    )
+    k = str(dim.id_dimension)
+    filas = [
+        ({k: "1°A"}, {"Puntaje": 200, "Nivel": "Bajo"}),
+        ({k: "1°A"}, {"Puntaje": 280, "Nivel": "Bajo"}),
+        ({k: "1°B"}, {"Puntaje": 300, "Nivel": "Alto"}),
+        ({k: "1°A"}, {"Puntaje": 250}),
+        ({k: 2}, {"Puntaje": 320, "Nivel": "Alto"}),
+        ({}, {"Puntaje": None}),
+    ]
+    for dims, value in filas:
+        make_metric_data(db_session, metric, value=value, dimensions_json=dims)
+    return metric, dim
+
+
+@pytest.fixture
+def mapeo_niveles(db_session, org):
+    cfg = {
+        "kind": "range",
+        "ranges": [
+            {"min": None, "max": 250, "label": "Bajo"},
+            {"min": 250, "max": None, "label": "Alto"},
+        ],
+        "default": "s/d",
+    }
+    spec = Spec(name="Niveles", type="Mapeo", org_id=org.id,
+                metadata_=json.dumps({"mapping_config": cfg}))
+    db_session.add(spec)
+    db_session.commit()
+    return spec
+
+
+def _filas(db_session, metric, dim):
+    db_session.expire_all()
+    rows = db_session.query(MetricData).filter(
+        MetricData.id_metric == metric.id_metric
+    ).order_by(MetricData.id_data).all()
+    return [
+        (json.loads(r.dimensions_json).get(str(dim.id_dimension)), json.loads(r.value))
+        for r in rows
+    ]
+
+
+@pytest.mark.integration
+class TestReplace:
+    def test_exact_sobre_dimension(self, client_auth_admin, db_session, metrica_cursos, camino):
+        metric, dim = metrica_cursos
+        body = {"metric_id": metric.id_metric, "column_name": "Curso",
+                "find": "1°a", "replace": "1A", "match_type": "exact"}
+
+        r = client_auth_admin.post("/api/data-ops/replace", json=body)
+        assert r.status_code == 200, r.text
+        preview = r.json()
+        assert preview["n_total_rows"] == 6
+        assert preview["n_matched"] == 3
+        assert preview["n_would_change"] == 3
+        assert [c["before"] for c in preview["sample_changes"]] == ["1°A"] * 3
+        assert [c["after"] for c in preview["sample_changes"]] == ["1A"] * 3
+        assert preview["applied"] is False
+        assert [d for d, _ in _filas(db_session, metric, dim)].count("1°A") == 3
+
+        r = client_auth_admin.post("/api/data-ops/replace", json={**body, "dry_run": False})
+        assert r.status_code == 200, r.text
+        assert {k: v for k, v in r.json().items() if k != "applied"} == \
+            {k: v for k, v in preview.items() if k != "applied"}
+        assert [d for d, _ in _filas(db_session, metric, dim)] == ["1A", "1A", "1°B", "1A", 2, None]
+
+    def test_contains_con_varios_valores(self, client_auth_admin, db_session, metrica_cursos, camino):
+        metric, dim = metrica_cursos
+        r = client_auth_admin.post("/api/data-ops/replace", json={
+            "metric_id": metric.id_metric, "column_name": "Curso",
+            "find": "°", "replace": "", "match_type": "contains", "dry_run": False,
+        })
+        assert r.status_code == 200, r.text
+        assert r.json()["n_would_change"] == 4
+        assert [d for d, _ in _filas(db_session, metric, dim)] == ["1A", "1A", "1B", "1A", 2, None]
+
+    def test_regex_sobre_field_castea_al_tipo(self, client_auth_admin, db_session, metrica_cursos, camino):
+        metric, dim = metrica_cursos
+        r = client_auth_admin.post("/api/data-ops/replace", json={
+            "metric_id": metric.id_metric, "column_name": "Puntaje",
+            "find": r"^2(\d)0$", "replace": r"1\g<1>5", "match_type": "regex", "dry_run": False,
+        })
+        assert r.status_code == 200, r.text
+        cuerpo = r.json()
+        assert (cuerpo["n_matched"], cuerpo["n_would_change"]) == (3, 3)
+        puntajes = [v.get("Puntaje") for _, v in _filas(db_session, metric, dim)]
+        assert puntajes == [105.0, 185.0, 300, 155.0, 320, None]
+
+    def test_invalida_los_datos_cacheados(self, client_auth_admin, db_session, metrica_cursos, camino):
+        metric, dim = metrica_cursos
+        antes = columnas_cacheadas(db_session, metric).dim(dim.id_dimension)
+        assert "1A" not in antes
+        r = client_auth_admin.post("/api/data-ops/replace", json={
+            "metric_id": metric.id_metric, "column_name": "Curso",
+            "find": "1°A", "replace": "1A", "dry_run": False,
+        })
+        assert r.status_code == 200, r.text
+        db_session.expire_all()
+        assert list(columnas_cacheadas(db_session, metric).dim(dim.id_dimension)).count("1A") == 3
+
+
+@pytest.mark.integration
+class TestRecalculate:
+    def test_aplica_el_mapeo(self, client_auth_admin, db_session, metrica_cursos, mapeo_niveles, camino):
+        metric, dim = metrica_cursos
+        body = {"metric_id": metric.id_metric, "source_column": "Puntaje",
+                "target_column": "Nivel", "mapping_id": mapeo_niveles.id_spec}
+
+        r = client_auth_admin.post("/api/data-ops/recalculate", json=body)
+        assert r.status_code == 200, r.text
+        preview = r.json()
+        assert preview["n_total_rows"] == 6
+        assert preview["n_processed"] == 6
+        # 280 → Alto (era Bajo), 250 → Alto (no tenía), None → s/d (default)
+        assert preview["n_changed"] == 3
+        assert preview["n_default_used"] == 1
+        assert [(c["source"], c["before"], c["after"], c["matched"]) for c in preview["sample_changes"]] == [
+            ("280", "Bajo", "Alto", True),
+            ("250", "", "Alto", True),
+            ("None", "", "s/d", False),
+        ]
+
+        r = client_auth_admin.post("/api/data-ops/recalculate", json={**body, "dry_run": False})
+        assert r.status_code == 200, r.text
+        assert r.json()["n_changed"] == 3
+        assert [v.get("Nivel") for _, v in _filas(db_session, metric, dim)] == \
+            ["Bajo", "Alto", "Alto", "Alto", "Alto", "s/d"]
+
+    def test_desde_una_dimension(self, client_auth_admin, db_session, metrica_cursos, org, camino):
+        metric, dim = metrica_cursos
+        cfg = {"kind": "discrete", "mapping": {"1°A": "Primero", "2": "Segundo"},
+               "input_field_type": "string"}
+        spec = Spec(name="Cursos", type="Mapeo", org_id=org.id,
+                    metadata_=json.dumps({"mapping_config": cfg}))
+        db_session.add(spec)
+        db_session.commit()
+
+        r = client_auth_admin.post("/api/data-ops/recalculate", json={
+            "metric_id": metric.id_metric, "source_column": "Curso",
+            "target_column": "Grado", "mapping_id": spec.id_spec, "dry_run": False,
+        })
+        assert r.status_code == 200, r.text
+        assert r.json()["n_changed"] == 4
+        assert [v.get("Grado") for _, v in _filas(db_session, metric, dim)] == \
+            ["Primero", "Primero", None, "Primero", "Segundo", None]
+
+
+@pytest.mark.integration
+def test_value_no_objeto_sigue_por_python(client_auth_admin, db_session, metrica_cursos):
+    metric, dim = metrica_cursos
+    db_session.add(MetricData(id_metric=metric.id_metric, org_id=metric.org_id,
+                              value="sin-json", dimensions_json=json.dumps({str(dim.id_dimension): "1°A"})))
+    db_session.commit()
+    assert data_ops_sql.agrupar(
+        db_session, metric.id_metric, [data_ops_sql.Celda("value", "Puntaje")]
+    ) is None
+
+    r = client_auth_admin.post("/api/data-ops/replace", json={
+        "metric_id": metric.id_metric, "column_name": "Curso",
+        "find": "1°A", "replace": "1A", "dry_run": False,
+    })
+    assert r.status_code == 200, r.text
+    assert r.json()["n_would_change"] == 4
@@ -0,0 +1,289 @@
+"""Tests de POST /api/indicators/{id}/export-pdf/batch (un ZIP con N PDFs).
+
+`build_pdf_bytes` se mockea igual que en `test_export_pdf_periodo.py`: la
+sonda dice qué filtros recibió cada rebanada.
+"""
+from __future__ import annotations
+
+import io
+import json
+import pickle
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from tests.factories import (
+    make_dimension, make_indicator, make_metric, make_metric_data,
+)
+
+FAKE_PDF = b"%PDF-1.4 lote\n"
+LAYOUT_EVAL = json.dumps({"sections": [{"type": "kpi"}]})
+
+
+@pytest.fixture
+def indicador(db_session, org):
+    dims = {n: make_dimension(db_session, org, name=n) for n in ("Curso", "Mes")}
+    metric = make_metric(
+        db_session, org, name="Resultados por Estudiante",
+        data_type="object", fields=[{"name": "Logro", "type": "float"}],
+        dimensions=list(dims.values()),
+    )
+    ident = {n: str(d.id_dimension) for n, d in dims.items()}
+    for curso, logro in (("10 A", 0.4), ("2 A", 0.5), ("1° B", 0.7)):
+        make_metric_data(db_session, metric, value={"Logro": logro}, dimensions_json={
+            ident["Curso"]: curso, ident["Mes"]: "ABRIL",
+        })
+    ind = make_indicator(db_session, org, name="Ensayo Lote", metrics=[metric],
+                         pdf_layout=LAYOUT_EVAL)
+    ind._ident = ident
+    return ind
+
+
+def _lote(client_auth, indicator_id, body, **kwargs):
+    with patch("backend.rgenerator.core.report_steps.build_pdf_bytes", **kwargs) as mock:
+        resp = client_auth.post(f"/api/indicators/{indicator_id}/export-pdf/batch", json=body)
+    return resp, mock
+
+
+def _zip(resp):
+    return zipfile.ZipFile(io.BytesIO(resp.content))
+
+
+class _PoolQueSerializa(ThreadPoolExecutor):
+    """Pool en threads que serializa cada tarea como lo haría el de procesos."""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.en_vuelo = 0
+        self.maximo = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            self.en_vuelo += 1
+            self.maximo = max(self.maximo, self.en_vuelo)
+        futuro = super().submit(pickle.loads(pickle.dumps(fn)), *args)
+        futuro.add_done_callback(self._terminada)
+        return futuro
+
+    def _terminada(self, _futuro):
+        with self._lock:
+            self.en_vuelo -= 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    from backend.rgenerator.reports import runtime
+
+    pool = _PoolQueSerializa()
+    monkeypatch.setattr(runtime, "_obtener_pool", lambda: pool)
+    monkeypatch.setattr(runtime, "REPORT_SECTION_WORKERS", 2)
+    yield pool
+    pool.shutdown()
+
+
+_renders = []
+
+
+def _render_falso(indicator, pdf_layout, records, org_name, branding, filters_label):
+    _renders.append((threading.current_thread().name, type(indicator).__name__, len(records)))
+    return b"%PDF-1.4 " + filters_label.encode("utf-8")
+
+
+def _dormir(segundos, contenido):
+    time.sleep(segundos)
+    return contenido
+
+
+def _fallar():
+    raise ValueError("render roto")
+
+
+@pytest.mark.integration
+class TestExportPDFLote:
+    def test_un_pdf_por_valor_de_la_dimension(self, client_auth, indicador):
+        resp, mock = _lote(client_auth, indicador.id_indicator,
+                           {"por": "Curso", "filters": {"Mes": "ABRIL"}},
+                           return_value=FAKE_PDF)
+        assert resp.status_code == 200, resp.text
+        assert resp.headers["content-type"] == "application/zip"
+        assert "informes_Ensayo_Lote.zip" in resp.headers["content-disposition"]
+
+        nombres = _zip(resp).namelist()
+        assert nombres == [
+            "informe_Ensayo_Lote_1_B.pdf",
+            "informe_Ensayo_Lote_2_A.pdf",
+            "informe_Ensayo_Lote_10_A.pdf",
+        ]
+        assert _zip(resp).read(nombres[0]) == FAKE_PDF
+        curso, mes = indicador._ident["Curso"], indicador._ident["Mes"]
+        filtros = [c.kwargs["filters"] for c in mock.call_args_list]
+        assert filtros == [
+            {mes: "ABRIL", curso: "1° B"},
+            {mes: "ABRIL", curso: "2 A"},
+            {mes: "ABRIL", curso: "10 A"},
+        ]
+
+    def test_filtros_lote_explicitos(self, client_auth, indicador):
+        curso = indicador._ident["Curso"]
+        resp, mock = _lote(client_auth, indicador.id_indicator,
+                           {"filtros_lote": [{curso: "2 A"}, {curso: ["10 A", "1° B"]}]},
+                           return_value=FAKE_PDF)
+        assert resp.status_code == 200, resp.text
+        assert len(_zip(resp).namelist()) == 2
+        assert mock.call_count == 2
+
+    def test_rebanada_sin_datos_queda_en_omitidos(self, client_auth, indicador):
+        from backend.rgenerator.reports.errores import DatosInsuficientes
+
+        def _render(record, db, org_id, filters=None, **kwargs):
+            if "2 A" in filters.values():
+                raise DatosInsuficientes("Sin datos para 2 A")
+            return FAKE_PDF
+
+        resp, _ = _lote(client_auth, indicador.id_indicator,
+                        {"por": "Curso", "valores": ["2 A", "10 A"]}, side_effect=_render)
+        assert resp.status_code == 200, resp.text
+        zf = _zip(resp)
+        assert zf.namelist() == ["informe_Ensayo_Lote_10_A.pdf", "omitidos.txt"]
+        assert "2 A: Sin datos para 2 A" in zf.read("omitidos.txt").decode("utf-8")
+
+    def test_todas_sin_datos_400(self, client_auth, indicador):
+        from backend.rgenerator.reports.errores import DatosInsuficientes
+
+        resp, _ = _lote(client_auth, indicador.id_indicator, {"por": "Curso"},
+                        side_effect=DatosInsuficientes("Sin datos"))
+        assert resp.status_code == 400
+
+    def test_sin_rebanadas_422(self, client_auth, indicador):
+        resp, _ = _lote(client_auth, indicador.id_indicator, {}, return_value=FAKE_PDF)
+        assert resp.status_code == 422
+
+    def test_dimension_ajena_400(self, client_auth, indicador):
+        resp, _ = _lote(client_auth, indicador.id_indicator, {"por": "Asignatura"},
+                        return_value=FAKE_PDF)
+        assert resp.status_code == 400
+
+    def test_la_carga_se_comparte_entre_rebanadas(self, client_auth, indicador):
+        from backend.rgenerator.reports import data
+
+        real = data._cargar_dataframes_indicator
+        with patch.object(data, "_cargar_dataframes_indicator", side_effect=real) as carga:
+            resp, mock = _lote(client_auth, indicador.id_indicator, {"por": "Curso"},
+                               return_value=FAKE_PDF)
+        assert resp.status_code == 200, resp.text
+        assert mock.call_count == 3
+        assert carga.call_count == 1
+
+    def test_renders_en_el_pool_con_los_datos_ya_preparados(self, client_auth, indicador, pool):
+        from backend.rgenerator.core import report_steps
+
+        _renders.clear()
+        with patch.object(report_steps, "_render_pdf_layout", _render_falso):
+            resp = client_auth.post(f"/api/indicators/{indicador.id_indicator}/export-pdf/batch",
+                                    json={"por": "Curso"})
+        assert resp.status_code == 200, resp.text
+        zf = _zip(resp)
+        assert sorted(zf.namelist()) == [
+            "informe_Ensayo_Lote_10_A.pdf",
+            "informe_Ensayo_Lote_1_B.pdf",
+            "informe_Ensayo_Lote_2_A.pdf",
+        ]
+        assert b"2 A" in zf.read("informe_Ensayo_Lote_2_A.pdf")
+        # Ni la sesión ni el ORM viajan al worker: cada render recibe el
+        # indicador plano y solo los records de su curso.
+        assert len(_renders) == 3
+        assert all(hilo != threading.current_thread().name for hilo, _, _ in _renders)
+        assert {(tipo, n) for _, tipo, n in _renders} == {("SimpleNamespace", 1)}
+
+
+@pytest.mark.unit
+class TestLote:
+    def test_memo_solo_dentro_del_lote(self):
+        import pandas as pd
+
+        from backend.rgenerator.reports.lote import dataframes_memorizados, en_lote
+
+        cargas = []
+
+        def cargar():
+            cargas.append(1)
+            return {"estudiantes": pd.DataFrame({"a": [1]})}
+
+        dataframes_memorizados(1, 1, None, cargar)
+        with en_lote():
+            primero = dataframes_memorizados(1, 1, {}, cargar)
+            primero["estudiantes"]["b"] = 2
+            segundo = dataframes_memorizados(1, 1, None, cargar)
+            dataframes_memorizados(1, 1, {"Curso": "A"}, cargar)
+        assert len(cargas) == 3
+        assert "b" not in segundo["estudiantes"].columns
+
+    def test_renderizar_entrega_en_orden_de_llegada(self, pool):
+        from backend.rgenerator.reports.lote import RenderPendiente, renderizar
+
+        trabajos = [
+            ("lento", RenderPendiente(_dormir, {"segundos": 0.5, "contenido": b"a"})),
+            ("rapido", RenderPendiente(_dormir, {"segundos": 0, "contenido": b"b"})),
+            ("listo", b"c"),
+            ("roto", RenderPendiente(_fallar)),
+        ]
+        salida = list(renderizar(trabajos, en_vuelo=2))
+        assert [clave for clave, _ in salida] == ["listo", "rapido", "roto", "lento"]
+        assert dict(salida)["lento"] == b"a"
+        assert isinstance(dict(salida)["roto"], ValueError)
+        assert pool.maximo == 2
+
+    def test_renderizar_sin_pool_va_en_serie(self, monkeypatch):
+        from backend.rgenerator.reports import runtime
+        from backend.rgenerator.reports.lote import RenderPendiente, renderizar
+
+        monkeypatch.setattr(runtime, "_obtener_pool", lambda: pytest.fail("no debe usar pool"))
+        trabajos = [(n, RenderPendiente(_dormir, {"segundos": 0, "contenido": n})) for n in (b"1", b"2")]
+        assert list(renderizar(trabajos, en_vuelo=1)) == [(b"1", b"1"), (b"2", b"2")]
+
+    def test_construir_pdf_se_difiere_en_lote(self):
+        import pandas as pd
+
+        from backend.rgenerator.reports import runtime
+        from backend.rgenerator.reports.errores import DatosInsuficientes
+        from backend.rgenerator.reports.lote import RenderPendiente, en_lote
+
+        dfs = {"estudiantes": pd.DataFrame({"Curso": ["1 A"]}), "vacio": pd.DataFrame()}
+        with en_lote():
+            pendiente = runtime.construir_pdf("x", dfs, esquema={"secciones_fijas": []})
+            # La guardia de datos sigue corriendo al preparar, no en el worker.
+            with pytest.raises(DatosInsuficientes):
+                runtime.construir_pdf("x", dfs, esquema={}, df_principal="vacio")
+        assert isinstance(pendiente, RenderPendiente)
+        assert pendiente.kwargs["workers"] == 1
+        assert pickle.loads(pickle.dumps(pendiente)).kwargs["dataframes"]["estudiantes"].equals(dfs["estudiantes"])
+
+    def test_escribir_zip_desambigua_nombres(self):
+        from backend.rgenerator.reports.lote import escribir_zip, nombre_archivo
+
+        buf = io.BytesIO()
+        escribir_zip(buf, [("a.pdf", b"1"), ("a.pdf", b"2"), ("b", b"3"), ("b", b"4")])
+        assert zipfile.ZipFile(buf).namelist() == ["a.pdf", "a_2.pdf", "b", "b_2"]
+        assert nombre_archivo("II° Medio / A") == "II_Medio_A"
+
+
+@pytest.mark.integration
+class TestLoteEnCola:
+    def test_job_de_lote_con_progreso_por_informe(self, client_auth, indicador):
+        with patch("backend.rgenerator.core.report_steps.build_pdf_bytes", return_value=FAKE_PDF):
+            job = client_auth.post(
+                f"/api/report-jobs/indicator/{indicador.id_indicator}/batch",
+                json={"por": "Curso"},
+            ).json()
+        assert job["status"] == "done", job
+        assert job["progress"] == {"done": 3, "total": 3}
+        assert job["filename"] == "informes_Ensayo_Lote.zip"
+
+        resp = client_auth.get(job["download_url"])
+        assert resp.headers["content-type"] == "application/zip"
+        assert len(_zip(resp).namelist()) == 3
@@ -588,6 +588,12 @@ class TestTrigger:
         assert log.status == "success"
         assert log.endpoint == f"pipelines/{pipeline.pipeline_id}/trigger"
 
+        from backend.models import PipelineStepMetric
+        metricas = db_session.query(PipelineStepMetric).filter(
+            PipelineStepMetric.pipeline_id == pipeline.pipeline_id
+        ).all()
+        assert [(m.step_class, m.status, m.run_id) for m in metricas] == [("InitRun", "success", None)]
+
     def test_cross_org_404(self, client, db_session, org, write_key):
         org_b = make_org(db_session)
         config = {"pipeline": [{"step": "InitRun", "params": {"evaluation": "test"}}]}
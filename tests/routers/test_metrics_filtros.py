@@ -177,6 +177,17 @@ class TestFiltroPorDimension:
         assert body["total"] == 3
         assert all("audit" in i for i in body["items"])
 
+    def test_export_con_filtro_solo_exporta_esas_filas(self, client_auth, metrica_filtrable):
+        metric, dim_anio, _ = metrica_filtrable
+        raw = _filters(**{str(dim_anio.id_dimension): ["2026"]})
+        r = client_auth.get(
+            f"/api/metrics/{metric.id_metric}/export?format=csv&filters={raw}&include_audit=true"
+        )
+        assert r.status_code == 200
+        lineas = r.content.decode("utf-8-sig").strip().splitlines()
+        assert len(lineas) == 1 + 3
+        assert all(";2026;" in f";{l};" for l in lineas[1:])
+
 
 # ─────────────────────────────────────────────────────────────────────────
 # q
@@ -217,6 +228,51 @@ class TestBusquedaLibre:
         assert body["total"] == 0
 
 
+@pytest.mark.integration
+class TestBusquedaIndexada:
+    """La tabla FTS5 de SQLite (`metric_data_fts`) sigue a cada escritura y
+    solo acota candidatos: el resultado es el mismo que el LIKE."""
+
+    def _total(self, client_auth, metric, q):
+        return client_auth.get(f"/api/metrics/{metric.id_metric}/data?q={quote(q)}").json()["total"]
+
+    def test_usa_fts(self, db_session):
+        from sqlalchemy.dialects import sqlite
+
+        from backend.metric_store import busqueda_texto_sql
+
+        sql = str(busqueda_texto_sql(db_session, "marzo").compile(dialect=sqlite.dialect()))
+        assert "MATCH" in sql
+        # Menos de 3 caracteres o comodines de LIKE: solo LIKE.
+        assert "MATCH" not in str(busqueda_texto_sql(db_session, "20").compile(dialect=sqlite.dialect()))
+        assert "MATCH" not in str(busqueda_texto_sql(db_session, "mar_o").compile(dialect=sqlite.dialect()))
+        assert busqueda_texto_sql(db_session, "   ") is None
+
+    def test_update_y_delete_mantienen_el_indice(self, client_auth, db_session, metrica_filtrable):
+        from backend.models import MetricData
+
+        metric, _, dim_mes = metrica_filtrable
+        fila = (
+            db_session.query(MetricData)
+            .filter(MetricData.id_metric == metric.id_metric, MetricData.value == "60")
+            .one()
+        )
+        fila.dimensions_json = json.dumps({str(dim_mes.id_dimension): "AGOSTO"})
+        db_session.commit()
+        assert self._total(client_auth, metric, "julio") == 0
+        assert self._total(client_auth, metric, "agosto") == 1
+
+        db_session.query(MetricData).filter(MetricData.value.in_(["20", "40"])).delete()
+        db_session.commit()
+        assert self._total(client_auth, metric, "noviembre") == 1
+
+    def test_comodines_siguen_siendo_like(self, client_auth, metrica_filtrable):
+        metric, _, _ = metrica_filtrable
+        # `_` es comodín de LIKE (comportamiento histórico): MAR_O → MARZO.
+        assert self._total(client_auth, metric, "mar_o") == 2
+        assert self._total(client_auth, metric, "viem") == 3
+
+
 # ─────────────────────────────────────────────────────────────────────────
 # Multi-tenancy
 # ─────────────────────────────────────────────────────────────────────────
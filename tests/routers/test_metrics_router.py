@@ -707,3 +707,40 @@ class TestAltaManualCompletaParesNombre:
         })
         assert r.status_code == 200, r.text
         assert r.json()["data"]["dimensions_json"] == {id_nom: "Pérez Juan"}
+
+
+@pytest.mark.integration
+class TestImportPorLotes:
+    def test_xlsx_en_lotes(self, client_auth, db_session, metric_sin_par_nombre, monkeypatch):
+        import io
+
+        from openpyxl import Workbook
+
+        from backend import lectura_por_lotes
+
+        monkeypatch.setattr(lectura_por_lotes, "FILAS_POR_LOTE", 2)
+        metric, dims = metric_sin_par_nombre
+        wb = Workbook()
+        for fila in (["Curso", "Logro"], ["II A", 0.5], ["II B", 0.7], ["II C", 1]):
+            wb.active.append(fila)
+        buf = io.BytesIO()
+        wb.save(buf)
+        r = client_auth.post(
+            f"/api/metrics/{metric.id_metric}/import",
+            files={"files": ("datos.xlsx", buf.getvalue(),
+                             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+        )
+        assert r.status_code == 200, r.text
+        assert r.json()["imported"] == 3
+        curso = str(dims["Curso"].id_dimension)
+        assert [d[curso] for d in _dims_guardadas(db_session, metric)] == ["II A", "II B", "II C"]
+
+    def test_valor_invalido_400_sin_guardar_nada(self, client_auth, db_session, metric_sin_par_nombre):
+        metric, _ = metric_sin_par_nombre
+        r = client_auth.post(
+            f"/api/metrics/{metric.id_metric}/import",
+            files=_csv("Curso;Logro\nII A;0.5\nII B;no numérico\n"),
+        )
+        assert r.status_code == 400
+        assert "datos.csv" in r.json()["detail"]
+        assert _dims_guardadas(db_session, metric) == []
@@ -0,0 +1,447 @@
+"""Tests del estado de corridas de pipelines en la DB (`backend/pipeline_runs.py`).
+
+Cubre:
+1. Una corrida pausada en `waiting_input` se retoma en `/input` aunque el
+   worker no tenga el runner en memoria (se restaura del checkpoint), y los
+   artifacts siguen disponibles para preview/descarga.
+2. Dos requests no ejecutan la misma corrida a la vez; una RUNNING sin
+   actividad (worker caído) se puede volver a reclamar.
+3. Un fallo de step deja la sesión FAILED con un checkpoint por paso;
+   `/run?resume=true` salta los pasos cuya config no cambió.
+4. Checkpoint: Parquet solo para DataFrames que vuelven idénticos; la
+   huella depende del contenido y de los dtypes.
+5. Telemetría: cada paso ejecutado deja una fila en `pipeline_step_metrics`
+   y /telemetry/steps la agrega por clase de paso.
+"""
+from __future__ import annotations
+
+import io
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from backend import pipeline_runs
+from backend.rgenerator.core.step import Step, WaitingForInputException
+from backend.rgenerator.tooling import pipeline_tools
+
+
+_CORRIDAS_TABLA = []
+
+
+@dataclass
+class _Tabla(Step):
+    name: str = "tabla"
+
+    def run(self, ctx):
+        _CORRIDAS_TABLA.append(self.description)
+        ctx.artifacts["tabla"] = pd.DataFrame({"Curso": ["II A", "II B"], "Puntaje": [1, 2]})
+        ctx.artifacts["mixta"] = pd.DataFrame({"Año": [2026, "2025"]})
+
+
+@dataclass
+class _PideCurso(Step):
+    name: str = "pide_curso"
+
+    def run(self, ctx):
+        valores = getattr(ctx, "user_inputs", {}).get("enrich_global", {})
+        if "Nivel" not in valores:
+            raise WaitingForInputException("Falta el nivel", {"fields": ["Nivel"]})
+        ctx.artifacts["tabla"] = ctx.artifacts["tabla"].assign(Nivel=valores["Nivel"])
+
+
+@dataclass
+class _Boom(Step):
+    name: str = "boom"
+
+    def run(self, ctx):
+        raise ValueError("Columna llave 'RUT' no existe")
+
+
+@dataclass
+class _Resumen(Step):
+    name: str = "resumen"
+
+    def run(self, ctx):
+        ctx.artifacts["resumen"] = {"filas": len(ctx.artifacts["tabla"])}
+
+
+@pytest.fixture
+def pipeline_interactivo(db_session, org, monkeypatch):
+    from backend.models import Pipeline
+
+    monkeypatch.setitem(pipeline_tools.STEP_MAPPING, "_TablaTest", _Tabla)
+    monkeypatch.setitem(pipeline_tools.STEP_MAPPING, "_PideCursoTest", _PideCurso)
+    monkeypatch.setitem(pipeline_tools.STEP_MAPPING, "_BoomTest", _Boom)
+    monkeypatch.setitem(pipeline_tools.STEP_MAPPING, "_ResumenTest", _Resumen)
+    _CORRIDAS_TABLA.clear()
+    cfg = {"context": {}, "pipeline": [
+        {"step": "_TablaTest", "params": {}},
+        {"step": "_PideCursoTest", "params": {}},
+    ]}
+    p = Pipeline(pipeline="Interactivo", config_json=json.dumps(cfg), org_id=org.id)
+    db_session.add(p)
+    db_session.commit()
+    db_session.refresh(p)
+    return p
+
+
+@pytest.fixture
+def sin_motor_parquet(monkeypatch):
+    """Como en producción, donde ni pyarrow ni fastparquet están instalados."""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    monkeypatch.setitem(sys.modules, "fastparquet", None)
+    assert not pipeline_runs._hay_motor_parquet()
+
+
+def _otro_worker():
+    """Simula que el siguiente request cae en otro proceso."""
+    pipeline_runs._runners_locales.clear()
+
+
+def _corrida(db_session, pipeline_id):
+    from backend.models import PipelineRun
+
+    db_session.expire_all()
+    return (
+        db_session.query(PipelineRun)
+        .filter(PipelineRun.pipeline_id == pipeline_id)
+        .order_by(PipelineRun.id.desc())
+        .first()
+    )
+
+
+@pytest.mark.integration
+class TestCorridaEntreWorkers:
+    def test_input_retoma_desde_checkpoint(self, client_auth, db_session, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        body = client_auth.post(f"/api/pipelines/{pid}/run").json()
+        assert body["status"] == "waiting_input"
+        assert body["input_details"] == {"fields": ["Nivel"]}
+
+        run = _corrida(db_session, pid)
+        assert (run.status, run.current_step_index) == ("WAITING_INPUT", 1)
+        estado = client_auth.get(f"/api/pipelines/{pid}/run-state").json()
+        assert estado["pending_input"]["input_details"] == {"fields": ["Nivel"]}
+        assert sorted(estado["artifacts"]) == ["mixta", "tabla"]
+
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/input",
+                                json={"type": "enrich_once", "data": {"Nivel": "Media"}}).json()
+        assert body["status"] == "success"
+        assert sorted(body["artifacts"]) == ["mixta", "tabla"]
+
+        _otro_worker()
+        preview = client_auth.get(f"/api/pipelines/{pid}/artifact/tabla/preview").json()
+        assert preview.splitlines() == ["Curso\tPuntaje\tNivel", "II A\t1\tMedia", "II B\t2\tMedia"]
+        resp = client_auth.get(f"/api/pipelines/{pid}/artifact/mixta")
+        assert resp.status_code == 200
+        assert pd.read_excel(io.BytesIO(resp.content))["Año"].tolist() == [2026, 2025]
+
+    def test_input_retoma_sin_motor_parquet(self, client_auth, db_session, pipeline_interactivo,
+                                            sin_motor_parquet):
+        pid = pipeline_interactivo.pipeline_id
+        assert client_auth.post(f"/api/pipelines/{pid}/run").json()["status"] == "waiting_input"
+        manifiesto = json.loads(_corrida(db_session, pid).checkpoint_json)
+        assert {e["formato"] for e in manifiesto["artefactos"].values()} == {"pickle"}
+
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/input",
+                                json={"type": "enrich_once", "data": {"Nivel": "Media"}}).json()
+        assert body["status"] == "success"
+        _otro_worker()
+        preview = client_auth.get(f"/api/pipelines/{pid}/artifact/tabla/preview").json()
+        assert preview.splitlines() == ["Curso\tPuntaje\tNivel", "II A\t1\tMedia", "II B\t2\tMedia"]
+
+    def test_run_siguiente_empieza_de_cero(self, client_auth, db_session, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/run")
+        client_auth.post(f"/api/pipelines/{pid}/input", json={"type": "enrich_once", "data": {"Nivel": "Media"}})
+        primera = _corrida(db_session, pid)
+        assert primera.status == "COMPLETED"
+
+        body = client_auth.post(f"/api/pipelines/{pid}/step").json()
+        assert body["step_name"] == "_Tabla"
+        db_session.refresh(primera)
+        assert primera.closed_at is not None
+        assert _corrida(db_session, pid).id != primera.id
+
+    def test_reset_cierra_la_sesion(self, client_auth, db_session, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/step")
+        run = _corrida(db_session, pid)
+        assert pipeline_runs._dir_checkpoint(run.id).exists()
+
+        assert client_auth.post(f"/api/pipelines/{pid}/reset").json() == {"status": "success"}
+        assert _corrida(db_session, pid).closed_at is not None
+        assert not pipeline_runs._dir_checkpoint(run.id).exists()
+        assert client_auth.get(f"/api/pipelines/{pid}/artifact/tabla/preview").status_code == 404
+
+    def test_descarga_por_formato_y_preview_paginado(self, client_auth, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/step")
+
+        resp = client_auth.get(f"/api/pipelines/{pid}/artifact/tabla?format=csv")
+        assert resp.status_code == 200
+        assert resp.headers["content-disposition"] == 'attachment; filename="tabla.csv"'
+        assert resp.content.decode("utf-8-sig").splitlines() == ["Curso;Puntaje", "II A;1", "II B;2"]
+
+        resp = client_auth.get(f"/api/pipelines/{pid}/artifact/mixta?format=parquet")
+        assert resp.status_code == 200
+        assert pd.read_parquet(io.BytesIO(resp.content))["Año"].tolist() == ["2026", "2025"]
+
+        assert client_auth.get(f"/api/pipelines/{pid}/artifact/tabla?format=ods").status_code == 422
+
+        pagina = client_auth.get(f"/api/pipelines/{pid}/artifact/tabla/preview?offset=1&limit=5").json()
+        assert pagina == {
+            "columns": [{"name": "Curso", "dtype": "object"}, {"name": "Puntaje", "dtype": "int64"}],
+            "rows": [["II B", 2]],
+            "offset": 1,
+            "limit": 5,
+            "total_rows": 2,
+        }
+
+
+@pytest.mark.integration
+class TestReclamo:
+    def test_corrida_en_curso_no_se_ejecuta_dos_veces(self, client_auth, db_session, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/step")
+        run = _corrida(db_session, pid)
+        run.status = "RUNNING"
+        run.updated_at = datetime.utcnow()
+        db_session.commit()
+
+        body = client_auth.post(f"/api/pipelines/{pid}/step").json()
+        assert "ya se está ejecutando" in body["error"]
+        run = _corrida(db_session, pid)
+        assert (run.status, run.current_step_index, run.closed_at) == ("RUNNING", 1, None)
+
+    def test_corrida_colgada_se_puede_reclamar(self, client_auth, db_session, pipeline_interactivo):
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/step")
+        run = _corrida(db_session, pid)
+        run.status = "RUNNING"
+        run.updated_at = datetime.utcnow() - timedelta(seconds=pipeline_runs.PIPELINE_RUN_STALE_SECONDS + 1)
+        db_session.commit()
+
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/step").json()
+        assert body["status"] == "waiting_input"
+        assert _corrida(db_session, pid).version == 2
+
+
+
+def _con_pasos(db_session, pipeline, *pasos):
+    pipeline.config_json = json.dumps({"context": {}, "pipeline": [
+        {"step": step, "params": params} for step, params in pasos
+    ]})
+    db_session.commit()
+
+
+@pytest.mark.integration
+class TestReanudar:
+    def test_fallo_deja_la_sesion_fallida(self, client_auth, db_session, pipeline_interactivo):
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_BoomTest", {}))
+        pid = pipeline_interactivo.pipeline_id
+
+        body = client_auth.post(f"/api/pipelines/{pid}/run").json()
+        assert body["status"] == "failed"
+        assert "Columna llave 'RUT' no existe" in body["error"]
+        run = _corrida(db_session, pid)
+        assert (run.status, run.current_step_index, run.closed_at) == ("FAILED", 1, None)
+        assert "Columna llave" in run.error
+        assert client_auth.get(f"/api/pipelines/{pid}/run-state").json()["checkpointed_steps"] == 1
+
+        # Sin resume, el siguiente /run empieza de cero y borra el checkpoint.
+        client_auth.post(f"/api/pipelines/{pid}/run")
+        db_session.refresh(run)
+        assert run.closed_at is not None
+        assert not pipeline_runs._dir_checkpoint(run.id).exists()
+        assert _CORRIDAS_TABLA == ["", ""]
+
+    def test_resume_salta_pasos_sin_cambios(self, client_auth, db_session, pipeline_interactivo):
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_BoomTest", {}))
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/run")
+        fallida = _corrida(db_session, pid)
+
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_ResumenTest", {}))
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/run?resume=true").json()
+        assert body["status"] == "success"
+        assert body["resumed_steps"] == 1
+        assert sorted(body["artifacts"]) == ["mixta", "resumen", "tabla"]
+        assert _CORRIDAS_TABLA == [""]
+
+        db_session.refresh(fallida)
+        assert fallida.closed_at is not None
+        assert not pipeline_runs._dir_checkpoint(fallida.id).exists()
+        nueva = _corrida(db_session, pid)
+        assert (nueva.status, nueva.current_step_index) == ("COMPLETED", 2)
+        preview = client_auth.get(f"/api/pipelines/{pid}/artifact/resumen/preview").json()
+        assert json.loads(preview) == {"filas": 2}
+
+    def test_resume_corre_desde_el_primer_paso_cambiado(self, client_auth, db_session, pipeline_interactivo):
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_BoomTest", {}))
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/run")
+
+        _con_pasos(db_session, pipeline_interactivo,
+                   ("_TablaTest", {"description": "v2"}), ("_ResumenTest", {}))
+        body = client_auth.post(f"/api/pipelines/{pid}/run?resume=true").json()
+        assert body["status"] == "success"
+        assert "resumed_steps" not in body
+        assert _CORRIDAS_TABLA == ["", "v2"]
+
+    def test_resume_sin_motor_parquet(self, client_auth, db_session, pipeline_interactivo, sin_motor_parquet):
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_BoomTest", {}))
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/run")
+
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_ResumenTest", {}))
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/run?resume=true").json()
+        assert body["status"] == "success"
+        assert body["resumed_steps"] == 1
+        assert _CORRIDAS_TABLA == [""]
+        preview = client_auth.get(f"/api/pipelines/{pid}/artifact/resumen/preview").json()
+        assert json.loads(preview) == {"filas": 2}
+
+    def test_resume_no_salta_pasos_en_parquet_sin_motor(self, client_auth, db_session, pipeline_interactivo,
+                                                       monkeypatch):
+        pytest.importorskip("pyarrow")
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_BoomTest", {}))
+        pid = pipeline_interactivo.pipeline_id
+        client_auth.post(f"/api/pipelines/{pid}/run")
+
+        # El worker que retoma no tiene motor: re-ejecuta en vez de fallar al leer.
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+        monkeypatch.setitem(sys.modules, "fastparquet", None)
+        _con_pasos(db_session, pipeline_interactivo, ("_TablaTest", {}), ("_ResumenTest", {}))
+        _otro_worker()
+        body = client_auth.post(f"/api/pipelines/{pid}/run?resume=true").json()
+        assert body["status"] == "success"
+        assert "resumed_steps" not in body
+        assert _CORRIDAS_TABLA == ["", ""]
+
+
+@pytest.mark.unit
+class TestHuellasDePasos:
+    def test_encadenadas(self):
+        base = {"context": {}, "pipeline": [
+            {"step": "RunExcelETL", "params": {"a": 1, "b": 2}},
+            {"step": "SaveToMetric", "params": {}},
+        ]}
+        mismo = {"context": {}, "pipeline": [
+            {"step": "RunExcelETL", "params": {"b": 2, "a": 1}},
+            {"step": "SaveToMetric"},
+        ]}
+        tarde = {"context": {}, "pipeline": [base["pipeline"][0], {"step": "SaveToMetric", "params": {"x": 1}}]}
+        temprano = {"context": {}, "pipeline": [{"step": "RunExcelETL", "params": {"a": 2}}, base["pipeline"][1]]}
+        h = pipeline_runs.huellas_de_pasos(base)
+        assert pipeline_runs.huellas_de_pasos(mismo) == h
+        assert pipeline_runs.huellas_de_pasos(tarde)[0] == h[0]
+        assert pipeline_runs.huellas_de_pasos(tarde)[1] != h[1]
+        assert all(a != b for a, b in zip(pipeline_runs.huellas_de_pasos(temprano), h))
+        assert pipeline_runs.huellas_de_pasos({**base, "context": {"evaluation": "x"}})[1] != h[1]
+
+    def test_archivos_nuevos_en_request_user_files(self, tmp_path, monkeypatch):
+        from backend.rgenerator.core import io_steps
+        from backend.rgenerator.core.context import RunContext
+
+        monkeypatch.setattr(io_steps, "UPLOADS_DIR", tmp_path)
+        step = io_steps.RequestUserFiles(file_specs=[{"id": "estudiantes"}])
+        ctx = RunContext(pipeline_id=7)
+        assert not step.has_new_inputs(ctx)
+        (tmp_path / "7" / "estudiantes").mkdir(parents=True)
+        assert not step.has_new_inputs(ctx)
+        (tmp_path / "7" / "estudiantes" / "a.xlsx").write_bytes(b"x")
+        assert step.has_new_inputs(ctx)
+
+
+@pytest.mark.integration
+class TestTelemetria:
+    def test_una_fila_por_paso_ejecutado(self, client_auth, db_session, pipeline_interactivo):
+        from backend.models import PipelineStepMetric
+
+        pid = pipeline_interactivo.pipeline_id
+        body = client_auth.post(f"/api/pipelines/{pid}/run").json()
+        assert body["metrics"]["wall_ms"] >= 0
+        client_auth.post(f"/api/pipelines/{pid}/input", json={"type": "enrich_once", "data": {"Nivel": "Media"}})
+
+        run = _corrida(db_session, pid)
+        filas = db_session.query(PipelineStepMetric).order_by(PipelineStepMetric.id).all()
+        assert [(f.step_index, f.step_class, f.status) for f in filas] == [
+            (0, "_Tabla", "success"),
+            (1, "_PideCurso", "waiting_input"),
+            (1, "_PideCurso", "success"),
+        ]
+        assert {f.run_id for f in filas} == {run.id}
+        assert (filas[0].rows_in, filas[0].rows_out) == (None, 4)
+        assert (filas[2].rows_in, filas[2].rows_out) == (None, 2)
+        assert json.loads(filas[0].detail_json)["artifacts_out"]["tabla"]["rows"] == 2
+
+    def test_resumen_por_clase(self, client_auth, db_session, org, pipeline_interactivo):
+        from backend.models import Organization, PipelineStepMetric
+
+        otra = Organization(name="Otra", slug="otra-telemetria", is_active=True)
+        db_session.add(otra)
+        db_session.flush()
+        pid = pipeline_interactivo.pipeline_id
+        for org_id, wall in [(org.id, 10.0), (org.id, 20.0), (org.id, 30.0), (otra.id, 999.0)]:
+            db_session.add(PipelineStepMetric(
+                org_id=org_id, pipeline_id=pid, step_index=0, step_class="RunExcelETL",
+                status="success", wall_ms=wall, cpu_ms=wall / 2, rows_out=100,
+            ))
+        db_session.add(PipelineStepMetric(
+            org_id=org.id, pipeline_id=pid, step_index=1, step_class="SaveToMetric",
+            status="failed", wall_ms=5.0, cpu_ms=1.0,
+            created_at=datetime.utcnow() - timedelta(days=40),
+        ))
+        db_session.commit()
+
+        body = client_auth.get("/api/pipelines/telemetry/steps", params={"pipeline_id": pid}).json()
+        assert [s["step_class"] for s in body["steps"]] == ["RunExcelETL"]
+        etl = body["steps"][0]
+        assert (etl["runs"], etl["wall_ms_avg"], etl["wall_ms_p50"], etl["wall_ms_max"]) == (3, 20.0, 20.0, 30.0)
+        assert etl["wall_ms_p95"] == 29.0
+        assert (etl["cpu_ms_avg"], etl["rows_out_avg"], etl["rows_in_avg"]) == (10.0, 100.0, None)
+
+        viejas = client_auth.get("/api/pipelines/telemetry/steps", params={"days": 60}).json()
+        assert [s["step_class"] for s in viejas["steps"]] == ["RunExcelETL", "SaveToMetric"]
+        assert viejas["steps"][1]["failed"] == 1
+
+
+@pytest.mark.unit
+class TestCheckpoint:
+    def test_parquet_solo_si_vuelve_identico(self, tmp_path):
+        plano = pd.DataFrame({"Curso": ["II A", None], "Puntaje": [1.5, 2.0]})
+        mixto = pd.DataFrame({"Año": [2026, "2025"]})
+        indexado = plano.set_index("Curso")
+        for df, formato in ((plano, "parquet"), (mixto, "pickle"), (indexado, "pickle")):
+            huella, fmt = pipeline_runs.huella_artefacto(df)
+            assert fmt == formato
+            archivo = pipeline_runs.escribir_artefacto(tmp_path, df, huella, fmt)
+            leido = pipeline_runs.leer_artefacto(tmp_path, {"archivo": archivo, "formato": fmt})
+            pd.testing.assert_frame_equal(leido, df)
+
+    def test_sin_motor_parquet_todo_va_a_pickle(self, tmp_path, sin_motor_parquet):
+        plano = pd.DataFrame({"Curso": ["II A", None], "Puntaje": [1.5, 2.0]})
+        huella, fmt = pipeline_runs.huella_artefacto(plano)
+        assert fmt == "pickle"
+        archivo = pipeline_runs.escribir_artefacto(tmp_path, plano, huella, fmt)
+        assert archivo.endswith(".pkl")
+        pd.testing.assert_frame_equal(
+            pipeline_runs.leer_artefacto(tmp_path, {"archivo": archivo, "formato": fmt}), plano
+        )
+
+    def test_huella_depende_del_contenido(self):
+        df = pd.DataFrame({"a": [1, 2]})
+        assert pipeline_runs.huella_artefacto(df) == pipeline_runs.huella_artefacto(df.copy())
+        assert pipeline_runs.huella_artefacto(df)[0] != pipeline_runs.huella_artefacto(df.assign(a=[1, 3]))[0]
+        assert pipeline_runs.huella_artefacto(df)[0] != pipeline_runs.huella_artefacto(df.astype(float))[0]
+        assert pipeline_runs.huella_artefacto({"k": [1]})[1] == "pickle"
@@ -157,6 +157,19 @@ class TestDashboardPivot:
         assert ia["cells"][idx_abril]["value"] == pytest.approx(0.9)
         assert ia["cells"][idx_marzo]["display"] == "70.0%"
 
+    def test_data_formato_columnar(self, client_auth, tabla_pivote_creada):
+        r = client_auth.get(f"/api/tables/{tabla_pivote_creada.id_spec}/data?pivot_format=columnar")
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert (body["mode"], body["format"]) == ("pivot", "columnar")
+        pv = body["pivot"]
+        cols = [c["keys"][0] for c in pv["columns"]]
+        fila = pv["row_keys"].index(["I A"])
+        assert pv["values"][fila][cols.index("Marzo")] == pytest.approx(0.7)
+        assert pv["counts"][fila][cols.index("Marzo")] == 2
+        assert pv["row_is_total"][-1] is True
+        assert len(pv["null_mask"]) == len(pv["values"]) == len(pv["row_keys"])
+
     def test_multi_tenant_404(self, client, db_session, tabla_pivote_creada):
         # Usuario de otra org no puede leer la tabla
         other = make_org(db_session, name="Otra Org Pivot")
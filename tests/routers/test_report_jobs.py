@@ -0,0 +1,195 @@
+"""Tests de la cola de informes en segundo plano (/api/report-jobs).
+
+En tests `REPORT_JOB_WORKERS=0` (conftest): el job corre dentro del POST
+con la sesión de test, así que al volver ya está en done/failed.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from tests.factories import make_indicator, make_org
+
+
+@pytest.mark.integration
+class TestReportJobs:
+    def test_sin_auth_401(self, client):
+        r = client.post("/api/report-jobs/reports/simce", json={"indicator_id": 1})
+        assert r.status_code == 401
+
+    def test_encola_y_descarga(self, client_auth):
+        with patch("backend.routers.report_jobs._render_reporte_v2",
+                   return_value=b"%PDF-1.4 job\n") as render:
+            r = client_auth.post("/api/report-jobs/reports/simce", json={
+                "indicator_id": 7, "filtros": {"Mes": "ABRIL"},
+            })
+        assert r.status_code == 202, r.text
+        job = r.json()
+        assert job["status"] == "done"
+        assert job["download_url"] == f"/api/report-jobs/{job['id']}/download"
+        assert render.call_args.kwargs["filtros"] == {"Mes": "ABRIL"}
+
+        r = client_auth.get(job["download_url"])
+        assert r.status_code == 200
+        assert r.content == b"%PDF-1.4 job\n"
+        assert r.headers["content-type"] == "application/pdf"
+        assert "informe_simce.pdf" in r.headers["content-disposition"]
+
+        listado = client_auth.get("/api/report-jobs/").json()
+        assert [j["id"] for j in listado] == [job["id"]]
+
+    def test_error_de_validacion_queda_en_el_job(self, client_auth):
+        """El 404 del informe (indicador inexistente) no sale en el POST."""
+        r = client_auth.post("/api/report-jobs/indicator/999999", json={})
+        assert r.status_code == 202
+        job = r.json()
+        assert job["status"] == "failed"
+        assert job["error_status"] == 404
+        assert "no encontrado" in job["error"].lower()
+
+        r = client_auth.get(f"/api/report-jobs/{job['id']}/download")
+        assert r.status_code == 404
+
+    def test_error_inesperado_no_filtra_detalle(self, client_auth):
+        with patch("backend.routers.report_jobs._render_reporte_v2",
+                   side_effect=RuntimeError("secreto interno")):
+            job = client_auth.post("/api/report-jobs/reports/simce",
+                                   json={"indicator_id": 1}).json()
+        assert job["status"] == "failed"
+        assert job["error_status"] == 500
+        assert "secreto" not in job["error"]
+
+    def test_export_pdf_reporta_progreso(self, client_auth, db_session, org):
+        """El progreso por secciones de build_pdf_bytes llega a la fila."""
+        from backend.rgenerator.reports.progreso import reportar
+
+        ind = make_indicator(db_session, org, name="Con layout")
+
+        def _render(db, indicator_id, org_id, body):
+            for i in range(1, 4):
+                reportar(i, 3)
+            return b"%PDF", "informe_Con_layout.pdf"
+
+        with patch("backend.routers.report_jobs._render_export_pdf", side_effect=_render):
+            job = client_auth.post(
+                f"/api/report-jobs/indicator/{ind.id_indicator}",
+                json={"filters": {"3": "II A"}},
+            ).json()
+        assert job["status"] == "done"
+        assert job["progress"] == {"done": 3, "total": 3}
+        assert job["filename"] == "informe_Con_layout.pdf"
+
+    def test_job_de_otra_org_404(self, client_auth, db_session):
+        from backend.models import ReportJob
+
+        otra = make_org(db_session, name="Otra", slug="otra")
+        ajeno = ReportJob(org_id=otra.id, kind="reports_v2", status="done",
+                          result=b"x", result_filename="x.pdf")
+        db_session.add(ajeno)
+        db_session.commit()
+
+        assert client_auth.get(f"/api/report-jobs/{ajeno.id}").status_code == 404
+        assert client_auth.get(f"/api/report-jobs/{ajeno.id}/download").status_code == 404
+        assert client_auth.get("/api/report-jobs/").json() == []
+
+
+@pytest.mark.integration
+class TestMantenimiento:
+    def test_job_no_terminado_409(self, client_auth, db_session, org):
+        from backend.models import ReportJob
+
+        job = ReportJob(org_id=org.id, kind="reports_v2", status="running")
+        db_session.add(job)
+        db_session.commit()
+        assert client_auth.get(f"/api/report-jobs/{job.id}/download").status_code == 409
+
+    def test_recuperar_pendientes_falla_los_huerfanos(self, db_session, org):
+        from backend import report_jobs
+        from backend.models import ReportJob
+
+        viejo = datetime.utcnow() - timedelta(seconds=report_jobs.REPORT_JOB_STALE_SECONDS + 60)
+        huerfano = ReportJob(org_id=org.id, kind="reports_v2", status="running", updated_at=viejo)
+        vivo = ReportJob(org_id=org.id, kind="reports_v2", status="running",
+                         updated_at=datetime.utcnow())
+        db_session.add_all([huerfano, vivo])
+        db_session.commit()
+
+        report_jobs.recuperar_pendientes(db_session)
+        db_session.refresh(huerfano)
+        db_session.refresh(vivo)
+        assert huerfano.status == "failed" and huerfano.finished_at is not None
+        assert vivo.status == "running"
+
+    def test_un_job_no_se_ejecuta_dos_veces(self, db_session, org, monkeypatch):
+        from backend import report_jobs
+        from backend.models import ReportJob
+
+        llamadas = []
+        monkeypatch.setitem(
+            report_jobs.TIPOS_DE_JOB, "prueba",
+            lambda db, org_id, params: llamadas.append(1) or report_jobs.ResultadoJob(b"x", "x", "text/plain"),
+        )
+        job = report_jobs.encolar(db_session, org_id=org.id, user_id=None, kind="prueba", params={})
+        assert job.status == "done"
+        report_jobs.ejecutar(db_session, job.id)
+        assert llamadas == [1]
+
+    def test_job_dado_por_perdido_no_vuelve_a_done(self, db_session, org, monkeypatch):
+        from backend import report_jobs
+        from backend.models import ReportJob
+
+        def _cuerpo(db, org_id, params):
+            # recuperar_pendientes (otro proceso) lo da por perdido mientras corre.
+            db.query(ReportJob).update({"status": "failed"})
+            db.commit()
+            return report_jobs.ResultadoJob(b"x", "x", "text/plain")
+
+        monkeypatch.setitem(report_jobs.TIPOS_DE_JOB, "prueba", _cuerpo)
+        job = report_jobs.encolar(db_session, org_id=org.id, user_id=None, kind="prueba", params={})
+        db_session.refresh(job)
+        assert job.status == "failed" and job.result is None
+
+    def test_latido_mientras_corre(self, tmp_path, monkeypatch):
+        from sqlalchemy import create_engine, select
+        from sqlalchemy.orm import sessionmaker
+
+        from backend import report_jobs
+        from backend.database import Base
+        from backend.models import ReportJob
+
+        eng = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        Base.metadata.create_all(eng)
+        Sesion = sessionmaker(autocommit=False, autoflush=False, bind=eng)
+        monkeypatch.setattr(report_jobs, "REPORT_JOB_HEARTBEAT_SECONDS", 0.05)
+        latidos = []
+
+        def _cuerpo(db, org_id, params):
+            # Una sección larga: ningún progreso en el medio.
+            for _ in range(2):
+                time.sleep(0.3)
+                with eng.connect() as conn:
+                    latidos.append(conn.execute(select(ReportJob.updated_at)).scalar_one())
+            return report_jobs.ResultadoJob(b"x", "x", "text/plain")
+
+        monkeypatch.setitem(report_jobs.TIPOS_DE_JOB, "prueba", _cuerpo)
+        with Sesion() as db:
+            org = make_org(db)
+            job = report_jobs.encolar(db, org_id=org.id, user_id=None, kind="prueba", params={})
+            db.refresh(job)
+            assert job.status == "done"
+            assert job.started_at < latidos[0] < latidos[1]
+        eng.dispose()
+
+    def test_purga_los_vencidos(self, db_session, org):
+        from backend import report_jobs
+        from backend.models import ReportJob
+
+        vencido = datetime.utcnow() - timedelta(hours=report_jobs.REPORT_JOB_TTL_HOURS + 1)
+        db_session.add(ReportJob(org_id=org.id, kind="reports_v2", status="done", finished_at=vencido))
+        db_session.add(ReportJob(org_id=org.id, kind="reports_v2", status="queued"))
+        db_session.commit()
+        assert report_jobs.purgar_vencidos(db_session) == 1
+        assert db_session.query(ReportJob).count() == 1
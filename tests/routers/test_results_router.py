@@ -190,3 +190,129 @@ class TestIndicadorSinMetrics:
         r = client_auth.get(f"/api/results/indicator/{ind.id_indicator}/data")
         assert r.status_code == 200
         assert r.json()["metrics"] == []
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Modo agregado: POST /indicator/{id}/query
+# ─────────────────────────────────────────────────────────────────────────
+
+@pytest.fixture
+def indicador_agregable(db_session, org):
+    """Métrica object (Logro) con Año × Curso y una derived_column Nivel."""
+    dim_year = make_dimension(db_session, org, name="Año")
+    dim_curso = make_dimension(db_session, org, name="Curso")
+    m = make_metric(
+        db_session, org, name="Estudiante", data_type="object",
+        fields=[{"name": "Logro", "type": "float"}],
+        dimensions=[dim_year, dim_curso],
+    )
+    ind = make_indicator(
+        db_session, org, name="Agregable", metrics=[m],
+        derived_columns=json.dumps([{
+            "metric_id": m.id_metric,
+            "temporal_dim_ids": [dim_year.id_dimension],
+            "configs": [{
+                "kind": "lookup_range", "name": "Nivel", "value_field": "Logro",
+                "ranges": [
+                    {"min": 0.0, "max": 0.5, "label": "Bajo"},
+                    {"min": 0.5, "max": None, "label": "Alto"},
+                ],
+            }],
+        }]),
+    )
+    filas = [
+        ("2025", "II A", 0.2), ("2025", "II A", 0.6), ("2025", "I A", 0.9),
+        ("2026", "I A", 0.4), ("2026", "I A", 0.8), ("2026", "II B", 0.7),
+    ]
+    for anio, curso, logro in filas:
+        make_metric_data(db_session, m, value={"Logro": logro}, dimensions_json={
+            str(dim_year.id_dimension): anio,
+            str(dim_curso.id_dimension): curso,
+        })
+    return ind, m, dim_year, dim_curso
+
+
+@pytest.mark.integration
+class TestQueryAgregada:
+    def _query(self, client_auth, ind, **body):
+        return client_auth.post(f"/api/results/indicator/{ind.id_indicator}/query", json=body)
+
+    def test_grilla_por_dimension(self, client_auth, indicador_agregable):
+        ind, m, _, dim_curso = indicador_agregable
+        r = self._query(
+            client_auth, ind, metric_id=m.id_metric,
+            group_by=[str(dim_curso.id_dimension)],
+            measures=[{"field": "Logro", "agg": "mean", "label": "prom"}, {"agg": "count"}],
+            facets=False,
+        )
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert [c["label"] for c in body["columns"]] == ["Curso", "prom", "n"]
+        # Orden chileno de Curso (I A < II A < II B), no alfabético.
+        assert [row[0] for row in body["rows"]] == ["I A", "II A", "II B"]
+        assert body["rows"][0][1] == pytest.approx((0.9 + 0.4 + 0.8) / 3)
+        assert [row[2] for row in body["rows"]] == [3, 2, 1]
+        assert body["total_groups"] == 3 and body["n_rows"] == 6
+        assert "facets" not in body
+
+    def test_derivada_y_filtro_temporal(self, client_auth, indicador_agregable):
+        ind, m, dim_year, _ = indicador_agregable
+        r = self._query(
+            client_auth, ind, metric_id=m.id_metric,
+            group_by=["Nivel"],
+            measures=[{"agg": "count", "label": "n"}],
+            filters={str(dim_year.id_dimension): ["2026"]},
+            facets=False,
+        )
+        assert r.status_code == 200, r.text
+        assert r.json()["rows"] == [["Alto", 2], ["Bajo", 1]]
+
+    def test_paginacion_y_order_by(self, client_auth, indicador_agregable):
+        ind, m, _, dim_curso = indicador_agregable
+        r = self._query(
+            client_auth, ind, metric_id=m.id_metric,
+            group_by=[str(dim_curso.id_dimension)],
+            measures=[{"field": "Logro", "agg": "max", "label": "max"}],
+            order_by="max", descending=True, offset=1, limit=1, facets=False,
+        )
+        body = r.json()
+        assert body["total_groups"] == 3
+        assert body["rows"] == [["II B", 0.7]]
+
+    def test_facetas_cascading_con_conteos(self, client_auth, indicador_agregable):
+        ind, m, dim_year, dim_curso = indicador_agregable
+        r = self._query(
+            client_auth, ind, metric_id=m.id_metric,
+            measures=[{"agg": "count"}],
+            filters={str(dim_year.id_dimension): "2026"},
+        )
+        body = r.json()
+        assert body["rows"] == [[3]]
+        facetas = body["facets"]
+        # Año no se filtra a sí misma; Curso solo ve 2026.
+        assert facetas[str(dim_year.id_dimension)]["values"] == [
+            {"value": "2025", "count": 3}, {"value": "2026", "count": 3},
+        ]
+        assert facetas[str(dim_curso.id_dimension)]["values"] == [
+            {"value": "I A", "count": 2}, {"value": "II B", "count": 1},
+        ]
+
+    def test_errores_de_consulta(self, client_auth, db_session, org, indicador_agregable):
+        ind, m, _, _ = indicador_agregable
+        assert self._query(
+            client_auth, ind, metric_id=m.id_metric, group_by=["NoExiste"],
+            measures=[{"agg": "count"}],
+        ).status_code == 400
+        assert self._query(
+            client_auth, ind, metric_id=m.id_metric, measures=[{"field": "Logro", "agg": "mode"}],
+        ).status_code == 400
+        otra = make_metric(db_session, org, name="Ajena")
+        assert self._query(
+            client_auth, ind, metric_id=otra.id_metric, measures=[{"agg": "count"}],
+        ).status_code == 404
+
+    def test_indicador_de_otra_org_404(self, client_auth, db_session):
+        other = make_org(db_session)
+        ind = make_indicator(db_session, other, name="Foreign")
+        r = self._query(client_auth, ind, metric_id=1, measures=[{"agg": "count"}])
+        assert r.status_code == 404
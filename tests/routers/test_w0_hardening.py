@@ -194,6 +194,7 @@ class TestSlidingWindowLimiter:
 @pytest.mark.integration
 class TestCacheInvalidacion:
     def test_post_data_invalida_cache_de_la_metrica(self, client_auth, db_session, org):
+        from backend.metric_cache import metric_frames
         from backend.routers import tables as tables_mod
 
         dim = make_dimension(db_session, org, name="Curso")
@@ -205,9 +206,8 @@ class TestCacheInvalidacion:
                          dimensions_json={str(dim.id_dimension): "II A"})
 
         # Sembrar una entrada de cache para esta métrica
-        clave = tables_mod._metric_df_cache_key(org.id, metric.id_metric, None)
-        tables_mod._METRIC_DF_CACHE[clave] = (time.time(), __import__("pandas").DataFrame())
-        assert any(k[1] == metric.id_metric for k in tables_mod._METRIC_DF_CACHE)
+        tables_mod._load_metric_to_df(db_session, org.id, metric.id_metric)
+        assert metric_frames.tiene(metric.id_metric)
 
         res = client_auth.post(
             f"/api/metrics/{metric.id_metric}/data",
@@ -216,16 +216,17 @@ class TestCacheInvalidacion:
         assert res.status_code == 200, res.text
 
         # La entrada de esa métrica ya no está
-        assert not any(k[1] == metric.id_metric for k in tables_mod._METRIC_DF_CACHE)
+        assert not metric_frames.tiene(metric.id_metric)
 
     def test_clear_invalida_cache(self, client_auth_admin, db_session, org):
+        from backend.metric_cache import metric_frames
         from backend.routers import tables as tables_mod
 
         metric = make_metric(db_session, org, name="Metric Clear Test", data_type="float")
-        clave = tables_mod._metric_df_cache_key(org.id, metric.id_metric, None)
-        tables_mod._METRIC_DF_CACHE[clave] = (time.time(), __import__("pandas").DataFrame())
+        tables_mod._load_metric_to_df(db_session, org.id, metric.id_metric)
+        assert metric_frames.tiene(metric.id_metric)
 
         # POST /clear exige `require_admin`; el fixture `client_auth` es editor.
         res = client_auth_admin.post(f"/api/metrics/{metric.id_metric}/clear")
         assert res.status_code == 200, res.text
-        assert not any(k[1] == metric.id_metric for k in tables_mod._METRIC_DF_CACHE)
+        assert not metric_frames.tiene(metric.id_metric)
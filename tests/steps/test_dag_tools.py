@@ -0,0 +1,136 @@
+"""Tests de la ejecución concurrente de pasos (`tooling/dag_tools.py`).
+
+Cubre:
+1. Pasos independientes corren a la vez y el resultado (lista de
+   resultados, artifacts, `last_artifact_key`, checkpoints) es el de la
+   ejecución en orden de lista.
+2. Un paso que lee lo que produce otro de la ventana lo espera.
+3. Una pausa o un fallo aplica solo los pasos anteriores de la lista.
+4. Pasos con el mismo `exclusive` no se solapan.
+5. Los pasos sin `parallel_safe` cortan la ventana.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from backend.rgenerator.core.step import Step, StepExecutionError, WaitingForInputException
+from backend.rgenerator.tooling import dag_tools
+from backend.rgenerator.tooling.pipeline_tools import PipelineRunner
+
+
+class _Fuente(Step):
+    parallel_safe = True
+
+    def __init__(self, salida, espera=0.0, lee=None, exclusive=None, falla=False, pausa=False):
+        super().__init__(name=f"Fuente_{salida}", requires=[lee] if lee else [], produces=[salida])
+        self.salida, self.espera, self.lee = salida, espera, lee
+        self.falla, self.pausa = falla, pausa
+        if exclusive:
+            self.exclusive = exclusive
+
+    def run(self, ctx):
+        time.sleep(self.espera)
+        if self.pausa:
+            raise WaitingForInputException(self.name, {"input_key": self.salida})
+        if self.falla:
+            raise ValueError(f"no se pudo leer {self.salida}")
+        base = ctx.artifacts[self.lee] if self.lee else []
+        ctx.artifacts[self.salida] = base + [self.salida]
+        ctx.last_artifact_key = self.salida
+        ctx.add_warning(f"leído {self.salida}")
+
+
+class _Barrera(Step):
+    def __init__(self):
+        super().__init__(name="Barrera", produces=["barrera"])
+
+    def run(self, ctx):
+        ctx.artifacts["barrera"] = True
+
+
+def _runner(*pasos) -> PipelineRunner:
+    runner = PipelineRunner({"pipeline": []})
+    runner.pipeline = list(pasos)
+    runner.total_steps = len(pasos)
+    return runner
+
+
+@pytest.mark.unit
+class TestVentana:
+    def test_barreras_cortan_la_ventana(self):
+        pasos = [_Fuente("a"), _Fuente("b"), _Barrera(), _Fuente("c")]
+        assert dag_tools.ventana(pasos, 0) == [0, 1]
+        assert dag_tools.ventana(pasos, 1) == []
+        assert dag_tools.ventana(pasos, 3) == []
+
+    def test_dependencias_transitivas(self):
+        pasos = [_Fuente("a"), _Fuente("b", lee="a"), _Fuente("c", lee="b"), _Fuente("d")]
+        assert dag_tools.dependencias(pasos, [0, 1, 2, 3]) == {0: set(), 1: {0}, 2: {0, 1}, 3: set()}
+
+
+@pytest.mark.unit
+class TestRunAllParalelo:
+    def test_independientes_a_la_vez_y_en_orden(self):
+        runner = _runner(_Fuente("a", espera=0.3), _Fuente("b", espera=0.3), _Fuente("c", espera=0.05))
+        checkpoints = []
+        runner.on_step_completed = lambda r: checkpoints.append(sorted(r.ctx.artifacts))
+
+        inicio = time.perf_counter()
+        results = runner.run_all()
+        assert time.perf_counter() - inicio < 0.55
+
+        assert [r["step_index"] for r in results] == [0, 1, 2]
+        assert results[-1]["finished"] and runner.status == "COMPLETED"
+        assert checkpoints == [["a"], ["a", "b"], ["a", "b", "c"]]
+        assert runner.ctx.last_artifact_key == "c"
+        assert runner.ctx.warnings == ["leído a", "leído b", "leído c"]
+
+    def test_dependiente_espera_a_su_fuente(self):
+        runner = _runner(_Fuente("a", espera=0.1), _Fuente("b", lee="a"), _Fuente("c", lee="b"))
+        runner.run_all()
+        assert runner.ctx.artifacts["c"] == ["a", "b", "c"]
+
+    def test_pausa_aplica_solo_los_anteriores(self):
+        runner = _runner(_Fuente("a", espera=0.1), _Fuente("b", pausa=True), _Fuente("c"))
+        results = runner.run_all()
+        assert [r["status"] for r in results] == ["success", "waiting_input"]
+        assert results[-1]["input_details"] == {"input_key": "b"}
+        assert (runner.current_step_index, runner.status) == (1, "WAITING_INPUT")
+        assert sorted(runner.ctx.artifacts) == ["a"]
+
+    def test_fallo_aplica_solo_los_anteriores(self):
+        runner = _runner(_Fuente("a", espera=0.1), _Fuente("b", falla=True), _Fuente("c"))
+        with pytest.raises(StepExecutionError) as exc:
+            runner.run_all()
+        assert exc.value.step_index == 1
+        assert "no se pudo leer b" in str(exc.value)
+        assert runner.status == "FAILED"
+        assert sorted(runner.ctx.artifacts) == ["a"]
+
+    def test_exclusivos_no_se_solapan(self):
+        activos, maximo = [0], [0]
+        lock = threading.Lock()
+
+        class _Db(_Fuente):
+            def run(self, ctx):
+                with lock:
+                    activos[0] += 1
+                    maximo[0] = max(maximo[0], activos[0])
+                super().run(ctx)
+                with lock:
+                    activos[0] -= 1
+
+        runner = _runner(_Db("a", espera=0.05, exclusive="db"), _Db("b", espera=0.05, exclusive="db"))
+        runner.run_all()
+        assert maximo[0] == 1
+        assert sorted(runner.ctx.artifacts) == ["a", "b"]
+
+    def test_un_solo_hilo_es_secuencial(self, monkeypatch):
+        monkeypatch.setattr(dag_tools, "PIPELINE_STEP_WORKERS", 1)
+        runner = _runner(_Fuente("a", espera=0.2), _Fuente("b", espera=0.2))
+        inicio = time.perf_counter()
+        runner.run_all()
+        assert time.perf_counter() - inicio >= 0.4
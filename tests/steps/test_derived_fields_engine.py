@@ -27,6 +27,7 @@ from backend.rgenerator.core.derived_fields_engine import (
     apply_row_mean_dynamic,
     apply_row_threshold,
     apply_slope,
+    compilar_plan,
 )
 
 
@@ -227,6 +228,37 @@ class TestSlope:
         r2 = out[out["Rut"] == "R2"].sort_values("Hito")
         assert r2.iloc[2]["Avance_Cualitativo"] < 0
 
+    def test_igual_a_polyfit_expansivo(self):
+        """La forma cerrada da lo mismo que un np.polyfit por punto sobre
+        los puntos previos + actual (promediando filas del mismo tiempo)."""
+        rng = np.random.default_rng(7)
+        n = 3000
+        df = pd.DataFrame({
+            "Curso": rng.choice(["A", "B", None], n, p=[0.45, 0.45, 0.1]),
+            "Rut": rng.integers(0, 80, n),
+            "Anio": rng.choice([2021, 2022, 2023, 2024, 2025, np.nan], n),
+            "Rend": np.where(rng.random(n) < 0.1, np.nan, rng.random(n)),
+        })
+        out = apply_slope(df, {
+            "name": "Avance", "value_field": "Rend",
+            "entity_field": ["Curso", "Rut"], "time_field": "Anio", "min_points": 3,
+        })
+
+        puntos = df.dropna().groupby(["Curso", "Rut", "Anio"])["Rend"].mean()
+        esperado = []
+        for fila in df.itertuples():
+            if fila.Curso is None or pd.isna(fila.Anio) or (fila.Curso, fila.Rut, fila.Anio) not in puntos.index:
+                esperado.append(np.nan)
+                continue
+            previos = puntos.loc[(fila.Curso, fila.Rut)]
+            previos = previos[previos.index <= fila.Anio]
+            esperado.append(
+                np.polyfit(previos.index.to_numpy(float), previos.to_numpy(), 1)[0]
+                if len(previos) >= 3 else np.nan
+            )
+        np.testing.assert_allclose(out["Avance"].to_numpy(), esperado, rtol=1e-9, atol=1e-12)
+        assert out["Avance"].notna().sum() > 1000
+
 
 # ─────────────────────────────────────────────────────────────────────────
 # Kind: delta
@@ -319,6 +351,74 @@ class TestOrchestrator:
         assert "X" in out.columns
 
 
+# ─────────────────────────────────────────────────────────────────────────
+# Plan compilado: mismo resultado que la cadena de apply_* sin copias
+# ─────────────────────────────────────────────────────────────────────────
+
+def _en_cadena(df, configs):
+    out = df.copy()
+    for config in configs:
+        out = KIND_REGISTRY[config["kind"]]["fn"](out, config)
+    return out
+
+
+class TestPlanDerivados:
+    CONFIGS = [
+        {"kind": "agg", "name": "Prom", "value_field": "Rend",
+         "entity_field": ["Rut", "Curso"]},
+        {"kind": "slope", "name": "Avance", "value_field": "Rend",
+         "entity_field": "Rut", "time_field": "Numero_Prueba"},
+        {"kind": "delta", "name": "Delta", "value_field": "Prom",
+         "entity_field": "Rut", "time_field": "Numero_Prueba"},
+        # Re-aplicación sobre una columna existente (drop + merge al final).
+        {"kind": "agg", "name": "Rend", "value_field": "Rend",
+         "entity_field": ["Rut", "Curso"], "agg": "max"},
+        {"kind": "row_threshold", "name": "Nivel", "value_field": "Rend",
+         "thresholds": [{"max": 0.5, "label": "Bajo"}, {"max": None, "label": "Alto"}]},
+        {"kind": "row_mean_dynamic", "name": "Media", "exclude_columns": ["Rut", "Curso", "Nivel"]},
+        {"kind": "temporal_value_at", "name": "Nivel", "value_field": "Nivel",
+         "entity_field": "Rut", "time_field": "Numero_Prueba"},
+    ]
+
+    def test_igual_a_la_cadena(self, df_simce):
+        df = df_simce.set_axis(range(100, 100 + len(df_simce)))
+        for n in range(1, len(self.CONFIGS) + 1):
+            esperado = _en_cadena(df, self.CONFIGS[:n])
+            pd.testing.assert_frame_equal(apply_derived_fields(df, self.CONFIGS[:n]), esperado)
+            pd.testing.assert_frame_equal(
+                compilar_plan(self.CONFIGS[:n]).aplicar(df, copiar=False), esperado,
+            )
+
+    def test_cada_kind_recibe_solo_lo_que_lee(self, df_simce):
+        plan = compilar_plan(self.CONFIGS)
+        assert plan.pasos[0].lee == ("Rend", "Rut", "Curso")
+        assert plan.pasos[0].escribe == ("Prom",)
+        assert plan.pasos[5].lee is None
+
+    def test_se_compila_una_vez_por_contenido(self):
+        plan = compilar_plan(self.CONFIGS)
+        copia = json.loads(json.dumps(self.CONFIGS))
+        assert compilar_plan(copia) is plan
+        assert compilar_plan(self.CONFIGS[:2]).huella != plan.huella
+        # 1 y "1" son configs distintas.
+        con_int = [{"kind": "lookup_dict", "name": "L", "value_field": "Rut", "mapping": {1: "a"}}]
+        con_str = [{"kind": "lookup_dict", "name": "L", "value_field": "Rut", "mapping": {"1": "a"}}]
+        assert compilar_plan(con_int).huella != compilar_plan(con_str).huella
+
+    def test_mutar_configs_despues_no_afecta_el_plan(self, df_simce):
+        configs = [{"kind": "agg", "name": "X", "value_field": "Rend", "entity_field": "Rut"}]
+        plan = compilar_plan(configs)
+        configs[0]["agg"] = "max"
+        assert plan.pasos[0].config.get("agg") is None
+        assert compilar_plan(configs) is not plan
+
+    def test_valida_al_compilar(self):
+        with pytest.raises(ValueError, match="requeridos"):
+            compilar_plan([{"kind": "agg", "name": "X"}])
+        with pytest.raises(ValueError, match="debe ser un dict"):
+            compilar_plan(["agg"])
+
+
 # ─────────────────────────────────────────────────────────────────────────
 # Registry
 # ─────────────────────────────────────────────────────────────────────────
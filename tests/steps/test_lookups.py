@@ -0,0 +1,120 @@
+"""Tests de las búsquedas compiladas (`core/lookups.py`).
+
+Cubre:
+1. `TramosCompilados` da el mismo tramo que recorrer la lista por valor,
+   en los tres `match`, con tramos solapados, abiertos, no numéricos y
+   valores justo en los bordes.
+2. lookup_range / piecewise_linear / lookup_dict: mismo resultado y dtype
+   que la versión por elemento.
+3. `apply_mapping_many` = `apply_mapping` valor por valor.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.rgenerator.core.derived_fields_engine import (
+    apply_lookup_dict,
+    apply_lookup_range,
+    apply_piecewise_linear,
+)
+from backend.rgenerator.core.lookups import TramosCompilados
+from backend.routers.mappings import apply_mapping, apply_mapping_many
+from backend.schemas_mapping import MappingConfig
+
+
+def _primero_por_valor(v, tramos, match):
+    """La búsqueda lineal de la versión por elemento."""
+    if np.isnan(v):
+        return -1
+    for i, (mn, mx) in enumerate(tramos):
+        try:
+            if mn is not None and not (v > float(mn) if match == "right_inclusive" else v >= float(mn)):
+                continue
+            if mx is not None and not (v < float(mx) if match == "left_inclusive" else v <= float(mx)):
+                continue
+        except (TypeError, ValueError):
+            continue
+        return i
+    return -1
+
+
+_TRAMOS = [
+    (None, 0.4), (0.4, 0.7), (0.7, None),      # tabla típica
+    (0.5, 0.6), (0.2, 0.2), ("x", 0.9),        # solapados, punto, no numérico
+    (0.9, 0.3), (None, None),                  # vacío, todo
+]
+
+
+@pytest.mark.unit
+class TestTramosCompilados:
+    @pytest.mark.parametrize("match", ["left_inclusive", "right_inclusive", "both_inclusive"])
+    @pytest.mark.parametrize("tramos", [_TRAMOS[:3], _TRAMOS[3:6] + _TRAMOS[:3], _TRAMOS])
+    def test_igual_a_busqueda_lineal(self, tramos, match):
+        bordes = [0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.9]
+        valores = np.array(
+            bordes + [b + d for b in bordes for d in (-1e-12, 1e-12)]
+            + list(np.linspace(-1, 2, 301)) + [np.nan, np.inf, -np.inf]
+        )
+        esperado = [_primero_por_valor(v, tramos, match) for v in valores]
+        assert TramosCompilados(tramos, match).indices(valores).tolist() == esperado
+
+    def test_piecewise_igual_a_por_elemento(self):
+        segments = [
+            {"min": None, "max": 60, "slope": 0.0167, "intercept": 1},
+            {"min": 60, "max": None, "slope": 0.075, "intercept": -0.5},
+        ]
+        df = pd.DataFrame({"Puntaje": [0, 30, 59.999, 60, 60.5, 100, None, "x"]})
+        out = apply_piecewise_linear(df, {
+            "name": "Nota", "value_field": "Puntaje", "segments": segments,
+            "round_to": 1, "clamp_min": 1.0, "clamp_max": 7.0,
+        })
+        assert out["Nota"].dtype == float
+        assert out["Nota"].tolist()[:6] == [1.0, 1.5, 2.0, 4.0, 4.0, 7.0]
+        assert out["Nota"].iloc[6:].isna().all()
+
+    def test_lookup_range_dtype_y_default(self):
+        df = pd.DataFrame({"Logro": [0.1, 0.4, 0.95, None]})
+        out = apply_lookup_range(df, {
+            "name": "Nivel", "value_field": "Logro", "default": "Sin dato",
+            "ranges": [{"min": 0, "max": 0.4, "label": "Bajo"}, {"min": 0.4, "max": 0.9, "label": "Medio"}],
+        })
+        assert out["Nivel"].tolist() == ["Bajo", "Medio", "Sin dato", "Sin dato"]
+        numerico = apply_lookup_range(df, {
+            "name": "Nivel", "value_field": "Logro",
+            "ranges": [{"min": 0, "max": 0.4, "label": 1}, {"min": 0.4, "max": 0.9, "label": 2}],
+        })
+        assert numerico["Nivel"].dtype == df["Logro"].map(lambda v: 1 if v < 0.4 else None).dtype
+        assert apply_lookup_range(df.iloc[:0], {
+            "name": "Nivel", "value_field": "Logro", "ranges": [{"min": 0, "label": "x"}],
+        })["Nivel"].dtype == float
+
+    def test_lookup_dict_por_texto(self):
+        df = pd.DataFrame({"Curso": ["1 A", "1 B", 1, 1.0, None, np.nan, pd.NA, "3 A"]})
+        out = apply_lookup_dict(df, {
+            "name": "Nivel", "value_field": "Curso", "default": "?",
+            "mapping": {"1": "Primeros", "1.0": "Float", "<NA>": "NA"},
+            "extract": {"split": " ", "index": 0},
+        })
+        assert out["Nivel"].tolist() == ["Primeros", "Primeros", "Primeros", "Float", "?", "?", "NA", "?"]
+
+
+@pytest.mark.unit
+class TestApplyMappingMany:
+    def test_range_igual_a_por_valor(self):
+        cfg = MappingConfig(kind="range", match="right_inclusive", default="Fuera", ranges=[
+            {"min": None, "max": 10, "label": "Bajo"},
+            {"min": 10, "max": 20, "label": "Medio"},
+            {"min": 15, "max": None, "label": "Alto"},
+        ])
+        valores = [None, "", "abc", "10", 10, 10.0001, 15, 20, 25, -3, float("nan")]
+        assert apply_mapping_many(cfg, valores) == [apply_mapping(cfg, v) for v in valores]
+
+    def test_discrete_igual_a_por_valor(self):
+        cfg = MappingConfig(
+            kind="discrete", mapping={"i": "Primeros", "ii": "Segundos"}, case_insensitive=True,
+            extract={"regex": "^[IVX]+"}, default="Otro",
+        )
+        valores = ["I A", "II B", "ii c", "III", None, "", 3, "I A"]
+        assert apply_mapping_many(cfg, valores) == [apply_mapping(cfg, v) for v in valores]
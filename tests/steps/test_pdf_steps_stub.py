@@ -5,6 +5,8 @@ Cobertura:
 - Registro en STEP_MAPPING.
 - Helpers con PDF real (skip si no hay PDFs DIA disponibles localmente).
 - Step completo con PDF real (skip si no hay).
+- Raster por página (`_RastersDePagina`) idéntico al render por token y
+  pool de procesos, sobre un PDF sintético (requiere fitz).
 
 Los tests con PDF real se saltean automáticamente cuando se corre en CI
 o en una máquina sin acceso a los PDFs del cliente.
@@ -193,3 +195,64 @@ def test_run_completo_con_pdf_real():
     # Logro debe estar en [0, 1]
     logros = pd.to_numeric(df["Logro"], errors="coerce").dropna()
     assert (logros >= 0).all() and (logros <= 1).all()
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Raster por página y pool de procesos (PDF sintético, requiere fitz)
+# ─────────────────────────────────────────────────────────────────────────
+
+
+def _pdf_con_alternativas(path: Path, negritas=("B", "D")) -> Path:
+    """Dos páginas con tokens A:..N: en x >= 450; las letras de `negritas`
+    (una por página) van en Helvetica-Bold."""
+    import fitz
+
+    doc = fitz.open()
+    for negrita in negritas:
+        page = doc.new_page()
+        for k, letra in enumerate("ABCDN"):
+            page.insert_text(
+                (460, 100 + 40 * k), f"{letra}:", fontsize=14,
+                fontname="hebo" if letra == negrita else "helv",
+            )
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+@pytest.mark.skipif(not _fitz_disponible(), reason="fitz/PyMuPDF no instalado")
+class TestRastersDePagina:
+    def test_oscuridad_igual_a_render_por_token(self, tmp_path):
+        import fitz
+        from backend.rgenerator.core.pdf_steps import _RastersDePagina, _region_darkness
+
+        doc = fitz.open(str(_pdf_con_alternativas(tmp_path / "dia.pdf")))
+        rasters = _RastersDePagina(doc, zoom=5.0)
+        for pi in range(len(doc)):
+            for w in doc[pi].get_text("words"):
+                bbox = tuple(w[:4])
+                assert rasters.oscuridad(pi, bbox) == _region_darkness(doc[pi], bbox, zoom=5.0)
+        bbox = (450.3, 80.7, 480.2, 101.9)
+        assert rasters.oscuridad(0, bbox) == _region_darkness(doc[0], bbox, zoom=5.0)
+        doc.close()
+
+    def test_negritas_con_documento_abierto_o_ruta(self, tmp_path):
+        import fitz
+        from backend.rgenerator.core.pdf_steps import _extract_bold_alternatives
+
+        pdf = _pdf_con_alternativas(tmp_path / "dia.pdf")
+        celdas = pd.DataFrame({0: ["A: 10%\nB: 20%\nC: 30%\nD: 40%\nN: 0%"] * 2})
+        por_ruta = _extract_bold_alternatives(str(pdf), celdas)
+        with fitz.open(str(pdf)) as doc:
+            por_doc = _extract_bold_alternatives(doc, celdas)
+            assert not doc.is_closed
+        assert [r["winner"] for r in por_ruta] == ["B", "D"]
+        assert por_doc == por_ruta
+
+    def test_pool_propaga_el_error_del_pdf(self, tmp_path):
+        """Un PDF sin la sección falla igual en el pool que en serie."""
+        pdfs = [str(_pdf_con_alternativas(tmp_path / f"{n}.pdf")) for n in ("a", "b")]
+        step = RunDIAPDFExtraction(input_key="pdfs")
+        with pytest.raises(ValueError, match="Resultados por pregunta"):
+            step._extraer(pdfs, workers=2)
+        assert any("Error procesando" in linea for linea in step.logs)
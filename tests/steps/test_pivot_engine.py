@@ -26,6 +26,7 @@ from backend.rgenerator.core.pivot_engine import (
     PivotCell,
     PivotResult,
     pivot,
+    pivot_columnar,
     pivot_to_dataframe,
 )
 
@@ -704,3 +705,55 @@ def test_resultado_serializa_a_json(df_simple):
     assert isinstance(data["rows"][0]["cells"][0]["display"], str)
     import json
     json.dumps(data)  # no debe lanzar
+
+
+# ─────────────────────────────────────────────────────────────────────────
+# Formato columnar
+# ─────────────────────────────────────────────────────────────────────────
+
+@pytest.mark.unit
+class TestPivotColumnar:
+    DF = pd.DataFrame({
+        "Curso": ["I A", "I A", "I A", "I B", "I B", None],
+        "Mes": ["Marzo", "Marzo", "Abril", "Marzo", "Marzo", "Abril"],
+        "Logro": [0.8, 0.6, 0.9, np.nan, 0.5, 0.7],
+    })
+
+    def test_mismas_celdas_que_pivot(self):
+        for agg in ("mean", "count", "std", "pct_row", "pct_col", "pct_total"):
+            for fill in (None, 0, "s/d"):
+                spec = {"rows": ["Curso"], "cols": ["Mes"], "fill_value": fill,
+                        "values": [{"field": "Logro", "agg": agg}],
+                        "totals": {"rows": True, "cols": True}}
+                res, col = pivot(self.DF, spec), pivot_columnar(self.DF, spec)
+                assert [r.keys for r in res.rows] == col.row_keys
+                assert res.columns == col.columns
+                for fila, valores in zip(res.rows, col.values.tolist()):
+                    assert [c.value for c in fila.cells] == [
+                        None if math.isnan(v) else approx(v) for v in valores
+                    ]
+
+    def test_conteos_y_mascara(self):
+        spec = {"rows": ["Curso"], "cols": ["Mes"],
+                "values": [{"field": "Logro", "agg": "mean"}],
+                "totals": {"rows": True, "cols": True}}
+        col = pivot_columnar(self.DF, spec)
+        # Columnas: Abril, Marzo, Total. Filas: I A, I B, Total.
+        assert [c.keys for c in col.columns] == [["Abril"], ["Marzo"], ["Total"]]
+        assert col.counts.tolist() == [[1, 2, 3], [0, 1, 1], [1, 3, 4]]
+        assert col.null_mask.tolist() == [[False, False, False], [True, False, False], [False, False, False]]
+
+    def test_to_json(self):
+        spec = {"rows": ["Curso"], "cols": ["Mes"], "fill_value": "s/d",
+                "values": [{"field": "Logro", "agg": "mean", "format": ".1%"}]}
+        payload = pivot_columnar(self.DF, spec).to_json()
+        assert payload["format"] == "columnar"
+        assert payload["row_keys"][-1] == ["Total"] and payload["row_is_total"][-1] is True
+        assert payload["values"][1][0] is None and payload["null_mask"][1][0] == 1
+        assert payload["meta"]["fill_display"] == "s/d"
+        assert payload["meta"]["aggs"][0]["format"] == ".1%"
+
+    def test_df_vacio(self):
+        col = pivot_columnar(self.DF.iloc[:0], {"rows": ["Curso"], "values": [{"field": "Logro"}]})
+        assert col.values.shape == (0, 0) and col.to_json()["values"] == []
+
@@ -0,0 +1,98 @@
+"""Tests de la telemetría por paso (`tooling/telemetry_tools.py`).
+
+Cubre:
+1. `medir_paso` mide tiempos y filas/bytes de lo que el paso leyó y produjo.
+2. Los resultados de `step()` traen `metrics` y `runner.telemetry` acumula
+   una entrada por paso, también para pausas, fallos y ventanas paralelas.
+"""
+from __future__ import annotations
+
+import time
+
+import pandas as pd
+import pytest
+
+from backend.rgenerator.core.step import Step, StepExecutionError, WaitingForInputException
+from backend.rgenerator.tooling import telemetry_tools
+from backend.rgenerator.tooling.pipeline_tools import PipelineRunner
+
+
+class _Duplica(Step):
+    parallel_safe = True
+
+    def __init__(self, entrada, salida, espera=0.0, falla=False, pausa=False):
+        super().__init__(name=f"duplica_{salida}", requires=[entrada] if entrada else [], produces=[salida])
+        self.entrada, self.salida, self.espera = entrada, salida, espera
+        self.falla, self.pausa = falla, pausa
+
+    def run(self, ctx):
+        time.sleep(self.espera)
+        if self.pausa:
+            raise WaitingForInputException(self.name, {"input_key": self.salida})
+        if self.falla:
+            raise ValueError("falló")
+        base = ctx.artifacts[self.entrada] if self.entrada else pd.DataFrame({"x": [1, 2, 3]})
+        ctx.artifacts[self.salida] = pd.concat([base, base], ignore_index=True)
+
+
+def _runner(*pasos) -> PipelineRunner:
+    runner = PipelineRunner({"pipeline": []})
+    runner.pipeline = list(pasos)
+    runner.total_steps = len(pasos)
+    return runner
+
+
+@pytest.mark.unit
+class TestMedirPaso:
+    def test_filas_y_bytes_de_entrada_y_salida(self):
+        runner = _runner(_Duplica(None, "a", espera=0.02), _Duplica("a", "b"))
+        runner.step()
+        m = runner.step()["metrics"]
+
+        a, b = runner.ctx.artifacts["a"], runner.ctx.artifacts["b"]
+        assert (m["rows_in"], m["rows_out"]) == (6, 12)
+        assert m["bytes_in"] == int(a.memory_usage(deep=True).sum())
+        assert m["bytes_out"] == int(b.memory_usage(deep=True).sum())
+        assert list(m["artifacts_in"]) == ["a"] and list(m["artifacts_out"]) == ["b"]
+        assert runner.telemetry[0]["wall_ms"] >= 20
+        assert m["cpu_ms"] >= 0
+
+    def test_artifact_sin_cambios_no_cuenta_como_salida(self):
+        class _Nada(Step):
+            def run(self, ctx):
+                ctx.artifacts["a"] = ctx.artifacts["a"]
+
+        runner = _runner(_Duplica(None, "a"), _Nada(name="nada", requires=["a"]))
+        runner.run_all()
+        assert runner.telemetry[1]["rows_out"] is None
+        assert runner.telemetry[1]["artifacts_out"] == {}
+
+    def test_tamano_de_otros_artifacts(self):
+        assert telemetry_tools.tamano([1, 2]) == {"rows": 2, "bytes": None}
+        assert telemetry_tools.tamano("texto") == {"rows": None, "bytes": None}
+
+
+@pytest.mark.unit
+class TestTelemetriaDelRunner:
+    def test_una_entrada_por_paso_con_su_estado(self):
+        runner = _runner(_Duplica(None, "a"), _Duplica("a", "b", pausa=True))
+        results = runner.run_all()
+        assert results[-1]["metrics"]["wall_ms"] >= 0
+        assert [(t["step_index"], t["step_class"], t["step_name"], t["status"]) for t in runner.telemetry] == [
+            (0, "_Duplica", "duplica_a", "success"),
+            (1, "_Duplica", "duplica_b", "waiting_input"),
+        ]
+
+    def test_fallo_queda_registrado(self):
+        runner = _runner(_Duplica(None, "a", falla=True))
+        with pytest.raises(StepExecutionError):
+            runner.step()
+        assert [t["status"] for t in runner.telemetry] == ["failed"]
+        assert runner.telemetry[0]["rows_out"] is None
+
+    def test_ventana_paralela_mide_cada_paso(self):
+        runner = _runner(_Duplica(None, "a", espera=0.1), _Duplica(None, "b", espera=0.1))
+        results = runner.run_all()
+        assert [r["metrics"]["rows_out"] for r in results] == [6, 6]
+        assert [t["step_index"] for t in runner.telemetry] == [0, 1]
+        assert all(t["wall_ms"] >= 100 for t in runner.telemetry)
@@ -0,0 +1,102 @@
+"""Tests de `backend/artifact_export.py` (descarga por bloques y preview
+paginado de artifacts de pipelines)."""
+from __future__ import annotations
+
+import io
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import artifact_export
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Curso": ["II A", "II B", None, "III A", "III B"],
+        "Puntaje": [250.5, np.nan, 300.0, 280.0, 1.0],
+        "N": np.arange(5, dtype=np.int64),
+        "Fecha": pd.to_datetime(["2026-03-01", None, "2026-04-01", "2026-05-01", "2026-06-01"]),
+        "Año": [2026, "2025", None, 2024, "2023"],
+    })
+
+
+@pytest.fixture(autouse=True)
+def _bloques_chicos(monkeypatch):
+    # Varios bloques aun con pocas filas.
+    monkeypatch.setattr(artifact_export, "FILAS_POR_BLOQUE", 2)
+
+
+@pytest.mark.unit
+class TestTexto:
+    def test_csv_por_bloques_igual_a_to_csv(self, df):
+        partes = list(artifact_export.texto_por_bloques(df, "csv"))
+        assert len(partes) == 1 + 3  # BOM + 3 bloques
+        contenido = b"".join(partes)
+        assert contenido == df.to_csv(index=False, sep=";").encode("utf-8-sig")
+
+    def test_tsv_sin_bom(self, df):
+        contenido = b"".join(artifact_export.texto_por_bloques(df, "tsv"))
+        assert contenido == df.to_csv(index=False, sep="\t").encode("utf-8")
+
+    def test_vacio_deja_el_encabezado(self):
+        vacio = pd.DataFrame(columns=["a", "b"])
+        assert b"".join(artifact_export.texto_por_bloques(vacio, "tsv")) == b"a\tb\n"
+
+
+@pytest.mark.unit
+class TestXlsx:
+    def test_vuelve_con_los_mismos_datos(self, df):
+        contenido = b"".join(artifact_export.xlsx_por_trozos(df))
+        leido = pd.read_excel(io.BytesIO(contenido))
+        assert list(leido.columns) == list(df.columns)
+        assert leido["Curso"].tolist()[:2] == ["II A", "II B"]
+        assert pd.isna(leido["Curso"][2])
+        assert leido["Puntaje"].tolist()[0] == 250.5 and pd.isna(leido["Puntaje"][1])
+        assert leido["N"].tolist() == [0, 1, 2, 3, 4]
+        assert leido["Fecha"][0] == datetime(2026, 3, 1)
+
+    def test_error_de_celda_se_propaga(self):
+        con_tz = pd.DataFrame({"t": pd.to_datetime(["2026-03-01"]).tz_localize("UTC")})
+        with pytest.raises(Exception):
+            artifact_export.xlsx_por_trozos(con_tz)
+
+
+@pytest.mark.unit
+class TestParquet:
+    def test_un_row_group_por_bloque(self, df):
+        pq = pytest.importorskip("pyarrow.parquet")
+        contenido = b"".join(artifact_export.parquet_por_trozos(df))
+        archivo = pq.ParquetFile(io.BytesIO(contenido))
+        assert archivo.metadata.num_row_groups == 3
+        leido = archivo.read().to_pandas()
+        assert leido["Puntaje"].equals(df["Puntaje"])
+        assert leido["N"].tolist() == [0, 1, 2, 3, 4]
+        assert leido["Curso"].tolist() == ["II A", "II B", None, "III A", "III B"]
+
+    def test_object_mixto_sale_como_texto(self, df):
+        pytest.importorskip("pyarrow")
+        leido = pd.read_parquet(io.BytesIO(b"".join(artifact_export.parquet_por_trozos(df))))
+        assert leido["Año"].tolist() == ["2026", "2025", None, "2024", "2023"]
+
+
+@pytest.mark.unit
+class TestPagina:
+    def test_ventana_dtypes_y_total(self, df):
+        p = artifact_export.pagina(df, offset=1, limit=2)
+        assert p["total_rows"] == 5
+        assert (p["offset"], p["limit"]) == (1, 2)
+        assert p["columns"][:3] == [
+            {"name": "Curso", "dtype": "object"},
+            {"name": "Puntaje", "dtype": "float64"},
+            {"name": "N", "dtype": "int64"},
+        ]
+        assert p["rows"][0][:3] == ["II B", None, 1]
+        assert p["rows"][1][:3] == [None, 300.0, 2]
+        assert isinstance(p["rows"][1][2], int)
+
+    def test_offset_fuera_de_rango(self, df):
+        p = artifact_export.pagina(df, offset=10, limit=5)
+        assert p["rows"] == [] and p["total_rows"] == 5
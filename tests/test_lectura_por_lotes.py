@@ -0,0 +1,93 @@
+"""Tests de la lectura de CSV/XLSX por lotes (`backend/lectura_por_lotes.py`).
+
+Cubre:
+1. Los lotes de XLSX (openpyxl read-only) tienen las mismas columnas y
+   filas que `pd.read_excel` con el mismo `header`.
+2. Los enteros no se vuelven float por un vacío en la columna, en ningún
+   lote; CSV y XLSX dan las mismas celdas.
+3. `buscar_fila` cuenta filas como `pd.read_excel(header=None)`.
+4. `metric_bulk.guardar_lotes` reporta progreso y ubica el lote inválido.
+"""
+from __future__ import annotations
+
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from backend.lectura_por_lotes import buscar_fila, leer_por_lotes
+
+
+def _xlsx(filas, ruta=None):
+    wb = Workbook()
+    ws = wb.active
+    for fila in filas:
+        ws.append(fila)
+    destino = ruta or io.BytesIO()
+    wb.save(destino)
+    if ruta is None:
+        destino.seek(0)
+    return destino
+
+
+FILAS = [
+    ["Informe"],
+    [],
+    ["Curso", "Año", None, "Curso"],
+    ["II A", 2026, 0.5, "x"],
+    [],
+    ["II B", None, 1.0, "y"],
+    ["II C", 2025, 0.25, None],
+    [],
+    [],
+]
+
+
+@pytest.mark.unit
+class TestLeerPorLotes:
+    def test_xlsx_igual_a_read_excel(self):
+        lotes = list(leer_por_lotes(_xlsx(FILAS), "a.xlsx", header=2, filas_por_lote=2))
+        assert [len(l) for l in lotes] == [2, 2]
+        df = pd.concat(lotes, ignore_index=True)
+        esperado = pd.read_excel(_xlsx(FILAS), header=2)
+        assert list(df.columns) == list(esperado.columns) == ["Curso", "Año", "Unnamed: 2", "Curso.1"]
+        assert df["Curso"].tolist() == [v if pd.notna(v) else None for v in esperado["Curso"]]
+        assert df["Unnamed: 2"].tolist() == [0.5, None, 1, 0.25]
+
+    def test_enteros_no_dependen_del_lote(self):
+        xlsx = pd.concat(leer_por_lotes(_xlsx(FILAS), "a.xlsx", header=2, filas_por_lote=1))
+        csv = "Curso;Año\nII A;2026\n;\nII B;\nII C;2025\n".encode("utf-8")
+        lotes_csv = list(leer_por_lotes(io.BytesIO(csv), "a.csv", filas_por_lote=2))
+        assert [str(v) for v in xlsx["Año"] if v is not None] == ["2026", "2025"]
+        assert [str(v) for l in lotes_csv for v in l["Año"] if v is not None] == ["2026", "2025"]
+        assert all(l.dtypes.eq(object).all() for l in lotes_csv)
+
+    def test_progreso(self):
+        avance = []
+        list(leer_por_lotes(_xlsx(FILAS), "a.xlsx", header=2, filas_por_lote=3,
+                            progreso=lambda n, total: avance.append(n)))
+        assert avance == [3, 4]
+
+    def test_buscar_fila(self, tmp_path):
+        ruta = str(tmp_path / "m.xlsx")
+        _xlsx([["titulo"], [], ["x", "  Forma 1 "], ["a", "b"]], ruta)
+        assert buscar_fila(ruta, "forma 1") == 2
+        assert buscar_fila(ruta, "no está") is None
+
+
+@pytest.mark.integration
+class TestGuardarLotes:
+    def test_progreso_y_lote_invalido(self, db_session, org):
+        from backend.metric_bulk import LoteInvalido, guardar_lotes
+        from tests.factories import make_metric
+
+        metric = make_metric(db_session, org, name="Puntaje", data_type="int")
+        lotes = [pd.DataFrame({"Puntaje": [1, 2]}), pd.DataFrame({"Puntaje": [3, "x"]})]
+        avance = []
+        with pytest.raises(LoteInvalido) as exc:
+            guardar_lotes(db_session, iter(lotes), metric=metric, fields=[], dim_name_to_id={},
+                          org_id=org.id, user_id=None, via="import_csv",
+                          progreso=lambda carga: avance.append(carga.filas))
+        assert avance == [2]
+        assert (exc.value.desde, exc.value.hasta) == (3, 4)
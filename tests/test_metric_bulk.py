@@ -0,0 +1,123 @@
+"""Tests del escritor masivo de metric_data (`backend/metric_bulk.py`).
+
+Cubre:
+1. `construir_payloads` produce el mismo `value`/`dimensions_json` que el
+   armado fila a fila (casteos por field, celdas vacías, pares X/X_Norm).
+2. La cobertura por dimensión cuenta solo filas guardadas con valor.
+3. `guardar_dataframe` escribe por lotes con auditoría y descarta la copia
+   columnar de la métrica.
+"""
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+import pytest
+
+from backend.metric_bulk import _copy_texto, construir_payloads
+
+
+class _M:
+    def __init__(self, name="Puntaje", data_type="object"):
+        self.name = name
+        self.data_type = data_type
+
+
+@pytest.mark.unit
+class TestConstruirPayloads:
+    def test_objeto_castea_fields_y_omite_vacios(self):
+        df = pd.DataFrame({
+            "Curso": ["II A", None, "II B"],
+            "Rend": [0.5, None, 1.0],
+            "Buenas": [8.0, 3.0, None],
+        })
+        values, dims, cobertura = construir_payloads(
+            df,
+            metric=_M(),
+            fields=[{"name": "Rend", "type": "float"}, {"name": "Buenas", "type": "int"}],
+            dim_name_to_id={"Curso": 3, "Pregunta": 4},
+        )
+        assert [json.loads(v) for v in values] == [
+            {"Rend": 0.5, "Buenas": 8}, {"Buenas": 3}, {"Rend": 1.0},
+        ]
+        assert [json.loads(d) for d in dims] == [{"3": "II A"}, {}, {"3": "II B"}]
+        assert cobertura == {3: 2, 4: 0}
+
+    def test_escalar_descarta_filas_sin_valor(self):
+        df = pd.DataFrame({"Puntaje": [60, None, 72], "Curso": ["A", "B", None]})
+        values, dims, cobertura = construir_payloads(
+            df, metric=_M(data_type="int"), fields=[], dim_name_to_id={"Curso": 5},
+        )
+        assert values == ["60", "72"]
+        assert [json.loads(d) for d in dims] == [{"5": "A"}, {}]
+        assert cobertura == {5: 1}
+
+    def test_vacios_como_nulos(self):
+        df = pd.DataFrame({"Puntaje": ["7", " NaN ", "null"], "Curso": ["", "X", "none"]})
+        values, dims, _ = construir_payloads(
+            df, metric=_M(data_type="str"), fields=[], dim_name_to_id={"Curso": 5},
+            vacios_como_nulos=True,
+        )
+        assert values == ["7"]
+        assert dims == ["{}"]
+
+    def test_completa_par_de_nombres(self):
+        df = pd.DataFrame({"Nombre": ["José Pérez", None], "Nombre_Norm": [None, "PEREZ JOSE"]})
+        _, dims, cobertura = construir_payloads(
+            df, metric=_M(), fields=[], dim_name_to_id={"Nombre": 1, "Nombre_Norm": 2},
+            pares_nombre=[(1, 2)],
+        )
+        d0, d1 = (json.loads(d) for d in dims)
+        assert d0["1"] == "José Pérez" and d0["2"]
+        assert d1 == {"1": "PEREZ JOSE", "2": "PEREZ JOSE"}
+        assert cobertura == {1: 2, 2: 2}
+
+    def test_copy_texto_escapa_separadores(self):
+        assert _copy_texto(None) == "\\N"
+        assert _copy_texto("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+
+@pytest.mark.integration
+class TestGuardarDataframe:
+    def test_escribe_por_lotes_con_auditoria(self, db_session, org, monkeypatch):
+        from backend import metric_bulk
+        from backend.metric_store import cargar_columnas
+        from backend.models import MetricData, MetricDataColumns
+        from tests.factories import make_dimension, make_metric
+
+        monkeypatch.setattr(metric_bulk, "FILAS_POR_LOTE", 2)
+        dim = make_dimension(db_session, org, name="Curso")
+        metric = make_metric(
+            db_session, org, data_type="object", fields=[{"name": "Rend", "type": "float"}],
+            dimensions=[dim],
+        )
+        assert cargar_columnas(db_session, metric).n_rows == 0
+
+        df = pd.DataFrame({"Curso": ["A", "B", "C", "D", "E"], "Rend": [0.1, 0.2, 0.3, 0.4, 0.5]})
+        carga = metric_bulk.guardar_dataframe(
+            db_session, df, metric=metric, fields=[{"name": "Rend", "type": "float"}],
+            dim_name_to_id={"Curso": dim.id_dimension}, org_id=org.id,
+            user_id=None, via="pipeline_cron",
+        )
+        db_session.commit()
+
+        assert carga.filas == 5
+        assert carga.cobertura == {dim.id_dimension: 5}
+        filas = db_session.query(MetricData).filter(
+            MetricData.id_metric == metric.id_metric
+        ).order_by(MetricData.id_data).all()
+        assert [json.loads(f.value)["Rend"] for f in filas] == [0.1, 0.2, 0.3, 0.4, 0.5]
+        assert {f.created_via for f in filas} == {"pipeline_cron"}
+        assert all(f.org_id == org.id and f.created_at is not None for f in filas)
+        assert db_session.query(MetricDataColumns).filter(
+            MetricDataColumns.id_metric == metric.id_metric
+        ).first() is None
+
+    def test_via_invalido(self, db_session, org):
+        from backend.metric_bulk import escribir_metric_data
+
+        with pytest.raises(ValueError):
+            escribir_metric_data(
+                db_session, metric_id=1, org_id=org.id, values=["1"], dimensions=[{}],
+                user_id=None, via="otro",
+            )
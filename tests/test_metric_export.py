@@ -0,0 +1,107 @@
+"""Tests del export por streaming de metric_data (`backend/metric_export.py`).
+
+Cubre:
+1. Las columnas y filas por lotes son las de `marco_plano(...,
+   solo_dims_presentes=True)`, leyendo de la DB o del cache del proceso.
+2. Las columnas de auditoría se resuelven lote a lote.
+3. CSV y XLSX (write-only) se pueden releer con el contenido esperado.
+"""
+from __future__ import annotations
+
+import io
+
+import pandas as pd
+import pytest
+
+from backend.metric_export import COLUMNAS_AUDITORIA, Exportacion, serializar
+from backend.metric_store import columnas_cacheadas, marco_plano
+from tests.factories import make_dimension, make_metric, make_metric_data
+
+
+@pytest.fixture
+def metrica(db_session, org):
+    from backend.metric_cache import metric_frames
+
+    curso = make_dimension(db_session, org, name="Curso")
+    anio = make_dimension(db_session, org, name="Año")
+    m = make_metric(db_session, org, name="Puntaje", data_type="object",
+                    fields=[{"name": "Rend", "type": "float"}], dimensions=[curso, anio])
+    # El field "Buenas" y la dimensión sin nombre aparecen recién en el
+    # tercer lote; la fila no-objeto agrega Valor_Raw.
+    filas = [
+        ({"Rend": 0.5}, {str(curso.id_dimension): "II A", str(anio.id_dimension): "2026"}),
+        ({"Rend": 0.7}, {str(curso.id_dimension): "II B"}),
+        ({"Rend": 0.1}, {str(anio.id_dimension): "2025"}),
+        ({"Rend": 0.9}, {str(curso.id_dimension): "II A"}),
+        ({"Rend": 1.0, "Buenas": 8}, {str(curso.id_dimension): "II C", "999": "x"}),
+        ("sin objeto", {str(curso.id_dimension): "II C"}),
+    ]
+    for value, dims in filas:
+        make_metric_data(db_session, m, value=value, dimensions_json=dims)
+    metric_frames.invalidar(m.id_metric)
+    m._dims_map = {curso.id_dimension: "Curso", anio.id_dimension: "Año"}
+    m._curso = curso
+    return m
+
+
+def _como_frame(exp: Exportacion) -> pd.DataFrame:
+    filas = [f for lote in exp.lotes() for f in lote]
+    return pd.DataFrame(filas, columns=exp.columnas)
+
+
+def _esperado(db, m, filtros=None) -> pd.DataFrame:
+    return marco_plano(columnas_cacheadas(db, m, filtros), m, m._dims_map, solo_dims_presentes=True)
+
+
+@pytest.mark.integration
+class TestExportacion:
+    @pytest.mark.parametrize("cacheada", [False, True])
+    def test_lotes_igual_a_marco_plano(self, db_session, metrica, cacheada):
+        if cacheada:
+            columnas_cacheadas(db_session, metrica)
+        exp = Exportacion(db_session, metrica, metrica._dims_map, filas_por_lote=2)
+        esperado = _esperado(db_session, metrica)
+        assert exp.columnas == list(esperado.columns)
+        assert exp.columnas[-3:] == ["Rend", "Buenas", "Valor_Raw"]
+        assert "Dim_999" in exp.columnas
+        pd.testing.assert_frame_equal(_como_frame(exp), esperado.astype(object), check_dtype=False)
+
+    def test_filtros_y_auditoria(self, db_session, metrica, user):
+        from backend.models import MetricData
+
+        db_session.query(MetricData).filter(MetricData.id_metric == metrica.id_metric).update(
+            {MetricData.created_by_user_id: user.id, MetricData.created_via: "excel"}
+        )
+        db_session.flush()
+        filtros = {str(metrica._curso.id_dimension): "II A"}
+        exp = Exportacion(db_session, metrica, metrica._dims_map, filtros,
+                          include_audit=True, filas_por_lote=1)
+        df = _como_frame(exp)
+        assert list(df.columns[-4:]) == COLUMNAS_AUDITORIA
+        assert df["Curso"].tolist() == ["II A", "II A"]
+        assert df["Cargado por"].tolist() == [user.email, user.email]
+        assert df["Vía"].tolist() == ["excel", "excel"]
+
+    def test_metrica_vacia(self, db_session, org):
+        m = make_metric(db_session, org, name="Vacía")
+        exp = Exportacion(db_session, m, {})
+        assert exp.columnas == []
+        assert b"".join(serializar(exp, "csv")) == "﻿".encode("utf-8")
+
+
+@pytest.mark.integration
+class TestSerializacion:
+    def test_csv_por_trozos(self, db_session, metrica):
+        exp = Exportacion(db_session, metrica, metrica._dims_map, filas_por_lote=2)
+        trozos = list(serializar(exp, "csv"))
+        assert len(trozos) == 1 + 3  # cabecera + un trozo por lote
+        df = pd.read_csv(io.BytesIO(b"".join(trozos)), sep=";", encoding="utf-8-sig", dtype=str)
+        assert list(df.columns) == exp.columnas
+        assert len(df) == 6
+        assert df["Valor_Raw"].dropna().tolist() == ["sin objeto"]
+
+    def test_xlsx_write_only(self, db_session, metrica):
+        exp = Exportacion(db_session, metrica, metrica._dims_map, filas_por_lote=4)
+        df = pd.read_excel(io.BytesIO(b"".join(serializar(exp, "excel"))), sheet_name="Datos")
+        assert list(df.columns) == exp.columnas
+        assert df["Rend"].tolist()[:5] == [0.5, 0.7, 0.1, 0.9, 1.0]
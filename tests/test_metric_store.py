@@ -0,0 +1,399 @@
+"""Tests de la copia columnar materializada de metric_data (`backend/metric_store.py`).
+
+Cubre:
+1. `construir_columnas` separa dimensiones y fields sin perder filas.
+2. El payload comprimido ida y vuelta conserva tipos y `None`.
+3. La primera lectura persiste la copia; las escrituras ORM la descartan en
+   el mismo flush y toda escritura (incluidas las masivas) sube
+   `Metric.data_version`, la huella de la copia. Con una sesión ligada a un
+   Engine, una escritura concurrente nunca deja una copia vieja y una
+   sesión que ya escribió persiste la copia en su propia transacción.
+4. Los filtros por dimensión compilados a SQL dan las mismas filas que el
+   filtrado en memoria sobre la métrica completa.
+5. `metric_dimension_value_counts` sigue a toda escritura (ORM, INSERT y
+   DELETE masivos, cambio de métrica) y coincide con recontar las filas.
+"""
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from backend.metric_store import (
+    ColumnasMetrica,
+    cargar_columnas,
+    columnas_por_campo,
+    columnas_cacheadas,
+    conteos_dimensiones,
+    construir_columnas,
+    filtrar_columnas,
+    normalizar_filtros,
+    registros,
+)
+
+
+@pytest.mark.unit
+class TestConstruirColumnas:
+    def test_separa_dimensiones_y_fields(self):
+        col = construir_columnas([
+            (1, json.dumps({"Rend": 0.5, "Buenas": 8}), json.dumps({"3": "II A", "4": "1-1"})),
+            (2, json.dumps({"Rend": 0.7}), json.dumps({"3": "II B"})),
+        ])
+        assert col.n_rows == 2
+        assert col.dim(3) == ["II A", "II B"]
+        assert col.dim("4") == ["1-1", None]
+        assert col.field("Rend") == [0.5, 0.7]
+        assert col.field("Buenas") == [8, None]
+        assert col.objeto == [1, 1]
+
+    def test_value_escalar_queda_crudo(self):
+        col = construir_columnas([(1, "3.5", "{}"), (2, None, None)])
+        assert col.value == ["3.5", None]
+        assert col.objeto == [0, 0]
+        assert col.fields == {}
+        assert col.dim(9) == [None, None]
+
+    def test_payload_ida_y_vuelta(self):
+        col = construir_columnas([
+            (7, json.dumps({"Logro": "Adecuado", "Rend": 1}), json.dumps({"1": "2026"})),
+        ])
+        again = ColumnasMetrica.from_payload(col.to_payload())
+        assert again == col
+
+    def test_from_frame_convierte_solo_lo_que_se_pide(self):
+        col = construir_columnas([
+            (1, json.dumps({"Rend": 0.5}), json.dumps({"3": "II A", "4": "1-1"})),
+            (2, json.dumps({"Rend": 0.7, "Nivel": "Alto"}), json.dumps({"3": "II B"})),
+        ])
+        again = ColumnasMetrica.from_frame(col.to_frame())
+        assert again.dim(3) == ["II A", "II B"]
+        assert list(again.dims._listas) == ["3"] and not again.fields._listas
+        assert list(again.dims) == ["3", "4"] and "4" in again.dims and "9" not in again.dims
+        assert again == col
+
+    def test_filas_respeta_orden_y_subconjunto(self):
+        col = construir_columnas([
+            (1, "1", json.dumps({"1": "a"})),
+            (2, "2", json.dumps({"1": "b"})),
+            (3, "3", json.dumps({"1": "c"})),
+        ])
+        sub = col.filas([2, 0])
+        assert sub.id_data == [3, 1]
+        assert sub.dim(1) == ["c", "a"]
+
+
+@pytest.mark.unit
+class TestProyeccionPorCampo:
+    def test_sin_meta_fields_convierte_a_float(self):
+        class _M:
+            name = "Puntaje"
+        col = construir_columnas([(1, "60", json.dumps({"5": "5A"})), (2, "n/a", "{}")])
+        cols = columnas_por_campo(col, _M(), [], [(5, "Curso")], lambda n: "_" + n.lower())
+        assert cols == {"_puntaje": [60.0, "n/a"], "_curso": ["5A", None]}
+        assert registros(cols, col.n_rows, extra={"_metric_id": 1})[0] == {
+            "_puntaje": 60.0, "_curso": "5A", "_metric_id": 1,
+        }
+
+    def test_con_meta_fields_value_no_objeto_va_al_primer_field(self):
+        class _M:
+            name = "SIMCE"
+        col = construir_columnas([(1, json.dumps({"Rend": 0.5}), "{}"), (2, "0.9", "{}")])
+        cols = columnas_por_campo(col, _M(), [{"name": "Rend"}], [], lambda n: "_" + n.lower())
+        assert cols["_rend"] == [0.5, 0.9]
+
+
+@pytest.mark.integration
+class TestCopiaPersistida:
+    def _copia(self, db_session, metric_id):
+        from backend.models import MetricDataColumns
+        return db_session.query(MetricDataColumns).filter(
+            MetricDataColumns.id_metric == metric_id
+        ).first()
+
+    def test_primera_lectura_persiste_y_escritura_la_descarta(self, db_session, org):
+        from tests.factories import make_metric, make_metric_data
+
+        m = make_metric(db_session, org)
+        make_metric_data(db_session, m, value="1.0", dimensions_json={"3": "X"})
+
+        col = cargar_columnas(db_session, m)
+        assert col.dim(3) == ["X"]
+        copia = self._copia(db_session, m.id_metric)
+        assert copia is not None and copia.n_rows == 1
+
+        # Update ORM (misma huella n_rows/max_id): la descarta el after_flush
+        md = make_metric_data(db_session, m, value="2.0", dimensions_json={"3": "Y"})
+        assert self._copia(db_session, m.id_metric) is None
+        assert cargar_columnas(db_session, m).value == ["1.0", "2.0"]
+
+        md.value = "5.0"
+        db_session.commit()
+        assert self._copia(db_session, m.id_metric) is None
+        assert cargar_columnas(db_session, m).value == ["1.0", "5.0"]
+
+    def test_borrado_masivo_se_detecta_por_huella(self, db_session, org):
+        from backend.models import MetricData
+        from tests.factories import make_metric, make_metric_data
+
+        m = make_metric(db_session, org)
+        for v in ("1", "2", "3"):
+            make_metric_data(db_session, m, value=v)
+        assert cargar_columnas(db_session, m).n_rows == 3
+
+        db_session.query(MetricData).filter(
+            MetricData.id_metric == m.id_metric
+        ).delete(synchronize_session=False)
+        db_session.commit()
+
+        assert cargar_columnas(db_session, m).n_rows == 0
+
+    def test_update_masivo_con_misma_cantidad_de_filas(self, db_session, org):
+        from backend.models import MetricData
+        from tests.factories import make_metric, make_metric_data
+
+        m = make_metric(db_session, org)
+        for v in ("1", "2"):
+            make_metric_data(db_session, m, value=v)
+        assert cargar_columnas(db_session, m).value == ["1", "2"]
+
+        # Mismos n_rows y max_id_data: solo la versión delata el cambio.
+        db_session.query(MetricData).filter(
+            MetricData.id_metric == m.id_metric, MetricData.value == "2"
+        ).update({"value": "7"}, synchronize_session=False)
+        db_session.commit()
+        assert cargar_columnas(db_session, m).value == ["1", "7"]
+
+
+@pytest.fixture
+def sesiones(tmp_path):
+    """Fábrica de sesiones ligadas a un Engine (como `SessionLocal`), sobre
+    un SQLite en archivo para que haya conexiones y locks reales."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.database import Base
+
+    eng = create_engine(f"sqlite:///{tmp_path / 'metricas.db'}", connect_args={"timeout": 0.5})
+    Base.metadata.create_all(eng)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=eng)
+    eng.dispose()
+
+
+@pytest.mark.integration
+class TestCopiaConEngine:
+    def _metrica(self, db):
+        from backend.models import Metric, MetricData, Organization
+
+        org = Organization(name="Org", slug="org-engine", is_active=True)
+        db.add(org)
+        db.flush()
+        m = Metric(name="M", data_type="str", org_id=org.id)
+        db.add(m)
+        db.flush()
+        db.add_all([MetricData(id_metric=m.id_metric, org_id=org.id, value=v) for v in ("1", "2")])
+        db.commit()
+        return m
+
+    def _copia(self, db, metric_id):
+        from backend.models import MetricDataColumns
+        return db.get(MetricDataColumns, metric_id)
+
+    def test_escritura_concurrente_no_deja_copia_vieja(self, sesiones, monkeypatch):
+        from backend import metric_store
+        from backend.models import MetricData
+
+        db = sesiones()
+        m = self._metrica(db)
+        original = metric_store.construir_columnas
+
+        def _con_update_concurrente(rows):
+            # Otro request commitea un cambio después de que este leyó las
+            # filas y antes de que persista la copia.
+            with sesiones() as otra:
+                otra.query(MetricData).filter(MetricData.value == "2").update(
+                    {"value": "7"}, synchronize_session=False,
+                )
+                otra.commit()
+            return original(rows)
+
+        monkeypatch.setattr(metric_store, "construir_columnas", _con_update_concurrente)
+        assert cargar_columnas(db, m).value == ["1", "2"]
+        monkeypatch.setattr(metric_store, "construir_columnas", original)
+        db.close()
+
+        with sesiones() as db:
+            assert cargar_columnas(db, m).value == ["1", "7"]
+            assert cargar_columnas(db, m).value == ["1", "7"]
+            assert self._copia(db, m.id_metric).data_version == db.get(type(m), m.id_metric).data_version
+
+    def test_sesion_que_ya_escribio_persiste_en_su_transaccion(self, sesiones, caplog):
+        from backend.models import Metric, MetricData
+
+        with sesiones() as db:
+            m = self._metrica(db)
+            mid, org_id = m.id_metric, m.org_id
+            db.add(MetricData(id_metric=mid, org_id=org_id, value="3"))
+            db.flush()
+            with caplog.at_level("WARNING", logger="backend.metric_store"):
+                assert cargar_columnas(db, m).value == ["1", "2", "3"]
+            assert "No se pudo persistir" not in caplog.text
+            db.rollback()
+
+        with sesiones() as db:
+            # El rollback se llevó la fila y también la copia que la incluía.
+            assert self._copia(db, mid) is None
+            m = db.get(Metric, mid)
+            assert cargar_columnas(db, m).value == ["1", "2"]
+            db.add(MetricData(id_metric=mid, org_id=org_id, value="4"))
+            db.flush()
+            assert cargar_columnas(db, m).value == ["1", "2", "4"]
+            db.commit()
+
+        with sesiones() as db:
+            copia = self._copia(db, mid)
+            assert copia is not None and copia.n_rows == 3
+            assert cargar_columnas(db, db.get(Metric, mid)).value == ["1", "2", "4"]
+
+
+@pytest.mark.unit
+class TestNormalizarFiltros:
+    def test_escalar_lista_y_vacios(self):
+        assert normalizar_filtros({3: "A", "4": ["b", "a", None], "5": [], "6": None}) == {
+            "3": ("A",), "4": ("a", "b"),
+        }
+
+    def test_clave_no_numerica(self):
+        with pytest.raises(ValueError):
+            normalizar_filtros({"3') OR 1=1 --": "x"})
+
+
+@pytest.mark.integration
+class TestFiltrosEnSQL:
+    def _metrica(self, db_session, org):
+        from tests.factories import make_metric, make_metric_data
+
+        m = make_metric(db_session, org)
+        filas = [
+            ("1", {"3": "II A", "4": "2025"}),
+            ("2", {"3": "II B", "4": "2025"}),
+            ("3", {"3": "II A", "4": "2026"}),
+            ("4", {"4": "2026"}),
+            ("5", {"3": "II A", "4": 2026}),
+        ]
+        for v, dims in filas:
+            make_metric_data(db_session, m, value=v, dimensions_json=dims)
+        return m
+
+    @pytest.mark.parametrize("filtros, esperado", [
+        ({"3": "II A"}, ["1", "3", "5"]),
+        ({"3": ["II A", "II B"], "4": "2026"}, ["3", "5"]),
+        ({"3": ""}, ["4"]),
+        ({"9": "x"}, []),
+        ({"3": []}, ["1", "2", "3", "4", "5"]),
+    ])
+    def test_sql_y_memoria_coinciden(self, db_session, org, filtros, esperado):
+        from backend.metric_cache import metric_frames
+
+        m = self._metrica(db_session, org)
+        # Sin la métrica en cache: filtra en SQL, sin leer el resto (una
+        # lista vacía no restringe: es la carga completa)
+        en_sql = columnas_cacheadas(db_session, m, filtros)
+        completa_cacheada = metric_frames.tiene(m.id_metric, variante="columnas")
+        assert completa_cacheada == (not normalizar_filtros(filtros))
+        assert en_sql.value == esperado
+
+        completa = columnas_cacheadas(db_session, m)
+        assert filtrar_columnas(completa, filtros).value == esperado
+        # Con la métrica cacheada, filtra en memoria
+        assert columnas_cacheadas(db_session, m, filtros).value == esperado
+
+    def test_filtro_no_lee_la_copia_materializada(self, db_session, org):
+        from backend.models import MetricDataColumns
+
+        m = self._metrica(db_session, org)
+        columnas_cacheadas(db_session, m, {"3": "II B"})
+        assert db_session.query(MetricDataColumns).filter(
+            MetricDataColumns.id_metric == m.id_metric
+        ).first() is None
+
+
+@pytest.mark.integration
+class TestConteosDimensiones:
+    def _recontar(self, db_session, metric_id):
+        from backend.models import MetricData
+
+        out = {}
+        for (raw,) in db_session.query(MetricData.dimensions_json).filter(
+            MetricData.id_metric == metric_id
+        ):
+            for k, v in json.loads(raw or "{}").items():
+                if v is not None:
+                    out.setdefault(k, {}).setdefault(str(v), 0)
+                    out[k][str(v)] += 1
+        return out
+
+    def test_sigue_a_todas_las_escrituras(self, db_session, org):
+        from sqlalchemy import insert
+
+        from backend.models import MetricData
+        from tests.factories import make_metric, make_metric_data
+
+        m = make_metric(db_session, org)
+        otra = make_metric(db_session, org)
+        md = make_metric_data(db_session, m, value="1", dimensions_json={"3": "II A", "4": None})
+        db_session.execute(insert(MetricData), [
+            {"id_metric": m.id_metric, "org_id": org.id, "value": str(i),
+             "dimensions_json": json.dumps({"3": f"II {'AB'[i % 2]}", "4": "2026"})}
+            for i in range(5)
+        ])
+        db_session.commit()
+        assert conteos_dimensiones(db_session, [m.id_metric]) == {
+            "3": {"II A": 4, "II B": 2}, "4": {"2026": 5},
+        }
+
+        md.dimensions_json = json.dumps({"3": "III A"})
+        db_session.commit()
+        db_session.query(MetricData).filter(
+            MetricData.id_metric == m.id_metric, MetricData.value.in_(["0", "1"])
+        ).update({"id_metric": otra.id_metric}, synchronize_session=False)
+        db_session.query(MetricData).filter(MetricData.value == "2").delete(synchronize_session=False)
+        db_session.commit()
+
+        for metric_id in (m.id_metric, otra.id_metric):
+            assert conteos_dimensiones(db_session, [metric_id]) == self._recontar(db_session, metric_id)
+        # Los valores que quedan en 0 se borran del índice (la única fila
+        # con "III A" pasó a la otra métrica).
+        assert "III A" not in conteos_dimensiones(db_session, [m.id_metric], ["3"])["3"]
+        assert conteos_dimensiones(db_session, [otra.id_metric], ["3"])["3"]["III A"] == 1
+
+    def test_dimensions_json_no_objeto_no_cuenta(self, db_session, org):
+        from sqlalchemy import insert
+
+        from backend.models import MetricData
+        from tests.factories import make_metric
+
+        m = make_metric(db_session, org)
+        db_session.execute(insert(MetricData), [
+            {"id_metric": m.id_metric, "org_id": org.id, "value": "1", "dimensions_json": raw}
+            for raw in ("{roto", "", None, "[1]", '"II A"', '{"3": "II A"}')
+        ])
+        db_session.commit()
+        assert conteos_dimensiones(db_session, [m.id_metric]) == {"3": {"II A": 1}}
+
+        db_session.query(MetricData).filter(
+            MetricData.id_metric == m.id_metric, MetricData.dimensions_json == "{roto"
+        ).update({"dimensions_json": '{"3": "II A"}'}, synchronize_session=False)
+        db_session.query(MetricData).filter(MetricData.dimensions_json == "[1]").delete(
+            synchronize_session=False
+        )
+        db_session.commit()
+        assert conteos_dimensiones(db_session, [m.id_metric]) == {"3": {"II A": 2}}
+
+    def test_suma_sobre_metricas_y_filtra_claves(self, db_session, org):
+        from tests.factories import make_metric, make_metric_data
+
+        a, b = make_metric(db_session, org), make_metric(db_session, org)
+        make_metric_data(db_session, a, value="1", dimensions_json={"3": "X", "4": "1"})
+        make_metric_data(db_session, b, value="1", dimensions_json={"3": "X"})
+        assert conteos_dimensiones(db_session, [a.id_metric, b.id_metric], ["3"]) == {"3": {"X": 2}}
+        assert conteos_dimensiones(db_session, []) == {}